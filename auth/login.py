@@ -6,11 +6,14 @@ import base64
 import hmac
 import hashlib
 import json
+import math
 import time
 import logging
 from datetime import datetime, timedelta
+from database.models.login_throttle import LoginThrottle
 from database.models.user import User
 from flask import session
+from utils.password_hasher import HasherBusy, get_verification_pool
 import config
 
 # Configure logger
@@ -20,20 +23,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger('auth.login')
 
-def login_user(username_or_email, password, remember_me=False):
+def login_user(username_or_email, password, remember_me=False, ip_address=None):
     """
     Authenticate a user.
     
+    Attempts are limited per client IP and per account with token buckets
+    shared by all processes. A successful login refills the account's
+    bucket and upgrades a password hash made with outdated parameters.
+    
     Args:
         username_or_email (str): Username or email
         password (str): Password
         remember_me (bool): Whether to remember login
+        ip_address (str, optional): Client IP address, used for throttling
         
     Returns:
         tuple: (success, message, token, user_data)
     """
     try:
         user_model = User()
+        throttle = LoginThrottle() if config.LOGIN_THROTTLE_ENABLED else None
+        account_key = f"account:{username_or_email.strip().lower()}"
+        
+        if throttle is not None:
+            if ip_address:
+                allowed, retry_after = throttle.consume(
+                    f"ip:{ip_address}", config.LOGIN_IP_BURST, config.LOGIN_IP_REFILL_SECONDS
+                )
+                if not allowed:
+                    logger.warning(f"Login throttled for IP {ip_address}")
+                    return _throttled(retry_after)
+            
+            # Taken up front so concurrent guesses cannot all pass; a successful login refills it
+            allowed, retry_after = throttle.consume(
+                account_key, config.LOGIN_ACCOUNT_BURST, config.LOGIN_ACCOUNT_REFILL_SECONDS
+            )
+            if not allowed:
+                logger.warning(f"Login throttled for account: {username_or_email}")
+                return _throttled(retry_after)
         
         # Check if input is email or username
         is_email = "@" in username_or_email
@@ -52,11 +79,25 @@ def login_user(username_or_email, password, remember_me=False):
         if not user.get("isVerified", False):
             return False, "Please verify your email before logging in", None, None
         
-        # Verify password
-        if not user_model.verify_password(password, user["password"]):
+        # Verify password off the request thread
+        try:
+            password_ok, new_hash = get_verification_pool().verify(password, user["password"])
+        except HasherBusy:
+            if throttle is not None:
+                throttle.refund(account_key)
+            logger.warning(f"Login rejected, password verification is saturated: {username_or_email}")
+            return False, "The server is busy. Please try again in a moment.", None, None
+        
+        if not password_ok:
             logger.warning(f"Failed login attempt for user: {username_or_email}")
             return False, "Invalid username/email or password", None, None
         
+        if throttle is not None:
+            throttle.reset(account_key)
+        
+        if new_hash and user_model.upgrade_password_hash(user["_id"], user["password"], new_hash):
+            logger.info(f"Upgraded password hash for user: {user['username']}")
+        
         # Generate simple token
         token = generate_simple_token(
             str(user["_id"]), 
@@ -80,6 +121,19 @@ def login_user(username_or_email, password, remember_me=False):
         logger.error(f"Login error: {str(e)}")
         return False, f"An error occurred during login: {str(e)}", None, None
 
+def _throttled(retry_after):
+    """
+    Build the login result for a throttled attempt.
+    
+    Args:
+        retry_after (float): Seconds until another attempt is allowed
+        
+    Returns:
+        tuple: (success, message, token, user_data)
+    """
+    seconds = max(1, math.ceil(retry_after))
+    return False, f"Too many login attempts. Please try again in {seconds} seconds.", None, None
+
 def generate_simple_token(user_id, username, email, role):
     """
     Generate a simple signed token without using JWT libraries.
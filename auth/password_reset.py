@@ -213,6 +213,7 @@ def change_password(user_id, current_password, new_password, confirm_password):
             "updatedAt": datetime.utcnow()
         }}
     )
+    user_model.invalidate_cached_user(user_id)
     
     if result.modified_count > 0:
         return True, "Your password has been changed successfully."
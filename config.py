@@ -26,12 +26,38 @@ JWT_SECRET = os.getenv("JWT_SECRET", SECRET_KEY)
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION = int(os.getenv("JWT_EXPIRATION", "24"))  # hours
 
+# Password hashing settings; older hashes are upgraded on the next successful login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "350000"))  # pbkdf2_sha256 rounds
+PASSWORD_VERIFY_WORKERS = int(os.getenv("PASSWORD_VERIFY_WORKERS", "2"))  # hashes computed in parallel per process
+PASSWORD_VERIFY_QUEUE = int(os.getenv("PASSWORD_VERIFY_QUEUE", "8"))  # hashes waiting before logins are turned away
+
+# Login throttling (token buckets stored in MongoDB)
+LOGIN_THROTTLE_ENABLED = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() == "true"
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))  # attempts per IP before throttling
+LOGIN_IP_REFILL_SECONDS = float(os.getenv("LOGIN_IP_REFILL_SECONDS", "6"))  # seconds to regain one attempt
+LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))  # failed attempts per account before throttling
+LOGIN_ACCOUNT_REFILL_SECONDS = float(os.getenv("LOGIN_ACCOUNT_REFILL_SECONDS", "60"))
+
 # Email settings
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 EMAIL_FROM = os.getenv("EMAIL_FROM", "Travian Whispers <noreply@travianwhispers.com>")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"  # STARTTLS; disable for a local sink
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))  # seconds
+
+# Email outbox settings (delivery runs on `main.py --worker`)
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+EMAIL_WORKER_CONCURRENCY = int(os.getenv("EMAIL_WORKER_CONCURRENCY", "2"))  # SMTP connections per process
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "2"))  # seconds
+EMAIL_RATE_LIMIT = float(os.getenv("EMAIL_RATE_LIMIT", "5"))  # messages per second per process, 0 disables
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", "30"))  # seconds, doubled per attempt
+EMAIL_RETRY_MAX_DELAY = float(os.getenv("EMAIL_RETRY_MAX_DELAY", "3600"))  # seconds
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))  # seconds before an unused connection is closed
 
 # PayPal settings
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID", "")
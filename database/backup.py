@@ -1,15 +1,40 @@
 """
 Database backup utility for Travian Whispers.
+
+Backups are written by a streaming engine: each collection is read in
+raw BSON cursor batches and written straight into a gzip file, several
+collections at a time, so memory use does not grow with collection size.
+A backup directory uses the mongodump --gzip layout and can also be
+restored with `mongorestore --gzip --dir <backup>` (full backups only):
+
+    <timestamp>/
+        manifest.json                  counts, sizes and checksums
+        <db>/<collection>.bson.gz      concatenated BSON documents
+        <db>/<collection>.metadata.json.gz
+
+Incremental backups build a chain on the latest full backup: the large
+append-only collections are copied only from the watermark recorded by
+the previous backup in the chain, everything else is copied whole. The
+manifest names the previous backup, so database/restore.py can replay a
+chain from the files alone.
 """
-import os
 import logging
 import subprocess
 import datetime
+import gzip
+import hashlib
+import io
 import json
-from pathlib import Path
-import shutil
+import struct
 import tarfile
-import gzip
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from contextlib import contextmanager
+from pathlib import Path
+from bson import ObjectId, json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
 from database.mongodb import MongoDB
 from flask import current_app
 
@@ -20,6 +45,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger('database.backup')
 
+# Version of the backup layout, recorded in the manifest
+BACKUP_FORMAT_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+
+# Collections written by the partial backup types
+BACKUP_TYPE_COLLECTIONS = {
+    'users': ['users'],
+    'transactions': ['transactions'],
+    'subscriptions': ['subscriptionPlans']
+}
+
+# Append-only collections that incremental backups copy from a watermark,
+# by the field recording insertion order. Deletions in them (retention
+# cleanups) are not carried into incrementals. Other collections are
+# updated in place without a reliable updatedAt, so they are copied whole.
+INCREMENTAL_WATERMARKS = {
+    'activity_logs': '_id',
+    'system_logs': '_id',
+    'proxyMetrics': '_id'
+}
+
+# Read size when checksumming backup files
+CHUNK_SIZE = 1024 * 1024
+
 class BackupError(Exception):
     """Base class for backup-related errors."""
     def __init__(self, message, original_error=None):
@@ -27,40 +77,119 @@ class BackupError(Exception):
         self.original_error = original_error
         super().__init__(self.message)
 
+class _ChecksumWriter:
+    """File wrapper that hashes and counts the bytes written through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+def _count_bson_documents(data):
+    """
+    Count the documents in a buffer of concatenated BSON documents.
+
+    Each document starts with its int32 length, so this walks the buffer
+    without decoding anything.
+
+    Args:
+        data (bytes): Raw BSON batch
+
+    Returns:
+        int: Number of documents
+    """
+    count = 0
+    offset = 0
+    while offset < len(data):
+        offset += struct.unpack_from("<i", data, offset)[0]
+        count += 1
+    return count
+
+def _isoformat(moment):
+    """Format a naive UTC datetime for the manifest."""
+    return moment.isoformat() + "Z"
+
+def _parse_time(value):
+    """Parse a manifest timestamp into a naive UTC datetime."""
+    return datetime.datetime.fromisoformat(value.rstrip("Z"))
+
+def _watermark_query(field, since):
+    """
+    Build the filter for documents added since a moment.
+
+    Args:
+        field (str): Watermark field, '_id' for ObjectIds or a datetime field
+        since (datetime): Moment (UTC)
+
+    Returns:
+        dict: Query
+    """
+    if field == '_id':
+        return {'_id': {'$gte': ObjectId.from_datetime(since)}}
+    return {field: {'$gte': since}}
+
+def _get_database():
+    """
+    Get the database, connecting if needed.
+
+    Returns:
+        pymongo.database.Database: Database
+
+    Raises:
+        BackupError: If MongoDB cannot be reached
+    """
+    mongodb = MongoDB()
+    db = mongodb.get_db()
+    if db is None:
+        mongodb.connect()
+        db = mongodb.get_db()
+        if db is None:
+            raise BackupError("Failed to connect to MongoDB")
+    return db
+
 def create_backup_directory(base_path="backups"):
     """
     Create a directory for storing backups.
-    
+
     Args:
         base_path (str): Base directory for backups
-        
+
     Returns:
         Path: Path to the created directory
     """
     try:
         backup_dir = Path(base_path)
         backup_dir.mkdir(exist_ok=True, parents=True)
-        
+
         # Create a timestamped subdirectory
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = backup_dir / timestamp
         backup_path.mkdir(exist_ok=True)
-        
+
         logger.info(f"Created backup directory: {backup_path}")
         return backup_path
     except Exception as e:
         logger.error(f"Failed to create backup directory: {e}")
         raise BackupError(f"Failed to create backup directory: {e}", e)
 
-def backup_using_mongodump(connection_string, output_path, db_name="whispers"):
+def backup_using_mongodump(connection_string, output_path, db_name="whispers", parallel=4):
     """
     Create a backup using mongodump utility.
-    
+
     Args:
         connection_string (str): MongoDB connection string
         output_path (Path): Directory to store the backup
         db_name (str): Database name
-        
+        parallel (int, optional): Collections dumped at once
+
     Returns:
         bool: True if successful, False otherwise
     """
@@ -71,22 +200,21 @@ def backup_using_mongodump(connection_string, output_path, db_name="whispers"):
         except (subprocess.SubprocessError, FileNotFoundError):
             logger.error("mongodump not found in PATH. Using alternative backup method.")
             return False
-        
-        # Run mongodump
-        dump_path = output_path / "mongodump"
-        dump_path.mkdir(exist_ok=True)
-        
+
+        # Same layout as the built-in engine: <output>/<db>/<collection>.bson.gz
         cmd = [
             "mongodump",
             "--uri", connection_string,
             "--db", db_name,
-            "--out", str(dump_path)
+            "--gzip",
+            f"--numParallelCollections={parallel}",
+            "--out", str(output_path)
         ]
-        
+
         process = subprocess.run(cmd, check=True, capture_output=True)
-        
+
         if process.returncode == 0:
-            logger.info(f"MongoDB backup created successfully using mongodump at {dump_path}")
+            logger.info(f"MongoDB backup created successfully using mongodump at {output_path}")
             return True
         else:
             logger.error(f"mongodump failed: {process.stderr.decode()}")
@@ -95,78 +223,287 @@ def backup_using_mongodump(connection_string, output_path, db_name="whispers"):
         logger.error(f"Error during mongodump: {e}")
         return False
 
+def dump_collection(db, collection_name, output_path, compress=True, batch_size=1000, compresslevel=6,
+                    query=None):
+    """
+    Stream one collection into a BSON file.
+
+    Documents are fetched as raw BSON batches and written as they arrive,
+    so only one batch is held in memory. The collection's options and
+    indexes go to a metadata file next to it.
+
+    Args:
+        db (pymongo.database.Database): Database
+        collection_name (str): Collection to dump
+        output_path (Path): Backup directory
+        compress (bool, optional): Whether to gzip the files while writing
+        batch_size (int, optional): Documents per cursor batch
+        compresslevel (int, optional): gzip compression level
+        query (dict, optional): Filter selecting the documents, all if omitted
+
+    Returns:
+        dict: Manifest entry for the collection
+    """
+    started = time.monotonic()
+    collection = db[collection_name]
+    suffix = ".gz" if compress else ""
+
+    db_dir = output_path / db.name
+    db_dir.mkdir(exist_ok=True)
+    data_name = f"{db.name}/{collection_name}.bson{suffix}"
+    metadata_name = f"{db.name}/{collection_name}.metadata.json{suffix}"
+
+    documents = 0
+    raw_bytes = 0
+
+    with open(output_path / data_name, "wb") as raw_file:
+        writer = _ChecksumWriter(raw_file)
+        stream = gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=compresslevel) if compress else writer
+        try:
+            for batch in collection.find_raw_batches(query or {}, batch_size=batch_size):
+                stream.write(batch)
+                documents += _count_bson_documents(batch)
+                raw_bytes += len(batch)
+        finally:
+            if compress:
+                stream.close()
+
+    metadata = json_util.dumps({
+        "options": collection.options(),
+        "indexes": list(collection.list_indexes()),
+        "collectionName": collection_name,
+        "type": "collection"
+    }, json_options=CANONICAL_JSON_OPTIONS).encode("utf-8")
+
+    opener = gzip.open if compress else open
+    with opener(output_path / metadata_name, "wb") as f:
+        f.write(metadata)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Backed up collection {collection_name} with {documents} documents in {elapsed:.1f}s")
+
+    return {
+        "file": data_name,
+        "metadata": metadata_name,
+        "documents": documents,
+        "bytes": raw_bytes,
+        "size": writer.size,
+        "sha256": writer.sha256.hexdigest(),
+        "seconds": round(elapsed, 3)
+    }
+
+def write_backup(output_path, collection_names=None, backup_type='full', compress=True,
+                 parallel=4, batch_size=1000, compresslevel=6, parent=None, overlap_seconds=300):
+    """
+    Dump collections in parallel and write the manifest.
+
+    With a parent, the backup is an incremental: watermarked collections
+    are copied from the parent's watermark minus `overlap_seconds`, which
+    covers inserts still in flight and clock skew between hosts (documents
+    copied twice are harmless, restores upsert them).
+
+    Args:
+        output_path (Path): Backup directory
+        collection_names (list, optional): Collections to dump, all if omitted
+        backup_type (str, optional): Backup type recorded in the manifest
+        compress (bool, optional): Whether to gzip the files while writing
+        parallel (int, optional): Collections dumped at once
+        batch_size (int, optional): Documents per cursor batch
+        compresslevel (int, optional): gzip compression level
+        parent (tuple, optional): (filename, manifest) of the previous backup in the chain
+        overlap_seconds (float, optional): Seconds re-copied before each watermark
+
+    Returns:
+        dict: Manifest
+
+    Raises:
+        BackupError: If any collection could not be dumped
+    """
+    db = _get_database()
+    started_at = datetime.datetime.utcnow()
+
+    if collection_names is None:
+        collection_names = [name for name in db.list_collection_names() if not name.startswith("system.")]
+
+    # Copy watermarked collections only from where the parent left off
+    since = {}
+    if parent is not None:
+        parent_watermarks = parent[1].get("watermarks", {})
+        for name in INCREMENTAL_WATERMARKS:
+            if name in parent_watermarks:
+                since[name] = _parse_time(parent_watermarks[name]) - timedelta(seconds=overlap_seconds)
+
+    # Largest collections first, so one big collection does not start last
+    collection_names = sorted(collection_names, key=lambda name: db[name].estimated_document_count(), reverse=True)
+
+    collections = {}
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="backup") as executor:
+        futures = {
+            name: executor.submit(
+                dump_collection, db, name, output_path, compress, batch_size, compresslevel,
+                _watermark_query(INCREMENTAL_WATERMARKS[name], since[name]) if name in since else None
+            )
+            for name in collection_names
+        }
+        for name, future in futures.items():
+            try:
+                entry = future.result()
+            except Exception as e:
+                logger.error(f"Error backing up collection {name}: {e}")
+                errors[name] = str(e)
+                continue
+
+            entry["mode"] = "incremental" if name in since else "full"
+            if name in since:
+                entry["since"] = _isoformat(since[name])
+            collections[name] = entry
+
+    if errors:
+        raise BackupError(f"Failed to back up collections: {', '.join(sorted(errors))}")
+
+    manifest = {
+        "version": BACKUP_FORMAT_VERSION,
+        "database": db.name,
+        "type": backup_type,
+        "compressed": compress,
+        "startedAt": _isoformat(started_at),
+        "finishedAt": _isoformat(datetime.datetime.utcnow()),
+        "documents": sum(entry["documents"] for entry in collections.values()),
+        # Everything inserted before the backup started is in this backup or its parents
+        "watermarks": {name: _isoformat(started_at) for name in INCREMENTAL_WATERMARKS if name in collections},
+        "collections": collections
+    }
+
+    if parent is not None:
+        parent_name, parent_manifest = parent
+        manifest["parent"] = parent_name
+        manifest["base"] = parent_manifest.get("base") or parent_name
+        manifest["sequence"] = parent_manifest.get("sequence", 0) + 1
+
+    with open(output_path / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+def write_manifest_from_files(output_path, started_at, backup_type='full'):
+    """
+    Write a manifest for a backup made by mongodump.
+
+    Sizes and checksums are read from the files; document counts are not
+    known without decompressing them, so they are left out.
+
+    Args:
+        output_path (Path): Backup directory
+        started_at (datetime): When mongodump started (UTC), the watermark for incrementals
+        backup_type (str, optional): Backup type recorded in the manifest
+
+    Returns:
+        dict: Manifest
+    """
+    collections = {}
+    database = None
+
+    for data_file in sorted(output_path.glob("*/*.bson*")):
+        database = data_file.parent.name
+        name = data_file.name.split(".bson")[0]
+        suffix = ".gz" if data_file.name.endswith(".gz") else ""
+        digest, size = _checksum_file(data_file)
+        collections[name] = {
+            "file": f"{database}/{data_file.name}",
+            "metadata": f"{database}/{name}.metadata.json{suffix}",
+            "documents": None,
+            "bytes": None,
+            "size": size,
+            "sha256": digest,
+            "mode": "full"
+        }
+
+    manifest = {
+        "version": BACKUP_FORMAT_VERSION,
+        "database": database,
+        "type": backup_type,
+        "compressed": True,
+        "startedAt": _isoformat(started_at),
+        "finishedAt": _isoformat(datetime.datetime.utcnow()),
+        "documents": None,
+        "watermarks": {name: _isoformat(started_at) for name in INCREMENTAL_WATERMARKS if name in collections},
+        "collections": collections
+    }
+
+    with open(output_path / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
 def create_backup(backup_type='full', compress=True, connection_string=None, db_name=None):
     """
     Create a database backup.
-    
+
+    An incremental backup extends the chain of the latest full or
+    incremental backup; without one it is taken as a full backup.
+
     Args:
-        backup_type (str, optional): Type of backup (full, users, transactions, etc.)
+        backup_type (str, optional): Type of backup (full, incremental, users, transactions, etc.)
         compress (bool, optional): Whether to compress the backup
         connection_string (str, optional): MongoDB connection string
         db_name (str, optional): Database name
-        
+
     Returns:
         tuple: (success, backup_path)
     """
     try:
+        config = current_app.config
+        backup_dir = config.get('BACKUP_DIR', 'backups')
+        parallel = config.get('BACKUP_PARALLEL_COLLECTIONS', 4)
+
         # Create backup directory
-        backup_path = create_backup_directory()
-        
-        # Try mongodump first (preferred method)
+        backup_path = create_backup_directory(backup_dir)
+
         if connection_string is None:
-            connection_string = current_app.config.get('MONGODB_URI')
-        
+            connection_string = config.get('MONGODB_URI')
+
         if db_name is None:
-            db_name = current_app.config.get('MONGODB_DB_NAME')
-        
-        # Use the backup type to determine what to backup
-        if backup_type == 'full':
-            # Full database backup
-            if backup_using_mongodump(connection_string, backup_path, db_name):
-                logger.info("Backup created successfully using mongodump")
-            else:
-                # Fall back to PyMongo method
-                logger.info("Falling back to PyMongo backup method")
-                if not backup_using_pymongo(backup_path):
-                    logger.error("Both backup methods failed")
-                    return False, None
-        elif backup_type == 'users':
-            # Users-only backup
-            if not backup_collection_using_pymongo(backup_path, 'users'):
-                logger.error("Failed to backup users collection")
-                return False, None
-        elif backup_type == 'transactions':
-            # Transactions-only backup
-            if not backup_collection_using_pymongo(backup_path, 'transactions'):
-                logger.error("Failed to backup transactions collection")
-                return False, None
-        elif backup_type == 'subscriptions':
-            # Subscriptions-only backup
-            if not backup_collection_using_pymongo(backup_path, 'subscriptionPlans'):
-                logger.error("Failed to backup subscription plans collection")
-                return False, None
-        else:
-            # Default to full backup
-            if backup_using_mongodump(connection_string, backup_path, db_name):
-                logger.info("Backup created successfully using mongodump")
-            else:
-                # Fall back to PyMongo method
-                logger.info("Falling back to PyMongo backup method")
-                if not backup_using_pymongo(backup_path):
-                    logger.error("Both backup methods failed")
-                    return False, None
-        
-        # Compress backup if requested
-        if compress:
-            tarball_path = compress_backup(backup_path)
+            db_name = config.get('MONGODB_DB_NAME')
+
+        parent = None
+        if backup_type == 'incremental':
+            parent = find_incremental_parent(backup_dir)
+            if parent is None:
+                logger.info("No backup chain to extend, taking a full backup instead")
+                backup_type = 'full'
+
+        # Unknown types default to a full backup
+        collection_names = BACKUP_TYPE_COLLECTIONS.get(backup_type)
+        started_at = datetime.datetime.utcnow()
+
+        if (parent is None and collection_names is None and config.get('BACKUP_USE_MONGODUMP', False)
+                and backup_using_mongodump(connection_string, backup_path, db_name, parallel)):
+            manifest = write_manifest_from_files(backup_path, started_at, backup_type)
         else:
-            tarball_path = backup_path
-        
+            manifest = write_backup(
+                backup_path,
+                collection_names=collection_names,
+                backup_type=backup_type,
+                compress=compress,
+                parallel=parallel,
+                batch_size=config.get('BACKUP_BATCH_SIZE', 1000),
+                compresslevel=config.get('BACKUP_COMPRESSION_LEVEL', 6),
+                parent=parent,
+                overlap_seconds=config.get('BACKUP_INCREMENTAL_OVERLAP', 300)
+            )
+
+        logger.info(f"Backup of {len(manifest['collections'])} collections written to {backup_path}")
+
+        # Bundle into a single file for download; the data files are already compressed
+        tarball_path = package_backup(backup_path)
+
         # Clean up old backups
-        num_deleted = cleanup_old_backups()
+        num_deleted = cleanup_old_backups(backup_dir, config.get('BACKUP_KEEP_LAST', 5))
         if num_deleted > 0:
             logger.info(f"Cleaned up {num_deleted} old backups")
-        
+
         return True, tarball_path
     except BackupError as e:
         logger.error(f"Backup error: {e}")
@@ -177,151 +514,236 @@ def create_backup(backup_type='full', compress=True, connection_string=None, db_
         logger.error(f"Unexpected error during backup: {e}")
         return False, None
 
-# Mock implementation of backup_collection_using_pymongo for collection-specific backups
+def find_incremental_parent(backup_dir="backups"):
+    """
+    Find the backup an incremental backup builds on.
+
+    Args:
+        backup_dir (str): Base directory for backups
+
+    Returns:
+        tuple: (filename, manifest) of the latest full or incremental
+            backup, or None if there is none or its file is gone
+    """
+    from database.models.backup import BackupRecord
+
+    record = BackupRecord().get_latest_chain_backup()
+    if record is None:
+        return None
+
+    path = Path(backup_dir) / record["filename"]
+    if not path.exists():
+        logger.warning(f"Latest backup {record['filename']} is missing, starting a new chain")
+        return None
+
+    try:
+        return record["filename"], read_manifest(path)
+    except BackupError as e:
+        logger.warning(f"{e.message}, starting a new chain")
+        return None
+
 def backup_collection_using_pymongo(output_path, collection_name):
     """
     Backup a specific collection using PyMongo.
-    
+
     Args:
         output_path (Path): Directory to store the backup
         collection_name (str): Name of the collection to backup
-        
+
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        # Connect to MongoDB
-        db = MongoDB().get_db()
-        if not db:
-            MongoDB().connect()
-            db = MongoDB().get_db()
-            if not db:
-                raise BackupError("Failed to connect to MongoDB")
-        
-        # Get the collection
-        collection = db[collection_name]
-        documents = list(collection.find())
-        
-        # Convert ObjectId to string
-        for doc in documents:
-            doc["_id"] = str(doc["_id"])
-            # Convert other potential ObjectIds
-            for key, value in doc.items():
-                if hasattr(value, "__str__") and not isinstance(value, (str, int, float, bool, list, dict, type(None))):
-                    doc[key] = str(value)
-        
-        # Create a directory for the backup files
-        json_backup_path = output_path / "json_backup"
-        json_backup_path.mkdir(exist_ok=True)
-        
-        # Write to file
-        output_file = json_backup_path / f"{collection_name}.json"
-        with open(output_file, "w") as f:
-            json.dump(documents, f, indent=2, default=str)
-        
-        logger.info(f"Backed up collection {collection_name} with {len(documents)} documents")
-        
+        write_backup(output_path, collection_names=[collection_name], backup_type=collection_name)
         return True
     except Exception as e:
         logger.error(f"Error during {collection_name} backup: {e}")
         return False
-    
-def compress_backup(backup_path, delete_original=True):
+
+def backup_using_pymongo(output_path):
+    """
+    Create a database backup using PyMongo.
+
+    Args:
+        output_path (Path): Directory to store the backup
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        write_backup(output_path)
+        return True
+    except Exception as e:
+        logger.error(f"Error during PyMongo backup: {e}")
+        return False
+
+def package_backup(backup_path, delete_original=True):
     """
-    Compress backup directory into a tarball.
-    
+    Bundle a backup directory into an uncompressed tarball.
+
     Args:
         backup_path (Path): Path to the backup directory
-        delete_original (bool): Whether to delete the original directory after compression
-        
+        delete_original (bool): Whether to delete the original directory afterwards
+
     Returns:
-        Path: Path to the compressed file
+        Path: Path to the tarball
     """
     try:
-        # Create tarball filename
-        tarball_name = f"{backup_path.name}_backup.tar.gz"
-        tarball_path = backup_path.parent / tarball_name
-        
-        # Create tarball
-        with tarfile.open(tarball_path, "w:gz") as tar:
+        tarball_path = backup_path.parent / f"{backup_path.name}_backup.tar"
+
+        with tarfile.open(tarball_path, "w") as tar:
             tar.add(backup_path, arcname=backup_path.name)
-        
-        logger.info(f"Compressed backup created at {tarball_path}")
-        
+
+        logger.info(f"Backup packaged at {tarball_path}")
+
         # Delete original directory if requested
         if delete_original:
             shutil.rmtree(backup_path)
             logger.info(f"Deleted original backup directory: {backup_path}")
-        
+
         return tarball_path
     except Exception as e:
-        logger.error(f"Failed to compress backup: {e}")
-        raise BackupError(f"Failed to compress backup: {e}", e)
+        logger.error(f"Failed to package backup: {e}")
+        raise BackupError(f"Failed to package backup: {e}", e)
 
-def backup_using_pymongo(output_path):
+def _checksum_file(path):
+    """Get the SHA-256 and size of a file, read in chunks."""
+    with open(path, "rb") as f:
+        return _checksum_stream(f)
+
+def _checksum_stream(stream):
+    """Get the SHA-256 and size of a stream, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+class _MemberReader(io.RawIOBase):
+    """Reads one member of an uncompressed tarball through its own file handle."""
+
+    def __init__(self, path, offset, size):
+        self._file = open(path, "rb")
+        self._file.seek(offset)
+        self._remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+@contextmanager
+def open_backup(path):
     """
-    Create a database backup using PyMongo.
-    
+    Open a backup directory or tarball for reading.
+
+    Every file opened gets its own handle, so several files of one
+    backup can be read from different threads at once.
+
     Args:
-        output_path (Path): Directory to store the backup
-        
+        path (str or Path): Backup directory or `*_backup.tar` file
+
+    Yields:
+        callable: Opens a file of the backup by its manifest path, in binary mode
+    """
+    path = Path(path)
+
+    if path.is_dir():
+        yield lambda name: open(path / name, "rb")
+        return
+
+    with tarfile.open(path, "r:") as tar:
+        members = {member.name: member for member in tar.getmembers()}
+    root = next(iter(members)).split("/")[0]
+
+    def open_member(name):
+        member = members.get(f"{root}/{name}")
+        if member is None or not member.isfile():
+            raise BackupError(f"{name} is missing from {path.name}")
+        return io.BufferedReader(_MemberReader(path, member.offset_data, member.size), CHUNK_SIZE)
+
+    yield open_member
+
+def read_manifest(path):
+    """
+    Read the manifest of a backup.
+
+    Args:
+        path (str or Path): Backup directory or tarball
+
     Returns:
-        bool: True if successful, False otherwise
+        dict: Manifest
+
+    Raises:
+        BackupError: If the backup has no readable manifest
     """
     try:
-        # Connect to MongoDB
-        db = MongoDB().get_db()
-        if not db:
-            MongoDB().connect()
-            db = MongoDB().get_db()
-            if not db:
-                raise BackupError("Failed to connect to MongoDB")
-        
-        # Create a directory for the backup files
-        json_backup_path = output_path / "json_backup"
-        json_backup_path.mkdir(exist_ok=True)
-        
-        # Get list of all collections
-        collections = db.list_collection_names()
-        
-        # Backup each collection
-        for collection_name in collections:
-            try:
-                # Get the collection
-                collection = db[collection_name]
-                documents = list(collection.find())
-                
-                # Convert ObjectId to string for JSON serialization
-                for doc in documents:
-                    doc["_id"] = str(doc["_id"])
-                    # Convert other potential ObjectIds
-                    for key, value in doc.items():
-                        if hasattr(value, "__str__") and not isinstance(value, (str, int, float, bool, list, dict, type(None))):
-                            doc[key] = str(value)
-                
-                # Write to file
-                output_file = json_backup_path / f"{collection_name}.json"
-                with open(output_file, "w") as f:
-                    json.dump(documents, f, indent=2, default=str)
-                
-                logger.info(f"Backed up collection {collection_name} with {len(documents)} documents")
-            except Exception as e:
-                logger.error(f"Error backing up collection {collection_name}: {e}")
-                # Continue with other collections even if one fails
-        
-        return True
+        with open_backup(path) as open_file:
+            with open_file(MANIFEST_NAME) as f:
+                return json.load(f)
     except Exception as e:
-        logger.error(f"Error during PyMongo backup: {e}")
-        return False
-    
+        raise BackupError(f"Cannot read backup manifest of {path}: {e}", e)
+
+def verify_backup(path):
+    """
+    Check every data file of a backup against its manifest checksum.
+
+    Args:
+        path (str or Path): Backup directory or tarball
+
+    Returns:
+        tuple: (valid, list of problems)
+    """
+    problems = []
+
+    try:
+        manifest = read_manifest(path)
+        with open_backup(path) as open_file:
+            for name, entry in manifest["collections"].items():
+                try:
+                    with open_file(entry["file"]) as f:
+                        digest, size = _checksum_stream(f)
+                except Exception as e:
+                    problems.append(f"{name}: {e}")
+                    continue
+
+                if size != entry["size"] or digest != entry["sha256"]:
+                    problems.append(f"{name}: checksum mismatch")
+    except BackupError as e:
+        problems.append(e.message)
+
+    return not problems, problems
+
+def _chain_base(path):
+    """Get the filename of the full backup a backup file depends on."""
+    try:
+        return read_manifest(path).get("base") or path.name
+    except BackupError:
+        # Tarballs from before manifests stand alone
+        return path.name
+
 def cleanup_old_backups(backup_dir="backups", keep_last=5):
     """
-    Remove old backups, keeping only the specified number of recent ones.
-    
+    Remove old backups, keeping only the specified number of recent chains.
+
+    A chain is a full backup and the incrementals built on it, so a full
+    backup is never removed while a kept incremental still needs it.
+
     Args:
         backup_dir (str): Base directory for backups
-        keep_last (int): Number of recent backups to keep
-        
+        keep_last (int): Number of recent chains to keep
+
     Returns:
         int: Number of backups deleted
     """
@@ -329,20 +751,29 @@ def cleanup_old_backups(backup_dir="backups", keep_last=5):
         backup_path = Path(backup_dir)
         if not backup_path.exists():
             return 0
-        
-        # Get all backup files
-        backup_files = list(backup_path.glob("*_backup.tar.gz"))
-        backup_files.sort(key=lambda x: x.stat().st_mtime)
-        
-        # Determine files to delete
-        files_to_delete = backup_files[:-keep_last] if len(backup_files) > keep_last else []
-        
+
+        # Get all backup files, including tarballs from before the streaming engine
+        backup_files = list(backup_path.glob("*_backup.tar")) + list(backup_path.glob("*_backup.tar.gz"))
+        backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+
+        # Keep every file of the newest chains
+        kept_chains = set()
+        files_to_delete = []
+        for file_path in backup_files:
+            base = _chain_base(file_path)
+            if base in kept_chains:
+                continue
+            if len(kept_chains) < keep_last:
+                kept_chains.add(base)
+                continue
+            files_to_delete.append(file_path)
+
         # Delete old backups
         for file_path in files_to_delete:
             file_path.unlink()
             logger.info(f"Deleted old backup: {file_path}")
-        
+
         return len(files_to_delete)
     except Exception as e:
         logger.error(f"Error cleaning up old backups: {e}")
-        return 0
\ No newline at end of file
+        return 0
@@ -111,6 +111,34 @@ class ActivityLog:
                 'total_pages': 0
             }
     
+    def iter_user_logs(self, user_id, filter_query=None, projection=None, batch_size=1000):
+        """
+        Iterate over all matching user activity logs, newest first.
+        
+        Documents are fetched from the server in batches, so memory use
+        does not grow with the number of logs.
+        
+        Args:
+            user_id (str): User ID
+            filter_query (dict): Additional filter criteria
+            projection (dict): Fields to return
+            batch_size (int): Documents per server round trip
+        
+        Returns:
+            Cursor: Cursor over log documents, or an empty list on error
+        """
+        try:
+            query = {'userId': user_id}
+            if filter_query:
+                query.update(filter_query)
+            
+            return (self.collection.find(query, projection)
+                    .sort('timestamp', DESCENDING)
+                    .batch_size(batch_size))
+        except Exception as e:
+            logger.error(f"Error iterating user logs: {e}")
+            return []
+    
     def get_latest_user_activity(self, user_id, activity_type=None, village=None, filter_query=None):
         """
         Get the latest user activity of a specific type.
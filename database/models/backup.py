@@ -1,6 +1,7 @@
 """
 Backup Record model for Travian Whispers application.
-This module provides the BackupRecord model for tracking database backups.
+This module provides the BackupRecord model for tracking database backups
+and the chains that incremental backups form on a full backup.
 """
 import logging
 from datetime import datetime
@@ -26,16 +27,21 @@ class BackupRecord:
         if self.db is not None:
             self.collection = self.db["backupRecords"]
     
-    def add_backup_record(self, filename, backup_type='full', file_size=0, success=True, details=None):
+    # Backup types that start or extend a chain
+    CHAIN_TYPES = ('full', 'incremental')
+    
+    def add_backup_record(self, filename, backup_type='full', file_size=0, success=True, details=None,
+                          manifest=None):
         """
         Add a new backup record.
         
         Args:
             filename (str): Backup filename
-            backup_type (str, optional): Type of backup (full, users, transactions, etc.)
+            backup_type (str, optional): Type of backup (full, incremental, users, transactions, etc.)
             file_size (int, optional): Size of backup file in bytes
             success (bool, optional): Whether backup was successful
             details (str, optional): Additional details about the backup
+            manifest (dict, optional): Backup manifest, used to record the chain
             
         Returns:
             dict: New backup record or None if failed
@@ -58,6 +64,14 @@ class BackupRecord:
                 "created_at": datetime.utcnow()
             }
             
+            if manifest is not None:
+                record_data.update({
+                    "documents": manifest.get("documents"),
+                    "base_filename": manifest.get("base") or filename,
+                    "parent_filename": manifest.get("parent"),
+                    "sequence": manifest.get("sequence", 0)
+                })
+            
             result = self.collection.insert_one(record_data)
             
             if result.inserted_id:
@@ -131,6 +145,80 @@ class BackupRecord:
             logger.error(f"Failed to get backup record: {e}")
             return None
     
+    def get_latest_chain_backup(self):
+        """
+        Get the most recent successful full or incremental backup.
+        
+        Returns:
+            dict: Backup record or None if there is none
+        """
+        if self.collection is None:
+            logger.error("Database not connected")
+            return None
+        
+        try:
+            return self.collection.find_one(
+                {"type": {"$in": list(self.CHAIN_TYPES)}, "success": True},
+                sort=[("created_at", -1)]
+            )
+        except Exception as e:
+            logger.error(f"Failed to get latest chain backup: {e}")
+            return None
+    
+    def get_chain(self, filename):
+        """
+        Get the backups a backup needs for a restore, oldest first.
+        
+        Args:
+            filename (str): Backup filename
+            
+        Returns:
+            list: Records from the full backup up to the given one, or an
+                empty list if a link is missing
+        """
+        if self.collection is None:
+            logger.error("Database not connected")
+            return []
+        
+        try:
+            chain = []
+            record = self.collection.find_one({"filename": filename})
+            while record is not None:
+                chain.insert(0, record)
+                parent = record.get("parent_filename")
+                if not parent:
+                    return chain
+                record = self.collection.find_one({"filename": parent})
+            
+            return []
+        except Exception as e:
+            logger.error(f"Failed to get backup chain: {e}")
+            return []
+    
+    def has_dependents(self, filename):
+        """
+        Check whether incremental backups build on a backup.
+        
+        Args:
+            filename (str): Backup filename
+            
+        Returns:
+            bool: True if another backup whose file still exists names it as parent
+        """
+        if self.collection is None:
+            logger.error("Database not connected")
+            return False
+        
+        try:
+            backup_dir = current_app.config.get('BACKUP_DIR', 'backups')
+            for record in self.collection.find({"parent_filename": filename}, {"filename": 1}):
+                if os.path.exists(os.path.join(backup_dir, record["filename"])):
+                    return True
+            return False
+        except Exception as e:
+            logger.error(f"Failed to check backup dependents: {e}")
+            return False
+    
     def list_backups(self, limit=10, backup_type=None):
         """
         List backup records.
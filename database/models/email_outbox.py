@@ -0,0 +1,275 @@
+"""
+Email outbox model for Travian Whispers application.
+This module stores outgoing emails until the outbox workers deliver
+them, so callers never wait on an SMTP server.
+"""
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from database.mongodb import MongoDB
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class EmailOutbox:
+    """Email outbox model."""
+
+    # Message statuses
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    # Days delivered and failed messages are kept before the TTL index removes them
+    RETENTION_DAYS = 14
+
+    def __init__(self):
+        """Initialize email outbox model."""
+        self.db = MongoDB().get_db()
+        self.collection = None
+        if self.db is not None:
+            self.collection = self.db["emailOutbox"]
+
+    def _build_message(self, to_email, subject, html_content, text_content=None,
+                       category=None, dedupe_key=None):
+        """Build an outbox document."""
+        now = datetime.utcnow()
+        message = {
+            'to': to_email,
+            'subject': subject,
+            'html': html_content,
+            'text': text_content,
+            'category': category,
+            'status': self.STATUS_PENDING,
+            'attempts': 0,
+            'nextAttemptAt': now,
+            'lockedBy': None,
+            'lockedUntil': None,
+            'lastError': None,
+            'createdAt': now,
+            'updatedAt': now,
+            'sentAt': None,
+            'expiresAt': None
+        }
+        if dedupe_key:
+            message['dedupeKey'] = dedupe_key
+        return message
+
+    def enqueue(self, to_email, subject, html_content, text_content=None,
+                category=None, dedupe_key=None):
+        """
+        Queue an email for delivery.
+
+        Args:
+            to_email (str): Recipient email
+            subject (str): Email subject
+            html_content (str): HTML content
+            text_content (str, optional): Plain text content
+            category (str, optional): Message kind, e.g. 'verification'
+            dedupe_key (str, optional): Key that makes queueing idempotent;
+                a second message with the same key is not queued
+
+        Returns:
+            str: Message ID (of the existing message for a duplicate key)
+                or None if queueing failed
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot queue email.")
+            return None
+
+        message = self._build_message(to_email, subject, html_content, text_content, category, dedupe_key)
+
+        try:
+            result = self.collection.insert_one(message)
+            return str(result.inserted_id)
+        except DuplicateKeyError:
+            existing = self.collection.find_one({'dedupeKey': dedupe_key}, {'_id': 1})
+            logger.debug(f"Email '{dedupe_key}' already queued")
+            return str(existing['_id']) if existing else None
+        except Exception as e:
+            logger.error(f"Error queueing email to {to_email}: {e}")
+            return None
+
+    def enqueue_many(self, messages):
+        """
+        Queue several emails with one write.
+
+        Args:
+            messages (list): Dictionaries with the keyword arguments of enqueue()
+
+        Returns:
+            int: Number of messages queued (duplicates are skipped),
+                or None if queueing failed
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot queue emails.")
+            return None
+
+        if not messages:
+            return 0
+
+        documents = [self._build_message(**message) for message in messages]
+
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicate dedupe keys are expected when a batch is retried
+            errors = e.details.get('writeErrors', [])
+            unexpected = [error for error in errors if error.get('code') != 11000]
+            if unexpected:
+                logger.error(f"Error queueing emails: {unexpected[0].get('errmsg')}")
+                return None
+            return e.details.get('nInserted', 0)
+        except Exception as e:
+            logger.error(f"Error queueing emails: {e}")
+            return None
+
+    def claim_batch(self, worker_id, limit=20, lease_seconds=120):
+        """
+        Claim messages that are due for delivery.
+
+        Messages are claimed one by one with an atomic update, so several
+        workers can drain the outbox together. A message left in 'sending'
+        by a worker that died becomes claimable when its lease runs out.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            limit (int, optional): Maximum messages to claim
+            lease_seconds (int, optional): Seconds the claim is held
+
+        Returns:
+            list: Claimed message documents
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot claim emails.")
+            return []
+
+        now = datetime.utcnow()
+        claimed = []
+
+        try:
+            for _ in range(limit):
+                message = self.collection.find_one_and_update(
+                    {'$or': [
+                        {'status': self.STATUS_PENDING, 'nextAttemptAt': {'$lte': now}},
+                        {'status': self.STATUS_SENDING, 'lockedUntil': {'$lt': now}}
+                    ]},
+                    {'$set': {
+                        'status': self.STATUS_SENDING,
+                        'lockedBy': worker_id,
+                        'lockedUntil': now + timedelta(seconds=lease_seconds),
+                        'updatedAt': now
+                    }, '$inc': {'attempts': 1}},
+                    sort=[('nextAttemptAt', 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if message is None:
+                    break
+                claimed.append(message)
+        except Exception as e:
+            logger.error(f"Error claiming emails for worker {worker_id}: {e}")
+
+        return claimed
+
+    def _finish(self, message_id, worker_id, updates):
+        """Apply a final or retry update to a message the worker holds."""
+        if self.collection is None:
+            logger.error("Database not connected. Cannot update email.")
+            return False
+
+        updates['lockedBy'] = None
+        updates['lockedUntil'] = None
+        updates['updatedAt'] = datetime.utcnow()
+
+        try:
+            result = self.collection.update_one(
+                {'_id': ObjectId(message_id), 'lockedBy': worker_id},
+                {'$set': updates}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating email {message_id}: {e}")
+            return False
+
+    def mark_sent(self, message_id, worker_id):
+        """
+        Mark a message as delivered.
+
+        Args:
+            message_id: Message ID
+            worker_id (str): Identifier of the worker holding the message
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        now = datetime.utcnow()
+        return self._finish(message_id, worker_id, {
+            'status': self.STATUS_SENT,
+            'sentAt': now,
+            'lastError': None,
+            'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+        })
+
+    def schedule_retry(self, message_id, worker_id, error, delay_seconds):
+        """
+        Put a message back in the queue after a temporary failure.
+
+        Args:
+            message_id: Message ID
+            worker_id (str): Identifier of the worker holding the message
+            error (str): Failure reason
+            delay_seconds (float): Seconds before the next attempt
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        return self._finish(message_id, worker_id, {
+            'status': self.STATUS_PENDING,
+            'lastError': error,
+            'nextAttemptAt': datetime.utcnow() + timedelta(seconds=delay_seconds)
+        })
+
+    def mark_failed(self, message_id, worker_id, error):
+        """
+        Give up on a message.
+
+        Args:
+            message_id: Message ID
+            worker_id (str): Identifier of the worker holding the message
+            error (str): Failure reason
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        now = datetime.utcnow()
+        return self._finish(message_id, worker_id, {
+            'status': self.STATUS_FAILED,
+            'lastError': error,
+            'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+        })
+
+    def count_by_status(self):
+        """
+        Count messages per status.
+
+        Returns:
+            dict: Status -> count
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot count emails.")
+            return {}
+
+        try:
+            return {
+                row['_id']: row['count']
+                for row in self.collection.aggregate([
+                    {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+                ])
+            }
+        except Exception as e:
+            logger.error(f"Error counting emails: {e}")
+            return {}
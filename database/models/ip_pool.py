@@ -6,6 +6,8 @@ import logging
 from datetime import datetime, timedelta
 from bson import ObjectId
 from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -100,6 +102,76 @@ class IPAddress:
             logger.error(f"Failed to add IP to pool: {e}")
             return None
     
+    def bulk_upsert_ips(self, proxies):
+        """
+        Add many IP addresses to the pool in a single bulk write.
+        
+        Existing IPs (matched on the unique ip_address index) are left
+        untouched; only new addresses are inserted.
+        
+        Args:
+            proxies (list): Proxy dictionaries with the same fields as add_ip
+            
+        Returns:
+            int: Number of IPs added
+        """
+        if self.collection is None:
+            logger.error("Database not connected")
+            return 0
+        
+        now = datetime.utcnow()
+        operations = []
+        seen = set()
+        
+        for proxy in proxies:
+            ip_address = proxy.get("ip_address")
+            if not ip_address or ip_address in seen:
+                continue
+            seen.add(ip_address)
+            
+            ip_data = {
+                "proxy_url": proxy.get("proxy_url"),
+                "username": proxy.get("username"),
+                "password": proxy.get("password"),
+                "ip_type": proxy.get("ip_type", self.TYPE_DATACENTER),
+                "country_code": proxy.get("country_code"),
+                "region": proxy.get("region"),
+                "provider": proxy.get("provider"),
+                "status": self.STATUS_AVAILABLE,
+                "max_users": proxy.get("max_users", 1),
+                "current_users": 0,
+                "assigned_users": [],
+                "last_used": None,
+                "last_rotation": now,
+                "failure_count": 0,
+                "ban_count": 0,
+                "created_at": now,
+                "updated_at": now
+            }
+            
+            operations.append(UpdateOne(
+                {"ip_address": ip_address},
+                {"$setOnInsert": ip_data},
+                upsert=True
+            ))
+        
+        if not operations:
+            return 0
+        
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            added = result.upserted_count
+        except BulkWriteError as e:
+            # Concurrent imports of the same address hit the unique index
+            added = e.details.get("nUpserted", 0)
+            logger.warning(f"Bulk IP upsert completed with errors: {len(e.details.get('writeErrors', []))} failed")
+        except Exception as e:
+            logger.error(f"Failed to bulk add IPs to pool: {e}")
+            return 0
+        
+        logger.info(f"Added {added} new IPs to the pool ({len(operations) - added} already present)")
+        return added
+    
     def remove_ip(self, ip_id):
         """
         Remove an IP from the pool.
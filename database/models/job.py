@@ -0,0 +1,354 @@
+"""
+Background job model for Travian Whispers web application.
+This module stores long-running jobs (village extraction, connection
+checks) that web requests submit and task workers claim and run.
+"""
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.models.init import get_collection
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class Job:
+    """Background job model."""
+
+    # Job statuses
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    # Days finished jobs are kept before the TTL index removes them
+    RETENTION_DAYS = 7
+
+    def __init__(self):
+        """Initialize job model."""
+        self.collection = get_collection('jobs')
+
+    def create_job(self, user_id, job_type, params=None, secrets=None):
+        """
+        Queue a job, or return the user's active job of the same type.
+
+        Active jobs carry an 'active' flag that a partial unique index on
+        (userId, type) covers, so concurrent submissions queue one job.
+
+        Args:
+            user_id (str): User ID
+            job_type (str): Job type, e.g. 'extract_villages'
+            params (dict, optional): Job parameters
+            secrets (dict, optional): Parameters removed from the document
+                as soon as a worker claims the job (e.g. passwords)
+
+        Returns:
+            dict: Job document or None if creation failed
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot create job.")
+            return None
+
+        try:
+            # One browser session per user and job type is enough
+            active = self.get_active_job(user_id, job_type)
+            if active:
+                return active
+
+            now = datetime.utcnow()
+            job = {
+                'userId': ObjectId(user_id),
+                'type': job_type,
+                'status': self.STATUS_QUEUED,
+                'params': params or {},
+                'secrets': secrets or {},
+                # Tells a retried handler that its secrets were removed
+                'hasSecrets': bool(secrets),
+                'active': True,
+                'progress': 0,
+                'message': 'Queued',
+                'result': None,
+                'error': None,
+                'attempts': 0,
+                'workerId': None,
+                'leaseExpiresAt': None,
+                'createdAt': now,
+                'updatedAt': now,
+                'startedAt': None,
+                'finishedAt': None,
+                'expiresAt': None
+            }
+
+            try:
+                result = self.collection.insert_one(job)
+            except DuplicateKeyError:
+                # Another request queued the same job first
+                return self.get_active_job(user_id, job_type)
+
+            job['_id'] = result.inserted_id
+            logger.info(f"Queued job '{job_type}' ({result.inserted_id}) for user {user_id}")
+            return job
+        except Exception as e:
+            logger.error(f"Error creating job '{job_type}' for user {user_id}: {e}")
+            return None
+
+    def get_job(self, job_id, user_id=None):
+        """
+        Get a job by ID.
+
+        Args:
+            job_id (str): Job ID
+            user_id (str, optional): Only return the job if it belongs to this user
+
+        Returns:
+            dict: Job document without secrets or None if not found
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot get job.")
+            return None
+
+        try:
+            query = {'_id': ObjectId(job_id)}
+            if user_id is not None:
+                query['userId'] = ObjectId(user_id)
+
+            return self.collection.find_one(query, {'secrets': 0})
+        except Exception as e:
+            logger.error(f"Error getting job {job_id}: {e}")
+            return None
+
+    def get_active_job(self, user_id, job_type):
+        """
+        Get the user's queued or running job of a type.
+
+        Args:
+            user_id (str): User ID
+            job_type (str): Job type
+
+        Returns:
+            dict: Job document without secrets or None if there is none
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot get active job.")
+            return None
+
+        try:
+            return self.collection.find_one(
+                {
+                    'userId': ObjectId(user_id),
+                    'type': job_type,
+                    'status': {'$in': list(self.ACTIVE_STATUSES)}
+                },
+                {'secrets': 0}
+            )
+        except Exception as e:
+            logger.error(f"Error getting active '{job_type}' job for user {user_id}: {e}")
+            return None
+
+    def claim_job(self, worker_id, job_types, lease_seconds=60, max_attempts=3):
+        """
+        Atomically claim the oldest runnable job.
+
+        A job is runnable when it is queued, or running under a lease that
+        expired because its worker died. Secrets are removed from the stored
+        document by the claim and only returned to the claiming worker.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            job_types (list): Job types the worker can run
+            lease_seconds (int, optional): Seconds before an unrenewed claim
+                may be taken over
+            max_attempts (int, optional): Attempts before a job is abandoned
+
+        Returns:
+            dict: Claimed job document or None if nothing is runnable
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot claim job.")
+            return None
+
+        now = datetime.utcnow()
+
+        try:
+            updates = {
+                'status': self.STATUS_RUNNING,
+                'workerId': worker_id,
+                'leaseExpiresAt': now + timedelta(seconds=lease_seconds),
+                'message': 'Started',
+                'startedAt': now,
+                'updatedAt': now
+            }
+
+            job = self.collection.find_one_and_update(
+                {
+                    'type': {'$in': list(job_types)},
+                    'attempts': {'$lt': max_attempts},
+                    '$or': [
+                        {'status': self.STATUS_QUEUED},
+                        {'status': self.STATUS_RUNNING, 'leaseExpiresAt': {'$lt': now}}
+                    ]
+                },
+                {
+                    '$set': updates,
+                    '$inc': {'attempts': 1},
+                    '$unset': {'secrets': ''}
+                },
+                sort=[('createdAt', 1)],
+                return_document=ReturnDocument.BEFORE
+            )
+
+            if job is None:
+                return None
+
+            job.update(updates)
+            job['attempts'] += 1
+            return job
+        except Exception as e:
+            logger.error(f"Error claiming job for worker {worker_id}: {e}")
+            return None
+
+    def update_progress(self, job_id, worker_id, progress=None, message=None, lease_seconds=60):
+        """
+        Record progress and renew the worker's lease on a running job.
+
+        Args:
+            job_id: Job ID
+            worker_id (str): Identifier of the worker holding the job
+            progress (int, optional): Percent complete
+            message (str, optional): Status message for the user
+            lease_seconds (int, optional): Seconds the lease is extended by
+
+        Returns:
+            bool: True if the worker still holds the job, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot update job.")
+            return False
+
+        now = datetime.utcnow()
+        updates = {
+            'leaseExpiresAt': now + timedelta(seconds=lease_seconds),
+            'updatedAt': now
+        }
+        if progress is not None:
+            updates['progress'] = progress
+        if message is not None:
+            updates['message'] = message
+
+        try:
+            result = self.collection.update_one(
+                {'_id': ObjectId(job_id), 'workerId': worker_id, 'status': self.STATUS_RUNNING},
+                {'$set': updates}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error updating job {job_id}: {e}")
+            return False
+
+    def finish_job(self, job_id, worker_id, result=None, error=None):
+        """
+        Mark a running job as succeeded or failed.
+
+        Args:
+            job_id: Job ID
+            worker_id (str): Identifier of the worker holding the job
+            result (dict, optional): Job result
+            error (str, optional): Error message, marks the job as failed
+
+        Returns:
+            bool: True if the job was updated, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot finish job.")
+            return False
+
+        now = datetime.utcnow()
+        failed = error is not None
+
+        try:
+            update_result = self.collection.update_one(
+                {'_id': ObjectId(job_id), 'workerId': worker_id, 'status': self.STATUS_RUNNING},
+                {'$set': {
+                    'status': self.STATUS_FAILED if failed else self.STATUS_SUCCEEDED,
+                    'progress': 100,
+                    'message': error if failed else (result or {}).get('message', 'Done'),
+                    'result': result,
+                    'error': error,
+                    'leaseExpiresAt': None,
+                    'updatedAt': now,
+                    'finishedAt': now,
+                    'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+                }, '$unset': {'active': ''}}
+            )
+            return update_result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error finishing job {job_id}: {e}")
+            return False
+
+    def fail_abandoned_jobs(self, max_attempts=3):
+        """
+        Fail jobs whose workers died on every attempt.
+
+        Args:
+            max_attempts (int, optional): Attempts after which a job is abandoned
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot fail abandoned jobs.")
+            return 0
+
+        now = datetime.utcnow()
+
+        try:
+            result = self.collection.update_many(
+                {
+                    'status': self.STATUS_RUNNING,
+                    'attempts': {'$gte': max_attempts},
+                    'leaseExpiresAt': {'$lt': now}
+                },
+                {'$set': {
+                    'status': self.STATUS_FAILED,
+                    'message': 'Job was interrupted too many times',
+                    'error': 'Job was interrupted too many times',
+                    'leaseExpiresAt': None,
+                    'updatedAt': now,
+                    'finishedAt': now,
+                    'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+                }, '$unset': {'secrets': '', 'active': ''}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error failing abandoned jobs: {e}")
+            return 0
+
+    @staticmethod
+    def to_public(job):
+        """
+        Convert a job document to the API representation.
+
+        Args:
+            job (dict): Job document
+
+        Returns:
+            dict: Job fields safe to return to the owner
+        """
+        return {
+            'id': str(job['_id']),
+            'type': job.get('type'),
+            'status': job.get('status'),
+            'progress': job.get('progress', 0),
+            'message': job.get('message'),
+            'result': job.get('result'),
+            'error': job.get('error'),
+            'createdAt': job.get('createdAt'),
+            'startedAt': job.get('startedAt'),
+            'finishedAt': job.get('finishedAt'),
+            'updatedAt': job.get('updatedAt')
+        }
@@ -0,0 +1,120 @@
+"""
+Login throttle model for Travian Whispers application.
+This module keeps token buckets for login attempts in MongoDB, so the
+limits hold across all web processes. A bucket is deleted by its TTL
+index once it has refilled, so only recently active keys are stored.
+"""
+import logging
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+from database.models.init import get_collection
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class LoginThrottle:
+    """Token bucket login throttle model."""
+
+    # Attempts to update a bucket another process changed concurrently
+    MAX_RETRIES = 5
+
+    def __init__(self):
+        """Initialize login throttle model."""
+        self.collection = get_collection('loginThrottle')
+
+    def consume(self, key, capacity, refill_seconds, cost=1):
+        """
+        Take tokens from a bucket.
+
+        The bucket starts full with `capacity` tokens and regains one
+        token every `refill_seconds`. The update is a compare-and-set on
+        the bucket's revision, retried if another process got there first.
+
+        Args:
+            key (str): Bucket key, e.g. 'ip:203.0.113.7'
+            capacity (int): Tokens in a full bucket
+            refill_seconds (float): Seconds to regain one token
+            cost (int, optional): Tokens taken
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available);
+                allowed is True if the database cannot be reached, so an
+                outage does not lock everyone out
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Login throttling skipped.")
+            return True, 0
+
+        try:
+            for _ in range(self.MAX_RETRIES):
+                now = datetime.utcnow()
+                bucket = self.collection.find_one({'_id': key})
+
+                if bucket is None:
+                    tokens = float(capacity)
+                else:
+                    elapsed = (now - bucket['updatedAt'].replace(tzinfo=None)).total_seconds()
+                    tokens = min(float(capacity), bucket['tokens'] + max(0.0, elapsed) / refill_seconds)
+
+                if tokens < cost:
+                    return False, (cost - tokens) * refill_seconds
+
+                tokens -= cost
+                fields = {
+                    'tokens': tokens,
+                    'updatedAt': now,
+                    # Full again by then, which is the same as having no bucket
+                    'expiresAt': now + timedelta(seconds=(capacity - tokens) * refill_seconds)
+                }
+
+                if bucket is None:
+                    try:
+                        self.collection.insert_one({'_id': key, 'rev': 1, **fields})
+                        return True, 0
+                    except DuplicateKeyError:
+                        continue
+
+                result = self.collection.update_one(
+                    {'_id': key, 'rev': bucket['rev']},
+                    {'$set': fields, '$inc': {'rev': 1}}
+                )
+                if result.modified_count:
+                    return True, 0
+
+            logger.warning(f"Login throttle bucket {key} is highly contended, allowing attempt")
+            return True, 0
+        except Exception as e:
+            logger.error(f"Error updating login throttle bucket {key}: {e}")
+            return True, 0
+
+    def refund(self, key, amount=1):
+        """
+        Give back tokens taken for an attempt that was not made.
+
+        Args:
+            key (str): Bucket key
+            amount (int, optional): Tokens returned
+        """
+        if self.collection is None:
+            return
+
+        try:
+            self.collection.update_one({'_id': key}, {'$inc': {'tokens': amount, 'rev': 1}})
+        except Exception as e:
+            logger.error(f"Error refunding login throttle bucket {key}: {e}")
+
+    def reset(self, key):
+        """
+        Refill a bucket completely.
+
+        Args:
+            key (str): Bucket key
+        """
+        if self.collection is None:
+            return
+
+        try:
+            self.collection.delete_one({'_id': key})
+        except Exception as e:
+            logger.error(f"Error resetting login throttle bucket {key}: {e}")
@@ -5,6 +5,7 @@ This module provides the ProxyService model for managing proxy providers and int
 import logging
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from bson import ObjectId
 from flask import current_app
@@ -24,6 +25,9 @@ class ProxyService:
     PROVIDER_BRIGHTDATA = 'brightdata'
     PROVIDER_CUSTOM = 'custom'
     
+    # Timeout in seconds for provider API requests
+    REQUEST_TIMEOUT = 30
+    
     def __init__(self):
         """Initialize ProxyService model."""
         self.db = None
@@ -346,7 +350,7 @@ class ProxyService:
                 params["ip_type"] = "datacenter"
                 
         try:
-            response = requests.get(endpoint, params=params)
+            response = requests.get(endpoint, params=params, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
             
             data = response.json()
@@ -412,7 +416,7 @@ class ProxyService:
                 body["type"] = "datacenter"
                 
         try:
-            response = requests.post(endpoint, headers=headers, json=body)
+            response = requests.post(endpoint, headers=headers, json=body, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
             
             data = response.json()
@@ -461,7 +465,7 @@ class ProxyService:
         }
         
         try:
-            response = requests.get(endpoint, headers=headers)
+            response = requests.get(endpoint, headers=headers, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
             
             data = response.json()
@@ -570,7 +574,7 @@ class ProxyService:
         params[provider["config"].get("limit_param", "limit")] = count
         
         try:
-            response = requests.get(endpoint, headers=headers, params=params)
+            response = requests.get(endpoint, headers=headers, params=params, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
             
             data = response.json()
@@ -619,43 +623,22 @@ class ProxyService:
             logger.error(f"Error fetching custom proxies: {e}")
             return []
     
-    def _add_proxies_to_pool(self, proxies, provider):
+    def _add_proxies_to_pool(self, proxies, provider, ip_pool=None):
         """
         Add fetched proxies to the IP pool.
         
         Args:
             proxies (list): List of proxy dictionaries
             provider (dict): Provider details
+            ip_pool (IPAddress, optional): IP pool model to write to
             
         Returns:
             int: Number of proxies added
         """
-        ip_pool = IPAddress()
-        added_count = 0
+        if ip_pool is None:
+            ip_pool = IPAddress()
         
-        for proxy in proxies:
-            # Check if IP already exists
-            existing_ip = ip_pool.get_ip_by_address(proxy["ip_address"])
-            
-            if existing_ip:
-                logger.debug(f"IP {proxy['ip_address']} already exists in pool")
-                continue
-                
-            # Add to pool
-            ip = ip_pool.add_ip(
-                ip_address=proxy["ip_address"],
-                proxy_url=proxy["proxy_url"],
-                username=proxy["username"],
-                password=proxy["password"],
-                ip_type=proxy["ip_type"],
-                country_code=proxy["country_code"],
-                region=proxy["region"],
-                provider=proxy["provider"],
-                max_users=proxy["max_users"]
-            )
-            
-            if ip:
-                added_count += 1
+        added_count = ip_pool.bulk_upsert_ips(proxies)
                 
         logger.info(f"Added {added_count} new proxies to the IP pool from {provider['name']}")
         return added_count
@@ -664,22 +647,31 @@ class ProxyService:
         """
         Automatically fetch proxies if available count is below threshold.
         
+        All active providers are queried concurrently; each provider's
+        batch is upserted into the pool as soon as it arrives.
+        
         Args:
             min_available (int, optional): Minimum available IPs threshold
             
         Returns:
-            int: Number of new proxies fetched
+            int: Number of new proxies added to the pool
         """
         # Check current available IP count
         ip_pool = IPAddress()
-        available_ips = ip_pool.list_ips(status=IPAddress.STATUS_AVAILABLE)
+        if ip_pool.collection is None:
+            logger.error("Database not connected")
+            return 0
+        
+        available_count = ip_pool.collection.count_documents(
+            {"status": IPAddress.STATUS_AVAILABLE}
+        )
         
-        if len(available_ips) >= min_available:
-            logger.info(f"Sufficient IPs available ({len(available_ips)}), skipping auto-fetch")
+        if available_count >= min_available:
+            logger.info(f"Sufficient IPs available ({available_count}), skipping auto-fetch")
             return 0
             
         # Calculate how many to fetch
-        to_fetch = min_available - len(available_ips)
+        to_fetch = min_available - available_count
         
         # Get active providers
         providers = self.list_providers(active_only=True)
@@ -687,28 +679,38 @@ class ProxyService:
         if not providers:
             logger.warning("No active proxy providers available for auto-fetch")
             return 0
-            
-        total_fetched = 0
         
-        # Fetch from each provider
-        for provider in providers:
-            # Skip if we've already fetched enough
-            if total_fetched >= to_fetch:
-                break
+        # Split the shortfall across providers
+        per_provider = -(-to_fetch // len(providers))
+        total_added = 0
+        
+        # Provider requests run on worker threads without touching the
+        # app context; pool writes happen here as each batch completes
+        with ThreadPoolExecutor(max_workers=len(providers),
+                                thread_name_prefix="proxy-fetch") as executor:
+            futures = {
+                executor.submit(
+                    self.fetch_proxies,
+                    provider_id=str(provider["_id"]),
+                    count=per_provider,
+                    update_pool=False
+                ): provider
+                for provider in providers
+            }
+            
+            for future in as_completed(futures):
+                provider = futures[future]
+                try:
+                    proxies = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching proxies from {provider['name']}: {e}")
+                    continue
                 
-            # Fetch proxies
-            provider_id = str(provider["_id"])
-            proxies = self.fetch_proxies(
-                provider_id=provider_id,
-                count=to_fetch - total_fetched,
-                update_pool=True
-            )
-            
-            if proxies:
-                total_fetched += len(proxies)
+                if proxies:
+                    total_added += self._add_proxies_to_pool(proxies, provider, ip_pool)
                 
-        logger.info(f"Auto-fetched {total_fetched} new proxies")
-        return total_fetched
+        logger.info(f"Auto-fetched {total_added} new proxies")
+        return total_added
     
     def create_indexes(self):
         """
@@ -0,0 +1,341 @@
+"""
+Revenue statistics model for Travian Whispers web application.
+This module maintains pre-aggregated daily, monthly and all-time
+revenue and subscription counters, updated as transactions change status.
+"""
+import logging
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+
+from database.models.init import get_collection
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class RevenueStats:
+    """Materialized revenue and subscription statistics."""
+
+    # Period types
+    PERIOD_DAILY = 'daily'
+    PERIOD_MONTHLY = 'monthly'
+    PERIOD_ALL = 'all'
+
+    # Document ID of the all-time counters
+    ALL_TIME_ID = 'all'
+
+    def __init__(self):
+        """Initialize revenue statistics model."""
+        self.collection = get_collection('revenueStats')
+
+    @staticmethod
+    def _day_start(date):
+        """Truncate a datetime to the start of its day."""
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _month_start(date):
+        """Truncate a datetime to the start of its month."""
+        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def _period_keys(self, date):
+        """
+        Get the statistics documents a transaction date contributes to.
+
+        Args:
+            date (datetime): Transaction creation date
+
+        Returns:
+            list: (document ID, period, period start) tuples
+        """
+        day = self._day_start(date)
+        month = self._month_start(date)
+
+        return [
+            (f"{self.PERIOD_DAILY}:{day.strftime('%Y-%m-%d')}", self.PERIOD_DAILY, day),
+            (f"{self.PERIOD_MONTHLY}:{month.strftime('%Y-%m')}", self.PERIOD_MONTHLY, month),
+            (self.ALL_TIME_ID, self.PERIOD_ALL, None)
+        ]
+
+    @staticmethod
+    def _completion_increments(transaction, sign):
+        """
+        Build the counters a completed transaction adds or removes.
+
+        Args:
+            transaction (dict): Transaction document
+            sign (int): 1 when completing, -1 when reverting a completion
+
+        Returns:
+            dict: $inc document
+        """
+        amount = float(transaction.get('amount', 0) or 0)
+        increments = {
+            'revenue': sign * amount,
+            'completed': sign
+        }
+
+        if transaction.get('type') == 'subscription':
+            increments['new_subscriptions'] = sign
+
+        if transaction.get('planId'):
+            plan_key = f"by_plan.{transaction['planId']}"
+            increments[f"{plan_key}.revenue"] = sign * amount
+            increments[f"{plan_key}.count"] = sign
+
+        return increments
+
+    def record_transaction_created(self, status='pending'):
+        """
+        Count a newly created transaction.
+
+        Args:
+            status (str): Initial transaction status
+
+        Returns:
+            bool: True if recorded, False otherwise
+        """
+        if self.collection is None:
+            return False
+
+        try:
+            self.collection.update_one(
+                {'_id': self.ALL_TIME_ID},
+                {
+                    '$inc': {'transactions': 1, f"status_counts.{status}": 1},
+                    '$set': {'period': self.PERIOD_ALL, 'updatedAt': datetime.utcnow()}
+                },
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error recording transaction creation in stats: {e}")
+            return False
+
+    def record_status_change(self, transaction, new_status):
+        """
+        Apply a transaction status change to the statistics.
+
+        Counters only move when the status actually changes, so repeated
+        updates to the same status are not double counted.
+
+        Args:
+            transaction (dict): Transaction document before the update
+            new_status (str): New transaction status
+
+        Returns:
+            bool: True if recorded, False otherwise
+        """
+        if self.collection is None or not transaction:
+            return False
+
+        old_status = transaction.get('status')
+        if old_status == new_status:
+            return True
+
+        now = datetime.utcnow()
+        status_increments = {f"status_counts.{new_status}": 1}
+        if old_status:
+            status_increments[f"status_counts.{old_status}"] = -1
+
+        operations = [UpdateOne(
+            {'_id': self.ALL_TIME_ID},
+            {
+                '$inc': status_increments,
+                '$set': {'period': self.PERIOD_ALL, 'updatedAt': now}
+            },
+            upsert=True
+        )]
+
+        sign = 0
+        if new_status == 'completed':
+            sign = 1
+        elif old_status == 'completed':
+            sign = -1
+
+        if sign:
+            increments = self._completion_increments(transaction, sign)
+            created_at = transaction.get('createdAt') or now
+
+            for doc_id, period, start in self._period_keys(created_at):
+                set_fields = {'period': period, 'updatedAt': now}
+                if start is not None:
+                    set_fields['start'] = start
+
+                operations.append(UpdateOne(
+                    {'_id': doc_id},
+                    {'$inc': increments, '$set': set_fields},
+                    upsert=True
+                ))
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error recording transaction status change in stats: {e}")
+            return False
+
+    def get_period(self, period, date):
+        """
+        Get the statistics document for the period containing a date.
+
+        Args:
+            period (str): PERIOD_DAILY or PERIOD_MONTHLY
+            date (datetime): Any date within the period
+
+        Returns:
+            dict: Statistics document or an empty dict
+        """
+        if self.collection is None:
+            return {}
+
+        if period == self.PERIOD_DAILY:
+            doc_id = f"{period}:{self._day_start(date).strftime('%Y-%m-%d')}"
+        else:
+            doc_id = f"{period}:{self._month_start(date).strftime('%Y-%m')}"
+
+        return self.collection.find_one({'_id': doc_id}) or {}
+
+    def get_daily_range(self, start, end=None):
+        """
+        Get daily statistics documents between two dates.
+
+        Args:
+            start (datetime): First day (inclusive)
+            end (datetime, optional): Last day (inclusive), defaults to today
+
+        Returns:
+            list: Daily statistics documents sorted by day
+        """
+        if self.collection is None:
+            return []
+
+        end = end or datetime.utcnow()
+        query = {
+            'period': self.PERIOD_DAILY,
+            'start': {'$gte': self._day_start(start), '$lte': self._day_start(end)}
+        }
+
+        return list(self.collection.find(query).sort('start', 1))
+
+    def get_all_time(self):
+        """
+        Get the all-time statistics document.
+
+        Returns:
+            dict: All-time counters or an empty dict
+        """
+        if self.collection is None:
+            return {}
+
+        return self.collection.find_one({'_id': self.ALL_TIME_ID}) or {}
+
+    def rebuild(self, transactions_collection=None):
+        """
+        Recompute all statistics from the transactions collection.
+
+        Used to backfill the collection from existing history, or to
+        repair drift. Each statistics document is replaced in place and
+        documents of periods without transactions are removed afterwards,
+        so readers never see the collection empty or half written.
+
+        Args:
+            transactions_collection: Transactions collection, defaults to
+                the application's
+
+        Returns:
+            int: Number of statistics documents written
+        """
+        if self.collection is None:
+            return 0
+
+        if transactions_collection is None:
+            transactions_collection = get_collection('transactions')
+
+        now = datetime.utcnow()
+        documents = {}
+
+        completed_pipeline = [
+            {'$match': {'status': 'completed'}},
+            {'$group': {
+                '_id': {
+                    'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$createdAt'}},
+                    'planId': '$planId',
+                    'subscription': {'$eq': ['$type', 'subscription']}
+                },
+                'revenue': {'$sum': '$amount'},
+                'count': {'$sum': 1}
+            }}
+        ]
+
+        for group in transactions_collection.aggregate(completed_pipeline, allowDiskUse=True):
+            day = datetime.strptime(group['_id']['day'], '%Y-%m-%d')
+
+            for doc_id, period, start in self._period_keys(day):
+                doc = documents.setdefault(doc_id, {
+                    '_id': doc_id,
+                    'period': period,
+                    'revenue': 0.0,
+                    'completed': 0,
+                    'new_subscriptions': 0,
+                    'by_plan': {}
+                })
+                if start is not None:
+                    doc['start'] = start
+
+                doc['revenue'] += group['revenue']
+                doc['completed'] += group['count']
+                if group['_id']['subscription']:
+                    doc['new_subscriptions'] += group['count']
+
+                plan_id = group['_id'].get('planId')
+                if plan_id:
+                    plan_stats = doc['by_plan'].setdefault(str(plan_id), {'revenue': 0.0, 'count': 0})
+                    plan_stats['revenue'] += group['revenue']
+                    plan_stats['count'] += group['count']
+
+        # All-time transaction and status counts
+        all_time = documents.setdefault(self.ALL_TIME_ID, {
+            '_id': self.ALL_TIME_ID,
+            'period': self.PERIOD_ALL,
+            'revenue': 0.0,
+            'completed': 0,
+            'new_subscriptions': 0,
+            'by_plan': {}
+        })
+        status_counts = {}
+        for group in transactions_collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            status_counts[str(group['_id'])] = group['count']
+        all_time['status_counts'] = status_counts
+        all_time['transactions'] = sum(status_counts.values())
+
+        operations = []
+        for doc in documents.values():
+            doc['updatedAt'] = now
+            operations.append(ReplaceOne({'_id': doc['_id']}, doc, upsert=True))
+
+        try:
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+            self.collection.delete_many({'_id': {'$nin': list(documents)}})
+            logger.info(f"Rebuilt revenue statistics: {len(operations)} documents")
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Error rebuilding revenue statistics: {e}")
+            return 0
+
+    def create_indexes(self):
+        """
+        Create necessary indexes for the statistics collection.
+
+        Returns:
+            bool: True if indexes created, False otherwise
+        """
+        if self.collection is None:
+            return False
+
+        try:
+            self.collection.create_index([('period', 1), ('start', 1)])
+            return True
+        except Exception as e:
+            logger.error(f"Error creating revenue statistics indexes: {e}")
+            return False
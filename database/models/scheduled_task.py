@@ -0,0 +1,312 @@
+"""
+Scheduled task model for Travian Whispers application.
+This module stores the scheduler's leader lease, the next run time of
+each periodic task and the history of task runs, so that every process
+can start a scheduler and each run still happens only once.
+"""
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.models.init import get_collection
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class ScheduledTask:
+    """Scheduled task state, leases and run history."""
+
+    # Run statuses
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_INTERRUPTED = 'interrupted'
+
+    # Days run history is kept before the TTL index removes it
+    RETENTION_DAYS = 30
+
+    def __init__(self):
+        """Initialize scheduled task model."""
+        self.collection = get_collection('scheduledTasks')
+        self.runs = get_collection('scheduledTaskRuns')
+        self.leases = get_collection('schedulerLeases')
+
+    def acquire_lease(self, name, holder, lease_seconds):
+        """
+        Take or renew a named lease.
+
+        Args:
+            name (str): Lease name
+            holder (str): Identifier of the process asking for the lease
+            lease_seconds (float): Seconds the lease stays valid without renewal
+
+        Returns:
+            bool: True if the caller holds the lease, False otherwise
+        """
+        if self.leases is None:
+            logger.error("Database not connected. Cannot acquire lease.")
+            return False
+
+        now = datetime.utcnow()
+
+        try:
+            self.leases.find_one_and_update(
+                {'_id': name, '$or': [{'holder': holder}, {'expiresAt': {'$lt': now}}]},
+                {'$set': {
+                    'holder': holder,
+                    'expiresAt': now + timedelta(seconds=lease_seconds),
+                    'renewedAt': now
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Another holder's lease is still valid
+            return False
+        except Exception as e:
+            logger.error(f"Error acquiring lease '{name}': {e}")
+            return False
+
+    def release_lease(self, name, holder):
+        """
+        Give up a lease so another process can take over immediately.
+
+        Args:
+            name (str): Lease name
+            holder (str): Identifier of the holder
+
+        Returns:
+            bool: True if released, False otherwise
+        """
+        if self.leases is None:
+            return False
+
+        try:
+            result = self.leases.delete_one({'_id': name, 'holder': holder})
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error releasing lease '{name}': {e}")
+            return False
+
+    def get_states(self):
+        """
+        Get the stored state of every task.
+
+        Returns:
+            dict: Task name -> state document
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot get scheduled tasks.")
+            return {}
+
+        try:
+            return {state['_id']: state for state in self.collection.find()}
+        except Exception as e:
+            logger.error(f"Error getting scheduled tasks: {e}")
+            return {}
+
+    def reset_task(self, name, schedule, due_at, next_run_at):
+        """
+        Store a task's schedule and first run time.
+
+        Args:
+            name (str): Task name
+            schedule (str): Description of the schedule, used to notice changes
+            due_at (datetime): First scheduled time
+            next_run_at (datetime): First run time, the scheduled time plus jitter
+
+        Returns:
+            bool: True if stored, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot store scheduled task.")
+            return False
+
+        try:
+            self.collection.update_one(
+                {'_id': name},
+                {
+                    '$set': {
+                        'schedule': schedule,
+                        'dueAt': due_at,
+                        'nextRunAt': next_run_at,
+                        'updatedAt': datetime.utcnow()
+                    },
+                    '$setOnInsert': {'lastRunAt': None, 'lastStatus': None, 'createdAt': datetime.utcnow()}
+                },
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error storing scheduled task '{name}': {e}")
+            return False
+
+    def reschedule(self, name, scheduled_for, due_at, next_run_at, updates=None):
+        """
+        Move a task to its next run time if nobody else has.
+
+        The update only matches while nextRunAt still equals the run time
+        the caller read, so each run time is taken once across all processes.
+
+        Args:
+            name (str): Task name
+            scheduled_for (datetime): Current run time, as read from the task
+            due_at (datetime): Next scheduled time
+            next_run_at (datetime): Next run time, the scheduled time plus jitter
+            updates (dict, optional): Other fields to set
+
+        Returns:
+            bool: True if this caller moved the task, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot reschedule task.")
+            return False
+
+        fields = dict(updates or {})
+        fields.update({'dueAt': due_at, 'nextRunAt': next_run_at, 'updatedAt': datetime.utcnow()})
+
+        try:
+            result = self.collection.update_one({'_id': name, 'nextRunAt': scheduled_for}, {'$set': fields})
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error rescheduling '{name}': {e}")
+            return False
+
+    def claim_run(self, name, scheduled_for, due_at, next_run_at, holder, missed=0):
+        """
+        Claim a due run of a task and move the task to its next run time.
+
+        Args:
+            name (str): Task name
+            scheduled_for (datetime): Run time being claimed, as read from the task
+            due_at (datetime): Next scheduled time
+            next_run_at (datetime): Next run time, the scheduled time plus jitter
+            holder (str): Identifier of the claiming scheduler
+            missed (int, optional): Earlier runs skipped while no scheduler was running
+
+        Returns:
+            str: Run ID or None if the run was already claimed
+        """
+        if self.collection is None or self.runs is None:
+            logger.error("Database not connected. Cannot claim scheduled run.")
+            return None
+
+        now = datetime.utcnow()
+
+        try:
+            claimed = self.reschedule(name, scheduled_for, due_at, next_run_at, {
+                'lastRunAt': now,
+                'lastStatus': self.STATUS_RUNNING
+            })
+            if not claimed:
+                return None
+
+            result = self.runs.insert_one({
+                'task': name,
+                'scheduledFor': scheduled_for,
+                'missed': missed,
+                'holder': holder,
+                'status': self.STATUS_RUNNING,
+                'result': None,
+                'error': None,
+                'startedAt': now,
+                'finishedAt': None,
+                'duration': None,
+                'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+            })
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"Error claiming run of '{name}': {e}")
+            return None
+
+    def finish_run(self, run_id, name, result=None, error=None):
+        """
+        Record the outcome of a run.
+
+        Args:
+            run_id (str): Run ID
+            name (str): Task name
+            result (optional): Value returned by the task
+            error (str, optional): Error message if the task failed
+
+        Returns:
+            bool: True if recorded, False otherwise
+        """
+        if self.collection is None or self.runs is None:
+            logger.error("Database not connected. Cannot finish scheduled run.")
+            return False
+
+        now = datetime.utcnow()
+        status = self.STATUS_FAILED if error else self.STATUS_SUCCEEDED
+
+        try:
+            run = self.runs.find_one_and_update(
+                {'_id': ObjectId(run_id)},
+                {'$set': {'status': status, 'result': result, 'error': error, 'finishedAt': now}},
+                return_document=ReturnDocument.AFTER
+            )
+            if run is None:
+                return False
+
+            started = run['startedAt'].replace(tzinfo=None)
+            duration = (now - started).total_seconds()
+            self.runs.update_one({'_id': run['_id']}, {'$set': {'duration': duration}})
+            self.collection.update_one(
+                {'_id': name},
+                {'$set': {'lastStatus': status, 'lastDuration': duration, 'lastError': error, 'updatedAt': now}}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error finishing run {run_id} of '{name}': {e}")
+            return False
+
+    def interrupt_runs(self, holder):
+        """
+        Mark runs left 'running' by other schedulers as interrupted.
+
+        Called when a scheduler becomes leader: the previous leader's
+        unfinished runs will never report back.
+
+        Args:
+            holder (str): Identifier of the new leader
+
+        Returns:
+            int: Number of runs marked
+        """
+        if self.runs is None:
+            return 0
+
+        try:
+            result = self.runs.update_many(
+                {'status': self.STATUS_RUNNING, 'holder': {'$ne': holder}},
+                {'$set': {'status': self.STATUS_INTERRUPTED, 'finishedAt': datetime.utcnow()}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error marking interrupted runs: {e}")
+            return 0
+
+    def list_runs(self, name=None, limit=50):
+        """
+        List recent runs.
+
+        Args:
+            name (str, optional): Only runs of this task
+            limit (int, optional): Maximum runs to return
+
+        Returns:
+            list: Run documents, newest first
+        """
+        if self.runs is None:
+            logger.error("Database not connected. Cannot list scheduled runs.")
+            return []
+
+        try:
+            query = {'task': name} if name else {}
+            return list(self.runs.find(query).sort('startedAt', DESCENDING).limit(limit))
+        except Exception as e:
+            logger.error(f"Error listing scheduled runs: {e}")
+            return []
+
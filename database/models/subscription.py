@@ -4,6 +4,10 @@ Subscription plan model for MongoDB integration.
 from datetime import datetime
 from bson import ObjectId
 from database.mongodb import MongoDB
+from database.versioned_cache import VersionedCache
+
+# Process-wide cache of plan documents, shared by all model instances
+_plan_cache = VersionedCache("subscriptionPlans")
 
 class SubscriptionPlan:
     """Subscription plan model for Travian Whispers."""
@@ -66,6 +70,7 @@ class SubscriptionPlan:
             result = self.collection.insert_one(plan)
             if result.inserted_id:
                 plan["_id"] = result.inserted_id
+                self.invalidate_cache()
                 return plan
         except Exception as e:
             print(f"Error creating plan: {e}")
@@ -85,10 +90,15 @@ class SubscriptionPlan:
             return None
             
         try:
-            return self.collection.find_one({"_id": ObjectId(plan_id)})
+            plan_oid = ObjectId(plan_id)
         except Exception as e:
             print(f"Error getting plan by ID: {e}")
             return None
+        
+        return _plan_cache.get(
+            self.db, ("id", str(plan_oid)),
+            lambda: self.collection.find_one({"_id": plan_oid})
+        )
     
     def get_plan_by_name(self, name):
         """
@@ -103,7 +113,10 @@ class SubscriptionPlan:
         if self.collection is None:  # Explicit None check
             return None
         
-        return self.collection.find_one({"name": name})
+        return _plan_cache.get(
+            self.db, ("name", name),
+            lambda: self.collection.find_one({"name": name})
+        )
     
     def update_plan(self, plan_id, update_data):
         """
@@ -132,6 +145,7 @@ class SubscriptionPlan:
                 {"_id": ObjectId(plan_id)},
                 {"$set": update_data}
             )
+            self.invalidate_cache()
             
             return result.modified_count > 0
         except Exception as e:
@@ -153,6 +167,7 @@ class SubscriptionPlan:
             
         try:
             result = self.collection.delete_one({"_id": ObjectId(plan_id)})
+            self.invalidate_cache()
             return result.deleted_count > 0
         except Exception as e:
             print(f"Error deleting plan: {e}")
@@ -169,12 +184,18 @@ class SubscriptionPlan:
             return []
             
         try:
-            cursor = self.collection.find().sort("price.monthly", 1)
-            return list(cursor)
+            return _plan_cache.get(
+                self.db, ("list",),
+                lambda: list(self.collection.find().sort("price.monthly", 1))
+            )
         except Exception as e:
             print(f"Error listing plans: {e}")
             return []
     
+    def invalidate_cache(self):
+        """Drop cached plans in every process after a plan changes."""
+        _plan_cache.invalidate(self.db)
+    
     def create_default_plans(self):
         """
         Create default subscription plans if none exist.
@@ -248,6 +269,7 @@ class SubscriptionPlan:
             }
             
             self.collection.insert_many([basic, standard, premium])
+            self.invalidate_cache()
             return True
         except Exception as e:
             print(f"Error creating default plans: {e}")
@@ -135,6 +135,29 @@ class SystemLog:
                 'total_pages': 0
             }
     
+    def iter_logs(self, query=None, projection=None, batch_size=1000):
+        """
+        Iterate over all matching system logs, newest first.
+        
+        Documents are fetched from the server in batches, so memory use
+        does not grow with the number of logs.
+        
+        Args:
+            query (dict, optional): Filter criteria
+            projection (dict, optional): Fields to return
+            batch_size (int): Documents per server round trip
+        
+        Returns:
+            Cursor: Cursor over log documents, or an empty list on error
+        """
+        try:
+            return (self.collection.find(query or {}, projection)
+                    .sort('timestamp', DESCENDING)
+                    .batch_size(batch_size))
+        except Exception as e:
+            logger.error(f"Error iterating system logs: {e}")
+            return []
+    
     def get_log_by_id(self, log_id):
         """
         Get a specific log entry by ID.
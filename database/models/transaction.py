@@ -5,9 +5,10 @@ This module defines the transaction model for subscription payments.
 import logging
 from datetime import datetime
 from bson import ObjectId
-from pymongo import DESCENDING
+from pymongo import DESCENDING, ReturnDocument
 
 from database.models.init import get_collection
+from database.models.revenue_stats import RevenueStats
 from database.models.user import User
 
 # Initialize logger
@@ -52,6 +53,7 @@ class Transaction:
             result = self.collection.insert_one(transaction)
             
             if result.inserted_id:
+                RevenueStats().record_transaction_created(transaction['status'])
                 return str(result.inserted_id)
             else:
                 return None
@@ -78,6 +80,22 @@ class Transaction:
             logger.error(f"Error getting transaction: {e}")
             return None
     
+    def get_transaction_by_payment_id(self, payment_id):
+        """
+        Get a transaction by its payment provider ID.
+        
+        Args:
+            payment_id (str): Payment ID, e.g. the PayPal order ID
+        
+        Returns:
+            dict: Transaction details or None if not found
+        """
+        try:
+            return self.collection.find_one({'paymentId': payment_id})
+        except Exception as e:
+            logger.error(f"Error getting transaction by payment ID: {e}")
+            return None
+    
     def update_transaction_status(self, transaction_id, status):
         """
         Update transaction status.
@@ -89,25 +107,53 @@ class Transaction:
         Returns:
             bool: True if status was updated successfully, False otherwise
         """
+        return self.change_transaction_status(transaction_id, status) is not None
+    
+    def change_transaction_status(self, transaction_id, status):
+        """
+        Update transaction status and report the status it had before.
+        
+        A transaction is only marked completed once the user's
+        subscription has been extended for it. The extension is recorded
+        in the payment history and applied at most once, so a failed
+        attempt can simply be retried.
+        
+        Args:
+            transaction_id (str): Transaction ID
+            status (str): New status (completed, failed, refunded)
+        
+        Returns:
+            dict: Transaction document before the update, or None if not
+                found, if the subscription could not be extended, or on error
+        """
         try:
-            # Update transaction status
-            result = self.collection.update_one(
+            if status == 'completed':
+                current = self.collection.find_one({'_id': ObjectId(transaction_id)})
+                if not current:
+                    return None
+                
+                # Extend the subscription before the transaction counts as completed
+                if current.get('status') != 'completed' and not self._update_user_subscription(current):
+                    logger.error(f"Subscription not extended for transaction {transaction_id}; left {current.get('status')}")
+                    return None
+            
+            # Update transaction status, keeping the previous state for statistics
+            previous = self.collection.find_one_and_update(
                 {'_id': ObjectId(transaction_id)},
-                {'$set': {'status': status, 'updatedAt': datetime.utcnow()}}
+                {'$set': {'status': status, 'updatedAt': datetime.utcnow()}},
+                return_document=ReturnDocument.BEFORE
             )
             
-            # If transaction is completed, update user subscription
-            if status == 'completed':
-                transaction = self.get_transaction(transaction_id)
-                
-                if transaction:
-                    # Update user subscription
-                    self._update_user_subscription(transaction)
+            if not previous:
+                return None
             
-            return result.modified_count > 0
+            # Keep materialized revenue statistics in step
+            RevenueStats().record_status_change(previous, status)
+            
+            return previous
         except Exception as e:
             logger.error(f"Error updating transaction status: {e}")
-            return False
+            return None
     
     def get_user_transactions(self, user_id, status=None):
         """
@@ -140,6 +186,9 @@ class Transaction:
         """
         Update user subscription based on completed transaction.
         
+        Idempotent: a transaction already in the payment history is not
+        applied again.
+        
         Args:
             transaction (dict): Transaction data
         
@@ -161,9 +210,14 @@ class Transaction:
             from datetime import timedelta
             
             # Start subscription from now or extend existing subscription
-            if user['subscription']['status'] == 'active' and user['subscription']['endDate'] > datetime.utcnow():
+            end_date = user['subscription'].get('endDate')
+            if end_date is not None:
+                # The client returns timezone-aware dates
+                end_date = end_date.replace(tzinfo=None)
+            
+            if user['subscription']['status'] == 'active' and end_date is not None and end_date > datetime.utcnow():
                 # Extend existing subscription
-                start_date = user['subscription']['endDate']
+                start_date = end_date
             else:
                 # Start new subscription
                 start_date = datetime.utcnow()
@@ -175,15 +229,7 @@ class Transaction:
                 # Default to monthly
                 end_date = start_date + timedelta(days=30)
             
-            # Update subscription data
-            subscription_data = {
-                'subscription': {
-                    'planId': transaction['planId'],
-                    'status': 'active',
-                    'startDate': start_date,
-                    'endDate': end_date
-                }
-            }
+            now = datetime.utcnow()
             
             # Add payment to history
             payment_entry = {
@@ -193,16 +239,39 @@ class Transaction:
                 'method': transaction['paymentMethod']
             }
             
-            # Update user subscription
+            # Set the subscription fields one by one so the payment history
+            # is kept, and apply each transaction only once
             result = user_model.collection.update_one(
-                {'_id': ObjectId(transaction['userId'])},
                 {
-                    '$set': subscription_data,
+                    '_id': ObjectId(transaction['userId']),
+                    'subscription.paymentHistory.transactionId': {'$ne': transaction['_id']}
+                },
+                {
+                    '$set': {
+                        'subscription.planId': transaction['planId'],
+                        'subscription.status': 'active',
+                        'subscription.startDate': start_date,
+                        'subscription.endDate': end_date,
+                        'updatedAt': now
+                    },
+                    # Expiry and renewal notices belong to the previous period
+                    '$unset': {
+                        'subscription.expiryNotice': '',
+                        'subscription.renewalReminder': ''
+                    },
                     '$push': {'subscription.paymentHistory': payment_entry}
                 }
             )
+            user_model.invalidate_cached_user(transaction['userId'])
+            
+            if result.modified_count > 0:
+                return True
             
-            return result.modified_count > 0
+            # Applied by an earlier attempt
+            return user_model.collection.count_documents({
+                '_id': ObjectId(transaction['userId']),
+                'subscription.paymentHistory.transactionId': transaction['_id']
+            }, limit=1) > 0
         except Exception as e:
             logger.error(f"Error updating user subscription: {e}")
             return False
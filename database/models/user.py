@@ -2,12 +2,16 @@
 User model for MongoDB integration.
 """
 import re
+import copy
 import uuid
 import logging
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import UpdateOne
+from flask import g, has_app_context
 from database.mongodb import MongoDB
-from passlib.hash import pbkdf2_sha256
+from utils.password_hasher import hash_password, verify_password
+from utils.ttl_cache import TTLCache
 
 # Configure logger
 logging.basicConfig(
@@ -16,6 +20,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger('database.models.user')
 
+# Cross-request cache of user documents keyed by user ID. Invalidation only
+# reaches the local process, so it is off unless configured.
+_user_cache = TTLCache(maxsize=1024, ttl=0)
+
+def configure_user_cache(maxsize=1024, ttl=0):
+    """
+    Configure the cross-request user cache.
+    
+    Args:
+        maxsize (int, optional): Maximum number of cached users
+        ttl (float, optional): Seconds a cached user stays valid, 0 disables it
+    """
+    global _user_cache
+    _user_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
 class User:
     """User model for Travian Whispers application."""
     
@@ -43,7 +62,7 @@ class User:
     
     def hash_password(self, password):
         """
-        Hash a password using passlib with improved security parameters.
+        Hash a password with the configured hashing parameters.
         
         Args:
             password (str): Plain text password
@@ -51,8 +70,7 @@ class User:
         Returns:
             str: Hashed password
         """
-        # Use stronger hashing parameters (more rounds)
-        return pbkdf2_sha256.using(rounds=350000).hash(password)
+        return hash_password(password)
     
     def verify_password(self, plain_password, hashed_password):
         """
@@ -65,7 +83,37 @@ class User:
         Returns:
             bool: True if match, False otherwise
         """
-        return pbkdf2_sha256.verify(plain_password, hashed_password)
+        return verify_password(plain_password, hashed_password)
+    
+    def upgrade_password_hash(self, user_id, old_hash, new_hash):
+        """
+        Replace a password hash made with outdated parameters.
+        
+        Only applied if the stored hash is still old_hash, so a password
+        changed in the meantime is never overwritten.
+        
+        Args:
+            user_id (str): User ID
+            old_hash (str): Hash the password was verified against
+            new_hash (str): Same password hashed with the current parameters
+            
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        if self.collection is None:  # Explicit None check
+            return False
+        
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(user_id), "password": old_hash},
+                {"$set": {"password": new_hash, "updatedAt": datetime.utcnow()}}
+            )
+            self.invalidate_cached_user(user_id)
+            
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error upgrading password hash: {e}")
+            return False
     
     def create_user(self, username, email, password, role="user", verification_token=None):
         """
@@ -165,6 +213,73 @@ class User:
             logger.error(f"Error getting user by ID: {e}")
             return None
     
+    def get_user_updated_at(self, user_id):
+        """
+        Get when a user document last changed, reading only that field.
+        
+        Args:
+            user_id (str): User ID
+            
+        Returns:
+            dict: Document with _id and updatedAt, or None if not found
+        """
+        if self.collection is None:  # Explicit None check
+            return None
+            
+        try:
+            return self.collection.find_one({"_id": ObjectId(user_id)}, {"updatedAt": 1})
+        except Exception as e:
+            logger.error(f"Error getting user update time: {e}")
+            return None
+    
+    def get_cached_user(self, user_id):
+        """
+        Get a user by ID, reusing documents already loaded.
+        
+        The document is cached on flask.g for the rest of the request and,
+        when enabled, in a short-lived cross-request cache, so a page loads
+        each user at most once. Writes done by other processes may not be
+        seen until the entry expires: routes that modify the document read
+        it with get_user_by_id instead.
+        
+        Args:
+            user_id (str): User ID
+            
+        Returns:
+            dict: User document or None if not found
+        """
+        user_id = str(user_id)
+        request_users = g.setdefault('_users', {}) if has_app_context() else {}
+        
+        if user_id in request_users:
+            return request_users[user_id]
+        
+        user = _user_cache.get(user_id)
+        if user is not None:
+            # Never hand out the shared cached object to callers
+            user = copy.deepcopy(user)
+        else:
+            user = self.get_user_by_id(user_id)
+            if user is not None:
+                _user_cache.set(user_id, copy.deepcopy(user))
+        
+        request_users[user_id] = user
+        return user
+    
+    @staticmethod
+    def invalidate_cached_user(user_id):
+        """
+        Drop a user from the request and cross-request caches.
+        
+        Args:
+            user_id (str): User ID
+        """
+        user_id = str(user_id)
+        _user_cache.delete(user_id)
+        
+        if has_app_context():
+            g.get('_users', {}).pop(user_id, None)
+    
     def get_user_by_username(self, username):
         """
         Get a user by username.
@@ -271,12 +386,134 @@ class User:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
+            self.invalidate_cached_user(user_id)
             
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating user: {e}")
             return False
     
+    def add_village(self, user_id, village):
+        """
+        Append a village unless one with the same newdid exists.
+        
+        The array is updated in place, so villages written concurrently by
+        an extraction job are kept.
+        
+        Args:
+            user_id (str): User ID
+            village (dict): Village document
+        
+        Returns:
+            bool: True if added, False if it already exists or on error
+        """
+        if self.collection is None:
+            return False
+        
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(user_id), "villages.newdid": {"$ne": village["newdid"]}},
+                {"$push": {"villages": village}, "$set": {"updatedAt": datetime.utcnow()}}
+            )
+            self.invalidate_cached_user(user_id)
+            
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error adding village: {e}")
+            return False
+    
+    def update_village(self, user_id, newdid, fields):
+        """
+        Update fields of one village in place.
+        
+        Args:
+            user_id (str): User ID
+            newdid: Village newdid as stored
+            fields (dict): Village fields to set
+        
+        Returns:
+            bool: True if the village was found, False otherwise
+        """
+        if self.collection is None:
+            return False
+        
+        try:
+            update = {f"villages.$.{key}": value for key, value in fields.items()}
+            update["updatedAt"] = datetime.utcnow()
+            
+            result = self.collection.update_one(
+                {"_id": ObjectId(user_id), "villages.newdid": newdid},
+                {"$set": update}
+            )
+            self.invalidate_cached_user(user_id)
+            
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error updating village: {e}")
+            return False
+    
+    def remove_village(self, user_id, newdid):
+        """
+        Remove one village in place.
+        
+        Args:
+            user_id (str): User ID
+            newdid: Village newdid as stored
+        
+        Returns:
+            bool: True if removed, False otherwise
+        """
+        if self.collection is None:
+            return False
+        
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$pull": {"villages": {"newdid": newdid}}, "$set": {"updatedAt": datetime.utcnow()}}
+            )
+            self.invalidate_cached_user(user_id)
+            
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error removing village: {e}")
+            return False
+    
+    def update_villages_fields(self, user_id, fields_by_newdid):
+        """
+        Update fields of several villages in place, in one round trip.
+        
+        Args:
+            user_id (str): User ID
+            fields_by_newdid (dict): Village newdid as stored -> fields to set
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if self.collection is None:
+            return False
+        if not fields_by_newdid:
+            return True
+        
+        try:
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"_id": ObjectId(user_id), "villages.newdid": newdid},
+                    {"$set": {
+                        **{f"villages.$.{key}": value for key, value in fields.items()},
+                        "updatedAt": now
+                    }}
+                )
+                for newdid, fields in fields_by_newdid.items()
+            ]
+            self.collection.bulk_write(operations, ordered=False)
+            self.invalidate_cached_user(user_id)
+            
+            return True
+        except Exception as e:
+            logger.error(f"Error updating villages: {e}")
+            return False
+    
     def verify_user(self, token):
         """
         Verify a user's email with token.
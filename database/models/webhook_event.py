@@ -0,0 +1,279 @@
+"""
+Webhook event inbox model for Travian Whispers application.
+This module stores incoming payment webhooks so the endpoint can
+acknowledge them immediately and workers can process them later, once
+each and in order for each user.
+"""
+import logging
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.models.init import get_collection
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class WebhookEvent:
+    """Webhook event inbox model."""
+
+    # Event statuses
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+
+    UNFINISHED_STATUSES = (STATUS_PENDING, STATUS_PROCESSING)
+
+    # Days processed and failed events are kept before the TTL index removes them
+    RETENTION_DAYS = 30
+
+    # Partitions examined per claim attempt
+    CLAIM_CANDIDATES = 20
+
+    def __init__(self):
+        """Initialize webhook event model."""
+        self.collection = get_collection('webhookEvents')
+        self.locks = get_collection('webhookLocks')
+
+    def record(self, provider, event_id, event_type, payload, partition_key):
+        """
+        Store a received event unless it was received before.
+
+        Args:
+            provider (str): Sender, e.g. 'paypal'
+            event_id (str): Provider's event ID
+            event_type (str): Event type
+            payload (dict): Event body
+            partition_key (str): Events sharing a key are processed in arrival order
+
+        Returns:
+            tuple: (event document ID, True if new) or (None, False) if storing failed
+        """
+        if self.collection is None:
+            logger.error("Database not connected. Cannot record webhook event.")
+            return None, False
+
+        now = datetime.utcnow()
+
+        try:
+            result = self.collection.insert_one({
+                'provider': provider,
+                'eventId': event_id,
+                'eventType': event_type,
+                'payload': payload,
+                'partitionKey': partition_key,
+                'status': self.STATUS_PENDING,
+                'attempts': 0,
+                'nextAttemptAt': now,
+                'lockedBy': None,
+                'lockedUntil': None,
+                'lastError': None,
+                'receivedAt': now,
+                'processedAt': None,
+                'expiresAt': None
+            })
+            return str(result.inserted_id), True
+        except DuplicateKeyError:
+            existing = self.collection.find_one({'provider': provider, 'eventId': event_id}, {'_id': 1})
+            logger.info(f"Duplicate {provider} webhook {event_id} ignored")
+            return (str(existing['_id']) if existing else None), False
+        except Exception as e:
+            logger.error(f"Error recording {provider} webhook {event_id}: {e}")
+            return None, False
+
+    def _lock_partition(self, partition_key, worker_id, lease_seconds):
+        """Take the processing lease on a partition."""
+        now = datetime.utcnow()
+
+        try:
+            self.locks.find_one_and_update(
+                {'_id': partition_key, '$or': [{'holder': worker_id}, {'expiresAt': {'$lt': now}}]},
+                {'$set': {'holder': worker_id, 'expiresAt': now + timedelta(seconds=lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def unlock_partition(self, partition_key, worker_id):
+        """
+        Release the processing lease on a partition.
+
+        Args:
+            partition_key (str): Partition key
+            worker_id (str): Identifier of the holder
+        """
+        if self.locks is None:
+            return
+
+        try:
+            self.locks.delete_one({'_id': partition_key, 'holder': worker_id})
+        except Exception as e:
+            logger.error(f"Error unlocking webhook partition {partition_key}: {e}")
+
+    def claim_next(self, worker_id, lease_seconds=60):
+        """
+        Claim the next event that may be processed.
+
+        An event is only handed out while its worker holds the lease on
+        the event's partition, and only if it is the oldest unfinished
+        event of that partition, so events for one user never overlap or
+        run out of order. Events of different users run in parallel.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (int, optional): Seconds the claim is held
+
+        Returns:
+            dict: Claimed event, holding its partition lease, or None if nothing is due
+        """
+        if self.collection is None or self.locks is None:
+            logger.error("Database not connected. Cannot claim webhook events.")
+            return None
+
+        now = datetime.utcnow()
+
+        try:
+            # The head of each partition is its oldest unfinished event; only
+            # due heads are candidates, so a partition blocked by a retry
+            # cannot crowd out the others
+            candidates = self.collection.aggregate([
+                {'$match': {'status': {'$in': list(self.UNFINISHED_STATUSES)}}},
+                {'$sort': {'receivedAt': ASCENDING}},
+                {'$group': {
+                    '_id': '$partitionKey',
+                    'status': {'$first': '$status'},
+                    'nextAttemptAt': {'$first': '$nextAttemptAt'},
+                    'lockedUntil': {'$first': '$lockedUntil'},
+                    'receivedAt': {'$first': '$receivedAt'}
+                }},
+                {'$match': {'$or': [
+                    {'status': self.STATUS_PENDING, 'nextAttemptAt': {'$lte': now}},
+                    {'status': self.STATUS_PROCESSING, 'lockedUntil': {'$lt': now}}
+                ]}},
+                {'$sort': {'receivedAt': ASCENDING}},
+                {'$limit': self.CLAIM_CANDIDATES},
+                {'$project': {'partitionKey': '$_id'}}
+            ])
+
+            tried = set()
+            for candidate in candidates:
+                partition_key = candidate['partitionKey']
+                if partition_key in tried:
+                    continue
+                tried.add(partition_key)
+
+                if not self._lock_partition(partition_key, worker_id, lease_seconds):
+                    continue
+
+                # The oldest unfinished event of the partition goes first, even if it is waiting for a retry
+                oldest = self.collection.find_one(
+                    {'partitionKey': partition_key, 'status': {'$in': list(self.UNFINISHED_STATUSES)}},
+                    sort=[('receivedAt', ASCENDING)]
+                )
+                due = oldest is not None and (
+                    (oldest['status'] == self.STATUS_PENDING and oldest['nextAttemptAt'].replace(tzinfo=None) <= now)
+                    or (oldest['status'] == self.STATUS_PROCESSING and oldest['lockedUntil'].replace(tzinfo=None) < now)
+                )
+                if not due:
+                    self.unlock_partition(partition_key, worker_id)
+                    continue
+
+                event = self.collection.find_one_and_update(
+                    {'_id': oldest['_id'], 'status': oldest['status']},
+                    {
+                        '$set': {
+                            'status': self.STATUS_PROCESSING,
+                            'lockedBy': worker_id,
+                            'lockedUntil': now + timedelta(seconds=lease_seconds)
+                        },
+                        '$inc': {'attempts': 1}
+                    },
+                    return_document=ReturnDocument.AFTER
+                )
+                if event is not None:
+                    return event
+
+                self.unlock_partition(partition_key, worker_id)
+        except Exception as e:
+            logger.error(f"Error claiming webhook event for worker {worker_id}: {e}")
+
+        return None
+
+    def _finish(self, event, worker_id, updates):
+        """Update a claimed event and release its partition."""
+        updates['lockedBy'] = None
+        updates['lockedUntil'] = None
+
+        try:
+            result = self.collection.update_one(
+                {'_id': event['_id'], 'lockedBy': worker_id},
+                {'$set': updates}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error updating webhook event {event['_id']}: {e}")
+            return False
+        finally:
+            self.unlock_partition(event['partitionKey'], worker_id)
+
+    def mark_processed(self, event, worker_id):
+        """
+        Mark a claimed event as processed.
+
+        Args:
+            event (dict): Claimed event
+            worker_id (str): Identifier of the worker holding the event
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        now = datetime.utcnow()
+        return self._finish(event, worker_id, {
+            'status': self.STATUS_PROCESSED,
+            'processedAt': now,
+            'lastError': None,
+            'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+        })
+
+    def schedule_retry(self, event, worker_id, error, delay_seconds):
+        """
+        Put a claimed event back after a failure.
+
+        Later events of the same partition wait until it succeeds or fails for good.
+
+        Args:
+            event (dict): Claimed event
+            worker_id (str): Identifier of the worker holding the event
+            error (str): Failure reason
+            delay_seconds (float): Seconds before the next attempt
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        return self._finish(event, worker_id, {
+            'status': self.STATUS_PENDING,
+            'lastError': error,
+            'nextAttemptAt': datetime.utcnow() + timedelta(seconds=delay_seconds)
+        })
+
+    def mark_failed(self, event, worker_id, error):
+        """
+        Give up on a claimed event.
+
+        Args:
+            event (dict): Claimed event
+            worker_id (str): Identifier of the worker holding the event
+            error (str): Failure reason
+
+        Returns:
+            bool: True if updated, False otherwise
+        """
+        now = datetime.utcnow()
+        return self._finish(event, worker_id, {
+            'status': self.STATUS_FAILED,
+            'lastError': error,
+            'processedAt': now,
+            'expiresAt': now + timedelta(days=self.RETENTION_DAYS)
+        })
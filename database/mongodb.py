@@ -19,6 +19,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger('mongodb')
 
+# Unique indexes that exactly-once delivery relies on; unlike the others they
+# are created at every startup: (collection, keys, options)
+CRITICAL_INDEXES = [
+    ("emailOutbox", [("dedupeKey", pymongo.ASCENDING)],
+     {"unique": True, "partialFilterExpression": {"dedupeKey": {"$exists": True}}}),
+    ("webhookEvents", [("provider", pymongo.ASCENDING), ("eventId", pymongo.ASCENDING)],
+     {"unique": True}),
+    # One queued or running job per user and type; finished jobs drop the flag
+    ("jobs", [("userId", pymongo.ASCENDING), ("type", pymongo.ASCENDING)],
+     {"unique": True, "partialFilterExpression": {"active": True}})
+]
+
 class MongoDB:
     """MongoDB connection handler for Travian Whispers."""
     
@@ -133,6 +145,13 @@ class MongoDB:
             db.users.create_index([("subscription.status", pymongo.ASCENDING)])
             db.users.create_index([("subscription.endDate", pymongo.ASCENDING)])
             
+            # Pending subscription notices left for the maintenance jobs to queue
+            for marker in ("subscription.expiryNotice", "subscription.renewalReminder"):
+                db.users.create_index(
+                    [(marker, pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+                    partialFilterExpression={marker: "pending"}
+                )
+            
             # Subscription plans indexes
             db.subscriptionPlans.create_index([("name", pymongo.ASCENDING)], unique=True)
             
@@ -142,6 +161,42 @@ class MongoDB:
             db.transactions.create_index([("createdAt", pymongo.DESCENDING)])
             db.transactions.create_index([("status", pymongo.ASCENDING)])
             
+            # Log indexes, used for sorted exports and pagination
+            db.activity_logs.create_index([("userId", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)])
+            db.system_logs.create_index([("timestamp", pymongo.DESCENDING)])
+            db.system_logs.create_index([("level", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)])
+            
+            # Revenue statistics indexes
+            db.revenueStats.create_index([("period", pymongo.ASCENDING), ("start", pymongo.ASCENDING)])
+            
+            # Background job indexes; finished jobs expire through expiresAt
+            db.jobs.create_index([("status", pymongo.ASCENDING), ("type", pymongo.ASCENDING), ("createdAt", pymongo.ASCENDING)])
+            db.jobs.create_index([("userId", pymongo.ASCENDING), ("type", pymongo.ASCENDING), ("status", pymongo.ASCENDING)])
+            db.jobs.create_index([("expiresAt", pymongo.ASCENDING)], expireAfterSeconds=0)
+            db.jobs.create_index([("updatedAt", pymongo.ASCENDING)])
+            
+            # Outbox dedupe, webhook event ID and active job uniques
+            self.create_critical_indexes()
+            
+            # Email outbox indexes; delivered and failed messages expire through expiresAt
+            db.emailOutbox.create_index([("status", pymongo.ASCENDING), ("nextAttemptAt", pymongo.ASCENDING)])
+            db.emailOutbox.create_index([("expiresAt", pymongo.ASCENDING)], expireAfterSeconds=0)
+            
+            # Webhook inbox; the unique event ID (a critical index) drops redeliveries
+            db.webhookEvents.create_index([("status", pymongo.ASCENDING), ("receivedAt", pymongo.ASCENDING)])
+            db.webhookEvents.create_index(
+                [("partitionKey", pymongo.ASCENDING), ("status", pymongo.ASCENDING), ("receivedAt", pymongo.ASCENDING)]
+            )
+            db.webhookEvents.create_index([("expiresAt", pymongo.ASCENDING)], expireAfterSeconds=0)
+            
+            # Scheduler run history; old runs expire through expiresAt
+            db.scheduledTaskRuns.create_index([("task", pymongo.ASCENDING), ("startedAt", pymongo.DESCENDING)])
+            db.scheduledTaskRuns.create_index([("status", pymongo.ASCENDING), ("holder", pymongo.ASCENDING)])
+            db.scheduledTaskRuns.create_index([("expiresAt", pymongo.ASCENDING)], expireAfterSeconds=0)
+
+            # Login throttle buckets are dropped once they have refilled
+            db.loginThrottle.create_index([("expiresAt", pymongo.ASCENDING)], expireAfterSeconds=0)
+            
             logger.info("All database indexes created successfully")
             return True
         except Exception as e:
@@ -149,6 +204,28 @@ class MongoDB:
             # Re-raise to let the decorator handle it
             raise
     
+    def create_critical_indexes(self):
+        """
+        Create the unique indexes listed in CRITICAL_INDEXES.
+        
+        Cheap when they exist, so web and worker processes call it at
+        startup even when the other indexes are left to `main.py --migrate`.
+        
+        Raises:
+            RuntimeError: If not connected or an index cannot be created,
+                e.g. because duplicates are already stored
+        """
+        db = self.get_db()
+        if db is None:
+            raise RuntimeError("Database not connected. Cannot create critical indexes.")
+        
+        for collection, keys, options in CRITICAL_INDEXES:
+            try:
+                db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Critical index on {collection} {keys} is missing and could not be created: {e}")
+                raise RuntimeError(f"Critical index on {collection} could not be created: {e}") from e
+    
     def disconnect(self):
         """Close the MongoDB connection."""
         if self.client:
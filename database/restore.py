@@ -0,0 +1,516 @@
+"""
+Database restore utility for Travian Whispers.
+
+Restores a backup written by database/backup.py. For an incremental
+backup the whole chain is replayed: the full backup it builds on first,
+then each incremental in order. Collections copied whole replace the
+current ones; watermarked collections are upserted by _id, so documents
+copied by two overlapping backups are applied once.
+
+Documents are streamed from the backup as raw BSON and written with
+unordered insert_many calls in large batches, several collections at
+once. Secondary indexes are built after all data is loaded, not
+maintained document by document while it loads.
+
+Usage:
+    python -m database.restore backups/20250101_030000_backup.tar
+"""
+import argparse
+import gzip
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import IndexModel, ReplaceOne
+
+from database.backup import BackupError, _get_database, open_backup, read_manifest, verify_backup
+from database.versioned_cache import VERSIONS_COLLECTION, bump_version
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Collections describing the live system rather than its data; restoring
+# them would forget backups taken after the one restored, cancel the
+# restore job itself, sign everybody out, send emails or process webhooks
+# a second time, or leave processes serving cached data from before
+RESTORE_SKIP_COLLECTIONS = (
+    'backupRecords',
+    'jobs',
+    'sessions',
+    'schedulerLeases',
+    'webhookLocks',
+    'webhookEvents',
+    'emailOutbox',
+    'loginThrottle',
+    VERSIONS_COLLECTION
+)
+
+# Restored collection -> versioned cache namespace invalidated afterwards
+CACHED_COLLECTIONS = {
+    'subscriptionPlans': 'subscriptionPlans',
+    'settings': 'settings'
+}
+
+# Index options that are not passed back to create_indexes
+_INDEX_IGNORED_FIELDS = ('v', 'key', 'ns')
+
+# Documents are passed through undecoded
+_RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+# Upper bound on the BSON size of one insert batch
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# Share of the progress bar taken by loading data; index builds take the rest
+_LOAD_PROGRESS = 90
+
+
+class _Progress:
+    """Thread-safe progress reporter counting compressed bytes read."""
+
+    def __init__(self, callback, total_bytes, interval=1.0):
+        self.callback = callback
+        self.total_bytes = max(total_bytes, 1)
+        self.interval = interval
+        self.read_bytes = 0
+        self.documents = 0
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, read_bytes=0, documents=0):
+        with self._lock:
+            self.read_bytes += read_bytes
+            self.documents += documents
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+            percent = min(_LOAD_PROGRESS, int(_LOAD_PROGRESS * self.read_bytes / self.total_bytes))
+            documents = self.documents
+        self.report(percent, f"Loaded {documents} documents")
+
+    def report(self, percent, message):
+        if self.callback is not None:
+            try:
+                self.callback(percent, message)
+            except Exception as e:
+                logger.warning(f"Error reporting restore progress: {e}")
+
+
+class _CountingReader:
+    """File wrapper that reports the bytes read through it."""
+
+    def __init__(self, fileobj, progress):
+        self.fileobj = fileobj
+        self.progress = progress
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.progress.add(read_bytes=len(data))
+        return data
+
+
+def resolve_chain(path):
+    """
+    Find the backups needed to restore a backup, oldest first.
+
+    Parents are looked up next to the given file by the names in the manifests.
+
+    Args:
+        path (str or Path): Backup directory or tarball
+
+    Returns:
+        list: (path, manifest) pairs from the full backup to the given one
+
+    Raises:
+        BackupError: If a backup of the chain is missing or unreadable
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    chain = [(path, manifest)]
+
+    while manifest.get("parent"):
+        parent_path = path.parent / manifest["parent"]
+        if not parent_path.exists():
+            raise BackupError(f"Backup {manifest['parent']} needed by {path.name} is missing")
+        path = parent_path
+        manifest = read_manifest(path)
+        chain.insert(0, (path, manifest))
+
+    return chain
+
+
+@contextmanager
+def _open_data(open_file, name, progress=None):
+    """Open a backup file, decompressing it if needed."""
+    with open_file(name) as stream:
+        if progress is not None:
+            stream = _CountingReader(stream, progress)
+        if name.endswith(".gz"):
+            with gzip.GzipFile(fileobj=stream, mode="rb") as f:
+                yield f
+        else:
+            yield stream
+
+
+def _read_metadata(open_file, entry):
+    """Read the options and indexes stored with a collection."""
+    with _open_data(open_file, entry["metadata"]) as f:
+        return json_util.loads(f.read())
+
+
+def _index_models(metadata):
+    """Build IndexModels from collection metadata, without the _id index."""
+    models = []
+    for index in metadata.get("indexes", []):
+        if index.get("name") == "_id_":
+            continue
+        options = {key: value for key, value in index.items() if key not in _INDEX_IGNORED_FIELDS}
+        models.append(IndexModel(list(index["key"].items()), **options))
+    return models
+
+
+def _iter_batches(open_file, entry, batch_size, progress=None):
+    """
+    Yield the documents of a data file as raw BSON, in batches.
+
+    A batch ends after batch_size documents or MAX_BATCH_BYTES bytes.
+    """
+    batch = []
+    batch_bytes = 0
+    with _open_data(open_file, entry["file"], progress) as f:
+        for document in bson.decode_file_iter(f, _RAW_CODEC_OPTIONS):
+            batch.append(document)
+            batch_bytes += len(document.raw)
+            if len(batch) >= batch_size or batch_bytes >= MAX_BATCH_BYTES:
+                yield batch
+                batch = []
+                batch_bytes = 0
+    if batch:
+        yield batch
+
+
+def _write_batches(batches, write, executor, in_flight, progress=None):
+    """
+    Run a write for each batch on the insert pool.
+
+    At most in_flight batches of one collection are held in memory at once;
+    the reader waits for a slot before decoding further.
+
+    Args:
+        batches (iterable): Batches of documents
+        write (callable): Writes one batch
+        executor (ThreadPoolExecutor): Insert pool
+        in_flight (int): Batches submitted but not yet written
+        progress (_Progress, optional): Progress reporter
+
+    Returns:
+        int: Documents written
+
+    Raises:
+        Exception: The first error of a write, after the others have finished
+    """
+    slots = threading.BoundedSemaphore(in_flight)
+    failed = threading.Event()
+    futures = []
+    written = 0
+
+    def run(batch):
+        try:
+            write(batch)
+        except Exception:
+            failed.set()
+            raise
+        finally:
+            slots.release()
+        if progress is not None:
+            progress.add(documents=len(batch))
+        return len(batch)
+
+    try:
+        for batch in batches:
+            slots.acquire()
+            if failed.is_set():
+                slots.release()
+                break
+            futures.append(executor.submit(run, batch))
+            # Count finished batches so their results do not pile up
+            if len(futures) > in_flight * 4:
+                pending = []
+                for future in futures:
+                    if future.done() and future.exception() is None:
+                        written += future.result()
+                    else:
+                        pending.append(future)
+                futures = pending
+    finally:
+        error = None
+        for future in futures:
+            try:
+                written += future.result()
+            except Exception as e:
+                error = error or e
+
+    if error is not None:
+        raise error
+    return written
+
+
+def replace_collection(db, name, entry, open_file, executor, batch_size=5000, in_flight=2, progress=None):
+    """
+    Replace a collection with the copy in a backup, without its indexes.
+
+    Args:
+        db (pymongo.database.Database): Target database
+        name (str): Collection name
+        entry (dict): Manifest entry of the collection
+        open_file (callable): Opens files of the backup
+        executor (ThreadPoolExecutor): Pool running the inserts
+        batch_size (int, optional): Documents per insert
+        in_flight (int, optional): Batches of this collection written at once
+        progress (_Progress, optional): Progress reporter
+
+    Returns:
+        tuple: (documents restored, collection metadata)
+    """
+    metadata = _read_metadata(open_file, entry)
+
+    db.drop_collection(name)
+    options = metadata.get("options") or {}
+    if options:
+        db.create_collection(name, **options)
+
+    collection = db[name]
+
+    def write(batch):
+        # Documents passed validation when they were first written
+        collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+
+    batches = _iter_batches(open_file, entry, batch_size, progress)
+    return _write_batches(batches, write, executor, in_flight, progress), metadata
+
+
+def upsert_collection(db, name, entry, open_file, executor, batch_size=5000, in_flight=2, progress=None):
+    """
+    Apply the documents of an incremental copy to a collection.
+
+    Args:
+        db (pymongo.database.Database): Target database
+        name (str): Collection name
+        entry (dict): Manifest entry of the collection
+        open_file (callable): Opens files of the backup
+        executor (ThreadPoolExecutor): Pool running the writes
+        batch_size (int, optional): Documents per bulk write
+        in_flight (int, optional): Batches of this collection written at once
+        progress (_Progress, optional): Progress reporter
+
+    Returns:
+        tuple: (documents applied, collection metadata)
+    """
+    metadata = _read_metadata(open_file, entry)
+    collection = db[name]
+
+    def write(batch):
+        collection.bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in batch],
+            ordered=False,
+            bypass_document_validation=True
+        )
+
+    batches = _iter_batches(open_file, entry, batch_size, progress)
+    return _write_batches(batches, write, executor, in_flight, progress), metadata
+
+
+def build_indexes(db, metadata_by_name, parallel=4, progress=None):
+    """
+    Build the secondary indexes of restored collections, several at once.
+
+    Args:
+        db (pymongo.database.Database): Target database
+        metadata_by_name (dict): Collection name -> metadata holding its indexes
+        parallel (int, optional): Collections indexed at once
+        progress (_Progress, optional): Progress reporter
+
+    Returns:
+        int: Indexes built
+    """
+    work = {name: _index_models(metadata) for name, metadata in metadata_by_name.items()}
+    work = {name: models for name, models in work.items() if models}
+    if not work:
+        return 0
+
+    done = [0]
+    lock = threading.Lock()
+
+    def build(name):
+        db[name].create_indexes(work[name])
+        with lock:
+            done[0] += 1
+            finished = done[0]
+        if progress is not None:
+            percent = _LOAD_PROGRESS + (100 - _LOAD_PROGRESS) * finished // (len(work) + 1)
+            progress.report(percent, f"Built indexes of {finished}/{len(work)} collections")
+        return len(work[name])
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="restore-index") as pool:
+        return sum(pool.map(build, work))
+
+
+def restore_backup(path, db=None, verify=True, skip=RESTORE_SKIP_COLLECTIONS, batch_size=5000,
+                   parallel=4, insert_workers=8, progress=None):
+    """
+    Restore a backup, replaying its chain.
+
+    Within each backup of the chain, `parallel` collections are read at once
+    and their batches written by a pool of `insert_workers` threads. The
+    backups of a chain are applied one after another, and indexes are built
+    once everything is loaded.
+
+    Args:
+        path (str or Path): Backup directory or tarball
+        db (pymongo.database.Database, optional): Target database, the configured one if omitted
+        verify (bool, optional): Whether to check all checksums before changing anything
+        skip (tuple, optional): Collections left untouched
+        batch_size (int, optional): Documents per write
+        parallel (int, optional): Collections loaded at once
+        insert_workers (int, optional): Batches written at once, across collections
+        progress (callable, optional): Progress reporter taking (percent, message)
+
+    Returns:
+        dict: Documents restored per collection
+
+    Raises:
+        BackupError: If the chain is incomplete or a file is damaged
+    """
+    chain = resolve_chain(path)
+    if chain[0][1].get("type") == "incremental":
+        raise BackupError(f"Backup chain of {Path(path).name} does not start with a full backup")
+
+    reporter = _Progress(progress, sum(
+        entry.get("size") or 0
+        for _, manifest in chain
+        for name, entry in manifest["collections"].items()
+        if name not in skip
+    ))
+
+    if verify:
+        reporter.report(0, "Verifying backup checksums")
+        for backup_path, _ in chain:
+            valid, problems = verify_backup(backup_path)
+            if not valid:
+                raise BackupError(f"Backup {backup_path.name} is damaged: {'; '.join(problems)}")
+
+    if db is None:
+        db = _get_database()
+
+    restored = {}
+    metadata_by_name = {}
+    in_flight = max(2, insert_workers // max(1, parallel) + 1)
+
+    with ThreadPoolExecutor(max_workers=max(1, insert_workers), thread_name_prefix="restore-insert") as inserts:
+        for backup_path, manifest in chain:
+            logger.info(f"Restoring {backup_path.name} ({manifest.get('type')})")
+
+            with open_backup(backup_path) as open_file:
+                def load(item):
+                    name, entry = item
+                    started = time.monotonic()
+                    if entry.get("mode", "full") == "incremental":
+                        loader = upsert_collection
+                    else:
+                        loader = replace_collection
+                    count, metadata = loader(db, name, entry, open_file, inserts, batch_size, in_flight, reporter)
+                    logger.info(f"Restored {count} documents into {name} in {time.monotonic() - started:.1f}s")
+                    return name, entry, count, metadata
+
+                # Largest collections first, so a big one does not start last
+                items = sorted(
+                    ((name, entry) for name, entry in manifest["collections"].items() if name not in skip),
+                    key=lambda item: item[1].get("size") or 0,
+                    reverse=True
+                )
+                with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="restore-load") as loaders:
+                    for name, entry, count, metadata in loaders.map(load, items):
+                        if entry.get("mode", "full") == "incremental":
+                            restored[name] = restored.get(name, 0) + count
+                        else:
+                            restored[name] = count
+                        metadata_by_name[name] = metadata
+
+            # Collections dropped between the backups of a chain
+            if manifest.get("parent"):
+                for name in list(restored):
+                    if name not in manifest["collections"]:
+                        db.drop_collection(name)
+                        del restored[name]
+                        metadata_by_name.pop(name, None)
+
+    # Plans or settings read while their collection was reloaded may be
+    # cached by any process; the version bump makes them all reload
+    for name, namespace in CACHED_COLLECTIONS.items():
+        if name in restored:
+            bump_version(db, namespace)
+
+    reporter.report(_LOAD_PROGRESS, f"Loaded {reporter.documents} documents, building indexes")
+    started = time.monotonic()
+    built = build_indexes(db, metadata_by_name, parallel, reporter)
+    logger.info(f"Built {built} indexes in {time.monotonic() - started:.1f}s")
+
+    reporter.report(100, f"Restored {sum(restored.values())} documents into {len(restored)} collections")
+    return restored
+
+
+def main():
+    """Restore a backup from the command line."""
+    parser = argparse.ArgumentParser(description='Restore a database backup and the backups it builds on')
+    parser.add_argument('backup', help='Backup tarball or directory')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    parser.add_argument('--no-verify', action='store_true', help='Skip checksum verification')
+    parser.add_argument('--parallel', type=int, default=4, help='Collections loaded at once')
+    parser.add_argument('--insert-workers', type=int, default=8, help='Batches written at once')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Documents per insert')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        chain = resolve_chain(args.backup)
+    except BackupError as e:
+        logger.error(e.message)
+        return 1
+
+    print("Backups to apply, in order:")
+    for backup_path, manifest in chain:
+        print(f"  {backup_path.name} ({manifest.get('type')}, {len(manifest['collections'])} collections)")
+
+    if not args.yes and input("Replace the restored collections in the database? [y/N] ").strip().lower() != 'y':
+        return 1
+
+    started = time.monotonic()
+    try:
+        restored = restore_backup(
+            args.backup,
+            verify=not args.no_verify,
+            batch_size=args.batch_size,
+            parallel=args.parallel,
+            insert_workers=args.insert_workers,
+            progress=lambda percent, message: print(f"[{percent:3d}%] {message}", flush=True)
+        )
+    except BackupError as e:
+        logger.error(e.message)
+        return 1
+
+    print(f"Restored {sum(restored.values())} documents into {len(restored)} collections "
+          f"in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
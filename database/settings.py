@@ -5,9 +5,14 @@ This module provides the Settings model for managing application settings.
 import logging
 from flask import current_app
 
+from database.versioned_cache import VersionedCache
+
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Process-wide cache of setting documents, shared by all model instances
+_settings_cache = VersionedCache("settings")
+
 
 class Settings:
     """Settings model for managing application settings."""
@@ -39,7 +44,12 @@ class Settings:
             return default
         
         try:
-            setting = self.collection.find_one({"key": key})
+            # Missing settings are cached too, so defaults stay cheap
+            setting = _settings_cache.get(
+                self.db, key,
+                lambda: self.collection.find_one({"key": key}),
+                cache_none=True
+            )
             
             if setting and "value" in setting:
                 return setting["value"]
@@ -70,6 +80,7 @@ class Settings:
                 {"$set": {"value": value}},
                 upsert=True
             )
+            _settings_cache.invalidate(self.db)
             
             return result.modified_count > 0 or result.upserted_id is not None
         except Exception as e:
@@ -119,6 +130,7 @@ class Settings:
         
         try:
             result = self.collection.delete_one({"key": key})
+            _settings_cache.invalidate(self.db)
             
             return result.deleted_count > 0
         except Exception as e:
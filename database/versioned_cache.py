@@ -0,0 +1,153 @@
+"""
+Versioned read-through cache for Travian Whispers application.
+This module caches rarely changing documents in-process and keeps
+processes consistent through a shared version counter in MongoDB.
+"""
+import copy
+import logging
+import os
+import threading
+import time
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Collection holding one version counter per cache namespace
+VERSIONS_COLLECTION = "cacheVersions"
+
+# Seconds between version checks; bounds staleness across processes
+POLL_INTERVAL = float(os.environ.get('MODEL_CACHE_POLL_INTERVAL', 5))
+
+
+class VersionedCache:
+    """
+    Process-wide read-through cache invalidated by a version counter.
+
+    Writers bump the namespace's counter in the cacheVersions collection.
+    Readers compare it with the version their entries were loaded under
+    at most once per poll interval and drop everything when it moved.
+    """
+
+    def __init__(self, namespace, poll_interval=None):
+        """
+        Initialize VersionedCache.
+
+        Args:
+            namespace (str): Name of the version counter, e.g. "subscriptionPlans"
+            poll_interval (float, optional): Seconds between version checks
+        """
+        self.namespace = namespace
+        self.poll_interval = POLL_INTERVAL if poll_interval is None else poll_interval
+
+        self._entries = {}
+        self._version = None
+        self._generation = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _clear(self):
+        """Drop all entries. Caller must hold the lock."""
+        self._entries.clear()
+        self._generation += 1
+
+    def _sync(self, db):
+        """
+        Drop local entries if another process bumped the version.
+
+        Args:
+            db: MongoDB database instance
+
+        Returns:
+            bool: True if the cache can be used, False if the version
+                could not be read
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_check < self.poll_interval:
+                return True
+
+        try:
+            doc = db[VERSIONS_COLLECTION].find_one({"_id": self.namespace}, {"version": 1})
+            version = doc.get("version", 0) if doc else 0
+        except Exception as e:
+            logger.warning(f"Could not read cache version for '{self.namespace}': {e}")
+            with self._lock:
+                self._clear()
+            return False
+
+        with self._lock:
+            if version != self._version:
+                self._clear()
+                self._version = version
+            self._last_check = now
+
+        return True
+
+    def get(self, db, key, loader, cache_none=False):
+        """
+        Get a value, loading and caching it on a miss.
+
+        Args:
+            db: MongoDB database instance
+            key: Cache key
+            loader (callable): Function returning the value on a miss
+            cache_none (bool, optional): Whether a None result is cached
+
+        Returns:
+            A copy of the cached or loaded value
+        """
+        if db is None or not self._sync(db):
+            return loader()
+
+        with self._lock:
+            if key in self._entries:
+                return copy.deepcopy(self._entries[key])
+            generation = self._generation
+
+        value = loader()
+
+        if value is not None or cache_none:
+            with self._lock:
+                # Skip the store if the cache was invalidated while loading
+                if generation == self._generation:
+                    self._entries[key] = copy.deepcopy(value)
+
+        return value
+
+    def invalidate(self, db):
+        """
+        Drop the cache in this process and bump the shared version.
+
+        Args:
+            db: MongoDB database instance
+        """
+        with self._lock:
+            self._clear()
+            # Force the next read to pick up the new version
+            self._last_check = 0.0
+
+        bump_version(db, self.namespace)
+
+
+def bump_version(db, namespace):
+    """
+    Bump a namespace's shared version so every process drops its cache.
+
+    Used directly by code that rewrites a cached collection without going
+    through its model, such as a restore.
+
+    Args:
+        db: MongoDB database instance
+        namespace (str): Cache namespace, e.g. "subscriptionPlans"
+    """
+    if db is None:
+        return
+
+    try:
+        db[VERSIONS_COLLECTION].update_one(
+            {"_id": namespace},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to bump cache version for '{namespace}': {e}")
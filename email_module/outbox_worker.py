@@ -0,0 +1,406 @@
+"""
+Email outbox worker for Travian Whispers.
+This module drains the email outbox over long-lived SMTP connections,
+with a shared send rate limit and retries with exponential backoff.
+"""
+import logging
+import os
+import random
+import smtplib
+import socket
+import threading
+import time
+import uuid
+
+import config
+from database.models.email_outbox import EmailOutbox
+from email_module.sender import build_message
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting messages per second."""
+
+    def __init__(self, rate, burst=None):
+        """
+        Initialize RateLimiter.
+
+        Args:
+            rate (float): Tokens added per second, 0 disables limiting
+            burst (float, optional): Bucket size, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """
+        Wait for a token.
+
+        Args:
+            stop_event (threading.Event, optional): Abort the wait when set
+
+        Returns:
+            bool: True if a token was taken, False if the wait was aborted
+        """
+        if self.rate <= 0:
+            return True
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+
+                wait = (1 - self._tokens) / self.rate
+
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class SMTPSession:
+    """
+    Reusable SMTP connection.
+
+    Connects, upgrades to TLS and logs in once, then sends messages until
+    the connection has been used max_messages times, sat idle for
+    idle_timeout seconds or failed.
+    """
+
+    def __init__(self, host, port, username, password, use_tls=True, timeout=30,
+                 max_messages=100, idle_timeout=60):
+        """
+        Initialize SMTPSession.
+
+        Args:
+            host (str): SMTP server
+            port (int): SMTP port
+            username (str): SMTP username
+            password (str): SMTP password
+            use_tls (bool, optional): Whether to use STARTTLS
+            timeout (float, optional): Socket timeout in seconds
+            max_messages (int, optional): Messages sent before reconnecting
+            idle_timeout (float, optional): Seconds before an unused connection is closed
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+
+        self.server = None
+        self.sent = 0
+        self.connections = 0
+        self._last_used = 0.0
+
+    def _connect(self):
+        """Open and authenticate a new connection."""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls()
+                server.ehlo()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+
+        self.server = server
+        self.sent = 0
+        self.connections += 1
+        logger.debug(f"Opened SMTP connection to {self.host}:{self.port}")
+
+    def send(self, msg):
+        """
+        Send a message, connecting or reconnecting as needed.
+
+        Args:
+            msg: Email message
+
+        Raises:
+            smtplib.SMTPException: If the server rejects the message
+            OSError: On network errors
+        """
+        if self.server is None:
+            self._connect()
+
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection; retry once on a fresh one
+            self.close()
+            self._connect()
+            self.server.send_message(msg)
+
+        self.sent += 1
+        self._last_used = time.monotonic()
+
+        if self.sent >= self.max_messages:
+            self.close()
+
+    def close_if_idle(self):
+        """Close the connection if it has not been used recently."""
+        if self.server is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+            self.close()
+
+    def close(self):
+        """Close the connection."""
+        if self.server is None:
+            return
+
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+
+def is_permanent_failure(error):
+    """
+    Check whether an SMTP error means the message can never be delivered.
+
+    Args:
+        error (Exception): Delivery error
+
+    Returns:
+        bool: True for rejected recipients or content, False for errors
+            worth retrying (network, throttling, authentication)
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPDataError):
+        return error.smtp_code >= 500
+    return False
+
+
+class OutboxWorker:
+    """
+    Pool of threads delivering queued emails.
+
+    Each thread keeps its own SMTP session and claims messages in
+    batches, so a burst of emails is sent over a handful of connections
+    instead of one handshake per message. All threads of a process share
+    one rate limiter.
+    """
+
+    def __init__(self, concurrency=None, batch_size=None, poll_interval=None, rate_limit=None,
+                 max_attempts=None, retry_base_delay=None, retry_max_delay=None):
+        """
+        Initialize OutboxWorker. Unset arguments come from config.
+
+        Args:
+            concurrency (int, optional): Number of threads (and SMTP connections)
+            batch_size (int, optional): Messages claimed at a time
+            poll_interval (float, optional): Seconds between polls when idle
+            rate_limit (float, optional): Messages per second for this process
+            max_attempts (int, optional): Attempts before a message fails
+            retry_base_delay (float, optional): Delay after the first failure
+            retry_max_delay (float, optional): Longest delay between attempts
+        """
+        self.concurrency = max(1, concurrency or config.EMAIL_WORKER_CONCURRENCY)
+        self.batch_size = batch_size or config.EMAIL_BATCH_SIZE
+        self.poll_interval = config.EMAIL_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.max_attempts = max_attempts or config.EMAIL_MAX_ATTEMPTS
+        self.retry_base_delay = config.EMAIL_RETRY_BASE_DELAY if retry_base_delay is None else retry_base_delay
+        self.retry_max_delay = config.EMAIL_RETRY_MAX_DELAY if retry_max_delay is None else retry_max_delay
+        self.limiter = RateLimiter(config.EMAIL_RATE_LIMIT if rate_limit is None else rate_limit)
+
+        # A claimed batch must be sent before its lease runs out
+        per_message = 1 / self.limiter.rate if self.limiter.rate > 0 else 1
+        self.lease_seconds = int(60 + self.batch_size * (per_message * self.concurrency + config.SMTP_TIMEOUT))
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def create_session(self):
+        """
+        Create an SMTP session from config.
+
+        Returns:
+            SMTPSession: Unconnected session
+        """
+        return SMTPSession(
+            config.SMTP_SERVER,
+            config.SMTP_PORT,
+            config.SMTP_USERNAME,
+            config.SMTP_PASSWORD,
+            use_tls=config.SMTP_USE_TLS,
+            timeout=config.SMTP_TIMEOUT,
+            max_messages=config.SMTP_MAX_MESSAGES_PER_CONNECTION,
+            idle_timeout=config.SMTP_IDLE_TIMEOUT
+        )
+
+    def retry_delay(self, attempts):
+        """
+        Get the delay before the next attempt.
+
+        Args:
+            attempts (int): Attempts made so far
+
+        Returns:
+            float: Seconds, exponential with jitter
+        """
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def start(self):
+        """Start the worker threads."""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(f"{self.worker_id}/{index}",),
+                name=f"email-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Email outbox worker {self.worker_id} started with {self.concurrency} connections")
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker threads after their current message.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each thread
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info(f"Email outbox worker {self.worker_id} stopped")
+
+    def drain(self, thread_id=None, session=None):
+        """
+        Deliver due messages until the outbox has none left.
+
+        Args:
+            thread_id (str, optional): Worker identifier recorded on claims
+            session (SMTPSession, optional): Session to reuse
+
+        Returns:
+            dict: Counts of 'sent', 'retried' and 'failed' messages
+        """
+        thread_id = thread_id or f"{self.worker_id}/drain"
+        own_session = session is None
+        session = session or self.create_session()
+        outbox = EmailOutbox()
+        counts = {'sent': 0, 'retried': 0, 'failed': 0}
+
+        try:
+            while not self._stop.is_set():
+                batch = outbox.claim_batch(thread_id, self.batch_size, self.lease_seconds)
+                if not batch:
+                    break
+
+                for message in batch:
+                    counts[self._deliver(outbox, session, message, thread_id)] += 1
+        finally:
+            if own_session:
+                session.close()
+
+        return counts
+
+    def _run_loop(self, thread_id):
+        """
+        Deliver messages until stopped.
+
+        Args:
+            thread_id (str): Worker identifier recorded on claims
+        """
+        session = self.create_session()
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    counts = self.drain(thread_id, session)
+                    if any(counts.values()):
+                        logger.info(f"Email worker {thread_id}: {counts['sent']} sent, "
+                                    f"{counts['retried']} retried, {counts['failed']} failed")
+                except Exception as e:
+                    logger.error(f"Email worker loop error: {e}")
+
+                session.close_if_idle()
+                self._stop.wait(self.poll_interval)
+        finally:
+            session.close()
+
+    def _deliver(self, outbox, session, message, thread_id):
+        """
+        Send one claimed message and record the outcome.
+
+        Args:
+            outbox (EmailOutbox): Outbox model
+            session (SMTPSession): SMTP session
+            message (dict): Claimed message
+            thread_id (str): Worker identifier holding the message
+
+        Returns:
+            str: 'sent', 'retried' or 'failed'
+        """
+        message_id = message['_id']
+
+        # Claimed again after its worker died on the last allowed attempt
+        if message['attempts'] > self.max_attempts:
+            outbox.mark_failed(message_id, thread_id, message.get('lastError') or 'Delivery interrupted')
+            return 'failed'
+
+        if not self.limiter.acquire(self._stop):
+            outbox.schedule_retry(message_id, thread_id, 'Worker stopped', 0)
+            return 'retried'
+
+        try:
+            session.send(build_message(message['to'], message['subject'], message['html'], message.get('text')))
+        except Exception as e:
+            # The connection may be unusable after any error
+            session.close()
+            error = f"{type(e).__name__}: {e}"
+
+            if is_permanent_failure(e) or message['attempts'] >= self.max_attempts:
+                logger.error(f"Giving up on email {message_id} to {message['to']}: {error}")
+                outbox.mark_failed(message_id, thread_id, error)
+                return 'failed'
+
+            delay = self.retry_delay(message['attempts'])
+            logger.warning(f"Email {message_id} to {message['to']} failed, retrying in {delay:.0f}s: {error}")
+            outbox.schedule_retry(message_id, thread_id, error, delay)
+            return 'retried'
+
+        outbox.mark_sent(message_id, thread_id)
+        return 'sent'
+
+
+def start_outbox_worker():
+    """
+    Start an email outbox worker in the current process.
+
+    Returns:
+        OutboxWorker: Started worker, or None if the outbox is disabled
+    """
+    if not config.EMAIL_OUTBOX_ENABLED:
+        return None
+
+    worker = OutboxWorker()
+    worker.start()
+    return worker
@@ -1,10 +1,11 @@
 """
 Email sender module for Travian Whispers.
+Messages are queued in the email outbox and delivered by the outbox
+workers (email_module/outbox_worker.py), so callers never wait on SMTP.
 """
+import html
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import os
 import config
 
 # Configure logger
@@ -14,74 +15,278 @@ logging.basicConfig(
 )
 logger = logging.getLogger('email_sender')
 
-def send_email(to_email, subject, html_content, text_content=None):
+# Directory holding the HTML email templates
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Loaded templates by name
+_templates = {}
+
+def smtp_configured():
     """
-    Send an email using configured SMTP server.
-    If SMTP credentials are not configured, logs the email instead.
-    
+    Check whether SMTP credentials are configured.
+
+    Returns:
+        bool: True if emails can be delivered, False if they are only logged
+    """
+    return bool(config.SMTP_USERNAME and config.SMTP_PASSWORD)
+
+def render_template(name, **values):
+    """
+    Render an HTML email template.
+
+    Args:
+        name (str): Template name without extension
+        **values: Placeholder values; strings are HTML-escaped
+
+    Returns:
+        str: Rendered HTML
+    """
+    template = _templates.get(name)
+    if template is None:
+        with open(os.path.join(TEMPLATES_DIR, f"{name}.html"), encoding='utf-8') as f:
+            template = f.read()
+        _templates[name] = template
+
+    return template.format(**{
+        key: html.escape(value) if isinstance(value, str) else value
+        for key, value in values.items()
+    })
+
+def build_message(to_email, subject, html_content, text_content=None):
+    """
+    Build a MIME message.
+
+    Args:
+        to_email (str): Recipient email
+        subject (str): Email subject
+        html_content (str): HTML content
+        text_content (str, optional): Plain text content
+
+    Returns:
+        MIMEMultipart: Message ready to send
+    """
+    # Only the outbox workers build messages; web processes just queue them
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = config.EMAIL_FROM
+    msg['To'] = to_email
+
+    # Add plain text version if provided
+    if text_content:
+        msg.attach(MIMEText(text_content, 'plain'))
+
+    # Add HTML version
+    msg.attach(MIMEText(html_content, 'html'))
+
+    return msg
+
+def deliver_email(to_email, subject, html_content, text_content=None):
+    """
+    Send an email immediately over a new SMTP connection.
+    Used when the outbox is disabled or unavailable; the outbox workers
+    reuse connections instead.
+
     Args:
         to_email (str): Recipient email
         subject (str): Email subject
         html_content (str): HTML content
         text_content (str, optional): Plain text content
-        
+
     Returns:
         bool: True if sent successfully, False otherwise
     """
-    # If SMTP not configured, log instead of sending
-    if not config.SMTP_USERNAME or not config.SMTP_PASSWORD:
-        logger.info(f"[MOCK EMAIL] To: {to_email}, Subject: {subject}")
-        return True
-    
+    import smtplib
+
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = config.EMAIL_FROM
-        msg['To'] = to_email
-        
-        # Add plain text version if provided, otherwise create from HTML
-        if text_content:
-            msg.attach(MIMEText(text_content, 'plain'))
-        
-        # Add HTML version
-        msg.attach(MIMEText(html_content, 'html'))
-        
-        # Send email
-        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-            server.starttls()
+        msg = build_message(to_email, subject, html_content, text_content)
+
+        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT) as server:
+            if config.SMTP_USE_TLS:
+                server.starttls()
             server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
             server.send_message(msg)
-            
+
         logger.info(f"Email sent successfully to {to_email}")
         return True
     except Exception as e:
         logger.error(f"Failed to send email: {e}")
         return False
 
+def send_email(to_email, subject, html_content, text_content=None, category=None, dedupe_key=None):
+    """
+    Queue an email for delivery.
+    If SMTP credentials are not configured, logs the email instead.
+
+    Args:
+        to_email (str): Recipient email
+        subject (str): Email subject
+        html_content (str): HTML content
+        text_content (str, optional): Plain text content
+        category (str, optional): Message kind, e.g. 'verification'
+        dedupe_key (str, optional): Key preventing the same email from
+            being queued twice
+
+    Returns:
+        bool: True if queued (or sent) successfully, False otherwise
+    """
+    # If SMTP not configured, log instead of sending
+    if not smtp_configured():
+        logger.info(f"[MOCK EMAIL] To: {to_email}, Subject: {subject}")
+        return True
+
+    if config.EMAIL_OUTBOX_ENABLED:
+        from database.models.email_outbox import EmailOutbox
+
+        message_id = EmailOutbox().enqueue(
+            to_email, subject, html_content, text_content,
+            category=category, dedupe_key=dedupe_key
+        )
+        if message_id:
+            logger.info(f"Email to {to_email} queued ({message_id})")
+            return True
+
+        logger.warning(f"Could not queue email to {to_email}, sending directly")
+
+    return deliver_email(to_email, subject, html_content, text_content)
+
+def send_emails(messages):
+    """
+    Queue several emails with one database write.
+
+    Args:
+        messages (list): Dictionaries with the keyword arguments of send_email()
+
+    Returns:
+        bool: True if every message was queued (or sent), False otherwise
+    """
+    if not messages:
+        return True
+
+    if not smtp_configured():
+        for message in messages:
+            logger.info(f"[MOCK EMAIL] To: {message['to_email']}, Subject: {message['subject']}")
+        return True
+
+    if config.EMAIL_OUTBOX_ENABLED:
+        from database.models.email_outbox import EmailOutbox
+
+        queued = EmailOutbox().enqueue_many(messages)
+        if queued is not None:
+            logger.info(f"Queued {queued} of {len(messages)} emails (the rest were already queued)")
+            return True
+
+        logger.warning(f"Could not queue {len(messages)} emails, sending one by one")
+
+    return all([send_email(**message) for message in messages])
+
 def send_verification_email(to_email, username, verification_url):
     """
-    Mock function for verification email.
+    Send the account verification email.
     """
-    logger.info(f"[MOCK VERIFICATION] To: {to_email}, Username: {username}, URL: {verification_url}")
-    return True
+    html_content = render_template('verification', username=username, verification_url=verification_url)
+    text_content = f"Hello {username},\n\nPlease verify your email address: {verification_url}\n"
+    return send_email(to_email, "Verify your Travian Whispers account", html_content, text_content,
+                      category='verification')
 
 def send_password_reset_email(to_email, username, reset_url):
     """
-    Mock function for password reset email.
+    Send the password reset email.
     """
-    logger.info(f"[MOCK PASSWORD RESET] To: {to_email}, Username: {username}, URL: {reset_url}")
-    return True
+    html_content = render_template('password-reset', username=username, reset_url=reset_url)
+    text_content = f"Hello {username},\n\nReset your password here: {reset_url}\n"
+    return send_email(to_email, "Reset your Travian Whispers password", html_content, text_content,
+                      category='password-reset')
 
 def send_subscription_confirmation_email(to_email, username, plan_name, end_date, amount, payment_id):
     """
-    Mock function for subscription confirmation email.
+    Send the subscription confirmation email.
     """
-    logger.info(f"[MOCK SUBSCRIPTION] To: {to_email}, Username: {username}, Plan: {plan_name}")
-    return True
+    html_content = render_template(
+        'subscription',
+        username=username,
+        plan_name=plan_name,
+        end_date=end_date,
+        amount=float(amount),
+        payment_id=payment_id
+    )
+    text_content = f"Hello {username},\n\nYour {plan_name} subscription is active until {end_date}.\n"
+    return send_email(to_email, "Your Travian Whispers subscription", html_content, text_content,
+                      category='subscription', dedupe_key=f"subscription:{payment_id}")
 
 def send_welcome_email(to_email, username):
     """
-    Mock function for welcome email.
+    Send the welcome email.
+    """
+    html_content = render_template('welcome', username=username)
+    return send_email(to_email, "Welcome to Travian Whispers", html_content,
+                      f"Hello {username},\n\nWelcome to Travian Whispers!\n", category='welcome')
+
+def subscription_expiry_email(to_email, username, dedupe_key=None):
+    """
+    Build the subscription expired notice.
+
+    Returns:
+        dict: Keyword arguments for send_email() or send_emails()
+    """
+    html_content = (
+        f"<p>Hello <strong>{html.escape(username)}</strong>,</p>"
+        "<p>Your Travian Whispers subscription has expired. Renew it from your dashboard "
+        "to keep your automation running.</p>"
+    )
+    return {
+        'to_email': to_email,
+        'subject': "Your Travian Whispers subscription has expired",
+        'html_content': html_content,
+        'category': 'subscription-expiry',
+        'dedupe_key': dedupe_key
+    }
+
+def send_subscription_expiry_email(to_email, username, dedupe_key=None):
+    """
+    Send the subscription expired notice.
+    """
+    return send_email(**subscription_expiry_email(to_email, username, dedupe_key))
+
+def renewal_reminder_email(to_email, username, plan_name, end_date, dedupe_key=None):
+    """
+    Build the subscription renewal reminder.
+
+    Returns:
+        dict: Keyword arguments for send_email() or send_emails()
+    """
+    html_content = (
+        f"<p>Hello <strong>{html.escape(username)}</strong>,</p>"
+        f"<p>Your {html.escape(plan_name)} subscription ends on {html.escape(str(end_date))}. Renew it from your dashboard "
+        "to avoid an interruption.</p>"
+    )
+    return {
+        'to_email': to_email,
+        'subject': "Your Travian Whispers subscription ends soon",
+        'html_content': html_content,
+        'category': 'renewal-reminder',
+        'dedupe_key': dedupe_key
+    }
+
+def send_renewal_reminder_email(to_email, username, plan_name, end_date, dedupe_key=None):
+    """
+    Send the subscription renewal reminder.
+    """
+    return send_email(**renewal_reminder_email(to_email, username, plan_name, end_date, dedupe_key))
+
+def send_admin_report_email(to_email, username, report, dedupe_key=None):
+    """
+    Send the weekly admin report.
     """
-    logger.info(f"[MOCK WELCOME] To: {to_email}, Username: {username}")
-    return True
\ No newline at end of file
+    rows = ''.join(
+        f"<tr><td>{html.escape(key.replace('_', ' ').title())}</td><td>{html.escape(str(value))}</td></tr>"
+        for key, value in report.items()
+    )
+    html_content = (
+        f"<p>Hello <strong>{html.escape(username)}</strong>,</p>"
+        f"<p>Weekly Travian Whispers report:</p><table>{rows}</table>"
+    )
+    return send_email(to_email, "Travian Whispers weekly report", html_content,
+                      category='admin-report', dedupe_key=dedupe_key)
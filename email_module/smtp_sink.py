@@ -0,0 +1,186 @@
+"""
+Local SMTP sink for Travian Whispers.
+This module runs a minimal SMTP server that accepts every message and
+keeps it in memory, for exercising the email outbox without a real
+mail provider.
+
+Usage:
+    python -m email_module.smtp_sink --port 1025
+
+Then set SMTP_SERVER=localhost, SMTP_PORT=1025 and SMTP_USE_TLS=false.
+"""
+import argparse
+import logging
+import socketserver
+import threading
+from email import message_from_bytes
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Handle one SMTP connection."""
+
+    def reply(self, line):
+        """Send a reply line."""
+        self.wfile.write(f"{line}\r\n".encode('utf-8'))
+
+    def handle(self):
+        """Run the SMTP dialogue until the client quits."""
+        sink = self.server.sink
+        sink.record_connection()
+
+        sender, recipients = None, []
+        self.reply('220 travian-whispers smtp sink ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+            command = command.upper()
+
+            if command == 'EHLO':
+                self.reply('250-travian-whispers')
+                self.reply('250-AUTH PLAIN LOGIN')
+                self.reply('250 8BITMIME')
+            elif command == 'HELO':
+                self.reply('250 travian-whispers')
+            elif command == 'AUTH':
+                # Any credentials are accepted; LOGIN asks for them in two steps
+                if argument.upper().startswith('LOGIN'):
+                    if ' ' not in argument:
+                        self.reply('334 VXNlcm5hbWU6')
+                        self.rfile.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                self.reply('235 Authentication successful')
+            elif command == 'MAIL':
+                sender, recipients = argument.partition(':')[2].strip(), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipient = argument.partition(':')[2].strip()
+                if sink.reject(recipient):
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                if not recipients:
+                    self.reply('503 No valid recipients')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                sink.record_message(sender, recipients, self._read_data())
+                sender, recipients = None, []
+                self.reply('250 OK: queued')
+            elif command == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def _read_data(self):
+        """Read a message body up to the terminating dot line."""
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    SMTP server that stores received messages.
+
+    Attributes:
+        messages (list): Received messages as dicts with 'from', 'to' and 'message'
+        connections (int): Number of connections accepted
+        reject_recipients (set): Addresses refused with a permanent error
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=1025):
+        """
+        Initialize SMTPSink.
+
+        Args:
+            host (str, optional): Address to listen on
+            port (int, optional): Port to listen on, 0 picks a free port
+        """
+        super().__init__((host, port), SMTPSinkHandler)
+        self.sink = self
+        self.messages = []
+        self.connections = 0
+        self.reject_recipients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        """Port the sink listens on."""
+        return self.server_address[1]
+
+    def reject(self, recipient):
+        """Check whether a recipient should be refused."""
+        return recipient.strip('<>') in self.reject_recipients
+
+    def record_connection(self):
+        """Count an accepted connection."""
+        with self._lock:
+            self.connections += 1
+
+    def record_message(self, sender, recipients, data):
+        """Store a received message."""
+        with self._lock:
+            self.messages.append({
+                'from': sender.strip('<>') if sender else None,
+                'to': [recipient.strip('<>') for recipient in recipients],
+                'message': message_from_bytes(data)
+            })
+        logger.info(f"Received email for {', '.join(recipients)}")
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    """Run the sink from the command line."""
+    parser = argparse.ArgumentParser(description='Local SMTP sink for testing emails')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=1025, help='Port to listen on')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    sink = SMTPSink(args.host, args.port)
+    logger.info(f"SMTP sink listening on {args.host}:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server_close()
+
+
+if __name__ == '__main__':
+    main()
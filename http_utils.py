@@ -1,14 +1,16 @@
 """
 HTTP utilities for Travian Whispers.
 This module provides HTTP request functionality without relying on external dependencies.
+payment/http_utils.py and web/utils/http_utils.py re-export it.
 """
-import logging
-import urllib.request
-import urllib.parse
-import urllib.error
+import base64
+import http.client
 import json
+import logging
 import ssl
-import base64
+import threading
+import time
+import urllib.parse
 from typing import Dict, Any, Optional, Tuple, Union
 
 # Configure logger
@@ -41,6 +43,179 @@ def basic_auth_header(username: str, password: str) -> Dict[str, str]:
     encoded_auth = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
     return {"Authorization": f"Basic {encoded_auth}"}
 
+class HTTPClient:
+    """
+    Thread-safe HTTP client reusing keep-alive connections.
+
+    Idle connections are pooled per scheme, host, port and SSL setting,
+    so repeated calls to the same API skip the TCP and TLS handshakes.
+    A pooled connection the server has since closed is detected on the
+    next request, which is then retried once on a fresh connection.
+    """
+
+    # Redirect statuses followed like urllib does
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+    def __init__(self, max_idle_per_host: int = 10, idle_timeout: float = 60, max_redirects: int = 5):
+        """
+        Initialize HTTPClient.
+
+        Args:
+            max_idle_per_host: Idle connections kept per host
+            idle_timeout: Seconds an idle connection is kept
+            max_redirects: Redirects followed before giving up
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.max_redirects = max_redirects
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._unverified_context = None
+
+    def _ssl_context(self, verify_ssl: bool) -> Optional[ssl.SSLContext]:
+        """Get the SSL context for a request."""
+        if verify_ssl:
+            return None
+
+        if self._unverified_context is None:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            self._unverified_context = context
+        return self._unverified_context
+
+    def _checkout(self, key: Tuple, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Take an idle connection for a host or open a new one.
+
+        Returns:
+            Tuple of (connection, whether it was reused)
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                connection, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    connection.timeout = timeout
+                    if connection.sock is not None:
+                        connection.sock.settimeout(timeout)
+                    return connection, True
+                connection.close()
+
+        scheme, host, port, verify_ssl = key
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context(verify_ssl))
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        return connection, False
+
+    def _checkin(self, key: Tuple, connection: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool, or close it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+        verify_ssl: bool = True
+    ) -> Tuple[int, Dict[str, Any], bytes]:
+        """
+        Send a request, following redirects.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            body: Request body
+            headers: Request headers
+            timeout: Socket timeout in seconds
+            verify_ssl: Whether to verify SSL certificates
+
+        Returns:
+            Tuple of (status code, headers, response content)
+
+        Raises:
+            OSError: On connection errors
+            http.client.HTTPException: On protocol errors
+        """
+        for _ in range(self.max_redirects + 1):
+            status, response_headers, content = self._send(method, url, body, headers or {}, timeout, verify_ssl)
+
+            location = response_headers.get('Location') or response_headers.get('location')
+            if status not in self.REDIRECT_STATUSES or not location:
+                return status, response_headers, content
+
+            url = urllib.parse.urljoin(url, location)
+            if status == 303 or (status in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+
+        return status, response_headers, content
+
+    def _send(self, method, url, body, headers, timeout, verify_ssl):
+        """Send one request over a pooled connection."""
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port, verify_ssl)
+        path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+
+        while True:
+            connection, reused = self._checkout(key, timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest, http.client.BadStatusLine):
+                connection.close()
+                if reused:
+                    # The server closed the idle connection; it never saw this request
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(key, connection)
+
+            return response.status, dict(response.getheaders()), content
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+
+# Client shared by every caller in the process
+_client = HTTPClient()
+
+def get_client() -> HTTPClient:
+    """
+    Get the shared keep-alive HTTP client.
+
+    Returns:
+        The process-wide HTTPClient
+    """
+    return _client
+
 def perform_request(
     url: str,
     method: str = "GET",
@@ -51,7 +226,7 @@ def perform_request(
     verify_ssl: bool = True
 ) -> Tuple[int, Dict[str, Any], bytes]:
     """
-    Perform an HTTP request using urllib.
+    Perform an HTTP request over the shared keep-alive client.
     
     Args:
         url: URL to request
@@ -71,7 +246,7 @@ def perform_request(
         url = f"{url}{separator}{urlencode(params)}"
     
     # Prepare headers
-    request_headers = headers or {}
+    request_headers = dict(headers or {})
     if not any(key.lower() == 'user-agent' for key in request_headers):
         request_headers['User-Agent'] = 'TravianWhispers/1.0'
     
@@ -88,35 +263,25 @@ def perform_request(
                 request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
         else:
             request_data = data
-    
-    # Create request
-    request = urllib.request.Request(
-        url,
-        data=request_data,
-        headers=request_headers,
-        method=method
-    )
-    
-    # Configure SSL context
-    context = None
-    if not verify_ssl:
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+    elif method.upper() in ('POST', 'PUT', 'PATCH'):
+        # urllib sent an explicit empty body; some APIs reject a body-less POST
+        request_data = b''
     
     try:
-        # Perform request
-        with urllib.request.urlopen(request, timeout=timeout, context=context) as response:
-            status_code = response.status
-            response_headers = dict(response.getheaders())
-            content = response.read()
-            return status_code, response_headers, content
-    except urllib.error.HTTPError as e:
-        logger.error(f"HTTP error: {e.code} - {e.reason}")
-        return e.code, dict(e.headers), e.read()
-    except urllib.error.URLError as e:
-        logger.error(f"URL error: {e.reason}")
-        return 0, {}, str(e.reason).encode('utf-8')
+        status_code, response_headers, content = get_client().request(
+            method.upper(),
+            url,
+            body=request_data,
+            headers=request_headers,
+            timeout=timeout,
+            verify_ssl=verify_ssl
+        )
+        if status_code >= 400:
+            logger.error(f"HTTP error: {status_code} - {url}")
+        return status_code, response_headers, content
+    except (OSError, http.client.HTTPException) as e:
+        logger.error(f"URL error: {e}")
+        return 0, {}, str(e).encode('utf-8')
     except Exception as e:
         logger.error(f"Request error: {str(e)}")
         return 0, {}, str(e).encode('utf-8')
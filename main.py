@@ -22,46 +22,37 @@ import threading
 import traceback
 import datetime
 from pathlib import Path
-from startup.ip_manager import IPManager
-from utils.proxy_metrics import ProxyHealthCheck
 
-ip_manager = IPManager()
-ip_manager.initialize()
-
-# Create indexes
-proxy_metrics = ProxyMetrics()
-proxy_metrics.create_indexes()
-
-# Initial health check
-proxy_health = ProxyHealthCheck()
-app.ip_manager = ip_manager
-app.proxy_health = proxy_health
-
-# Load environment variables if .env file exists
-try:
-    from dotenv import load_dotenv
-    env_path = Path(".") / ".env"
-    if env_path.exists():
-        load_dotenv(dotenv_path=env_path)
-        print("[INFO] Loaded environment variables from .env file")
-except ImportError:
-    print("[WARNING] dotenv package not installed. Environment variables must be set manually.")
+# Configured by configure_environment(); importing this module has no side effects
+logger = logging.getLogger('main')
+has_signal_handler = False
 
-# Configure logging
-log_directory = Path("logs")
-log_directory.mkdir(exist_ok=True)
-current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-log_filename = log_directory / f"travian_whispers_{current_date}.log"
+def load_environment():
+    """Load environment variables from the .env file if there is one."""
+    try:
+        from dotenv import load_dotenv
+        env_path = Path(".") / ".env"
+        if env_path.exists():
+            load_dotenv(dotenv_path=env_path)
+            print("[INFO] Loaded environment variables from .env file")
+    except ImportError:
+        print("[WARNING] dotenv package not installed. Environment variables must be set manually.")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(log_filename)
-    ]
-)
-logger = logging.getLogger('main')
+def configure_logging():
+    """Log to the console and to a dated file in logs/."""
+    log_directory = Path("logs")
+    log_directory.mkdir(exist_ok=True)
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    log_filename = log_directory / f"travian_whispers_{current_date}.log"
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(log_filename)
+        ]
+    )
 
 # Check if running in a virtual environment
 def in_virtualenv():
@@ -70,24 +61,26 @@ def in_virtualenv():
         hasattr(sys, "base_prefix") and sys.base_prefix != sys.prefix
     )
 
-if not in_virtualenv():
-    logger.warning("Not running in a virtual environment! It's recommended to use a venv.")
-
-# Import signal handler (don't fail if the file doesn't exist yet)
-try:
-    from signal_handler import initialize_signal_handlers, register_shutdown_handler
-    has_signal_handler = True
-except ImportError:
-    logger.warning("Signal handler not available. Graceful shutdown may be limited.")
-    has_signal_handler = False
-
-# Import cron jobs (don't fail if the file doesn't exist yet)
-try:
-    from cron_jobs import start_scheduler
-    has_scheduler = True
-except ImportError:
-    logger.warning("Cron jobs scheduler not available. Scheduled tasks will not run.")
-    has_scheduler = False
+def configure_environment():
+    """
+    Prepare the process once the command line has been parsed: load .env,
+    configure logging and check the environment.
+    """
+    global has_signal_handler
+    
+    load_environment()
+    configure_logging()
+    
+    if not in_virtualenv():
+        logger.warning("Not running in a virtual environment! It's recommended to use a venv.")
+    
+    # Import signal handler (don't fail if the file doesn't exist yet)
+    try:
+        from signal_handler import initialize_signal_handlers, register_shutdown_handler
+        has_signal_handler = True
+    except ImportError:
+        logger.warning("Signal handler not available. Graceful shutdown may be limited.")
+        has_signal_handler = False
 
 def parse_arguments():
     """
@@ -104,6 +97,9 @@ def parse_arguments():
     parser.add_argument('--user-id', help='User ID for authentication in bot mode')
     parser.add_argument('--setup', action='store_true', help='Run setup procedure')
     parser.add_argument('--check-imports', action='store_true', help='Check Python imports')
+    parser.add_argument('--backfill-stats', action='store_true', help='Rebuild revenue statistics from transaction history')
+    parser.add_argument('--migrate', action='store_true', help='Create database indexes (run once per deploy)')
+    parser.add_argument('--worker', action='store_true', help='Run the background job worker')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     parser.add_argument('--host', default='0.0.0.0', help='Host address for web mode')
     parser.add_argument('--port', type=int, default=5000, help='Port for web mode')
@@ -180,6 +176,132 @@ def check_imports_mode():
         logger.error(traceback.format_exc())
         return 1
 
+def backfill_stats_mode():
+    """
+    Rebuild the materialized revenue statistics from existing transactions.
+    
+    Returns:
+        int: Exit code (0 for success, 1 for failure)
+    """
+    logger.info("Rebuilding revenue statistics...")
+    
+    try:
+        from database.mongodb import MongoDB
+        from database.models.revenue_stats import RevenueStats
+        
+        db = MongoDB()
+        if not db.connect():
+            logger.error("Failed to connect to MongoDB. Please check your connection string.")
+            return 1
+        
+        # Models resolve their collections through the application context
+        from web.app import create_app
+        app = create_app()
+        
+        with app.app_context():
+            revenue_stats = RevenueStats()
+            revenue_stats.create_indexes()
+            written = revenue_stats.rebuild()
+        
+        logger.info(f"Revenue statistics rebuilt ({written} documents).")
+        return 0
+    except Exception as e:
+        logger.error(f"Revenue statistics backfill failed: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
+def migrate_mode():
+    """
+    Create the database indexes. Web and worker processes no longer create
+    them when they start, so this runs once after installing or upgrading.
+    
+    Returns:
+        int: Exit code (0 for success, 1 for failure)
+    """
+    logger.info("Creating database indexes...")
+    
+    try:
+        from database.mongodb import MongoDB
+        from database.models.ip_pool import IPAddress
+        from database.models.proxy_service import ProxyService
+        from database.models.revenue_stats import RevenueStats
+        from utils.proxy_metrics import ProxyMetrics
+        
+        db = MongoDB()
+        if not db.connect():
+            logger.error("Failed to connect to MongoDB. Please check your connection string.")
+            return 1
+        
+        # Models resolve their collections through the application context
+        from web.app import create_app
+        app = create_app()
+        
+        with app.app_context():
+            results = {
+                'core': db.create_indexes(),
+                'ipAddresses': IPAddress().create_indexes(),
+                'proxyServices': ProxyService().create_indexes(),
+                'proxyMetrics': ProxyMetrics().create_indexes(),
+                'revenueStats': RevenueStats().create_indexes()
+            }
+        
+        failed = [name for name, ok in results.items() if not ok]
+        if failed:
+            logger.error(f"Failed to create indexes for: {', '.join(failed)}")
+            return 1
+        
+        logger.info("Database indexes are up to date.")
+        return 0
+    except Exception as e:
+        logger.error(f"Index creation failed: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
+def worker_mode():
+    """
+    Run the background job worker (village extraction, connection checks),
+    the email outbox worker, the payment webhook worker and the periodic
+    task scheduler.
+    
+    Returns:
+        int: Exit code (0 for success, 1 for failure)
+    """
+    logger.info("Starting background job worker...")
+    
+    try:
+        from database.mongodb import MongoDB
+        
+        db = MongoDB()
+        if not db.connect():
+            logger.error("Failed to connect to MongoDB. Please check your connection string.")
+            return 1
+        
+        # Models resolve their collections through the application context
+        from web.app import create_app
+        from tasks.job_worker import create_job_worker
+        from email_module.outbox_worker import start_outbox_worker
+        from tasks.scheduler import start_scheduler
+        from tasks.webhook_worker import start_webhook_worker
+        app = create_app()
+        
+        email_worker = start_outbox_worker()
+        webhook_worker = start_webhook_worker(app)
+        scheduler = start_scheduler(app)
+        try:
+            create_job_worker(app).run_forever()
+        finally:
+            if scheduler:
+                scheduler.stop(timeout=30)
+            if webhook_worker:
+                webhook_worker.stop(timeout=30)
+            if email_worker:
+                email_worker.stop(timeout=30)
+        return 0
+    except Exception as e:
+        logger.error(f"Job worker failed: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
 def web_mode(host='0.0.0.0', port=5000, debug=False):
     """
     Run in web application mode.
@@ -448,6 +570,7 @@ def main():
     """
     # Parse command line arguments
     args = parse_arguments()
+    configure_environment()
     
     # Setup logging level
     if args.debug:
@@ -460,6 +583,12 @@ def main():
             return setup_mode()
         elif args.check_imports:
             return check_imports_mode()
+        elif args.backfill_stats:
+            return backfill_stats_mode()
+        elif args.migrate:
+            return migrate_mode()
+        elif args.worker:
+            return worker_mode()
         elif args.web:
             return web_mode(args.host, args.port, args.debug)
         else:
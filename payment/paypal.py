@@ -4,7 +4,9 @@ Modified to avoid using charset_normalizer dependency.
 """
 import logging
 import json
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 import config
 from database.models.transaction import Transaction
 from database.models.user import User
@@ -19,19 +21,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger('payment.paypal')
 
-def get_access_token():
+# Seconds before expiry a cached access token is replaced
+TOKEN_REFRESH_MARGIN = 300
+
+class _AccessTokenCache:
     """
-    Get PayPal API access token.
+    Process-wide cache of the PayPal OAuth token.
+
+    PayPal tokens last hours, so one token serves every checkout until
+    shortly before it expires. Refreshes happen under a lock, so a burst
+    of requests with an expired token makes a single OAuth call.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.token = None
+        self.credentials = None
+        self.refresh_at = 0.0
+        self.expires_at = 0.0
+
+    def get(self, credentials, rejected=None):
+        """
+        Get a valid token, fetching a new one if needed.
+
+        Args:
+            credentials (tuple): Base URL, client ID and secret the token belongs to
+            rejected (str, optional): Token PayPal refused; replaced even if fresh.
+                If another thread already replaced it, the new token is returned.
+
+        Returns:
+            str: Access token or None if failed
+        """
+        with self.lock:
+            now = time.monotonic()
+            cached = self.token if self.credentials == credentials and self.token != rejected else None
+
+            if cached and now < self.refresh_at:
+                return cached
+
+            token, expires_in = _fetch_access_token(*credentials)
+            if token is None:
+                # Keep using a token that is due for refresh but not yet expired
+                return cached if cached and now < self.expires_at else None
+
+            self.token = token
+            self.credentials = credentials
+            self.expires_at = now + expires_in
+            self.refresh_at = now + max(expires_in - TOKEN_REFRESH_MARGIN, expires_in / 2)
+            return token
+
+_token_cache = _AccessTokenCache()
+
+def _fetch_access_token(base_url, client_id, secret):
+    """
+    Request a new access token from PayPal.
     
     Returns:
-        str: Access token or None if failed
+        tuple: (access token, lifetime in seconds) or (None, 0) if failed
     """
     try:
-        url = f"{config.PAYPAL_BASE_URL}/v1/oauth2/token"
+        url = f"{base_url}/v1/oauth2/token"
         headers = {
             "Accept": "application/json",
             "Accept-Language": "en_US",
-            **basic_auth_header(config.PAYPAL_CLIENT_ID, config.PAYPAL_SECRET)
+            **basic_auth_header(client_id, secret)
         }
         data = "grant_type=client_credentials"
         
@@ -44,13 +97,66 @@ def get_access_token():
         
         if status == 200:
             response_data = json.loads(content.decode('utf-8'))
-            return response_data.get("access_token")
+            return response_data.get("access_token"), float(response_data.get("expires_in", 0))
         
         logger.error(f"Failed to get PayPal access token: Status {status}, Response: {content.decode('utf-8', errors='replace')}")
-        return None
+        return None, 0
     except Exception as e:
         logger.error(f"Error getting PayPal access token: {e}")
-        return None
+        return None, 0
+
+def get_access_token(rejected=None):
+    """
+    Get PayPal API access token.
+    
+    Args:
+        rejected (str, optional): Token PayPal refused, which must not be returned again
+    
+    Returns:
+        str: Access token or None if failed
+    """
+    credentials = (config.PAYPAL_BASE_URL, config.PAYPAL_CLIENT_ID, config.PAYPAL_SECRET)
+    return _token_cache.get(credentials, rejected)
+
+def _api_request(method, path, payload=None):
+    """
+    Call the PayPal REST API with the cached access token.
+    
+    A 401 means PayPal revoked the token early; it is refreshed and the
+    call retried once.
+    
+    Args:
+        method (str): HTTP method
+        path (str): API path, e.g. '/v2/checkout/orders'
+        payload (dict, optional): JSON body
+        
+    Returns:
+        tuple: (status code, response content); status is None if no token could be obtained
+    """
+    access_token = get_access_token()
+    
+    for attempt in range(2):
+        if not access_token:
+            return None, b''
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {access_token}"
+        }
+        status, _, content = perform_request(
+            f"{config.PAYPAL_BASE_URL}{path}",
+            method=method,
+            headers=headers,
+            data=payload
+        )
+        
+        if status != 401 or attempt:
+            return status, content
+        
+        logger.warning("PayPal rejected the cached access token, refreshing")
+        access_token = get_access_token(rejected=access_token)
+    
+    return status, content
 
 def create_subscription_order(plan_id, user_id, success_url, cancel_url):
     """
@@ -79,18 +185,7 @@ def create_subscription_order(plan_id, user_id, success_url, cancel_url):
     if not user:
         return False, None, None
     
-    # Get access token
-    access_token = get_access_token()
-    if not access_token:
-        return False, None, None
-    
     try:
-        url = f"{config.PAYPAL_BASE_URL}/v2/checkout/orders"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {access_token}"
-        }
-        
         # Create order payload
         payload = {
             "intent": "CAPTURE",
@@ -114,12 +209,9 @@ def create_subscription_order(plan_id, user_id, success_url, cancel_url):
             }
         }
         
-        status, _, content = perform_request(
-            url,
-            method="POST",
-            headers=headers,
-            data=payload
-        )
+        status, content = _api_request("POST", "/v2/checkout/orders", payload)
+        if status is None:
+            return False, None, None
         
         if status in (200, 201):
             data = json.loads(content.decode('utf-8'))
@@ -168,23 +260,10 @@ def capture_payment(order_id):
     Returns:
         tuple: (success, capture_id)
     """
-    # Get access token
-    access_token = get_access_token()
-    if not access_token:
-        return False, None
-    
     try:
-        url = f"{config.PAYPAL_BASE_URL}/v2/checkout/orders/{order_id}/capture"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {access_token}"
-        }
-        
-        status, _, content = perform_request(
-            url,
-            method="POST",
-            headers=headers
-        )
+        status, content = _api_request("POST", f"/v2/checkout/orders/{order_id}/capture")
+        if status is None:
+            return False, None
         
         if status in (200, 201):
             data = json.loads(content.decode('utf-8'))
@@ -221,11 +300,18 @@ def process_successful_payment(order_id):
         return False
     
     # Update transaction status
-    if not transaction_model.update_transaction_status(transaction["_id"], "completed"):
+    previous = transaction_model.change_transaction_status(transaction["_id"], "completed")
+    if previous is None:
         logger.error(f"Failed to update transaction status: {transaction['_id']}")
         return False
     
-    # Get user and plan details
+    # The return URL and the webhook both report the same payment; only
+    # the update that completed the transaction goes on
+    if previous.get("status") == "completed":
+        logger.info(f"Payment for order {order_id} already processed")
+        return True
+    
+    # The completing update extended the subscription; read the result
     user_model = User()
     plan_model = SubscriptionPlan()
     
@@ -236,34 +322,7 @@ def process_successful_payment(order_id):
         logger.error(f"User or plan not found: user_id={transaction['userId']}, plan_id={transaction['planId']}")
         return False
     
-    # Calculate subscription dates
-    start_date = datetime.utcnow()
-    
-    if transaction["billingPeriod"] == "monthly":
-        end_date = start_date + timedelta(days=30)
-    else:  # yearly
-        end_date = start_date + timedelta(days=365)
-    
-    # Update user subscription
-    if not user_model.update_subscription(
-        user_id=str(user["_id"]),
-        plan_id=str(plan["_id"]),
-        status="active",
-        start_date=start_date,
-        end_date=end_date
-    ):
-        logger.error(f"Failed to update user subscription: {user['_id']}")
-        return False
-    
-    # Add payment record
-    if not user_model.add_payment_record(
-        user_id=str(user["_id"]),
-        payment_id=order_id,
-        amount=transaction["amount"],
-        method="paypal"
-    ):
-        logger.error(f"Failed to add payment record for user: {user['_id']}")
-        # Continue as this is not critical
+    end_date = user["subscription"].get("endDate") or datetime.utcnow()
     
     # Send confirmation email
     try:
@@ -298,6 +357,35 @@ def verify_webhook_signature(request_body, headers):
     
     return True  # Placeholder for actual verification
 
+def webhook_partition_key(event_data):
+    """
+    Get the key that orders a webhook event relative to others.
+    
+    Events for one user are processed one at a time in arrival order.
+    The user comes from the custom_id set when the order was created;
+    events without it are ordered per order instead.
+    
+    Args:
+        event_data (dict): Event data
+        
+    Returns:
+        str: Partition key
+    """
+    resource = event_data.get("resource") or {}
+    
+    custom_id = resource.get("custom_id")
+    if not custom_id:
+        purchase_units = resource.get("purchase_units") or [{}]
+        custom_id = purchase_units[0].get("custom_id")
+    if custom_id:
+        return f"user:{custom_id.split('|')[0]}"
+    
+    order_id = resource.get("supplementary_data", {}).get("related_ids", {}).get("order_id")
+    if order_id:
+        return f"order:{order_id}"
+    
+    return f"event:{event_data.get('id')}"
+
 def handle_webhook_event(event_type, event_data):
     """
     Handle PayPal webhook events.
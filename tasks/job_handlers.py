@@ -0,0 +1,226 @@
+"""
+Background job handlers for Travian Whispers application.
+This module contains the browser-driven and long-running operations
+that web requests queue as jobs instead of running them in the request
+thread.
+"""
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def _log_connection_activity(user_id, connection_result, data=None):
+    """
+    Record the outcome of a Travian connection check in the activity log.
+
+    Args:
+        user_id (str): User ID
+        connection_result (dict): Result of test_connection()
+        data (dict, optional): Extra activity data
+    """
+    from database.models.activity_log import ActivityLog
+
+    try:
+        activity_model = ActivityLog()
+        if connection_result.get('success'):
+            activity_model.log_activity(
+                user_id=user_id,
+                activity_type='travian-connection',
+                details='Successfully connected to Travian account',
+                status='success',
+                data=data
+            )
+        else:
+            activity_model.log_activity(
+                user_id=user_id,
+                activity_type='travian-connection',
+                details=f"Failed to connect to Travian account: {connection_result.get('message', 'Unknown error')}",
+                status='error'
+            )
+    except Exception as e:
+        logger.error(f"Error logging connection activity: {e}")
+
+
+def extract_villages(job, progress):
+    """
+    Extract the user's villages from Travian.
+
+    Args:
+        job (dict): Job document
+        progress (callable): Progress reporter taking (percent, message)
+
+    Returns:
+        dict: Result with 'success', 'message' and 'data'
+    """
+    from web.routes.users_apis.villages import extract_villages_internal
+
+    return extract_villages_internal(str(job['userId']), progress=progress)
+
+
+def verify_travian_connection(job, progress):
+    """
+    Log into Travian with the submitted credentials.
+
+    Args:
+        job (dict): Job document; params hold 'username' and 'server', secrets
+            may hold 'password' (the stored password is used when none was
+            submitted)
+        progress (callable): Progress reporter taking (percent, message)
+
+    Returns:
+        dict: Result with 'success', 'message' and 'villages_count'
+    """
+    from travian_api.connector import test_connection
+    from database.models.user import User
+
+    user_id = str(job['userId'])
+    params = job.get('params', {})
+    password = (job.get('secrets') or {}).get('password')
+
+    if password is None and job.get('hasSecrets'):
+        # A retried claim no longer has the submitted password; checking the
+        # stored one instead would verify different credentials
+        return {'success': False, 'message': 'The submitted password is no longer available. Please try again.'}
+
+    if password is None:
+        user = User().get_user_by_id(user_id)
+        password = user['travianCredentials'].get('password', '') if user else ''
+
+    if not password:
+        return {'success': False, 'message': 'Password is required'}
+
+    progress(20, 'Logging into Travian...')
+    connection_result = test_connection(params.get('username'), password, params.get('server'))
+
+    villages_count = connection_result.get('villages_count', 0)
+    _log_connection_activity(user_id, connection_result, data={'villages_count': villages_count})
+
+    if not connection_result.get('success'):
+        return {
+            'success': False,
+            'message': connection_result.get('message', 'Failed to connect to Travian account')
+        }
+
+    return {
+        'success': True,
+        'message': 'Travian account successfully connected!',
+        'villages_count': villages_count
+    }
+
+
+def connect_travian_account(job, progress):
+    """
+    Verify the user's stored Travian credentials and extract their villages.
+
+    Queued when a user saves their Travian settings.
+
+    Args:
+        job (dict): Job document
+        progress (callable): Progress reporter taking (percent, message)
+
+    Returns:
+        dict: Result with 'success', 'message', 'connection_verified'
+            and 'villages_count'
+    """
+    from travian_api.connector import test_connection
+    from database.models.user import User
+    from web.routes.users_apis.villages import extract_villages_internal
+
+    user_id = str(job['userId'])
+    user = User().get_user_by_id(user_id)
+
+    if not user:
+        return {'success': False, 'message': 'User not found'}
+
+    credentials = user.get('travianCredentials', {})
+
+    progress(5, 'Verifying Travian account...')
+    connection_result = test_connection(
+        credentials.get('username'),
+        credentials.get('password'),
+        credentials.get('server')
+    )
+
+    if not connection_result.get('success'):
+        _log_connection_activity(user_id, connection_result)
+        return {
+            'success': False,
+            'message': f"Connection could not be verified: {connection_result.get('message', 'Unknown error')}",
+            'connection_verified': False,
+            'villages_count': 0
+        }
+
+    extraction_result = extract_villages_internal(user_id, progress=progress)
+    villages_count = len(extraction_result.get('data', [])) if extraction_result.get('success') else 0
+
+    _log_connection_activity(user_id, connection_result, data={
+        'villages_extracted': extraction_result.get('success', False),
+        'villages_count': villages_count
+    })
+
+    if not extraction_result.get('success'):
+        return {
+            'success': False,
+            'message': f"Connection verified, but villages could not be extracted: {extraction_result.get('message', 'Unknown error')}",
+            'connection_verified': True,
+            'villages_count': 0
+        }
+
+    return {
+        'success': True,
+        'message': f'Travian account verified and {villages_count} villages extracted',
+        'connection_verified': True,
+        'villages_count': villages_count,
+        'data': extraction_result.get('data', [])
+    }
+
+
+def restore_backup(job, progress):
+    """
+    Restore the database from a backup file and the backups it builds on.
+
+    Args:
+        job (dict): Job document; params hold 'filename', a file in BACKUP_DIR
+        progress (callable): Progress reporter taking (percent, message)
+
+    Returns:
+        dict: Result with 'success', 'message' and 'collections'
+    """
+    from pathlib import Path
+    from flask import current_app
+    from database.backup import BackupError
+    from database.restore import restore_backup as run_restore
+
+    config = current_app.config
+    filename = job.get('params', {}).get('filename', '')
+    path = Path(config.get('BACKUP_DIR', 'backups')) / Path(filename).name
+
+    if not filename or not path.exists():
+        return {'success': False, 'message': f"Backup {filename} not found"}
+
+    try:
+        restored = run_restore(
+            path,
+            batch_size=config.get('RESTORE_BATCH_SIZE', 5000),
+            parallel=config.get('RESTORE_PARALLEL_COLLECTIONS', 4),
+            insert_workers=config.get('RESTORE_INSERT_WORKERS', 8),
+            progress=progress
+        )
+    except BackupError as e:
+        return {'success': False, 'message': e.message}
+
+    return {
+        'success': True,
+        'message': f"Restored {sum(restored.values())} documents into {len(restored)} collections",
+        'collections': restored
+    }
+
+
+# Job type -> handler
+JOB_HANDLERS = {
+    'extract_villages': extract_villages,
+    'verify_travian_connection': verify_travian_connection,
+    'connect_travian_account': connect_travian_account,
+    'restore_backup': restore_backup
+}
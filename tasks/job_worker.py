@@ -0,0 +1,218 @@
+"""
+Background job worker for Travian Whispers application.
+This module claims queued jobs from MongoDB and runs them on a small
+pool of threads, outside the web request cycle.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from database.models.job import Job
+from tasks.job_handlers import JOB_HANDLERS
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Pool of threads running background jobs.
+
+    Each thread claims one job at a time with an atomic update, so any
+    number of worker processes can share the jobs collection. While a job
+    runs its lease is renewed; if the process dies the lease runs out and
+    another worker picks the job up again, up to max_attempts times.
+    """
+
+    def __init__(self, app, concurrency=2, poll_interval=2, lease_seconds=60,
+                 max_attempts=2, handlers=None):
+        """
+        Initialize JobWorker.
+
+        Args:
+            app: Flask application instance, used for the app context models need
+            concurrency (int, optional): Number of jobs run in parallel
+            poll_interval (float, optional): Seconds between claims when idle
+            lease_seconds (int, optional): Seconds a claim stays valid without renewal
+            max_attempts (int, optional): Attempts before a job is abandoned
+            handlers (dict, optional): Job type -> handler, defaults to JOB_HANDLERS
+        """
+        self.app = app
+        self.concurrency = max(1, int(concurrency))
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.handlers = handlers or JOB_HANDLERS
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads."""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(f"{self.worker_id}/{index}", index == 0),
+                name=f"job-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Job worker {self.worker_id} started with {self.concurrency} threads "
+                    f"for {', '.join(sorted(self.handlers))}")
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker threads after their current job.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each thread
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    def run_forever(self):
+        """Run until interrupted (used by the standalone worker process)."""
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Interrupted, finishing running jobs...")
+        finally:
+            self.stop()
+
+    def _run_loop(self, thread_id, sweeps_abandoned):
+        """
+        Claim and run jobs until stopped.
+
+        Args:
+            thread_id (str): Worker identifier recorded on claimed jobs
+            sweeps_abandoned (bool): Whether this thread fails abandoned jobs
+        """
+        idle_polls = 0
+
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    job_model = Job()
+                    job = job_model.claim_job(
+                        thread_id,
+                        list(self.handlers),
+                        lease_seconds=self.lease_seconds,
+                        max_attempts=self.max_attempts
+                    )
+
+                    if job is not None:
+                        idle_polls = 0
+                        self._run_job(job_model, job, thread_id)
+                        continue
+
+                    # Jobs whose workers died on the last attempt are never claimed again
+                    idle_polls += 1
+                    if sweeps_abandoned and idle_polls * self.poll_interval >= self.lease_seconds:
+                        idle_polls = 0
+                        abandoned = job_model.fail_abandoned_jobs(self.max_attempts)
+                        if abandoned:
+                            logger.warning(f"Marked {abandoned} abandoned jobs as failed")
+            except Exception as e:
+                logger.error(f"Job worker loop error: {e}")
+
+            self._stop.wait(self.poll_interval)
+
+    def _run_job(self, job_model, job, thread_id):
+        """
+        Run a claimed job, renewing its lease until it finishes.
+
+        Args:
+            job_model (Job): Job model
+            job (dict): Claimed job document
+            thread_id (str): Worker identifier holding the job
+        """
+        job_id = job['_id']
+        handler = self.handlers[job['type']]
+        done = threading.Event()
+        lost = threading.Event()
+
+        def renew_lease():
+            while not done.wait(self.lease_seconds / 3):
+                with self.app.app_context():
+                    if not job_model.update_progress(job_id, thread_id, lease_seconds=self.lease_seconds):
+                        lost.set()
+                        return
+
+        def progress(percent=None, message=None):
+            job_model.update_progress(job_id, thread_id, percent, message, lease_seconds=self.lease_seconds)
+
+        heartbeat = threading.Thread(target=renew_lease, name=f"job-lease-{job_id}", daemon=True)
+        heartbeat.start()
+
+        logger.info(f"Running job '{job['type']}' ({job_id}) attempt {job['attempts']}")
+
+        try:
+            result = handler(job, progress) or {}
+            error = None if result.get('success', True) else result.get('message', 'Job failed')
+        except Exception as e:
+            logger.error(f"Job '{job['type']}' ({job_id}) raised: {e}", exc_info=True)
+            result = None
+            error = str(e)
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if lost.is_set():
+            logger.warning(f"Lost the lease on job {job_id}; result discarded")
+            return
+
+        job_model.finish_job(job_id, thread_id, result=result, error=error)
+        logger.info(f"Job '{job['type']}' ({job_id}) {'failed: ' + error if error else 'succeeded'}")
+
+
+def create_job_worker(app):
+    """
+    Build a job worker from the application config.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        JobWorker: Worker (not started)
+    """
+    config = app.config
+
+    return JobWorker(
+        app,
+        concurrency=config.get('JOB_WORKER_CONCURRENCY', 2),
+        poll_interval=config.get('JOB_POLL_INTERVAL', 2),
+        lease_seconds=config.get('JOB_LEASE_SECONDS', 60),
+        max_attempts=config.get('JOB_MAX_ATTEMPTS', 2)
+    )
+
+
+def start_embedded_worker(app):
+    """
+    Run a job worker inside the web process.
+
+    Meant for single-process deployments; otherwise run `main.py --worker`.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        JobWorker: Started worker
+    """
+    worker = create_job_worker(app)
+    worker.start()
+    app.extensions['job_worker'] = worker
+    return worker
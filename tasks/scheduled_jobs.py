@@ -1,242 +1,206 @@
 """
 Scheduled Jobs module for Travian Whispers application.
-This module handles scheduled maintenance tasks such as IP rotation and session cleanup.
+This module defines the maintenance tasks run by the scheduler
+(tasks/scheduler.py): subscription upkeep, token cleanup, admin reports,
+IP rotation, proxy health checks and, when browser isolation is
+installed, browser session cleanup.
 """
+import importlib.util
 import logging
-import threading
-import time
 from datetime import datetime, timedelta
 
-from startup.ip_manager import IPManager
-from startup.session_isolation import BrowserIsolationManager
+from tasks.scheduler import At, Every, PeriodicTask
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-class ScheduledJobManager:
-    """Manager for scheduled maintenance jobs."""
-    
-    def __init__(self):
-        """Initialize ScheduledJobManager."""
-        self.ip_manager = IPManager()
-        self.browser_manager = BrowserIsolationManager()
-        self.stop_event = threading.Event()
-        self.maintenance_thread = None
-        self.jobs = []
-        
-        # Define default jobs
-        self._setup_default_jobs()
-    
-    def _setup_default_jobs(self):
-        """Setup default maintenance jobs."""
-        # IP rotation job (every 12 hours)
-        self.jobs.append({
-            "name": "ip_rotation",
-            "function": self._rotate_ips,
-            "interval": 12 * 60 * 60,  # 12 hours
-            "last_run": None
-        })
-        
-        # Session cleanup job (every 24 hours)
-        self.jobs.append({
-            "name": "session_cleanup",
-            "function": self._cleanup_sessions,
-            "interval": 24 * 60 * 60,  # 24 hours
-            "last_run": None
-        })
-        
-        # IP health check job (every 6 hours)
-        self.jobs.append({
-            "name": "ip_health_check",
-            "function": self._check_ip_health,
-            "interval": 6 * 60 * 60,  # 6 hours
-            "last_run": None
-        })
-    
-    def start(self):
-        """Start the scheduled job manager."""
-        if self.maintenance_thread and self.maintenance_thread.is_alive():
-            logger.warning("Scheduled job manager is already running")
-            return False
-        
-        # Clear stop event
-        self.stop_event.clear()
-        
-        # Start maintenance thread
-        self.maintenance_thread = threading.Thread(target=self._maintenance_loop)
-        self.maintenance_thread.daemon = True
-        self.maintenance_thread.start()
-        
-        logger.info("Scheduled job manager started")
-        return True
-    
-    def stop(self):
-        """Stop the scheduled job manager."""
-        if not self.maintenance_thread or not self.maintenance_thread.is_alive():
-            logger.warning("Scheduled job manager is not running")
-            return False
-        
-        # Set stop event
-        self.stop_event.set()
-        
-        # Wait for maintenance thread to finish
-        self.maintenance_thread.join(timeout=60)
-        
-        if self.maintenance_thread.is_alive():
-            logger.warning("Maintenance thread did not stop gracefully")
-        
-        logger.info("Scheduled job manager stopped")
-        return True
-    
-    def _maintenance_loop(self):
-        """
-        Main maintenance loop.
-        This runs in a separate thread and executes scheduled jobs.
-        """
-        logger.info("Maintenance loop started")
-        
-        while not self.stop_event.is_set():
-            try:
-                # Check if any jobs need to run
-                now = datetime.utcnow()
-                
-                for job in self.jobs:
-                    # Skip if job has been run recently
-                    if job["last_run"] and (now - job["last_run"]).total_seconds() < job["interval"]:
-                        continue
-                    
-                    # Run job
-                    logger.info(f"Running scheduled job: {job['name']}")
-                    try:
-                        result = job["function"]()
-                        job["last_run"] = now
-                        logger.info(f"Job {job['name']} completed: {result}")
-                    except Exception as e:
-                        logger.error(f"Error in job {job['name']}: {e}")
-                
-                # Sleep for a while (check every minute)
-                time.sleep(60)
-                
-            except Exception as e:
-                logger.error(f"Error in maintenance loop: {e}")
-                time.sleep(60)
-        
-        logger.info("Maintenance loop stopped")
-    
-    def _rotate_ips(self):
-        """
-        Rotate IPs that have been used for too long.
-        
-        Returns:
-            dict: Job result
-        """
-        # Define maximum age (12 hours)
-        max_age_hours = 12
-        
-        # Rotate IPs
-        rotated_count = self.ip_manager.schedule_ip_rotation(max_age_hours)
-        
-        return {
-            "rotated_count": rotated_count,
-            "max_age_hours": max_age_hours
-        }
-    
-    def _cleanup_sessions(self):
-        """
-        Clean up old browser sessions.
-        
-        Returns:
-            dict: Job result
-        """
-        # Define maximum age (24 hours)
-        max_age_hours = 24
-        
-        # Clean up sessions
-        cleaned_count = self.browser_manager.session_manager.clean_old_sessions(max_age_hours)
-        
-        return {
-            "cleaned_count": cleaned_count,
-            "max_age_hours": max_age_hours
-        }
-    
-    def _check_ip_health(self):
-        """
-        Check health of IPs in the pool.
-        
-        Returns:
-            dict: Job result
-        """
-        # This would typically involve testing IPs for connectivity and validity
-        # For now, we'll just return a placeholder
-        
-        # Get all IPs
-        all_ips = list(self.ip_manager.ip_collection.find())
-        
-        # Count by status
-        status_counts = {}
-        for ip in all_ips:
-            status = ip.get("status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        # Count in-use IPs
-        in_use_count = sum(1 for ip in all_ips if ip.get("inUse", False))
-        
-        return {
-            "total_ips": len(all_ips),
-            "in_use": in_use_count,
-            "status_counts": status_counts
-        }
-    
-    def add_job(self, name, function, interval_hours):
-        """
-        Add a custom job to the scheduler.
-        
-        Args:
-            name (str): Job name
-            function (callable): Function to execute
-            interval_hours (float): Interval in hours
-            
-        Returns:
-            bool: True if job was added, False otherwise
-        """
-        # Check if job already exists
-        for job in self.jobs:
-            if job["name"] == name:
-                logger.warning(f"Job {name} already exists")
-                return False
-        
-        # Add job
-        self.jobs.append({
-            "name": name,
-            "function": function,
-            "interval": interval_hours * 60 * 60,
-            "last_run": None
-        })
-        
-        logger.info(f"Added job {name} with interval {interval_hours} hours")
-        
-        return True
-    
-    def remove_job(self, name):
-        """
-        Remove a job from the scheduler.
-        
-        Args:
-            name (str): Job name
-            
-        Returns:
-            bool: True if job was removed, False otherwise
-        """
-        # Find job
-        for i, job in enumerate(self.jobs):
-            if job["name"] == name:
-                # Remove job
-                self.jobs.pop(i)
-                logger.info(f"Removed job {name}")
-                return True
-        
-        logger.warning(f"Job {name} not found")
+
+def expire_subscriptions():
+    """
+    Expire lapsed subscriptions and queue expiry notices.
+
+    Returns:
+        dict: Job result
+    """
+    from tasks.subscription_jobs import expire_subscriptions as expire
+
+    return expire()
+
+
+def send_renewal_reminders():
+    """
+    Queue renewal reminders for subscriptions ending soon.
+
+    Returns:
+        dict: Job result
+    """
+    from tasks.subscription_jobs import send_renewal_reminders as remind
+
+    return {"reminded": remind()}
+
+
+def cleanup_old_tokens():
+    """
+    Clear verification tokens older than a week and expired reset tokens.
+
+    Returns:
+        dict: Job result
+    """
+    from database.models.user import User
+
+    users = User().collection
+    if users is None:
+        raise RuntimeError("Database not connected")
+
+    now = datetime.utcnow()
+
+    verification_result = users.update_many(
+        {"verificationToken": {"$ne": None}, "createdAt": {"$lt": now - timedelta(days=7)}},
+        {"$set": {"verificationToken": None, "updatedAt": now}}
+    )
+    reset_result = users.update_many(
+        {"resetPasswordToken": {"$ne": None}, "resetPasswordExpires": {"$lt": now}},
+        {"$set": {"resetPasswordToken": None, "resetPasswordExpires": None, "updatedAt": now}}
+    )
+
+    return {
+        "verification_tokens": verification_result.modified_count,
+        "reset_tokens": reset_result.modified_count
+    }
+
+
+def generate_admin_report():
+    """
+    Email the weekly user and revenue report to admins.
+
+    Returns:
+        dict: Job result
+    """
+    from database.models.transaction import Transaction
+    from database.models.user import User
+    from email_module.sender import send_admin_report_email
+
+    users = User().collection
+    transactions = Transaction().collection
+    if users is None or transactions is None:
+        raise RuntimeError("Database not connected")
+
+    now = datetime.utcnow()
+    seven_days_ago = now - timedelta(days=7)
+
+    revenue_result = list(transactions.aggregate([
+        {"$match": {"createdAt": {"$gte": seven_days_ago}, "status": "completed"}},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+    ]))
+
+    report = {
+        "total_users": users.count_documents({}),
+        "active_users": users.count_documents({"subscription.status": "active"}),
+        "expired_users": users.count_documents({"subscription.status": "expired"}),
+        "recent_transactions": transactions.count_documents({"createdAt": {"$gte": seven_days_ago}}),
+        "revenue": revenue_result[0]["total"] if revenue_result else 0,
+        "date_range": f"{seven_days_ago.strftime('%Y-%m-%d')} to {now.strftime('%Y-%m-%d')}"
+    }
+
+    sent = 0
+    week = now.strftime('%G-W%V')
+    for admin in users.find({"role": "admin"}, {"email": 1, "username": 1}):
+        if send_admin_report_email(admin["email"], admin["username"], report,
+                                   dedupe_key=f"admin-report:{admin['_id']}:{week}"):
+            sent += 1
+
+    return {"admins": sent, **report}
+
+
+def rotate_ips():
+    """
+    Rotate IPs based on usage patterns.
+
+    Returns:
+        dict: Job result
+    """
+    from utils.rotation_strategy import RotationStrategy
+
+    strategy = RotationStrategy()
+    rotated = strategy.apply_rotation_strategy(strategy.STRATEGY_PATTERN_BASED)
+
+    return {"rotated_count": rotated}
+
+
+def check_proxy_health():
+    """
+    Probe all proxies and act on failing ones.
+
+    Returns:
+        dict: Job result
+    """
+    from utils.proxy_metrics import ProxyHealthCheck
+
+    health_check = ProxyHealthCheck()
+    health_check.check_all_proxies()
+    actions = health_check.handle_failing_proxies()
+
+    return {
+        "sweep_seconds": round(health_check.last_sweep['duration'], 1) if health_check.last_sweep else None,
+        **{action: len(proxies) for action, proxies in actions.items()}
+    }
+
+
+def fetch_new_proxies():
+    """
+    Top up the proxy pool from the configured providers.
+
+    Returns:
+        dict: Job result
+    """
+    from database.models.proxy_service import ProxyService
+
+    return {"fetched": ProxyService().auto_fetch_proxies()}
+
+
+def _browser_isolation_available():
+    """
+    Check whether the browser isolation module is installed.
+
+    Returns:
+        bool: True if startup.session_isolation can be imported
+    """
+    try:
+        return importlib.util.find_spec('startup.session_isolation') is not None
+    except ImportError:
         return False
 
-# Create a singleton instance
-scheduled_job_manager = ScheduledJobManager()
+
+def cleanup_browser_sessions():
+    """
+    Remove browser sessions older than a day.
+
+    Returns:
+        dict: Job result
+    """
+    from startup.session_isolation import BrowserIsolationManager
+
+    max_age_hours = 24
+    cleaned_count = BrowserIsolationManager().session_manager.clean_old_sessions(max_age_hours)
+
+    return {"cleaned_count": cleaned_count, "max_age_hours": max_age_hours}
+
+
+# Tasks run by the scheduler; times are UTC
+SCHEDULED_TASKS = [
+    PeriodicTask('expire_subscriptions', expire_subscriptions, At(0, 0), jitter=300),
+    PeriodicTask('renewal_reminders', send_renewal_reminders, At(12, 0), jitter=300),
+    PeriodicTask('cleanup_old_tokens', cleanup_old_tokens, At(3, 0, weekday=0), jitter=600),
+    PeriodicTask('admin_report', generate_admin_report, At(6, 0, weekday=6)),
+    PeriodicTask('rotate_ips', rotate_ips, Every(minutes=15), jitter=60, catch_up=False),
+    PeriodicTask('proxy_health_check', check_proxy_health, Every(hours=2), jitter=300, catch_up=False),
+    PeriodicTask('fetch_new_proxies', fetch_new_proxies, Every(hours=6), jitter=300),
+]
+
+# Browser isolation is not part of every deployment
+if _browser_isolation_available():
+    SCHEDULED_TASKS.append(
+        PeriodicTask('browser_session_cleanup', cleanup_browser_sessions, Every(hours=24), jitter=600)
+    )
+else:
+    logger.info("startup.session_isolation not installed, browser session cleanup is not scheduled")
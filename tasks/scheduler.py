@@ -0,0 +1,428 @@
+"""
+Periodic task scheduler for Travian Whispers application.
+This module runs maintenance tasks on fixed schedules. Every web or
+worker process may start a scheduler; they elect a leader through a
+lease in MongoDB and each run is claimed with an atomic update, so a
+task runs once per scheduled time across the whole deployment.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from database.models.scheduled_task import ScheduledTask
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Name of the leader lease
+LEASE_NAME = 'scheduler'
+
+
+def _aware(value):
+    """Treat naive datetimes from the database as UTC."""
+    if value is None or value.tzinfo:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+class Every:
+    """Trigger firing at a fixed interval."""
+
+    def __init__(self, seconds=0, minutes=0, hours=0, days=0):
+        """
+        Initialize Every.
+
+        Args:
+            seconds (float, optional): Seconds between runs
+            minutes (float, optional): Minutes between runs
+            hours (float, optional): Hours between runs
+            days (float, optional): Days between runs
+        """
+        self.interval = timedelta(seconds=seconds, minutes=minutes, hours=hours, days=days)
+        if self.interval <= timedelta(0):
+            raise ValueError("Interval must be positive")
+
+    def next_after(self, moment):
+        """
+        Get the first run time after a moment.
+
+        Args:
+            moment (datetime): Previous run time
+
+        Returns:
+            datetime: Next run time
+        """
+        return moment + self.interval
+
+    def __str__(self):
+        return f"every {int(self.interval.total_seconds())}s"
+
+
+class At:
+    """Trigger firing daily, or weekly on one weekday, at a UTC time."""
+
+    WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+    def __init__(self, hour, minute=0, weekday=None):
+        """
+        Initialize At.
+
+        Args:
+            hour (int): Hour (UTC)
+            minute (int, optional): Minute
+            weekday (int, optional): Day of the week, 0 for Monday; daily if omitted
+        """
+        self.hour = hour
+        self.minute = minute
+        self.weekday = weekday
+
+    def next_after(self, moment):
+        """
+        Get the first run time after a moment.
+
+        Args:
+            moment (datetime): Previous run time
+
+        Returns:
+            datetime: Next run time
+        """
+        candidate = moment.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+
+        if self.weekday is None:
+            if candidate <= moment:
+                candidate += timedelta(days=1)
+            return candidate
+
+        candidate += timedelta(days=(self.weekday - moment.weekday()) % 7)
+        if candidate <= moment:
+            candidate += timedelta(days=7)
+        return candidate
+
+    def __str__(self):
+        day = 'daily' if self.weekday is None else self.WEEKDAYS[self.weekday]
+        return f"{day} at {self.hour:02d}:{self.minute:02d} UTC"
+
+
+class PeriodicTask:
+    """A function run by the scheduler."""
+
+    def __init__(self, name, func, trigger, jitter=0, catch_up=True):
+        """
+        Initialize PeriodicTask.
+
+        Args:
+            name (str): Unique task name
+            func (callable): Function called without arguments; its return
+                value is stored in the run history
+            trigger (Every or At): Schedule
+            jitter (float, optional): Maximum seconds each run is delayed,
+                so tasks sharing a schedule do not all start together
+            catch_up (bool, optional): Whether a run missed while no
+                scheduler was running is made up once at startup, or
+                skipped until the next scheduled time
+        """
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.jitter = jitter
+        self.catch_up = catch_up
+
+    def run_time(self, due_at):
+        """
+        Apply this task's jitter to a scheduled time.
+
+        The delay is derived from the task name and the scheduled time,
+        so every process computes the same run time.
+
+        Args:
+            due_at (datetime): Scheduled time
+
+        Returns:
+            datetime: Time the run starts
+        """
+        if not self.jitter:
+            return due_at
+
+        digest = hashlib.sha1(f"{self.name}:{due_at.isoformat()}".encode('utf-8')).digest()
+        fraction = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+        return due_at + timedelta(seconds=round(self.jitter * fraction))
+
+    @property
+    def schedule(self):
+        """Description of the schedule, stored to notice changes."""
+        return f"{self.trigger}, jitter {self.jitter}s"
+
+
+class Scheduler:
+    """
+    Leader-elected scheduler running periodic tasks.
+
+    The leader sleeps until the next task is due instead of polling on a
+    fixed tick; followers retry the lease at half its length, so one of
+    them takes over shortly after the leader dies. A run left behind by a
+    dead leader is recorded as interrupted, and a task whose scheduled
+    time passed while no scheduler was running is run once (not once per
+    missed interval) when a leader comes back.
+    """
+
+    def __init__(self, app, tasks, lease_seconds=30, max_workers=2, misfire_grace=300):
+        """
+        Initialize Scheduler.
+
+        Args:
+            app: Flask application instance, used for the app context models need
+            tasks (list): PeriodicTask instances
+            lease_seconds (float, optional): Seconds the leader lease stays valid without renewal
+            max_workers (int, optional): Tasks run in parallel
+            misfire_grace (float, optional): Seconds a run may start late before
+                tasks without catch_up skip it
+        """
+        self.app = app
+        self.tasks = {task.name: task for task in tasks}
+        self.lease_seconds = lease_seconds
+        self.max_workers = max(1, int(max_workers))
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+
+        self.scheduler_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        """Start the scheduler thread."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scheduled-task')
+        self._thread = threading.Thread(target=self._run_loop, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduler {self.scheduler_id} started with {len(self.tasks)} tasks")
+
+    def stop(self, timeout=None):
+        """
+        Stop the scheduler and give up leadership.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the scheduler thread
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info(f"Scheduler {self.scheduler_id} stopped")
+
+    def run_forever(self):
+        """Run until interrupted (used by the standalone scheduler process)."""
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Interrupted, stopping scheduler...")
+        finally:
+            self.stop()
+
+    def _run_loop(self):
+        """Hold or wait for the lease and dispatch due tasks."""
+        while not self._stop.is_set():
+            wait = self.lease_seconds / 2
+
+            try:
+                with self.app.app_context():
+                    model = ScheduledTask()
+                    wait = self._tick(model)
+            except Exception as e:
+                logger.error(f"Scheduler loop error: {e}")
+
+            self._wake.wait(wait)
+            self._wake.clear()
+
+        if self.is_leader:
+            with self.app.app_context():
+                ScheduledTask().release_lease(LEASE_NAME, self.scheduler_id)
+            self.is_leader = False
+
+    def _tick(self, model):
+        """
+        Renew leadership and start due tasks.
+
+        Args:
+            model (ScheduledTask): Scheduled task model
+
+        Returns:
+            float: Seconds until the next tick
+        """
+        if not model.acquire_lease(LEASE_NAME, self.scheduler_id, self.lease_seconds):
+            if self.is_leader:
+                logger.warning(f"Scheduler {self.scheduler_id} lost leadership")
+            self.is_leader = False
+            return self.lease_seconds / 2
+
+        if not self.is_leader:
+            self.is_leader = True
+            interrupted = model.interrupt_runs(self.scheduler_id)
+            logger.info(f"Scheduler {self.scheduler_id} is now leader"
+                        + (f"; {interrupted} unfinished runs marked interrupted" if interrupted else ""))
+
+        now = datetime.now(timezone.utc)
+        states = model.get_states()
+        next_due = now + timedelta(seconds=self.lease_seconds / 3)
+
+        for name, task in self.tasks.items():
+            state = states.get(name)
+
+            if state is None or state.get('schedule') != task.schedule or state.get('nextRunAt') is None:
+                due_at = task.trigger.next_after(now)
+                model.reset_task(name, task.schedule, due_at, task.run_time(due_at))
+                next_due = min(next_due, task.run_time(due_at))
+                continue
+
+            run_at = _aware(state['nextRunAt'])
+            if run_at > now:
+                next_due = min(next_due, run_at)
+                continue
+
+            with self._lock:
+                if name in self._running:
+                    # Still running from the last time; it is looked at again when it finishes
+                    continue
+
+            self._dispatch(model, task, state, now)
+
+        # Renew the lease well before it runs out, even if nothing is due
+        return max(0.0, (next_due - datetime.now(timezone.utc)).total_seconds())
+
+    def _dispatch(self, model, task, state, now):
+        """
+        Claim a due run and hand it to the executor.
+
+        Args:
+            model (ScheduledTask): Scheduled task model
+            task (PeriodicTask): Task
+            state (dict): Stored task state
+            now (datetime): Current time
+        """
+        run_at = _aware(state['nextRunAt'])
+        due_at = _aware(state.get('dueAt')) or run_at
+
+        # Skip ahead past scheduled times that went by without a scheduler
+        next_due_at = task.trigger.next_after(due_at)
+        missed = 0
+        while next_due_at <= now:
+            next_due_at = task.trigger.next_after(next_due_at)
+            missed += 1
+
+        late = now - run_at
+        if not task.catch_up and late > self.misfire_grace:
+            if model.reschedule(task.name, state['nextRunAt'], next_due_at, task.run_time(next_due_at)):
+                logger.info(f"Skipped late run of '{task.name}' ({int(late.total_seconds())}s late)")
+            return
+
+        run_id = model.claim_run(
+            task.name,
+            state['nextRunAt'],
+            next_due_at,
+            task.run_time(next_due_at),
+            self.scheduler_id,
+            missed=missed
+        )
+        if run_id is None:
+            return
+
+        if missed:
+            logger.info(f"Catching up '{task.name}' after {missed + 1} missed runs")
+
+        with self._lock:
+            self._running.add(task.name)
+        self._executor.submit(self._run_task, task, run_id)
+
+    def _run_task(self, task, run_id):
+        """
+        Run a task and record the outcome.
+
+        Args:
+            task (PeriodicTask): Task
+            run_id (str): Run ID
+        """
+        logger.info(f"Running scheduled task '{task.name}'")
+
+        try:
+            with self.app.app_context():
+                try:
+                    result = task.func()
+                    error = None
+                except Exception as e:
+                    logger.error(f"Scheduled task '{task.name}' failed: {e}", exc_info=True)
+                    result = None
+                    error = str(e)
+
+                if not isinstance(result, (dict, list, str, int, float, bool, type(None))):
+                    result = str(result)
+
+                ScheduledTask().finish_run(run_id, task.name, result=result, error=error)
+                logger.info(f"Scheduled task '{task.name}' {'failed' if error else 'finished'}")
+        finally:
+            with self._lock:
+                self._running.discard(task.name)
+            self._wake.set()
+
+
+def create_scheduler(app, tasks=None):
+    """
+    Build a scheduler from the application config.
+
+    Args:
+        app: Flask application instance
+        tasks (list, optional): Tasks to run, defaults to SCHEDULED_TASKS
+
+    Returns:
+        Scheduler: Scheduler (not started)
+    """
+    if tasks is None:
+        from tasks.scheduled_jobs import SCHEDULED_TASKS
+        tasks = SCHEDULED_TASKS
+
+    config = app.config
+
+    return Scheduler(
+        app,
+        tasks,
+        lease_seconds=config.get('SCHEDULER_LEASE_SECONDS', 30),
+        max_workers=config.get('SCHEDULER_MAX_WORKERS', 2),
+        misfire_grace=config.get('SCHEDULER_MISFIRE_GRACE', 300)
+    )
+
+
+def start_scheduler(app):
+    """
+    Start a scheduler in the current process.
+
+    Safe to call in every process; only the leader runs tasks.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        Scheduler: Started scheduler, or None if scheduling is disabled
+    """
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        return None
+
+    scheduler = create_scheduler(app)
+    scheduler.start()
+    app.extensions['scheduler'] = scheduler
+    return scheduler
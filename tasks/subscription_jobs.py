@@ -0,0 +1,200 @@
+"""
+Subscription maintenance jobs for Travian Whispers application.
+This module expires lapsed subscriptions and queues expiry notices and
+renewal reminders with set-based updates instead of per-user loops.
+
+Each job runs in two phases. The first marks every affected user with a
+single update_many. The second reads marked users in batches, queues
+their emails in bulk and clears the markers. A run that crashes leaves
+its markers behind for the next run to finish, and every email carries
+a dedupe key, so no user is skipped or emailed twice.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from database.mongodb import MongoDB
+from database.models.subscription import SubscriptionPlan
+from database.models.user import User
+from email_module.sender import renewal_reminder_email, send_emails, subscription_expiry_email
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Marker states stored on the user's subscription
+NOTICE_PENDING = 'pending'
+NOTICE_QUEUED = 'queued'
+
+# Days before the end date a renewal reminder is sent
+RENEWAL_REMINDER_DAYS = 3
+
+# Users handled per email batch
+BATCH_SIZE = 500
+
+# Fields needed to build the emails
+USER_PROJECTION = {'email': 1, 'username': 1, 'subscription.planId': 1, 'subscription.endDate': 1}
+
+
+def _users_collection():
+    """Get the users collection, connecting if needed."""
+    db = MongoDB()
+    if db.get_db() is None:
+        db.connect()
+
+    database = db.get_db()
+    return database['users'] if database is not None else None
+
+
+def _period_key(user):
+    """
+    Identify the subscription period an email is about.
+
+    Renewing replaces the subscription, so a new end date gets new
+    dedupe keys and the user is notified again for the new period.
+    """
+    end_date = user.get('subscription', {}).get('endDate')
+    return int(end_date.timestamp()) if end_date else 0
+
+
+def _queue_marked(users, marker, build_message, batch_size=BATCH_SIZE):
+    """
+    Queue emails for users carrying a pending marker and mark them queued.
+
+    Args:
+        users: Users collection
+        marker (str): Marker field under 'subscription'
+        build_message (callable): Returns send_email() arguments for a user,
+            or None to skip the user
+        batch_size (int, optional): Users per batch
+
+    Returns:
+        int: Number of users handled
+    """
+    field = f'subscription.{marker}'
+    handled = 0
+
+    while True:
+        batch = list(users.find({field: NOTICE_PENDING}, USER_PROJECTION).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        messages = [message for message in map(build_message, batch) if message]
+        if not send_emails(messages):
+            # Keep the markers; the next run retries this batch
+            logger.error(f"Could not queue {marker} emails, {len(batch)} users left pending")
+            break
+
+        ids = [user['_id'] for user in batch]
+        users.update_many(
+            {'_id': {'$in': ids}, field: NOTICE_PENDING},
+            {'$set': {field: NOTICE_QUEUED, f'{field}At': datetime.utcnow()}}
+        )
+        for user_id in ids:
+            User.invalidate_cached_user(str(user_id))
+
+        handled += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    return handled
+
+
+def expire_subscriptions(now=None, batch_size=BATCH_SIZE):
+    """
+    Expire lapsed subscriptions and queue expiry notices.
+
+    Args:
+        now (datetime, optional): Current time, for tests
+        batch_size (int, optional): Users per email batch
+
+    Returns:
+        dict: 'expired' subscriptions flipped by this run and 'notified'
+            users whose notices were queued (including ones left over
+            from an interrupted run), or None on error
+    """
+    users = _users_collection()
+    if users is None:
+        logger.error("Database not connected. Cannot expire subscriptions.")
+        return None
+
+    now = now or datetime.utcnow()
+
+    try:
+        result = users.update_many(
+            {'subscription.status': 'active', 'subscription.endDate': {'$lt': now}},
+            {'$set': {
+                'subscription.status': 'expired',
+                'subscription.expiryNotice': NOTICE_PENDING,
+                'updatedAt': now
+            }}
+        )
+
+        notified = _queue_marked(
+            users,
+            'expiryNotice',
+            lambda user: subscription_expiry_email(
+                user['email'],
+                user['username'],
+                dedupe_key=f"subscription-expiry:{user['_id']}:{_period_key(user)}"
+            ),
+            batch_size
+        )
+
+        logger.info(f"Expired {result.modified_count} subscriptions, queued {notified} expiry notices")
+        return {'expired': result.modified_count, 'notified': notified}
+    except Exception as e:
+        logger.error(f"Error expiring subscriptions: {e}")
+        return None
+
+
+def send_renewal_reminders(now=None, days=RENEWAL_REMINDER_DAYS, batch_size=BATCH_SIZE):
+    """
+    Queue one renewal reminder per subscription period ending soon.
+
+    Args:
+        now (datetime, optional): Current time, for tests
+        days (int, optional): Days before the end date to remind
+        batch_size (int, optional): Users per email batch
+
+    Returns:
+        int: Number of users reminded, or None on error
+    """
+    users = _users_collection()
+    if users is None:
+        logger.error("Database not connected. Cannot send renewal reminders.")
+        return None
+
+    now = now or datetime.utcnow()
+
+    try:
+        # Users already reminded for this period keep a 'queued' marker
+        users.update_many(
+            {
+                'subscription.status': 'active',
+                'subscription.endDate': {'$gte': now, '$lte': now + timedelta(days=days)},
+                'subscription.renewalReminder': {'$exists': False}
+            },
+            {'$set': {'subscription.renewalReminder': NOTICE_PENDING}}
+        )
+
+        plan_names = {plan['_id']: plan['name'] for plan in SubscriptionPlan().list_plans()}
+
+        def build_reminder(user):
+            subscription = user.get('subscription', {})
+            plan_name = plan_names.get(subscription.get('planId'))
+            if not plan_name or not subscription.get('endDate'):
+                return None
+            return renewal_reminder_email(
+                user['email'],
+                user['username'],
+                plan_name,
+                subscription['endDate'].strftime('%Y-%m-%d'),
+                dedupe_key=f"renewal-reminder:{user['_id']}:{_period_key(user)}"
+            )
+
+        reminded = _queue_marked(users, 'renewalReminder', build_reminder, batch_size)
+
+        logger.info(f"Queued {reminded} renewal reminders")
+        return reminded
+    except Exception as e:
+        logger.error(f"Error sending renewal reminders: {e}")
+        return None
@@ -0,0 +1,189 @@
+"""
+Webhook worker for Travian Whispers application.
+This module processes payment webhook events stored in the inbox by the
+webhook endpoint, outside the request PayPal is waiting on.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+
+from database.models.webhook_event import WebhookEvent
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def _handle_paypal_event(event):
+    """
+    Process a stored PayPal event.
+
+    Args:
+        event (dict): Webhook event document
+
+    Returns:
+        bool: True if handled, False to retry
+    """
+    from payment.paypal import handle_webhook_event
+
+    return handle_webhook_event(event['eventType'], event['payload'])
+
+
+# Provider -> handler
+WEBHOOK_HANDLERS = {
+    'paypal': _handle_paypal_event
+}
+
+
+class WebhookWorker:
+    """
+    Pool of threads processing inbox events.
+
+    Threads claim events through WebhookEvent.claim_next(), which hands
+    out one event per user at a time in arrival order. A failed event is
+    retried with exponential backoff and holds back later events for the
+    same user until it succeeds or fails for good.
+    """
+
+    def __init__(self, app, concurrency=2, poll_interval=1, lease_seconds=60,
+                 max_attempts=8, retry_base_delay=5, retry_max_delay=900):
+        """
+        Initialize WebhookWorker.
+
+        Args:
+            app: Flask application instance, used for the app context models need
+            concurrency (int, optional): Events processed in parallel
+            poll_interval (float, optional): Seconds between claims when idle
+            lease_seconds (int, optional): Seconds a claim stays valid
+            max_attempts (int, optional): Attempts before an event fails for good
+            retry_base_delay (float, optional): Delay after the first failure
+            retry_max_delay (float, optional): Longest delay between attempts
+        """
+        self.app = app
+        self.concurrency = max(1, int(concurrency))
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads."""
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(f"{self.worker_id}/{index}",),
+                name=f"webhook-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Webhook worker {self.worker_id} started with {self.concurrency} threads")
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker threads after their current event.
+
+        Args:
+            timeout (float, optional): Seconds to wait for each thread
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info(f"Webhook worker {self.worker_id} stopped")
+
+    def process_next(self, thread_id):
+        """
+        Claim and process one event.
+
+        Args:
+            thread_id (str): Worker identifier recorded on the claim
+
+        Returns:
+            bool: True if an event was claimed, False if none was due
+        """
+        inbox = WebhookEvent()
+        event = inbox.claim_next(thread_id, self.lease_seconds)
+        if event is None:
+            return False
+
+        handler = WEBHOOK_HANDLERS.get(event['provider'])
+        label = f"{event['provider']} webhook {event['eventId']} ({event['eventType']})"
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for provider '{event['provider']}'")
+            handled = handler(event)
+            error = None if handled else 'Handler reported failure'
+        except Exception as e:
+            logger.error(f"Error processing {label}: {e}", exc_info=True)
+            error = str(e)
+
+        if error is None:
+            inbox.mark_processed(event, thread_id)
+            logger.info(f"Processed {label}")
+        elif event['attempts'] >= self.max_attempts:
+            inbox.mark_failed(event, thread_id, error)
+            logger.error(f"Giving up on {label} after {event['attempts']} attempts: {error}")
+        else:
+            delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (event['attempts'] - 1)))
+            delay *= random.uniform(0.5, 1.0)
+            inbox.schedule_retry(event, thread_id, error, delay)
+            logger.warning(f"Failed to process {label}, retrying in {delay:.0f}s: {error}")
+
+        return True
+
+    def _run_loop(self, thread_id):
+        """
+        Process events until stopped.
+
+        Args:
+            thread_id (str): Worker identifier recorded on claims
+        """
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if self.process_next(thread_id):
+                        continue
+            except Exception as e:
+                logger.error(f"Webhook worker loop error: {e}")
+
+            self._stop.wait(self.poll_interval)
+
+
+def start_webhook_worker(app):
+    """
+    Start a webhook worker in the current process.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        WebhookWorker: Started worker, or None if the inbox is disabled
+    """
+    config = app.config
+    if not config.get('WEBHOOK_INBOX_ENABLED', True):
+        return None
+
+    worker = WebhookWorker(
+        app,
+        concurrency=config.get('WEBHOOK_WORKER_CONCURRENCY', 2),
+        poll_interval=config.get('WEBHOOK_POLL_INTERVAL', 1),
+        lease_seconds=config.get('WEBHOOK_LEASE_SECONDS', 60),
+        max_attempts=config.get('WEBHOOK_MAX_ATTEMPTS', 8)
+    )
+    worker.start()
+    app.extensions['webhook_worker'] = worker
+    return worker
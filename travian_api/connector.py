@@ -4,12 +4,6 @@ import logging
 import time
 import os
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -69,6 +63,14 @@ def _selenium_login_test(username, password, server_url, timeout=30):
     Returns:
         dict: Connection result with keys 'success' and 'message'
     """
+    # Selenium is imported on first use so unreachable servers never load it
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
     driver = None
     try:
         # Configure Chrome options
@@ -245,6 +247,8 @@ def _count_villages(driver):
     Returns:
         int: Number of villages
     """
+    from selenium.webdriver.common.by import By
+
     try:
         # Navigate to village overview page
         driver.get(driver.current_url.split('?')[0] + "?profile=1&s=1")
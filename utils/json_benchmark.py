@@ -0,0 +1,146 @@
+"""
+JSON encoding benchmark for Travian Whispers.
+This module encodes a large activity-log payload, shaped like the
+documents ActivityLog stores, with MongoJSONProvider and with the
+dump, parse and dump again approach the provider replaced, and reports
+the best time of several rounds for each. No database is needed.
+
+The msgspec run is skipped when msgspec is not installed.
+
+Usage:
+    python -m utils.json_benchmark --documents 20000 --rounds 5
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+
+from web.utils import json_encoder
+from web.utils.json_encoder import MongoJSONProvider
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+ACTIVITY_TYPES = ['auto-farm', 'troop-training', 'login', 'profile-update', 'travian-connection']
+
+
+def build_payload(documents):
+    """
+    Build an activity-log API payload.
+
+    Args:
+        documents (int): Number of activity-log documents
+
+    Returns:
+        dict: Payload as the activity log endpoints return it
+    """
+    rng = random.Random(0)
+    user_id = ObjectId()
+    start = datetime.utcnow()
+
+    logs = []
+    for index in range(documents):
+        activity_type = rng.choice(ACTIVITY_TYPES)
+        logs.append({
+            '_id': ObjectId(),
+            'userId': user_id,
+            'activityType': activity_type,
+            'details': f"{activity_type.replace('-', ' ').title()} activity #{index}",
+            'status': rng.choice(['success', 'success', 'success', 'error']),
+            'village': f"Village {rng.randint(1, 12)}",
+            'timestamp': start - timedelta(seconds=index * 37),
+            'data': {
+                'villageId': ObjectId(),
+                'troops': {'legionnaire': rng.randint(0, 500), 'imperian': rng.randint(0, 300)},
+                'targets': [rng.randint(1, 10000) for _ in range(5)]
+            }
+        })
+
+    return {'success': True, 'logs': logs, 'total': documents, 'page': 1}
+
+
+def dump_parse_dump(obj):
+    """
+    Encode the way responses were built before MongoJSONProvider.
+
+    Args:
+        obj: Object to serialize
+
+    Returns:
+        bytes: JSON document
+    """
+    converted = json.loads(json.dumps(obj, default=json_encoder.to_json))
+    return json.dumps(converted, separators=(',', ':')).encode('utf-8')
+
+
+def build_provider(use_msgspec):
+    """
+    Build a MongoJSONProvider for a bare Flask app.
+
+    Args:
+        use_msgspec (bool): Value of JSON_USE_MSGSPEC
+
+    Returns:
+        MongoJSONProvider: Provider of the app
+    """
+    app = Flask(__name__)
+    app.config['JSON_USE_MSGSPEC'] = use_msgspec
+    return MongoJSONProvider(app)
+
+
+def run_benchmark(encode, payload, rounds):
+    """
+    Encode the payload several times.
+
+    Args:
+        encode (callable): Encoder taking the payload and returning bytes
+        payload: Object to serialize
+        rounds (int): Number of rounds
+
+    Returns:
+        dict: Best time in seconds and the encoded size in bytes
+    """
+    best = None
+    size = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        size = len(encode(payload))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {'seconds': best, 'bytes': size}
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoding of large activity-log payloads')
+    parser.add_argument('--documents', type=int, default=20000, help='Activity-log documents in the payload')
+    parser.add_argument('--rounds', type=int, default=5, help='Rounds per encoder, the best is reported')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    payload = build_payload(args.documents)
+    runs = [
+        ('dump-parse-dump', dump_parse_dump),
+        ('provider, stdlib', build_provider(False).encode)
+    ]
+
+    if json_encoder.msgspec is not None:
+        runs.append(('provider, msgspec', build_provider(True).encode))
+    else:
+        print("msgspec is not installed, only the standard library is measured")
+
+    print(f"{args.documents} activity-log documents, best of {args.rounds}")
+    for name, encode in runs:
+        result = run_benchmark(encode, payload, args.rounds)
+        print(f"{name:>17}: {result['seconds']:.3f}s, {result['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
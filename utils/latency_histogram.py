@@ -0,0 +1,104 @@
+"""
+Latency histogram helpers for Travian Whispers application.
+This module maps response times to log-scaled buckets so histograms
+can be stored as MongoDB counters and summed across time buckets.
+"""
+import math
+
+# Four buckets per doubling, starting at 1 ms (about 9% relative error)
+BUCKETS_PER_DOUBLING = 4
+MIN_LATENCY_MS = 1.0
+MAX_BUCKET = 72  # ~262 s; slower responses land in the last bucket
+
+
+def bucket_index(seconds):
+    """
+    Get the histogram bucket for a response time.
+
+    Args:
+        seconds (float): Response time in seconds
+
+    Returns:
+        int: Bucket index between 0 and MAX_BUCKET
+    """
+    milliseconds = seconds * 1000.0
+    if milliseconds <= MIN_LATENCY_MS:
+        return 0
+
+    index = math.ceil(BUCKETS_PER_DOUBLING * math.log2(milliseconds / MIN_LATENCY_MS))
+    return min(index, MAX_BUCKET)
+
+
+def bucket_upper_bound(index):
+    """
+    Get the upper bound of a histogram bucket.
+
+    Args:
+        index (int): Bucket index
+
+    Returns:
+        float: Upper bound in seconds
+    """
+    return MIN_LATENCY_MS * 2 ** (index / BUCKETS_PER_DOUBLING) / 1000.0
+
+
+def merge(histograms):
+    """
+    Merge histograms by summing their bucket counts.
+
+    Args:
+        histograms (iterable): Histograms as {bucket index: count} dicts;
+            keys may be strings, as stored in MongoDB
+
+    Returns:
+        dict: Merged histogram keyed by int bucket index
+    """
+    merged = {}
+    for histogram in histograms:
+        for index, count in (histogram or {}).items():
+            index = int(index)
+            merged[index] = merged.get(index, 0) + count
+    return merged
+
+
+def percentile(histogram, quantile):
+    """
+    Estimate a latency percentile from a histogram.
+
+    Args:
+        histogram (dict): Histogram keyed by bucket index
+        quantile (float): Quantile between 0 and 1, e.g. 0.95
+
+    Returns:
+        float: Upper bound of the bucket holding the quantile, in
+            seconds, or None if the histogram is empty
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+
+    rank = quantile * total
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_upper_bound(index)
+
+    return bucket_upper_bound(max(histogram))
+
+
+def percentiles(histogram, quantiles=(0.5, 0.95, 0.99)):
+    """
+    Estimate several latency percentiles from a histogram.
+
+    Args:
+        histogram (dict): Histogram keyed by bucket index
+        quantiles (tuple, optional): Quantiles to estimate
+
+    Returns:
+        dict: Latencies in seconds keyed as p50, p95, p99, ...
+    """
+    return {
+        f"p{quantile * 100:g}": percentile(histogram, quantile)
+        for quantile in quantiles
+    }
@@ -0,0 +1,171 @@
+"""
+Login throughput benchmark for Travian Whispers.
+This module drives auth.login.login_user from many threads against the
+configured MongoDB and reports login throughput and latency, together
+with the latency of a small unrelated task run alongside, which stands
+in for the other requests a web worker serves during a login burst.
+
+Each run is made twice: once with a pool as wide as the number of
+client threads (every request hashes at once, as before the bounded
+pool) and once with the configured PASSWORD_VERIFY_WORKERS and
+PASSWORD_VERIFY_QUEUE. Throttling is disabled for the runs.
+
+Usage:
+    python -m utils.login_benchmark --threads 16 --duration 10
+"""
+import argparse
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import config
+from utils import password_hasher
+from utils.password_hasher import VerificationPool
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, fraction):
+    """Get a percentile of a list of numbers, 0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _probe(stop, latencies):
+    """Time a short CPU task every 10 ms until stopped."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        sum(i * i for i in range(20000))
+        latencies.append(time.perf_counter() - started)
+        stop.wait(0.01)
+
+
+def run_benchmark(app, username, password, threads, duration, pool):
+    """
+    Run concurrent logins for a fixed time.
+
+    Args:
+        app: Flask application instance
+        username (str): Username of the benchmark account
+        password (str): Its password
+        threads (int): Client threads logging in back to back
+        duration (float): Seconds to run
+        pool (VerificationPool): Pool used for password verification
+
+    Returns:
+        dict: Counts and latencies in milliseconds
+    """
+    from auth.login import login_user
+
+    password_hasher._pool = pool
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, probe_latencies = [], []
+    counts = {'ok': 0, 'busy': 0, 'failed': 0}
+
+    def client():
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                success, message, _, _ = login_user(username, password)
+                elapsed = time.perf_counter() - started
+
+                with lock:
+                    if success:
+                        counts['ok'] += 1
+                        latencies.append(elapsed)
+                    elif 'busy' in message:
+                        counts['busy'] += 1
+                    else:
+                        counts['failed'] += 1
+
+                if not success:
+                    # A turned-away client waits before trying again
+                    stop.wait(0.05)
+
+    workers = [threading.Thread(target=client, daemon=True) for _ in range(threads)]
+    workers.append(threading.Thread(target=_probe, args=(stop, probe_latencies), daemon=True))
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    return {
+        'logins_per_second': counts['ok'] / elapsed,
+        'ok': counts['ok'],
+        'busy': counts['busy'],
+        'failed': counts['failed'],
+        'login_p50_ms': _percentile(latencies, 0.5) * 1000,
+        'login_p95_ms': _percentile(latencies, 0.95) * 1000,
+        'probe_p50_ms': _percentile(probe_latencies, 0.5) * 1000,
+        'probe_p95_ms': _percentile(probe_latencies, 0.95) * 1000
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='Benchmark login throughput under concurrent load')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent login clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+    args = parser.parse_args()
+
+    # Every turned-away login logs a warning
+    logging.disable(logging.WARNING)
+    config.LOGIN_THROTTLE_ENABLED = False
+
+    from database.models.user import User
+    from web.app import create_app
+
+    app = create_app()
+    suffix = uuid.uuid4().hex[:8]
+    username, password = f"bench_{suffix}", uuid.uuid4().hex
+
+    with app.app_context():
+        users = User().collection
+        user_id = users.insert_one({
+            'username': username,
+            'email': f"{username}@example.invalid",
+            'password': password_hasher.hash_password(password),
+            'role': 'user',
+            'isVerified': True,
+            'subscription': {'status': 'inactive', 'planId': None},
+            'createdAt': datetime.utcnow(),
+            'updatedAt': datetime.utcnow()
+        }).inserted_id
+
+    runs = [
+        ('unbounded', VerificationPool(max_workers=args.threads, max_queue=0)),
+        ('bounded', VerificationPool(max_workers=config.PASSWORD_VERIFY_WORKERS,
+                                     max_queue=config.PASSWORD_VERIFY_QUEUE))
+    ]
+
+    try:
+        print(f"{args.threads} clients, {args.duration:g}s per run, "
+              f"{config.PASSWORD_HASH_ROUNDS} rounds")
+        for name, pool in runs:
+            result = run_benchmark(app, username, password, args.threads, args.duration, pool)
+            print(
+                f"{name:>9} ({pool.max_workers} workers, queue {pool.max_queue}): "
+                f"{result['logins_per_second']:.1f} logins/s, "
+                f"busy {result['busy']}, failed {result['failed']}, "
+                f"login p50 {result['login_p50_ms']:.0f} ms p95 {result['login_p95_ms']:.0f} ms, "
+                f"other work p50 {result['probe_p50_ms']:.1f} ms p95 {result['probe_p95_ms']:.1f} ms"
+            )
+    finally:
+        with app.app_context():
+            User().collection.delete_one({'_id': user_id})
+
+
+if __name__ == '__main__':
+    main()
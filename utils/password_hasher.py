@@ -0,0 +1,170 @@
+"""
+Password hashing helpers for Travian Whispers application.
+This module holds the password hashing policy and a bounded pool that
+runs the expensive verifications off the request threads.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+import config
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Hashes with fewer rounds than configured are upgraded on the next successful login
+password_context = CryptContext(
+    schemes=['pbkdf2_sha256'],
+    pbkdf2_sha256__rounds=config.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=config.PASSWORD_HASH_ROUNDS
+)
+
+
+class HasherBusy(Exception):
+    """Raised when the verification pool has no room for more work."""
+
+
+class VerificationPool:
+    """
+    Bounded executor for password hashing.
+
+    Hashing is CPU-bound and takes tens of milliseconds, so a burst of
+    logins on the request threads starves every other request on the
+    same worker. The pool runs at most `max_workers` hashes at a time
+    and queues at most `max_queue` more; anything beyond that is
+    rejected at once with HasherBusy instead of piling up.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8):
+        """
+        Initialize VerificationPool.
+
+        Args:
+            max_workers (int, optional): Hashes computed in parallel
+            max_queue (int, optional): Hashes allowed to wait for a worker
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+
+    def submit(self, func, *args):
+        """
+        Run a function in the pool and wait for its result.
+
+        Args:
+            func (callable): Function to run
+            *args: Positional arguments for func
+
+        Returns:
+            Result of func
+
+        Raises:
+            HasherBusy: If every worker and queue slot is taken
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Password verification pool is full")
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def verify(self, password, password_hash):
+        """
+        Verify a password in the pool.
+
+        Args:
+            password (str): Plain text password
+            password_hash (str): Stored hash
+
+        Returns:
+            tuple: (matches, new hash or None); the new hash is set when
+                the stored one uses outdated parameters
+
+        Raises:
+            HasherBusy: If the pool is full
+        """
+        return self.submit(verify_and_update, password, password_hash)
+
+    def shutdown(self):
+        """Stop the pool after the queued work."""
+        self._executor.shutdown(wait=True)
+
+
+def hash_password(password):
+    """
+    Hash a password with the current parameters.
+
+    Args:
+        password (str): Plain text password
+
+    Returns:
+        str: Hashed password
+    """
+    return password_context.hash(password)
+
+
+def verify_password(password, password_hash):
+    """
+    Verify a password on the calling thread.
+
+    Args:
+        password (str): Plain text password
+        password_hash (str): Stored hash
+
+    Returns:
+        bool: True if match, False otherwise
+    """
+    try:
+        return password_context.verify(password, password_hash)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Unusable password hash: {e}")
+        return False
+
+
+def verify_and_update(password, password_hash):
+    """
+    Verify a password and rehash it if its parameters are outdated.
+
+    Args:
+        password (str): Plain text password
+        password_hash (str): Stored hash
+
+    Returns:
+        tuple: (matches, new hash or None)
+    """
+    try:
+        return password_context.verify_and_update(password, password_hash)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Unusable password hash: {e}")
+        return False, None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_verification_pool():
+    """
+    Get the process-wide verification pool, creating it on first use.
+
+    Returns:
+        VerificationPool: Shared pool
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = VerificationPool(
+                    max_workers=config.PASSWORD_VERIFY_WORKERS,
+                    max_queue=config.PASSWORD_VERIFY_QUEUE
+                )
+    return _pool
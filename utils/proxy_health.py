@@ -0,0 +1,241 @@
+"""
+Proxy health engine for Travian Whispers application.
+This module probes proxies concurrently with bounded parallelism and
+connection reuse, without touching the database.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Default probe URLs, checked in order
+DEFAULT_PROBE_URLS = [
+    "http://httpbin.org/ip",            # Returns IP info
+    "http://httpbin.org/status/200",    # Always returns 200
+    "https://www.google.com/robots.txt"  # Common stable URL
+]
+
+
+def build_proxy_url(ip):
+    """
+    Build the proxy URL for an IP document, including credentials.
+
+    Args:
+        ip (dict): IP document from the pool
+
+    Returns:
+        str: Proxy URL or None if the IP has no proxy URL
+    """
+    proxy_url = ip.get("proxy_url")
+    username = ip.get("username")
+    password = ip.get("password")
+
+    if not proxy_url:
+        return None
+
+    if username and password:
+        auth = f"{username}:{password}@"
+        if "://" in proxy_url:
+            protocol, address = proxy_url.split("://", 1)
+            proxy_url = f"{protocol}://{auth}{address}"
+        else:
+            proxy_url = f"http://{auth}{proxy_url}"
+
+    return proxy_url
+
+
+class ProxyHealthEngine:
+    """Runs proxy health probes on a bounded thread pool."""
+
+    def __init__(self, probe_urls=None, max_workers=32, proxy_deadline=20,
+                 probe_timeout=10, fail_fast=True):
+        """
+        Initialize ProxyHealthEngine.
+
+        Args:
+            probe_urls (list, optional): URLs to probe through each proxy
+            max_workers (int, optional): Maximum number of proxies checked at once
+            proxy_deadline (float, optional): Total seconds allowed per proxy
+            probe_timeout (float, optional): Timeout in seconds for a single probe
+            fail_fast (bool, optional): Stop probing a proxy after its first failure
+        """
+        self.probe_urls = list(probe_urls or DEFAULT_PROBE_URLS)
+        self.max_workers = max(1, int(max_workers))
+        self.proxy_deadline = proxy_deadline
+        self.probe_timeout = probe_timeout
+        self.fail_fast = fail_fast
+
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def _get_session(self):
+        """
+        Get the HTTP session for the current worker thread.
+
+        Returns:
+            requests.Session: Session with keep-alive connection pooling
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            # No automatic retries: a failing proxy should fail quickly
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        """Close all HTTP sessions opened by worker threads."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.debug(f"Error closing health check session: {e}")
+
+        self._local = threading.local()
+
+    def probe(self, ip):
+        """
+        Probe a single proxy against the configured URLs.
+
+        Args:
+            ip (dict): IP document from the pool
+
+        Returns:
+            dict: Health check results
+        """
+        ip_id = str(ip.get("_id"))
+        proxy_url = build_proxy_url(ip)
+
+        if not proxy_url:
+            return {
+                "ip_id": ip_id,
+                "ip_address": ip.get("ip_address"),
+                "success": False,
+                "error": "No proxy URL available",
+                "tests": []
+            }
+
+        proxy_dict = {
+            "http": proxy_url,
+            "https": proxy_url
+        }
+
+        session = self._get_session()
+        start = time.monotonic()
+        deadline = start + self.proxy_deadline
+        results = []
+        overall_success = True
+
+        for url in self.probe_urls:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                results.append({
+                    "url": url,
+                    "success": False,
+                    "error": f"Deadline of {self.proxy_deadline}s exceeded"
+                })
+                overall_success = False
+                break
+
+            try:
+                probe_start = time.monotonic()
+
+                # The timeout applies per socket operation, so cap it by the
+                # time left before the proxy deadline
+                response = session.get(
+                    url,
+                    proxies=proxy_dict,
+                    timeout=min(self.probe_timeout, remaining)
+                )
+
+                response_time = time.monotonic() - probe_start
+                success = response.status_code < 400
+
+                results.append({
+                    "url": url,
+                    "success": success,
+                    "status_code": response.status_code,
+                    "response_time": response_time
+                })
+
+                if not success:
+                    overall_success = False
+            except Exception as e:
+                results.append({
+                    "url": url,
+                    "success": False,
+                    "error": str(e)
+                })
+                overall_success = False
+
+            if not overall_success and self.fail_fast:
+                break
+
+        return {
+            "ip_id": ip_id,
+            "ip_address": ip.get("ip_address"),
+            "success": overall_success,
+            "tests": results,
+            "elapsed": time.monotonic() - start
+        }
+
+    def sweep(self, ips):
+        """
+        Probe a list of proxies concurrently.
+
+        Args:
+            ips (list): IP documents from the pool
+
+        Returns:
+            tuple: (results dict keyed by IP ID, wall-clock seconds)
+        """
+        results = {}
+        start = time.monotonic()
+
+        if not ips:
+            return results, 0.0
+
+        workers = min(self.max_workers, len(ips))
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix="proxy-health") as executor:
+                futures = {executor.submit(self.probe, ip): ip for ip in ips}
+
+                for future in as_completed(futures):
+                    ip = futures[future]
+                    ip_id = str(ip.get("_id"))
+                    try:
+                        results[ip_id] = future.result()
+                    except Exception as e:
+                        logger.error(f"Health probe crashed for IP {ip_id}: {e}")
+                        results[ip_id] = {
+                            "ip_id": ip_id,
+                            "ip_address": ip.get("ip_address"),
+                            "success": False,
+                            "error": str(e),
+                            "tests": []
+                        }
+        finally:
+            self.close()
+
+        elapsed = time.monotonic() - start
+        logger.info(f"Proxy health sweep checked {len(results)} proxies in "
+                    f"{elapsed:.2f}s with {workers} workers")
+
+        return results, elapsed
@@ -0,0 +1,230 @@
+"""
+Proxy health sweep benchmark for Travian Whispers.
+This module runs ProxyHealthEngine sweeps against a local HTTP proxy
+stand-in, so no real proxies or network access are needed, and reports
+the sweep time together with what the stand-in observed.
+
+The stand-in tells proxies apart by the username in their credentials
+and behaves accordingly:
+
+- ok: answers every probe after --delay seconds
+- fail: answers every probe with 502
+- slow: answers each probe after 0.6 x --deadline seconds, so only one
+  probe fits in the per-proxy deadline
+
+Each sweep is made twice: once serially without a per-proxy deadline or
+fail-fast (as before the engine) and once with --workers threads, the
+deadline and fail-fast. The report shows the highest number of proxies
+probed at once (bounded by the worker count), the requests failing
+proxies received (one each with fail-fast) and the longest time spent on
+a slow proxy (bounded by the deadline).
+
+Usage:
+    python -m utils.proxy_health_benchmark --proxies 32 --workers 8 --deadline 1
+"""
+import argparse
+import base64
+import logging
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.proxy_health import ProxyHealthEngine
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Probe URLs; the stand-in answers them itself instead of forwarding
+PROBE_URLS = [
+    "http://probe.invalid/ip",
+    "http://probe.invalid/status/200",
+    "http://probe.invalid/robots.txt"
+]
+
+
+class _ProxyStandIn(ThreadingHTTPServer):
+    """Local HTTP proxy that answers probes according to the proxy's username."""
+
+    daemon_threads = True
+
+    def __init__(self, delay, slow_delay):
+        """
+        Initialize the stand-in on a free local port.
+
+        Args:
+            delay (float): Response delay of healthy proxies
+            slow_delay (float): Response delay of slow proxies
+        """
+        super().__init__(("127.0.0.1", 0), _ProxyHandler)
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear the observations of the previous sweep."""
+        with self.lock:
+            self.requests = Counter()
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """Handles one proxied probe request."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Keep the report readable."""
+
+    def _proxy_name(self):
+        """Get the username from the Proxy-Authorization header."""
+        header = self.headers.get("Proxy-Authorization", "")
+        try:
+            return base64.b64decode(header.split(" ", 1)[1]).decode().split(":", 1)[0]
+        except Exception:
+            return "anonymous"
+
+    def do_GET(self):
+        """Answer a probe the way the requested proxy behaves."""
+        server = self.server
+        name = self._proxy_name()
+        kind = name.split("-", 1)[0]
+
+        with server.lock:
+            server.requests[name] += 1
+
+        try:
+            if kind == "fail":
+                status = 502
+            else:
+                time.sleep(server.slow_delay if kind == "slow" else server.delay)
+                status = 200
+
+            body = b"ok"
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The engine gave up on a slow probe
+            pass
+
+
+def build_pool(address, proxies, slow, failing):
+    """
+    Build IP documents pointing at the stand-in.
+
+    Args:
+        address (tuple): Host and port of the stand-in
+        proxies (int): Number of proxies in the pool
+        slow (int): How many of them are slow
+        failing (int): How many of them fail
+
+    Returns:
+        list: IP documents as stored in the pool
+    """
+    kinds = ["slow"] * slow + ["fail"] * failing
+    kinds += ["ok"] * max(0, proxies - len(kinds))
+
+    return [
+        {
+            "_id": f"{kind}-{index}",
+            "ip_address": f"10.0.0.{index}",
+            "proxy_url": f"http://{address[0]}:{address[1]}",
+            "username": f"{kind}-{index}",
+            "password": "secret"
+        }
+        for index, kind in enumerate(kinds[:proxies])
+    ]
+
+
+def run_benchmark(server, pool, engine):
+    """
+    Run one sweep and collect what the engine and the stand-in did.
+
+    Concurrency is counted around ProxyHealthEngine.probe rather than in
+    the stand-in, which keeps serving probes the engine gave up on.
+
+    Args:
+        server (_ProxyStandIn): Running stand-in
+        pool (list): IP documents to sweep
+        engine (ProxyHealthEngine): Engine under test
+
+    Returns:
+        dict: Sweep time, healthy count and observations
+    """
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+    probe = engine.probe
+
+    def counted_probe(ip):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return probe(ip)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    engine.probe = counted_probe
+    server.reset()
+    results, elapsed = engine.sweep(pool)
+
+    slow_elapsed = [r.get("elapsed", 0.0) for r in results.values() if r["ip_id"].startswith("slow")]
+    fail_requests = [count for name, count in server.requests.items() if name.startswith("fail")]
+
+    return {
+        "seconds": elapsed,
+        "healthy": sum(1 for r in results.values() if r["success"]),
+        "max_in_flight": in_flight["max"],
+        "max_fail_requests": max(fail_requests, default=0),
+        "max_slow_seconds": max(slow_elapsed, default=0.0)
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='Benchmark proxy health sweeps against a local stand-in')
+    parser.add_argument('--proxies', type=int, default=32, help='Proxies in the pool')
+    parser.add_argument('--slow', type=int, default=2, help='Slow proxies in the pool')
+    parser.add_argument('--failing', type=int, default=4, help='Failing proxies in the pool')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrency cap of the bounded run')
+    parser.add_argument('--deadline', type=float, default=1.0, help='Per-proxy deadline in seconds')
+    parser.add_argument('--delay', type=float, default=0.05, help='Response delay of healthy proxies')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    server = _ProxyStandIn(args.delay, args.deadline * 0.6)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    pool = build_pool(server.server_address, args.proxies, args.slow, args.failing)
+    runs = [
+        ('serial', ProxyHealthEngine(PROBE_URLS, max_workers=1, proxy_deadline=float('inf'),
+                                     probe_timeout=args.deadline, fail_fast=False)),
+        ('bounded', ProxyHealthEngine(PROBE_URLS, max_workers=args.workers, proxy_deadline=args.deadline,
+                                      probe_timeout=args.deadline, fail_fast=True))
+    ]
+
+    try:
+        print(f"{len(pool)} proxies ({args.slow} slow, {args.failing} failing), "
+              f"{len(PROBE_URLS)} probes each, deadline {args.deadline:g}s")
+        for name, engine in runs:
+            result = run_benchmark(server, pool, engine)
+            print(
+                f"{name:>8} ({engine.max_workers} workers): sweep {result['seconds']:.2f}s, "
+                f"healthy {result['healthy']}, "
+                f"at once {result['max_in_flight']}, "
+                f"requests per failing proxy {result['max_fail_requests']}, "
+                f"slowest slow proxy {result['max_slow_seconds']:.2f}s"
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
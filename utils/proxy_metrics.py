@@ -2,17 +2,507 @@
 Proxy Metrics module for Travian Whispers application.
 This module provides metrics collection and monitoring for proxy performance.
 """
+import atexit
 import logging
+import os
+import threading
 import time
 from datetime import datetime, timedelta
+from bson import ObjectId
 from flask import current_app
+from pymongo import UpdateOne
 from database.models.ip_pool import IPAddress
 from database.models.proxy_service import ProxyService
+from utils.proxy_health import ProxyHealthEngine, DEFAULT_PROBE_URLS
+from utils import latency_histogram
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 
+# Rollup granularities and how long each is kept
+GRANULARITY_MINUTE = 'minute'
+GRANULARITY_HOUR = 'hour'
+ROLLUP_RETENTION = {
+    GRANULARITY_MINUTE: timedelta(days=2),
+    GRANULARITY_HOUR: timedelta(days=90)
+}
+
+# Rollup scopes
+SCOPE_IP = 'ip'
+SCOPE_PROVIDER = 'provider'
+
+
+def bucket_start(timestamp, granularity):
+    """
+    Truncate a timestamp to the start of its rollup bucket.
+    
+    Args:
+        timestamp (datetime): Sample timestamp
+        granularity (str): Rollup granularity
+        
+    Returns:
+        datetime: Start of the bucket
+    """
+    if granularity == GRANULARITY_MINUTE:
+        return timestamp.replace(second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def granularity_for_window(window):
+    """
+    Pick the rollup granularity to read for a time window.
+    
+    Args:
+        window (timedelta): Length of the window
+        
+    Returns:
+        str: Rollup granularity
+    """
+    if window <= timedelta(hours=3):
+        return GRANULARITY_MINUTE
+    return GRANULARITY_HOUR
+
+
+# Error classes, matched in order against the error message; the message
+# itself never becomes a field name
+ERROR_CLASS_PATTERNS = [
+    ("timeout", ("timed out", "timeout", "deadline")),
+    ("proxy", ("proxyerror", "unable to connect to proxy", "tunnel connection failed")),
+    ("ssl", ("sslerror", "ssl:", "certificate")),
+    ("connection", ("connectionerror", "connection refused", "connection reset",
+                    "connection aborted", "failed to establish", "remotedisconnected",
+                    "name or service not known")),
+]
+
+
+def encode_error_key(error, status_code=None):
+    """
+    Classify a failed request into a bounded set of error names.
+    
+    Requests answered with an error status are counted per status code
+    (e.g. 'http_502'); other failures are counted as 'timeout', 'proxy',
+    'ssl', 'connection' or 'other', so error messages, which embed hosts
+    and ports, do not become rollup field names.
+    
+    Args:
+        error (str): Error message
+        status_code (int, optional): HTTP status code of the response
+        
+    Returns:
+        str: Error class, usable as a field name
+    """
+    if status_code is not None and status_code >= 400:
+        return f"http_{int(status_code)}"
+    
+    message = (error or "").lower()
+    for error_class, patterns in ERROR_CLASS_PATTERNS:
+        if any(pattern in message for pattern in patterns):
+            return error_class
+    return "other"
+
+
+def decode_error_key(key):
+    """
+    Turn an error_counts field name back into a readable error.
+    
+    Rollups written before errors were classified used the message,
+    with dots and dollar signs replaced by their full-width forms.
+    
+    Args:
+        key (str): Field name
+        
+    Returns:
+        str: Error class or message
+    """
+    return key.replace("\uff0e", ".").replace("\uff04", "$")
+
+
+class ProxyMetricsRecorder:
+    """Buffers proxy usage samples and writes them to MongoDB in batches."""
+    
+    def __init__(self, db, batch_size=500, flush_interval=5.0, ip_cache_ttl=300,
+                 failure_threshold=5):
+        """
+        Initialize ProxyMetricsRecorder.
+        
+        Args:
+            db: MongoDB database instance
+            batch_size (int, optional): Buffered samples that trigger a flush
+            flush_interval (float, optional): Seconds between background flushes
+            ip_cache_ttl (int, optional): Seconds to cache IP address/provider metadata
+            failure_threshold (int, optional): Failure count at which an IP is flagged
+        """
+        self.metrics_collection = db["proxyMetrics"]
+        self.rollup_collection = db["proxyMetricsRollups"]
+        self.ip_collection = db["ipAddresses"]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ip_cache_ttl = ip_cache_ttl
+        self.failure_threshold = failure_threshold
+        
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._samples = []
+        self._failures = {}
+        self._ip_cache = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the background flush thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="proxy-metrics-flush",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background flush thread and flush remaining samples."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+    
+    def _run(self):
+        """Flush buffered samples periodically until stopped."""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in proxy metrics flush thread: {e}")
+    
+    def record(self, ip_id, request_url, success, response_time=None,
+               status_code=None, error=None):
+        """
+        Buffer a proxy usage sample.
+        
+        Args:
+            ip_id (str): The IP ID
+            request_url (str): The URL that was requested
+            success (bool): Whether the request was successful
+            response_time (float, optional): Response time in seconds
+            status_code (int, optional): HTTP status code
+            error (str, optional): Error message if failed
+            
+        Returns:
+            bool: True if buffered
+        """
+        sample = {
+            "ip_id": ip_id,
+            "request_url": request_url,
+            "success": success,
+            "response_time": response_time,
+            "status_code": status_code,
+            "error": error,
+            "timestamp": datetime.utcnow()
+        }
+        
+        with self._lock:
+            self._samples.append(sample)
+            buffer_full = len(self._samples) >= self.batch_size
+        
+        if not success:
+            self.record_failure(ip_id, "request_failure",
+                                f"URL: {request_url}, Error: {error}")
+        
+        if buffer_full:
+            self.flush()
+        
+        return True
+    
+    def record_failure(self, ip_id, failure_type, failure_details=None):
+        """
+        Buffer a failure for an IP, to be applied on the next flush.
+        
+        Args:
+            ip_id (str): The IP ID
+            failure_type (str): Type of failure
+            failure_details (str, optional): Additional details
+        """
+        failure_record = {
+            "type": failure_type,
+            "details": failure_details,
+            "timestamp": datetime.utcnow()
+        }
+        
+        with self._lock:
+            self._failures.setdefault(ip_id, []).append(failure_record)
+    
+    def _resolve_ips(self, ip_ids):
+        """
+        Resolve IP address and provider for a set of IP IDs.
+        
+        Cached entries are served from memory; misses are loaded with a
+        single query.
+        
+        Args:
+            ip_ids (set): IP IDs to resolve
+            
+        Returns:
+            dict: Metadata by IP ID for IPs that exist
+        """
+        now = time.monotonic()
+        resolved = {}
+        missing = []
+        
+        for ip_id in ip_ids:
+            cached = self._ip_cache.get(ip_id)
+            if cached and cached[0] > now:
+                resolved[ip_id] = cached[1]
+            elif ObjectId.is_valid(ip_id):
+                missing.append(ObjectId(ip_id))
+        
+        if missing:
+            cursor = self.ip_collection.find(
+                {"_id": {"$in": missing}},
+                {"ip_address": 1, "provider": 1}
+            )
+            for ip in cursor:
+                ip_id = str(ip["_id"])
+                metadata = {
+                    "ip_address": ip.get("ip_address"),
+                    "provider": ip.get("provider")
+                }
+                self._ip_cache[ip_id] = (now + self.ip_cache_ttl, metadata)
+                resolved[ip_id] = metadata
+        
+        return resolved
+    
+    def invalidate_ip(self, ip_id):
+        """
+        Drop cached metadata for an IP.
+        
+        Args:
+            ip_id (str): The IP ID
+        """
+        self._ip_cache.pop(ip_id, None)
+    
+    def flush(self):
+        """
+        Write buffered samples and coalesced failure counts to MongoDB.
+        
+        Samples go out in one insert_many and are folded into per-IP and
+        per-provider rollups with one bulk upsert; failures become one
+        update per IP in a single bulk write, followed by one update
+        flagging IPs that crossed the failure threshold.
+        
+        Returns:
+            int: Number of samples written
+        """
+        with self._flush_lock:
+            with self._lock:
+                samples, self._samples = self._samples, []
+                failures, self._failures = self._failures, {}
+            
+            if not samples and not failures:
+                return 0
+            
+            metadata = self._resolve_ips({s["ip_id"] for s in samples} | set(failures))
+            
+            documents = []
+            for sample in samples:
+                ip_metadata = metadata.get(sample["ip_id"])
+                if ip_metadata is None:
+                    continue
+                sample.update(ip_metadata)
+                documents.append(sample)
+            
+            dropped = len(samples) - len(documents)
+            if dropped:
+                logger.warning(f"Dropped {dropped} proxy metrics samples for unknown IPs")
+            
+            written = 0
+            try:
+                if documents:
+                    result = self.metrics_collection.insert_many(documents, ordered=False)
+                    written = len(result.inserted_ids)
+            except Exception as e:
+                logger.error(f"Failed to write proxy metrics batch: {e}")
+            
+            self._apply_rollups(documents)
+            self._apply_failures(failures, metadata)
+            
+            return written
+    
+    def _apply_rollups(self, samples):
+        """
+        Fold samples into rollup documents with $inc upserts.
+        
+        Increments are summed in memory first, so each (scope, key,
+        granularity, bucket) gets a single update per flush.
+        
+        Args:
+            samples (list): Samples with resolved IP metadata
+        """
+        rollups = {}
+        
+        for sample in samples:
+            targets = [(SCOPE_IP, sample["ip_id"])]
+            if sample.get("provider"):
+                targets.append((SCOPE_PROVIDER, sample["provider"]))
+            
+            for granularity in ROLLUP_RETENTION:
+                bucket = bucket_start(sample["timestamp"], granularity)
+                
+                for scope, key in targets:
+                    rollup = rollups.get((scope, key, granularity, bucket))
+                    if rollup is None:
+                        rollup = rollups[(scope, key, granularity, bucket)] = {
+                            "inc": {},
+                            "last_used": sample["timestamp"],
+                            "ip_address": sample.get("ip_address"),
+                            "provider": sample.get("provider")
+                        }
+                    
+                    inc = rollup["inc"]
+                    inc["requests"] = inc.get("requests", 0) + 1
+                    
+                    if sample["success"]:
+                        inc["successes"] = inc.get("successes", 0) + 1
+                    else:
+                        inc["errors"] = inc.get("errors", 0) + 1
+                        error_key = encode_error_key(sample.get("error"), sample.get("status_code"))
+                        error_field = f"error_counts.{error_key}"
+                        inc[error_field] = inc.get(error_field, 0) + 1
+                    
+                    if sample.get("response_time") is not None:
+                        hist_field = f"latency_hist.{latency_histogram.bucket_index(sample['response_time'])}"
+                        inc["latency_sum"] = inc.get("latency_sum", 0) + sample["response_time"]
+                        inc["latency_count"] = inc.get("latency_count", 0) + 1
+                        inc[hist_field] = inc.get(hist_field, 0) + 1
+                    
+                    rollup["last_used"] = max(rollup["last_used"], sample["timestamp"])
+        
+        if not rollups:
+            return
+        
+        operations = []
+        for (scope, key, granularity, bucket), rollup in rollups.items():
+            set_fields = {"expires_at": bucket + ROLLUP_RETENTION[granularity]}
+            if scope == SCOPE_IP:
+                set_fields["ip_address"] = rollup["ip_address"]
+            set_fields["provider"] = rollup["provider"]
+            
+            operations.append(UpdateOne(
+                {
+                    "scope": scope,
+                    "key": key,
+                    "granularity": granularity,
+                    "bucket": bucket
+                },
+                {
+                    "$inc": rollup["inc"],
+                    "$max": {"last_used": rollup["last_used"]},
+                    "$set": set_fields
+                },
+                upsert=True
+            ))
+        
+        try:
+            self.rollup_collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update proxy metrics rollups: {e}")
+    
+    def _apply_failures(self, failures, metadata):
+        """
+        Apply coalesced failure counts to the IP pool.
+        
+        Args:
+            failures (dict): Failure records by IP ID
+            metadata (dict): Resolved metadata by IP ID
+        """
+        now = datetime.utcnow()
+        operations = []
+        failed_ids = []
+        
+        for ip_id, records in failures.items():
+            if ip_id not in metadata:
+                continue
+            
+            failed_ids.append(ObjectId(ip_id))
+            operations.append(UpdateOne(
+                {"_id": ObjectId(ip_id)},
+                {
+                    "$inc": {"failure_count": len(records)},
+                    "$push": {"failures": {"$each": records}},
+                    "$set": {"updated_at": now}
+                }
+            ))
+        
+        if not operations:
+            return
+        
+        try:
+            self.ip_collection.bulk_write(operations, ordered=False)
+            
+            # Flag IPs that crossed the threshold and unassign their users
+            flagged = self.ip_collection.update_many(
+                {
+                    "_id": {"$in": failed_ids},
+                    "failure_count": {"$gte": self.failure_threshold},
+                    "status": {"$nin": [IPAddress.STATUS_FLAGGED, IPAddress.STATUS_BANNED]}
+                },
+                {
+                    "$set": {
+                        "status": IPAddress.STATUS_FLAGGED,
+                        "status_reason": f"Exceeded failure threshold ({self.failure_threshold})",
+                        "current_users": 0,
+                        "assigned_users": [],
+                        "updated_at": now
+                    }
+                }
+            )
+            
+            if flagged.modified_count:
+                logger.info(f"Flagged {flagged.modified_count} IPs after exceeding failure threshold")
+        except Exception as e:
+            logger.error(f"Failed to apply proxy failure counts: {e}")
+
+
+_recorder = None
+_recorder_pid = None
+_recorder_lock = threading.Lock()
+
+
+def get_metrics_recorder(db):
+    """
+    Get the process-wide proxy metrics recorder, creating it if needed.
+    
+    The recorder is recreated after a fork so each worker process owns
+    its own buffer and flush thread.
+    
+    Args:
+        db: MongoDB database instance
+        
+    Returns:
+        ProxyMetricsRecorder: Shared recorder
+    """
+    global _recorder, _recorder_pid
+    
+    with _recorder_lock:
+        if _recorder is None or _recorder_pid != os.getpid():
+            config = current_app.config
+            _recorder = ProxyMetricsRecorder(
+                db,
+                batch_size=config.get('PROXY_METRICS_BATCH_SIZE', 500),
+                flush_interval=config.get('PROXY_METRICS_FLUSH_INTERVAL', 5),
+                ip_cache_ttl=config.get('PROXY_METRICS_IP_CACHE_TTL', 300),
+                failure_threshold=config.get('IP_FAILURE_THRESHOLD', 5)
+            )
+            _recorder_pid = os.getpid()
+            _recorder.start()
+            atexit.register(_recorder.stop)
+        
+        return _recorder
+
+
 class ProxyMetrics:
     """Collects and analyzes proxy performance metrics."""
     
@@ -21,15 +511,22 @@ class ProxyMetrics:
         self.ip_pool = IPAddress()
         self.proxy_service = ProxyService()
         self.metrics_collection = None
+        self.rollup_collection = None
+        self.recorder = None
         
         if hasattr(current_app, 'db'):
             self.db = current_app.db.get_db()
             self.metrics_collection = self.db["proxyMetrics"]
+            self.rollup_collection = self.db["proxyMetricsRollups"]
+            self.recorder = get_metrics_recorder(self.db)
     
     def record_proxy_usage(self, ip_id, request_url, success, response_time=None, status_code=None, error=None):
         """
         Record proxy usage metrics.
         
+        The sample is buffered by the shared recorder and written with
+        the next batch; failures are counted against the IP at flush.
+        
         Args:
             ip_id (str): The IP ID
             request_url (str): The URL that was requested
@@ -41,52 +538,41 @@ class ProxyMetrics:
         Returns:
             bool: True if recorded, False otherwise
         """
-        if self.metrics_collection is None:
+        if self.recorder is None:
             logger.error("Database not connected")
             return False
         
-        # Get IP details
-        ip = self.ip_pool.get_ip(ip_id)
-        if not ip:
-            logger.warning(f"IP with ID {ip_id} not found")
-            return False
-        
-        # Prepare metrics data
-        metrics_data = {
-            "ip_id": ip_id,
-            "ip_address": ip.get("ip_address"),
-            "provider": ip.get("provider"),
-            "request_url": request_url,
-            "success": success,
-            "response_time": response_time,
-            "status_code": status_code,
-            "error": error,
-            "timestamp": datetime.utcnow()
-        }
-        
         try:
-            # Insert metrics record
-            result = self.metrics_collection.insert_one(metrics_data)
-            
-            if result.inserted_id:
-                # Update IP success/failure stats
-                if not success:
-                    self.ip_pool.report_ip_failure(
-                        ip_id,
-                        "request_failure",
-                        f"URL: {request_url}, Error: {error}"
-                    )
-                
-                return True
-            return False
+            return self.recorder.record(
+                ip_id,
+                request_url,
+                success,
+                response_time,
+                status_code,
+                error
+            )
         except Exception as e:
             logger.error(f"Failed to record proxy metrics: {e}")
             return False
     
+    def flush(self):
+        """
+        Write buffered metrics to the database immediately.
+        
+        Returns:
+            int: Number of samples written
+        """
+        if self.recorder is None:
+            return 0
+        
+        return self.recorder.flush()
+    
     def get_provider_metrics(self, provider_id=None, days=7):
         """
         Get performance metrics for a proxy provider.
         
+        Reads per-provider rollups only; raw samples are not scanned.
+        
         Args:
             provider_id (str, optional): Provider ID, or all if None
             days (int, optional): Number of days to analyze
@@ -94,7 +580,7 @@ class ProxyMetrics:
         Returns:
             dict: Provider performance metrics
         """
-        if self.metrics_collection is None:
+        if self.rollup_collection is None:
             logger.error("Database not connected")
             return {}
         
@@ -107,64 +593,58 @@ class ProxyMetrics:
             else:
                 providers = self.proxy_service.list_providers()
             
-            start_date = datetime.utcnow() - timedelta(days=days)
+            providers = [provider for provider in providers if provider]
+            provider_names = [provider.get("name") for provider in providers]
+            
+            window = timedelta(days=days)
+            granularity = granularity_for_window(window)
+            start_bucket = bucket_start(datetime.utcnow() - window, granularity)
+            
+            # Totals per provider
+            pipeline = [
+                {
+                    "$match": {
+                        "scope": SCOPE_PROVIDER,
+                        "key": {"$in": provider_names},
+                        "granularity": granularity,
+                        "bucket": {"$gte": start_bucket}
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": "$key",
+                        "total_requests": {"$sum": "$requests"},
+                        "total_successes": {"$sum": "$successes"},
+                        "latency_sum": {"$sum": "$latency_sum"},
+                        "latency_count": {"$sum": "$latency_count"},
+                        "latency_hist": {"$push": "$latency_hist"},
+                        "error_counts": {"$push": "$error_counts"}
+                    }
+                }
+            ]
+            totals = {result["_id"]: result for result in self.rollup_collection.aggregate(pipeline)}
+            
+            # Number of IPs that served requests per provider
+            pipeline = [
+                {
+                    "$match": {
+                        "scope": SCOPE_IP,
+                        "provider": {"$in": provider_names},
+                        "granularity": granularity,
+                        "bucket": {"$gte": start_bucket}
+                    }
+                },
+                {"$group": {"_id": {"provider": "$provider", "ip_id": "$key"}}},
+                {"$group": {"_id": "$_id.provider", "ip_count": {"$sum": 1}}}
+            ]
+            ip_counts = {result["_id"]: result["ip_count"] for result in self.rollup_collection.aggregate(pipeline)}
             
             for provider in providers:
-                if not provider:
-                    continue
-                
                 provider_name = provider.get("name")
                 provider_id = str(provider.get("_id"))
+                result = totals.get(provider_name)
                 
-                # Get IPs for this provider
-                ips = self.ip_pool.list_ips(provider=provider_name)
-                ip_ids = [str(ip.get("_id")) for ip in ips]
-                
-                # Query metrics for these IPs
-                pipeline = [
-                    {
-                        "$match": {
-                            "ip_id": {"$in": ip_ids},
-                            "timestamp": {"$gte": start_date}
-                        }
-                    },
-                    {
-                        "$group": {
-                            "_id": "$ip_id",
-                            "requests": {"$sum": 1},
-                            "successes": {"$sum": {"$cond": ["$success", 1, 0]}},
-                            "avg_response_time": {"$avg": "$response_time"},
-                            "errors": {
-                                "$push": {
-                                    "$cond": [
-                                        {"$eq": ["$success", False]},
-                                        {
-                                            "error": "$error",
-                                            "url": "$request_url",
-                                            "timestamp": "$timestamp"
-                                        },
-                                        "$$REMOVE"
-                                    ]
-                                }
-                            }
-                        }
-                    },
-                    {
-                        "$group": {
-                            "_id": None,
-                            "total_requests": {"$sum": "$requests"},
-                            "total_successes": {"$sum": "$successes"},
-                            "avg_response_time": {"$avg": "$avg_response_time"},
-                            "ip_count": {"$sum": 1},
-                            "errors": {"$push": "$errors"}
-                        }
-                    }
-                ]
-                
-                results = list(self.metrics_collection.aggregate(pipeline))
-                
-                if results:
-                    result = results[0]
+                if result:
                     total_requests = result.get("total_requests", 0)
                     total_successes = result.get("total_successes", 0)
                     
@@ -172,19 +652,21 @@ class ProxyMetrics:
                     if total_requests > 0:
                         success_rate = (total_successes / total_requests) * 100
                     
-                    # Flatten errors array
-                    errors = []
-                    for error_group in result.get("errors", []):
-                        errors.extend(error_group)
+                    avg_response_time = None
+                    if result.get("latency_count"):
+                        avg_response_time = result["latency_sum"] / result["latency_count"]
                     
-                    # Get most common errors
+                    # Merge latency histograms across buckets
+                    latency = latency_histogram.percentiles(
+                        latency_histogram.merge(result.get("latency_hist", []))
+                    )
+                    
+                    # Merge error counts across buckets
                     error_counts = {}
-                    for error in errors:
-                        error_msg = error.get("error", "Unknown")
-                        if error_msg in error_counts:
-                            error_counts[error_msg] += 1
-                        else:
-                            error_counts[error_msg] = 1
+                    for bucket_errors in result.get("error_counts", []):
+                        for key, count in (bucket_errors or {}).items():
+                            error_msg = decode_error_key(key)
+                            error_counts[error_msg] = error_counts.get(error_msg, 0) + count
                     
                     # Sort errors by count
                     common_errors = sorted(
@@ -197,8 +679,11 @@ class ProxyMetrics:
                         "provider_name": provider_name,
                         "total_requests": total_requests,
                         "success_rate": success_rate,
-                        "avg_response_time": result.get("avg_response_time"),
-                        "ip_count": result.get("ip_count", 0),
+                        "avg_response_time": avg_response_time,
+                        "p50_response_time": latency["p50"],
+                        "p95_response_time": latency["p95"],
+                        "p99_response_time": latency["p99"],
+                        "ip_count": ip_counts.get(provider_name, 0),
                         "common_errors": common_errors
                     }
                 else:
@@ -207,7 +692,10 @@ class ProxyMetrics:
                         "total_requests": 0,
                         "success_rate": 0,
                         "avg_response_time": 0,
-                        "ip_count": len(ips),
+                        "p50_response_time": None,
+                        "p95_response_time": None,
+                        "p99_response_time": None,
+                        "ip_count": self.ip_pool.collection.count_documents({"provider": provider_name}),
                         "common_errors": []
                     }
             
@@ -220,35 +708,43 @@ class ProxyMetrics:
         """
         Get health metrics for all IPs.
         
+        Reads per-IP rollups only; raw samples are not scanned.
+        
         Args:
             days (int, optional): Number of days to analyze
             
         Returns:
             dict: IP health metrics
         """
-        if self.metrics_collection is None:
+        if self.rollup_collection is None:
             logger.error("Database not connected")
             return {}
         
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
+            window = timedelta(days=days)
+            granularity = granularity_for_window(window)
+            start_bucket = bucket_start(datetime.utcnow() - window, granularity)
             
-            # Query metrics for all IPs
+            # Query rollups for all IPs
             pipeline = [
                 {
                     "$match": {
-                        "timestamp": {"$gte": start_date}
+                        "scope": SCOPE_IP,
+                        "granularity": granularity,
+                        "bucket": {"$gte": start_bucket}
                     }
                 },
                 {
                     "$group": {
-                        "_id": "$ip_id",
-                        "ip_address": {"$first": "$ip_address"},
-                        "provider": {"$first": "$provider"},
-                        "requests": {"$sum": 1},
-                        "successes": {"$sum": {"$cond": ["$success", 1, 0]}},
-                        "avg_response_time": {"$avg": "$response_time"},
-                        "last_used": {"$max": "$timestamp"}
+                        "_id": "$key",
+                        "ip_address": {"$last": "$ip_address"},
+                        "provider": {"$last": "$provider"},
+                        "requests": {"$sum": "$requests"},
+                        "successes": {"$sum": "$successes"},
+                        "latency_sum": {"$sum": "$latency_sum"},
+                        "latency_count": {"$sum": "$latency_count"},
+                        "latency_hist": {"$push": "$latency_hist"},
+                        "last_used": {"$max": "$last_used"}
                     }
                 },
                 {
@@ -257,8 +753,15 @@ class ProxyMetrics:
                         "provider": 1,
                         "requests": 1,
                         "successes": 1,
-                        "avg_response_time": 1,
                         "last_used": 1,
+                        "latency_hist": 1,
+                        "avg_response_time": {
+                            "$cond": [
+                                {"$eq": ["$latency_count", 0]},
+                                None,
+                                {"$divide": ["$latency_sum", "$latency_count"]}
+                            ]
+                        },
                         "success_rate": {
                             "$cond": [
                                 {"$eq": ["$requests", 0]},
@@ -273,7 +776,7 @@ class ProxyMetrics:
                 }
             ]
             
-            results = list(self.metrics_collection.aggregate(pipeline))
+            results = list(self.rollup_collection.aggregate(pipeline))
             
             # Get current IP status
             all_ips = {str(ip.get("_id")): ip for ip in self.ip_pool.list_ips()}
@@ -281,6 +784,15 @@ class ProxyMetrics:
             # Combine metrics with current status
             for result in results:
                 ip_id = result.get("_id")
+                
+                # Merge latency histograms across buckets
+                latency = latency_histogram.percentiles(
+                    latency_histogram.merge(result.pop("latency_hist", []))
+                )
+                result["p50_response_time"] = latency["p50"]
+                result["p95_response_time"] = latency["p95"]
+                result["p99_response_time"] = latency["p99"]
+                
                 if ip_id in all_ips:
                     result["status"] = all_ips[ip_id].get("status")
                     result["current_users"] = all_ips[ip_id].get("current_users")
@@ -301,7 +813,7 @@ class ProxyMetrics:
     
     def create_indexes(self):
         """
-        Create necessary indexes for the metrics collection.
+        Create necessary indexes for the metrics and rollup collections.
         
         Returns:
             bool: True if indexes created, False otherwise
@@ -314,8 +826,14 @@ class ProxyMetrics:
             # Index on IP ID for quick lookups
             self.metrics_collection.create_index("ip_id")
             
-            # Index on timestamp for time-based queries
-            self.metrics_collection.create_index("timestamp")
+            # TTL index on timestamp; analytics read the rollups, so raw
+            # samples only need to live long enough for debugging
+            retention_days = current_app.config.get('PROXY_METRICS_RAW_RETENTION_DAYS', 3)
+            expire_after = int(retention_days * 86400)
+            timestamp_index = self.metrics_collection.index_information().get("timestamp_1")
+            if timestamp_index and timestamp_index.get("expireAfterSeconds") != expire_after:
+                self.metrics_collection.drop_index("timestamp_1")
+            self.metrics_collection.create_index("timestamp", expireAfterSeconds=expire_after)
             
             # Compound index for provider and success queries
             self.metrics_collection.create_index([
@@ -324,7 +842,33 @@ class ProxyMetrics:
                 ("timestamp", -1)
             ])
             
-            logger.info("Created indexes for proxy metrics collection")
+            # One rollup document per scope, key and bucket
+            self.rollup_collection.create_index([
+                ("scope", 1),
+                ("key", 1),
+                ("granularity", 1),
+                ("bucket", 1)
+            ], unique=True)
+            
+            # Window scans across all IPs or providers
+            self.rollup_collection.create_index([
+                ("scope", 1),
+                ("granularity", 1),
+                ("bucket", 1)
+            ])
+            
+            # Per-provider IP rollups
+            self.rollup_collection.create_index([
+                ("scope", 1),
+                ("provider", 1),
+                ("granularity", 1),
+                ("bucket", 1)
+            ])
+            
+            # Expire rollups once their retention has passed
+            self.rollup_collection.create_index("expires_at", expireAfterSeconds=0)
+            
+            logger.info("Created indexes for proxy metrics collections")
             return True
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
@@ -339,6 +883,50 @@ class ProxyHealthCheck:
         self.ip_pool = IPAddress()
         self.proxy_service = ProxyService()
         self.metrics = ProxyMetrics()
+        self.last_sweep = None
+    
+    def _build_engine(self):
+        """
+        Build a health engine from the application configuration.
+        
+        Returns:
+            ProxyHealthEngine: Configured health engine
+        """
+        config = current_app.config
+        
+        return ProxyHealthEngine(
+            probe_urls=config.get('PROXY_HEALTH_PROBE_URLS') or DEFAULT_PROBE_URLS,
+            max_workers=config.get('PROXY_HEALTH_CONCURRENCY', 32),
+            proxy_deadline=config.get('PROXY_HEALTH_DEADLINE', 20),
+            probe_timeout=config.get('PROXY_HEALTH_PROBE_TIMEOUT', 10),
+            fail_fast=config.get('PROXY_HEALTH_FAIL_FAST', True)
+        )
+    
+    def _record_health_result(self, ip_id, result):
+        """
+        Record metrics and failures for a health check result.
+        
+        Args:
+            ip_id (str): The IP ID
+            result (dict): Result returned by the health engine
+        """
+        for test in result.get("tests", []):
+            self.metrics.record_proxy_usage(
+                ip_id,
+                test.get("url"),
+                test.get("success", False),
+                test.get("response_time"),
+                test.get("status_code"),
+                test.get("error")
+            )
+        
+        # Update IP status based on health check
+        if not result.get("success") and self.metrics.recorder is not None:
+            self.metrics.recorder.record_failure(
+                ip_id,
+                "health_check_failure",
+                f"Failed health check: {result.get('tests') or result.get('error')}"
+            )
     
     def check_proxy_health(self, ip_id):
         """
@@ -359,106 +947,34 @@ class ProxyHealthCheck:
                 "error": "IP not found"
             }
         
-        import requests
-        
-        proxy_url = ip.get("proxy_url")
-        username = ip.get("username")
-        password = ip.get("password")
-        
-        if not proxy_url:
+        if not ip.get("proxy_url"):
             return {
                 "success": False,
                 "error": "No proxy URL available"
             }
         
-        # Create proxy dictionary
-        proxy_dict = {}
-        
-        if username and password:
-            auth = f"{username}:{password}@"
-            if "://" in proxy_url:
-                protocol, address = proxy_url.split("://", 1)
-                proxy_url = f"{protocol}://{auth}{address}"
-            else:
-                proxy_url = f"http://{auth}{proxy_url}"
-        
-        proxy_dict = {
-            "http": proxy_url,
-            "https": proxy_url
-        }
-        
-        # Try several test URLs
-        test_urls = [
-            "http://httpbin.org/ip",            # Returns IP info
-            "http://httpbin.org/status/200",    # Always returns 200
-            "https://www.google.com/robots.txt"  # Common stable URL
-        ]
-        
-        results = []
-        overall_success = True
-        
-        for url in test_urls:
-            try:
-                start_time = time.time()
-                
-                # Set a reasonable timeout
-                response = requests.get(url, proxies=proxy_dict, timeout=10)
-                
-                response_time = time.time() - start_time
-                
-                results.append({
-                    "url": url,
-                    "success": response.status_code < 400,
-                    "status_code": response.status_code,
-                    "response_time": response_time
-                })
-                
-                # Record metrics
-                self.metrics.record_proxy_usage(
-                    ip_id,
-                    url,
-                    response.status_code < 400,
-                    response_time,
-                    response.status_code
-                )
-                
-                if response.status_code >= 400:
-                    overall_success = False
-                
-            except Exception as e:
-                results.append({
-                    "url": url,
-                    "success": False,
-                    "error": str(e)
-                })
-                
-                # Record failure
-                self.metrics.record_proxy_usage(
-                    ip_id,
-                    url,
-                    False,
-                    error=str(e)
-                )
-                
-                overall_success = False
+        engine = self._build_engine()
+        try:
+            result = engine.probe(ip)
+        finally:
+            engine.close()
         
-        # Update IP status based on health check
-        if not overall_success:
-            self.ip_pool.report_ip_failure(
-                ip_id,
-                "health_check_failure",
-                f"Failed health check: {results}"
-            )
+        self._record_health_result(ip_id, result)
+        self.metrics.flush()
         
         return {
             "ip_address": ip.get("ip_address"),
-            "success": overall_success,
-            "tests": results
+            "success": result["success"],
+            "tests": result["tests"]
         }
     
     def check_all_proxies(self, status=None):
         """
-        Check health of all proxies.
+        Check health of all proxies concurrently.
+        
+        Probes run on the health engine's thread pool; metrics and
+        failures are recorded afterwards on the calling thread, which
+        holds the application context.
         
         Args:
             status (str, optional): Only check IPs with this status
@@ -466,37 +982,65 @@ class ProxyHealthCheck:
         Returns:
             dict: Health check results by IP
         """
-        ips = self.ip_pool.list_ips(status=status)
+        ips = [ip for ip in self.ip_pool.list_ips(status=status) if ip.get("proxy_url")]
+        
+        engine = self._build_engine()
+        probe_results, elapsed = engine.sweep(ips)
+        
         results = {}
+        for ip_id, result in probe_results.items():
+            self._record_health_result(ip_id, result)
+            results[ip_id] = {
+                "ip_address": result.get("ip_address"),
+                "success": result["success"],
+                "tests": result["tests"]
+            }
+        
+        # Write samples and failure counts before failing-proxy handling reads them
+        self.metrics.flush()
         
-        for ip in ips:
-            ip_id = str(ip.get("_id"))
-            results[ip_id] = self.check_proxy_health(ip_id)
+        healthy = sum(1 for result in results.values() if result["success"])
+        self.last_sweep = {
+            "checked": len(results),
+            "healthy": healthy,
+            "duration": elapsed,
+            "completed_at": datetime.utcnow()
+        }
+        
+        logger.info(f"Checked {len(results)} proxies in {elapsed:.2f}s: "
+                    f"{healthy} healthy, {len(results) - healthy} failing")
         
         return results
     
-    def handle_failing_proxies(self, threshold=50):
+    def handle_failing_proxies(self, threshold=50, p95_threshold=None):
         """
-        Handle failing proxies based on success rate.
+        Handle failing proxies based on success rate and tail latency.
         
         Args:
             threshold (int, optional): Success rate threshold percentage
+            p95_threshold (float, optional): p95 latency in seconds above which
+                a proxy is demoted; defaults to PROXY_P95_LATENCY_THRESHOLD
             
         Returns:
             dict: Actions taken
         """
+        if p95_threshold is None:
+            p95_threshold = current_app.config.get('PROXY_P95_LATENCY_THRESHOLD')
+        
         # Get IP health metrics
         ip_health = self.metrics.get_ip_health(days=1)
         
         actions = {
             "flagged": [],
             "banned": [],
-            "rotated": []
+            "rotated": [],
+            "demoted": []
         }
         
         for ip in ip_health:
             ip_id = ip.get("_id")
             success_rate = ip.get("success_rate", 0)
+            p95 = ip.get("p95_response_time")
             
             # Skip IPs with no requests
             if ip.get("requests", 0) < 10:
@@ -543,11 +1087,28 @@ class ProxyHealthCheck:
                                 "ip_address": ip.get("ip_address"),
                                 "success_rate": success_rate
                             })
+            elif p95_threshold and p95 is not None and p95 > p95_threshold:
+                # Reliable but slow in the tail, take it out of rotation
+                if ip.get("status") in [IPAddress.STATUS_FLAGGED, IPAddress.STATUS_BANNED]:
+                    continue
+                
+                if self.ip_pool.update_ip_status(
+                    ip_id,
+                    IPAddress.STATUS_FLAGGED,
+                    f"High p95 latency: {p95:.2f}s"
+                ):
+                    actions["demoted"].append({
+                        "ip_id": ip_id,
+                        "ip_address": ip.get("ip_address"),
+                        "success_rate": success_rate,
+                        "p95_response_time": p95
+                    })
         
         # Log actions
         logger.info(f"Proxy health handling: "
                     f"{len(actions['banned'])} banned, "
                     f"{len(actions['flagged'])} flagged, "
-                    f"{len(actions['rotated'])} rotated")
+                    f"{len(actions['rotated'])} rotated, "
+                    f"{len(actions['demoted'])} demoted for latency")
         
-        return actions
\ No newline at end of file
+        return actions
@@ -0,0 +1,170 @@
+"""
+Session store benchmark for Travian Whispers.
+This module compares request latency with the filesystem session store
+and with the MongoDB store (with and without its in-memory tier) under
+concurrent users. Each simulated user logs in once and then makes
+requests that read the session, a few of which modify it.
+
+The MongoDB runs use the configured database and a scratch collection
+that is dropped afterwards.
+
+Usage:
+    python -m utils.session_benchmark --users 16 --requests 200
+"""
+import argparse
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import Flask, session
+from flask_session import Session
+
+from web.utils.session_interface import TieredMongoDBSessionInterface
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, fraction):
+    """Get a percentile of a list of numbers, 0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def build_app(store, client=None, db_name=None, collection=None, local_cache_ttl=0, file_dir=None):
+    """
+    Build a minimal application using one session store.
+
+    Args:
+        store (str): 'filesystem' or 'mongodb'
+        client (MongoClient, optional): MongoDB client for the mongodb store
+        db_name (str, optional): Database name
+        collection (str, optional): Session collection
+        local_cache_ttl (int, optional): In-memory tier lifetime in seconds
+        file_dir (str, optional): Directory of the filesystem store
+
+    Returns:
+        Flask: Application with /login, / and /flash routes
+    """
+    app = Flask(__name__)
+    app.secret_key = uuid.uuid4().hex
+    app.config.update(SESSION_TYPE='filesystem', SESSION_FILE_DIR=file_dir, SESSION_PERMANENT=False)
+
+    if store == 'filesystem':
+        Session(app)
+    else:
+        app.session_interface = TieredMongoDBSessionInterface(
+            app, client=client, db=db_name, collection=collection,
+            local_cache_ttl=local_cache_ttl, permanent=False
+        )
+
+    @app.route('/login')
+    def login():
+        session['user_id'] = uuid.uuid4().hex
+        session['role'] = 'user'
+        return 'ok'
+
+    @app.route('/')
+    def index():
+        return session.get('user_id', '-')
+
+    @app.route('/flash')
+    def flash_message():
+        session['notice'] = time.time()
+        return 'ok'
+
+    return app
+
+
+def run_benchmark(app, users, requests, write_every=10):
+    """
+    Make requests from concurrent users.
+
+    Args:
+        app (Flask): Application under test
+        users (int): Concurrent users, one thread each
+        requests (int): Requests per user
+        write_every (int, optional): Every n-th request modifies the session
+
+    Returns:
+        dict: Total time and latencies in milliseconds
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def user():
+        client = app.test_client()
+        client.get('/login')
+        mine = []
+        for i in range(requests):
+            path = '/flash' if i % write_every == write_every - 1 else '/'
+            started = time.perf_counter()
+            client.get(path)
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'seconds': time.perf_counter() - started,
+        'p50_ms': _percentile(latencies, 0.5) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='Compare session store latency under concurrent users')
+    parser.add_argument('--users', type=int, default=16, help='Concurrent users')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per user')
+    parser.add_argument('--tier-ttl', type=int, default=5, help='In-memory tier lifetime for the tiered run')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    from database.mongodb import MongoDB
+    from web.app import create_app
+
+    web_app = create_app()
+    mongodb = MongoDB()
+    collection = f"sessionBenchmark_{uuid.uuid4().hex[:8]}"
+    file_dir = tempfile.mkdtemp(prefix='session_benchmark_')
+
+    runs = [
+        ('filesystem', dict(store='filesystem', file_dir=file_dir)),
+        ('mongodb', dict(store='mongodb', local_cache_ttl=0)),
+        (f'mongodb + tier {args.tier_ttl}s', dict(store='mongodb', local_cache_ttl=args.tier_ttl))
+    ]
+
+    if mongodb.get_db() is None:
+        print("MongoDB is not reachable, only the filesystem store is measured")
+        runs = runs[:1]
+
+    try:
+        print(f"{args.users} users, {args.requests} requests each")
+        for name, options in runs:
+            if options['store'] == 'mongodb':
+                options.update(client=mongodb.client, db_name=web_app.config.get('MONGODB_DB_NAME'),
+                               collection=collection, file_dir=file_dir)
+            result = run_benchmark(build_app(**options), args.users, args.requests)
+            print(f"{name:>20}: total {result['seconds']:.2f}s, "
+                  f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms")
+    finally:
+        if mongodb.db is not None:
+            mongodb.db.drop_collection(collection)
+        shutil.rmtree(file_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
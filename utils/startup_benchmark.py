@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark for Travian Whispers.
+This module starts fresh interpreters the way the deployment does and
+reports how long each takes, with the slowest imports from
+`python -X importtime` and any heavy module that was loaded although the
+process never uses it.
+
+Targets:
+    main        `python main.py --help`: module load and argument parsing
+    web-worker  `create_app()`, as run by each gunicorn worker (connects
+                to the configured MongoDB)
+    job-worker  the modules `main.py --worker` imports before it starts
+
+Usage:
+    python -m utils.startup_benchmark --runs 5
+    python -m utils.startup_benchmark --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Modules only the bot, the browser jobs and email delivery need
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'smtplib', 'email.mime')
+
+# Heavy modules a target is expected to load
+EXPECTED_MODULES = {
+    'job-worker': ('smtplib',)
+}
+
+TARGETS = {
+    'main': ['main.py', '--help'],
+    'web-worker': ['-c', 'from web.app import create_app; create_app()'],
+    'job-worker': ['-c', (
+        'import web.app, tasks.job_worker, tasks.scheduler, '
+        'tasks.webhook_worker, email_module.outbox_worker'
+    )]
+}
+
+
+def parse_importtime(output):
+    """
+    Parse the report written by `python -X importtime`.
+
+    Args:
+        output (str): Standard error of the process
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, depth) in import order
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        module = fields[2].rstrip()
+        depth = (len(module) - len(module.lstrip())) // 2
+        imports.append((module.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+
+def run_target(args, cwd):
+    """
+    Start one interpreter and time it.
+
+    Args:
+        args (list): Arguments after the interpreter
+        cwd (str): Working directory
+
+    Returns:
+        dict: Wall time, import time and the parsed imports
+    """
+    env = dict(os.environ, PYTHONPATH=cwd)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    imports = parse_importtime(result.stderr)
+
+    return {
+        'returncode': result.returncode,
+        'wall_ms': wall * 1000,
+        'import_ms': sum(self_us for _, self_us, _, _ in imports) / 1000,
+        'imports': imports
+    }
+
+
+def benchmark(name, runs, cwd, top=5):
+    """
+    Run a target several times.
+
+    Args:
+        name (str): Target name from TARGETS
+        runs (int): Interpreters to start
+        cwd (str): Working directory
+        top (int, optional): Slowest top-level imports to report
+
+    Returns:
+        dict: Median times, slowest imports and heavy modules loaded
+    """
+    results = [run_target(TARGETS[name], cwd) for _ in range(runs)]
+    last = results[-1]
+
+    top_level = sorted(
+        ((module, cumulative) for module, _, cumulative, depth in last['imports'] if depth == 0),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+    loaded = {module for module, _, _, _ in last['imports']}
+
+    return {
+        'target': name,
+        'runs': runs,
+        'failed_runs': sum(1 for result in results if result['returncode'] != 0),
+        'wall_ms': statistics.median(result['wall_ms'] for result in results),
+        'import_ms': statistics.median(result['import_ms'] for result in results),
+        'modules': len(loaded),
+        'slowest_imports': [{'module': module, 'ms': cumulative / 1000} for module, cumulative in top_level],
+        'heavy_modules': sorted(
+            heavy for heavy in HEAVY_MODULES
+            if heavy not in EXPECTED_MODULES.get(name, ())
+            and any(module == heavy or module.startswith(heavy + '.') for module in loaded)
+        )
+    }
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='Measure cold-start time of the main processes')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters started per target')
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS), help='Target to run (default: all)')
+    parser.add_argument('--output', help='Append the results as a JSON line to this file')
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    reports = [benchmark(name, args.runs, cwd) for name in args.target or TARGETS]
+
+    for report in reports:
+        print(
+            f"{report['target']:>10}: {report['wall_ms']:.0f} ms wall, "
+            f"{report['import_ms']:.0f} ms importing {report['modules']} modules"
+            + (f" ({report['failed_runs']} runs failed)" if report['failed_runs'] else "")
+        )
+        for entry in report['slowest_imports']:
+            print(f"{'':>12}{entry['ms']:7.1f} ms  {entry['module']}")
+        if report['heavy_modules']:
+            print(f"{'':>12}unused heavy modules loaded: {', '.join(report['heavy_modules'])}")
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({'recordedAt': datetime.utcnow().isoformat() + 'Z', 'results': reports}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+In-process cache helpers for Travian Whispers application.
+This module provides a small thread-safe LRU cache whose entries
+expire after a fixed time to live.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize=1024, ttl=30):
+        """
+        Initialize TTLCache.
+
+        Args:
+            maxsize (int, optional): Maximum number of entries kept
+            ttl (float, optional): Seconds an entry stays valid, 0 disables caching
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """bool: Whether entries are cached at all."""
+        return self.ttl > 0
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove a value from the cache.
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all values from the cache."""
+        with self._lock:
+            self._entries.clear()
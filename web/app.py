@@ -4,17 +4,17 @@ This module defines the application factory function that creates
 and configures the Flask application.
 """
 import os
-import json
-from flask import Flask, jsonify
+from flask import Flask
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
-from bson import ObjectId
-from datetime import datetime
 from web.routes.travian_api import register_routes as register_travian_api_routes
 from web.extensions import register_extensions
 from web.routes import register_blueprints
 from web.utils.error_handlers import register_error_handlers
 from web.utils.context_processors import register_context_processors
+from web.utils.json_encoder import MongoJSONProvider
+from web.utils.http_cache import register_http_cache
+from database.models.user import configure_user_cache
 
 def create_app(config_object=None):
     """
@@ -41,6 +41,12 @@ def create_app(config_object=None):
     # Configure JSON serialization
     configure_json_serialization(app)
     
+    # Configure the cross-request user cache
+    configure_user_cache(
+        maxsize=app.config.get('USER_CACHE_SIZE', 1024),
+        ttl=app.config.get('USER_CACHE_TTL', 0)
+    )
+    
     # Register extensions
     register_extensions(app)
     
@@ -59,6 +65,20 @@ def create_app(config_object=None):
     # Register blueprints
     register_blueprints(app)
     
+    # Register HTTP caching and compression
+    register_http_cache(app)
+    
+    # Run background jobs in-process when no separate worker is deployed
+    if app.config.get('JOB_WORKER_EMBEDDED') and not app.testing:
+        from tasks.job_worker import start_embedded_worker
+        from email_module.outbox_worker import start_outbox_worker
+        from tasks.scheduler import start_scheduler
+        from tasks.webhook_worker import start_webhook_worker
+        start_embedded_worker(app)
+        app.extensions['email_worker'] = start_outbox_worker()
+        start_webhook_worker(app)
+        start_scheduler(app)
+    
     # Ensure the instance folder exists
     try:
         os.makedirs(app.instance_path, exist_ok=True)
@@ -96,41 +116,14 @@ def configure_app(app, config_object=None):
 def configure_json_serialization(app):
     """
     Configure JSON serialization for the Flask application.
-    Uses a custom implementation to override Flask's default JSON serialization.
+    Installs a JSON provider that encodes MongoDB ObjectId and datetime
+    values in a single pass, so jsonify() works on raw documents.
     
     Args:
         app: Flask application instance
     """
-    # Create custom JSON encoder function
-    def custom_json_encoder(obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat() if obj else None
-        raise TypeError(f"Type {type(obj)} not serializable")
-    
-    # Override Flask's jsonify to handle MongoDB ObjectId and datetime
-    original_jsonify = jsonify
-    
-    def custom_jsonify(*args, **kwargs):
-        if args and kwargs:
-            raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
-        if len(args) == 1:
-            data = args[0]
-        else:
-            data = args or kwargs
-            
-        # First convert to JSON string using the custom encoder
-        dumped = json.dumps(data, default=custom_json_encoder)
-        # Then parse it back to ensure it's fully serializable
-        parsed = json.loads(dumped)
-        # Now use Flask's original jsonify with the serialized data
-        return original_jsonify(parsed)
-    
-    # Replace Flask's jsonify in the current module
-    import flask
-    flask.jsonify = custom_jsonify
+    app.json = MongoJSONProvider(app)
     
     # Configure Flask JSON settings
-    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
-    app.config['JSON_SORT_KEYS'] = False
+    app.json.compact = True
+    app.json.sort_keys = False
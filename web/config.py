@@ -11,8 +11,13 @@ class Config:
     
     # Application settings
     SECRET_KEY = os.environ.get('SECRET_KEY', secrets.token_hex(32))
-    SESSION_TYPE = 'filesystem'
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'mongodb')
     SESSION_FILE_DIR = os.environ.get('SESSION_FILE_DIR', 'flask_session')
+    SESSION_MONGODB_COLLECT = os.environ.get('SESSION_MONGODB_COLLECT', 'sessions')
+    SESSION_SERIALIZATION_FORMAT = os.environ.get('SESSION_SERIALIZATION_FORMAT', 'msgpack')  # or 'json'
+    SESSION_LOCAL_CACHE_TTL = int(os.environ.get('SESSION_LOCAL_CACHE_TTL', 0))  # Seconds, 0 disables; cached copies are checked against the stored revision
+    SESSION_LOCAL_CACHE_SIZE = int(os.environ.get('SESSION_LOCAL_CACHE_SIZE', 1000))
+    SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', 60))  # Seconds
     SESSION_PERMANENT = False
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
@@ -23,6 +28,7 @@ class Config:
     # Database settings
     MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/whispers')
     MONGODB_DB_NAME = os.environ.get('MONGODB_DB_NAME', 'whispers')
+    MONGODB_CREATE_INDEXES = os.environ.get('MONGODB_CREATE_INDEXES', 'false').lower() == 'true'  # On every boot; otherwise `main.py --migrate`
     
     # Email settings
     SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
@@ -42,9 +48,89 @@ class Config:
     JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
     JWT_EXPIRATION = int(os.environ.get('JWT_EXPIRATION', 24))  # Hours
     
+    # Admin dashboard statistics cache lifetime in seconds
+    ADMIN_DASHBOARD_CACHE_TTL = int(os.environ.get('ADMIN_DASHBOARD_CACHE_TTL', 60))
+    
+    # Cross-request user document cache (TTL in seconds, 0 disables it).
+    # Invalidation does not reach other processes, so keep it off when the
+    # job worker or several web workers write user documents.
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 0))
+    
+    # HTTP caching and compression
+    HTTP_ETAGS = os.environ.get('HTTP_ETAGS', 'true').lower() == 'true'
+    HTTP_COMPRESS_MIN_SIZE = int(os.environ.get('HTTP_COMPRESS_MIN_SIZE', 1024))  # Bytes
+    HTTP_GZIP_LEVEL = int(os.environ.get('HTTP_GZIP_LEVEL', 6))
+    HTTP_BROTLI = os.environ.get('HTTP_BROTLI', 'true').lower() == 'true'  # Used when brotli is installed
+    HTTP_BROTLI_QUALITY = int(os.environ.get('HTTP_BROTLI_QUALITY', 4))
+    STATIC_IMMUTABLE_MAX_AGE = int(os.environ.get('STATIC_IMMUTABLE_MAX_AGE', 31536000))  # Seconds
+    
+    # Background jobs (browser sessions run on `main.py --worker`)
+    JOB_WORKER_EMBEDDED = os.environ.get('JOB_WORKER_EMBEDDED', 'false').lower() == 'true'  # Run jobs in the web process
+    JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # Seconds
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 60))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 2))
+    JOB_EVENTS_POLL_INTERVAL = float(os.environ.get('JOB_EVENTS_POLL_INTERVAL', 1))  # Seconds
+    JOB_EVENTS_MAX_DURATION = float(os.environ.get('JOB_EVENTS_MAX_DURATION', 55))  # Seconds, below the worker timeout
+    
+    # Payment webhooks are stored and acknowledged, then processed by webhook workers
+    WEBHOOK_INBOX_ENABLED = os.environ.get('WEBHOOK_INBOX_ENABLED', 'true').lower() == 'true'
+    WEBHOOK_WORKER_CONCURRENCY = int(os.environ.get('WEBHOOK_WORKER_CONCURRENCY', 2))
+    WEBHOOK_POLL_INTERVAL = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 1))  # Seconds
+    WEBHOOK_LEASE_SECONDS = int(os.environ.get('WEBHOOK_LEASE_SECONDS', 60))
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 8))
+    
+    # Periodic task scheduler; every process may run one, a MongoDB lease picks the leader
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', 30))
+    SCHEDULER_MAX_WORKERS = int(os.environ.get('SCHEDULER_MAX_WORKERS', 2))  # Tasks run in parallel
+    SCHEDULER_MISFIRE_GRACE = float(os.environ.get('SCHEDULER_MISFIRE_GRACE', 300))  # Seconds late before skippable tasks skip a run
+    
+    # Server-sent events
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))  # Seconds
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', 2000))
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 8))  # Per process; keep well below the gunicorn thread count
+    SSE_MAX_STREAMS_PER_USER = int(os.environ.get('SSE_MAX_STREAMS_PER_USER', 2))  # Per process
+    USER_EVENTS_POLL_INTERVAL = float(os.environ.get('USER_EVENTS_POLL_INTERVAL', 1))  # Seconds, one poll per process
+    USER_EVENTS_OVERLAP = float(os.environ.get('USER_EVENTS_OVERLAP', 5))  # Seconds each poll looks back
+    USER_EVENTS_QUEUE_SIZE = int(os.environ.get('USER_EVENTS_QUEUE_SIZE', 256))
+    USER_EVENTS_MAX_DURATION = float(os.environ.get('USER_EVENTS_MAX_DURATION', 60))  # Seconds before the browser reconnects
+    
+    # JSON settings
+    JSON_USE_MSGSPEC = os.environ.get('JSON_USE_MSGSPEC', 'true').lower() == 'true'
+    
     # Logging settings
     LOG_FILE = os.environ.get('LOG_FILE', None)
     
+    # Proxy health check settings
+    PROXY_HEALTH_CONCURRENCY = int(os.environ.get('PROXY_HEALTH_CONCURRENCY', 32))
+    PROXY_HEALTH_DEADLINE = float(os.environ.get('PROXY_HEALTH_DEADLINE', 20))  # Seconds per proxy
+    PROXY_HEALTH_PROBE_TIMEOUT = float(os.environ.get('PROXY_HEALTH_PROBE_TIMEOUT', 10))  # Seconds per URL
+    PROXY_HEALTH_FAIL_FAST = os.environ.get('PROXY_HEALTH_FAIL_FAST', 'true').lower() == 'true'
+    PROXY_HEALTH_PROBE_URLS = [
+        url.strip() for url in os.environ.get('PROXY_HEALTH_PROBE_URLS', '').split(',') if url.strip()
+    ]
+    PROXY_P95_LATENCY_THRESHOLD = float(os.environ.get('PROXY_P95_LATENCY_THRESHOLD', 8))  # Seconds, 0 disables
+    
+    # Proxy metrics settings
+    PROXY_METRICS_BATCH_SIZE = int(os.environ.get('PROXY_METRICS_BATCH_SIZE', 500))
+    PROXY_METRICS_FLUSH_INTERVAL = float(os.environ.get('PROXY_METRICS_FLUSH_INTERVAL', 5))  # Seconds
+    PROXY_METRICS_IP_CACHE_TTL = int(os.environ.get('PROXY_METRICS_IP_CACHE_TTL', 300))  # Seconds
+    PROXY_METRICS_RAW_RETENTION_DAYS = float(os.environ.get('PROXY_METRICS_RAW_RETENTION_DAYS', 3))
+
+    # Database backups
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+    BACKUP_PARALLEL_COLLECTIONS = int(os.environ.get('BACKUP_PARALLEL_COLLECTIONS', 4))  # Collections dumped at once
+    BACKUP_BATCH_SIZE = int(os.environ.get('BACKUP_BATCH_SIZE', 1000))  # Documents per cursor batch
+    BACKUP_COMPRESSION_LEVEL = int(os.environ.get('BACKUP_COMPRESSION_LEVEL', 6))  # gzip level, 1 (fast) to 9
+    BACKUP_USE_MONGODUMP = os.environ.get('BACKUP_USE_MONGODUMP', 'false').lower() == 'true'
+    BACKUP_KEEP_LAST = int(os.environ.get('BACKUP_KEEP_LAST', 5))  # Chains: a full backup and its incrementals
+    BACKUP_INCREMENTAL_OVERLAP = float(os.environ.get('BACKUP_INCREMENTAL_OVERLAP', 300))  # Seconds re-copied before each watermark
+    RESTORE_PARALLEL_COLLECTIONS = int(os.environ.get('RESTORE_PARALLEL_COLLECTIONS', 4))  # Collections loaded at once
+    RESTORE_INSERT_WORKERS = int(os.environ.get('RESTORE_INSERT_WORKERS', 8))  # Insert batches written at once
+    RESTORE_BATCH_SIZE = int(os.environ.get('RESTORE_BATCH_SIZE', 5000))  # Documents per insert
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
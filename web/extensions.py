@@ -17,18 +17,18 @@ def register_extensions(app):
     Args:
         app: Flask application instance
     """
-    # Configure session
-    session.init_app(app)
-    
-    # Enable CSRF protection
-    csrf.init_app(app)
-    
     # Configure logging
     configure_logging(app)
     
     # Initialize database connection (via MongoDB class)
     init_database(app)
     
+    # Configure session (the MongoDB store needs the connection above)
+    init_session(app)
+    
+    # Enable CSRF protection
+    csrf.init_app(app)
+    
     logger = logging.getLogger(__name__)
     logger.info("Flask extensions initialized")
 
@@ -58,6 +58,28 @@ def configure_logging(app):
             
     app.logger.info('Logging configured')
 
+def init_session(app):
+    """
+    Initialize server-side session storage.
+    
+    Args:
+        app: Flask application instance
+    """
+    if app.config.get('SESSION_TYPE') == 'mongodb':
+        client = getattr(app.db, 'client', None)
+        
+        if client is not None:
+            from web.utils.session_interface import create_session_interface
+            
+            app.session_interface = create_session_interface(app, client)
+            app.logger.info("Using MongoDB session storage")
+            return
+        
+        app.logger.warning("MongoDB not connected, falling back to filesystem sessions")
+        app.config['SESSION_TYPE'] = 'filesystem'
+    
+    session.init_app(app)
+
 def init_database(app):
     """
     Initialize database connection.
@@ -80,8 +102,12 @@ def init_database(app):
     else:
         app.logger.info("Connected to MongoDB successfully")
         
-        # Create indexes if not in testing mode
-        if not app.testing:
+        # The unique indexes deduplication relies on must exist before
+        # serving; a failure here stops the process
+        db.create_critical_indexes()
+        
+        # The others are normally created once per deploy by `main.py --migrate`
+        if app.config.get('MONGODB_CREATE_INDEXES') and not app.testing:
             db.create_indexes()
             
     # Store database instance in app context
@@ -13,8 +13,10 @@ from flask import (
 
 from web.utils.decorators import admin_required
 from database.models.user import User
-from database.backup import create_backup, BackupError
+from database.backup import create_backup, read_manifest, BackupError
 from database.models.backup import BackupRecord
+from database.models.job import Job
+from web.utils.jobs import submit_job
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -35,7 +37,7 @@ def create_backup_route():
     """
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get request data (supporting both JSON and form data)
     if request.is_json:
@@ -47,7 +49,7 @@ def create_backup_route():
     compress_backup = data.get('compress_backup', True)
     
     # Check if backup type is valid
-    valid_types = ['full', 'users', 'transactions', 'subscriptions']
+    valid_types = ['full', 'incremental', 'users', 'transactions', 'subscriptions']
     if backup_type not in valid_types:
         if request.is_json:
             return jsonify({
@@ -71,6 +73,10 @@ def create_backup_route():
             # Get file size
             file_size = os.path.getsize(backup_path)
             
+            # An incremental without a chain to extend is taken as a full backup
+            manifest = read_manifest(backup_path)
+            backup_type = manifest.get('type', backup_type)
+            
             # Record backup in database
             backup_record = BackupRecord()
             backup_record.add_backup_record(
@@ -78,7 +84,8 @@ def create_backup_route():
                 backup_type=backup_type,
                 file_size=file_size,
                 success=True,
-                details=f"Created by admin user: {current_user['username']}"
+                details=f"Created by admin user: {current_user['username']}",
+                manifest=manifest
             )
             
             logger.info(f"Admin '{current_user['username']}' created {backup_type} backup: {backup_path}")
@@ -142,7 +149,7 @@ def download_backup(filename):
     """
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Validate filename to prevent directory traversal
     if '..' in filename or '/' in filename:
@@ -174,7 +181,7 @@ def delete_backup():
     """
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get request data (supporting both JSON and form data)
     if request.is_json:
@@ -251,6 +258,18 @@ def delete_backup():
             flash('Backup file not found', 'danger')
             return redirect(url_for('admin.settings', tab='backup'))
     
+    # Incremental backups cannot be restored without the backups they build on
+    if backup_record.has_dependents(filename):
+        message = 'Other backups build on this one; delete the later incremental backups first'
+        if request.is_json:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), 409
+        else:
+            flash(message, 'danger')
+            return redirect(url_for('admin.settings', tab='backup'))
+    
     try:
         # Delete file
         os.remove(backup_path)
@@ -289,31 +308,61 @@ def delete_backup():
 
 def restore_backup():
     """
-    Restore a database from a backup.
-    Currently just a placeholder as this would be complex to implement.
+    Restore the database from a backup.
+    The restore runs as a background job; JSON requests get the job's
+    status URLs back.
     """
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
-    # Get backup filename
-    filename = request.form.get('filename')
+    # Get request data (supporting both JSON and form data)
+    if request.is_json:
+        data = request.get_json()
+    else:
+        data = request.form
     
-    if not filename:
-        flash('Backup filename is required', 'danger')
+    filename = data.get('filename')
+    
+    def fail(message, status):
+        if request.is_json:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), status
+        flash(message, 'danger')
         return redirect(url_for('admin.settings', tab='backup'))
     
-    # Log the attempt
-    logger.info(f"Admin '{current_user['username']}' attempted to restore backup: {filename}")
+    if not filename:
+        return fail('Backup filename is required', 400)
+    
+    # Validate filename to prevent directory traversal
+    if '..' in filename or '/' in filename:
+        return fail('Invalid backup filename', 400)
+    
+    backup_dir = current_app.config.get('BACKUP_DIR', 'backups')
+    if not os.path.exists(os.path.join(backup_dir, filename)):
+        return fail('Backup file not found', 404)
+    
+    job_model = Job()
+    if job_model.get_active_job(session['user_id'], 'restore_backup'):
+        return fail('A restore is already in progress', 409)
     
-    # This would be a complex operation requiring:
-    # 1. Database connection handling
-    # 2. Proper error recovery
-    # 3. Data validation
-    # 4. Progress reporting
+    logger.info(f"Admin '{current_user['username']}' started a restore of backup: {filename}")
     
-    # For now, just show a message
-    flash('Database restore functionality is not yet implemented', 'warning')
+    # Loading millions of documents outlives a request, so it runs on the job workers
+    if request.is_json:
+        return submit_job(
+            session['user_id'],
+            'restore_backup',
+            params={'filename': filename},
+            message='Database restore started'
+        )
+    
+    if job_model.create_job(session['user_id'], 'restore_backup', params={'filename': filename}) is None:
+        flash('Failed to start the database restore', 'danger')
+    else:
+        flash('Database restore started; it continues in the background', 'info')
     return redirect(url_for('admin.settings', tab='backup'))
 
 def get_backups():
@@ -339,7 +388,9 @@ def get_backups():
             'size': backup.get('size'),
             'created_at': backup.get('created_at').strftime('%Y-%m-%d %H:%M:%S') if backup.get('created_at') else None,
             'success': backup.get('success', True),
-            'details': backup.get('details')
+            'details': backup.get('details'),
+            'parent': backup.get('parent_filename'),
+            'sequence': backup.get('sequence')
         }
         formatted_backups.append(formatted_backup)
     
@@ -8,11 +8,12 @@ from flask import (
     url_for, flash, session, current_app, jsonify
 )
 from bson import ObjectId
+from cachelib import SimpleCache
 
 from web.utils.decorators import admin_required
 from database.models.user import User
-from database.models.subscription import SubscriptionPlan
 from database.models.transaction import Transaction
+from database.models.revenue_stats import RevenueStats
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -23,53 +24,128 @@ def register_routes(admin_bp):
     admin_bp.route('/')(admin_required(dashboard))
     admin_bp.route('/refresh-stats', methods=['GET'])(admin_required(admin_refresh_stats))
 
-@admin_required
-def dashboard():
-    """Admin dashboard route."""
+# Short-lived cache for dashboard statistics, cleared by admin_refresh_stats
+_stats_cache = SimpleCache(threshold=16, default_timeout=60)
+STATS_CACHE_KEY = 'admin_dashboard_stats'
+
+def _count(facet_result):
+    """Extract the value of a {"$count": "n"} facet."""
+    return facet_result[0]["n"] if facet_result else 0
+
+def _collect_user_stats(user_model, one_week_ago):
+    """
+    Collect user and plan distribution statistics in one aggregation.
+    
+    Args:
+        user_model: User model
+        one_week_ago (datetime): Start of the new-user window
+        
+    Returns:
+        dict: Facet results
+    """
+    pipeline = [
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "new_week": [
+                {"$match": {"createdAt": {"$gte": one_week_ago}}},
+                {"$count": "n"}
+            ],
+            "active_by_plan": [
+                {"$match": {"subscription.status": "active"}},
+                {"$group": {"_id": "$subscription.planId", "n": {"$sum": 1}}},
+                {"$lookup": {
+                    "from": "subscriptionPlans",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "plan"
+                }},
+                {"$project": {"n": 1, "name": {"$first": "$plan.name"}}}
+            ],
+            "recent": [
+                {"$sort": {"createdAt": -1}},
+                {"$limit": 4},
+                {"$project": {"username": 1, "email": 1, "isVerified": 1}}
+            ]
+        }}
+    ]
+    
+    results = list(user_model.collection.aggregate(pipeline))
+    return results[0] if results else {}
+
+def _collect_recent_transactions(transaction_model):
+    """
+    Get the most recent transactions with their plan and user joined in.
+    
+    Args:
+        transaction_model: Transaction model
+        
+    Returns:
+        list: Transaction documents with plan_name and username
+    """
+    pipeline = [
+        {"$sort": {"createdAt": -1}},
+        {"$limit": 5},
+        {"$lookup": {
+            "from": "subscriptionPlans",
+            "localField": "planId",
+            "foreignField": "_id",
+            "as": "plan"
+        }},
+        # userId is stored as a string, so convert it before matching
+        {"$lookup": {
+            "from": "users",
+            "let": {"user_id": {"$convert": {
+                "input": "$userId", "to": "objectId", "onError": None, "onNull": None
+            }}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$user_id"]}}},
+                {"$project": {"username": 1}}
+            ],
+            "as": "user"
+        }},
+        {"$addFields": {
+            "plan_name": {"$first": "$plan.name"},
+            "username": {"$first": "$user.username"}
+        }},
+        {"$project": {"plan": 0, "user": 0}}
+    ]
+    
+    return list(transaction_model.collection.aggregate(pipeline))
+
+def get_dashboard_stats():
+    """
+    Get admin dashboard statistics, served from a short-TTL cache.
+    
+    Returns:
+        dict: user_stats, revenue_stats, subscription_stats, recent_users
+            and recent_transactions
+    """
+    stats = _stats_cache.get(STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+    
     # Initialize models
     user_model = User()
-    subscription_model = SubscriptionPlan()
     transaction_model = Transaction()
+    revenue_stats = RevenueStats()
     
-    # Calculate user statistics
-    total_users = user_model.collection.count_documents({})
-    active_users = user_model.collection.count_documents({"subscription.status": "active"})
-    
-    # Get new users this week
-    one_week_ago = datetime.utcnow() - timedelta(days=7)
-    new_users_week = user_model.collection.count_documents({"createdAt": {"$gte": one_week_ago}})
-    
-    # Calculate revenue statistics
-    current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    now = datetime.utcnow()
+    one_week_ago = now - timedelta(days=7)
+    current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
     
-    # Get current month revenue
-    revenue_pipeline = [
-        {"$match": {
-            "createdAt": {"$gte": current_month_start},
-            "status": "completed"
-        }},
-        {"$group": {
-            "_id": None,
-            "total": {"$sum": "$amount"}
-        }}
-    ]
-    current_revenue = list(transaction_model.collection.aggregate(revenue_pipeline))
-    monthly_revenue = current_revenue[0]["total"] if current_revenue else 0
+    user_facets = _collect_user_stats(user_model, one_week_ago)
     
-    # Get previous month revenue for comparison
-    prev_revenue_pipeline = [
-        {"$match": {
-            "createdAt": {"$gte": previous_month_start, "$lt": current_month_start},
-            "status": "completed"
-        }},
-        {"$group": {
-            "_id": None,
-            "total": {"$sum": "$amount"}
-        }}
-    ]
-    prev_revenue = list(transaction_model.collection.aggregate(prev_revenue_pipeline))
-    prev_monthly_revenue = prev_revenue[0]["total"] if prev_revenue else 0
+    # Calculate user statistics
+    active_by_plan = user_facets.get("active_by_plan", [])
+    active_users = sum(plan["n"] for plan in active_by_plan)
+    
+    # Calculate revenue statistics from the materialized monthly counters
+    monthly_revenue = revenue_stats.get_period(RevenueStats.PERIOD_MONTHLY, current_month_start).get("revenue", 0)
+    prev_monthly_revenue = revenue_stats.get_period(RevenueStats.PERIOD_MONTHLY, previous_month_start).get("revenue", 0)
+    new_subscriptions = sum(
+        day.get("new_subscriptions", 0) for day in revenue_stats.get_daily_range(one_week_ago, now)
+    )
     
     # Calculate percentage change
     if prev_monthly_revenue > 0:
@@ -80,33 +156,85 @@ def dashboard():
     # Determine monthly goal (simplified to 25% more than current)
     monthly_goal = monthly_revenue * 1.25 if monthly_revenue > 0 else 15000
     
-    # Subscription statistics
-    active_subscriptions = user_model.collection.count_documents({"subscription.status": "active"})
-    new_subscriptions = transaction_model.collection.count_documents({
-        "createdAt": {"$gte": one_week_ago},
-        "type": "subscription",
-        "status": "completed"
-    })
-    
     # Get plan distribution
-    basic_plan = subscription_model.get_plan_by_name("Basic")
-    standard_plan = subscription_model.get_plan_by_name("Standard")
-    premium_plan = subscription_model.get_plan_by_name("Premium")
+    plan_counts = {}
+    for plan in active_by_plan:
+        if plan.get("name"):
+            plan_counts[plan["name"]] = plan_counts.get(plan["name"], 0) + plan["n"]
     
-    basic_count = user_model.collection.count_documents({
-        "subscription.status": "active", 
-        "subscription.planId": basic_plan["_id"] if basic_plan else None
-    })
+    # Get recent users
+    recent_users = []
+    for user in user_facets.get("recent", []):
+        status = "Active" if user.get("isVerified", False) else "Pending"
+        status_class = "bg-success" if status == "Active" else "bg-warning"
+        
+        recent_users.append({
+            "id": user["_id"],
+            "username": user["username"],
+            "email": user["email"],
+            "status": status,
+            "status_class": status_class
+        })
     
-    standard_count = user_model.collection.count_documents({
-        "subscription.status": "active", 
-        "subscription.planId": standard_plan["_id"] if standard_plan else None
-    })
+    # Get recent transactions
+    recent_transactions = []
+    for tx in _collect_recent_transactions(transaction_model):
+        # Format status class
+        status_class = "bg-success"
+        if tx["status"] == "pending":
+            status_class = "bg-warning"
+        elif tx["status"] == "failed":
+            status_class = "bg-danger"
+        
+        recent_transactions.append({
+            "id": tx["_id"],
+            "username": tx.get("username") or "Unknown User",
+            "plan": tx.get("plan_name") or "Unknown Plan",
+            "amount": tx["amount"],
+            "date": tx["createdAt"]["$date"].split('T')[0] if isinstance(tx["createdAt"], dict) and "$date" in tx["createdAt"] else tx["createdAt"].strftime('%Y-%m-%d'),
+            "status": tx["status"].capitalize(),
+            "status_class": status_class
+        })
     
-    premium_count = user_model.collection.count_documents({
-        "subscription.status": "active", 
-        "subscription.planId": premium_plan["_id"] if premium_plan else None
-    })
+    stats = {
+        'user_stats': {
+            'total_users': _count(user_facets.get("total")),
+            'active_users': active_users,
+            'new_users_week': _count(user_facets.get("new_week"))
+        },
+        'revenue_stats': {
+            'monthly_revenue': monthly_revenue,
+            'monthly_change': monthly_change,
+            'monthly_goal': monthly_goal
+        },
+        'subscription_stats': {
+            'active_subscriptions': active_users,
+            'new_subscriptions': new_subscriptions,
+            'plan_distribution': {
+                'basic': plan_counts.get("Basic", 0),
+                'standard': plan_counts.get("Standard", 0),
+                'premium': plan_counts.get("Premium", 0)
+            }
+        },
+        'recent_users': recent_users,
+        'recent_transactions': recent_transactions
+    }
+    
+    _stats_cache.set(
+        STATS_CACHE_KEY,
+        stats,
+        timeout=current_app.config.get('ADMIN_DASHBOARD_CACHE_TTL', 60)
+    )
+    return stats
+
+def invalidate_dashboard_stats():
+    """Drop cached dashboard statistics so the next load recomputes them."""
+    _stats_cache.delete(STATS_CACHE_KEY)
+
+@admin_required
+def dashboard():
+    """Admin dashboard route."""
+    stats = get_dashboard_stats()
     
     # System status (simplified)
     system_stats = {
@@ -156,88 +284,19 @@ def dashboard():
         }
     ]
     
-    # Get recent users
-    recent_users_cursor = user_model.collection.find().sort("createdAt", -1).limit(4)
-    recent_users = []
-    
-    for user in recent_users_cursor:
-        status = "Active" if user.get("isVerified", False) else "Pending"
-        status_class = "bg-success" if status == "Active" else "bg-warning"
-        
-        recent_users.append({
-            "id": user["_id"],
-            "username": user["username"],
-            "email": user["email"],
-            "status": status,
-            "status_class": status_class
-        })
-    
-    # Get recent transactions
-    recent_transactions_cursor = transaction_model.collection.find().sort("createdAt", -1).limit(5)
-    recent_transactions = []
-    
-    for tx in recent_transactions_cursor:
-        # Get plan name
-        plan = subscription_model.get_plan_by_id(tx["planId"])
-        plan_name = plan["name"] if plan else "Unknown Plan"
-        
-        # Get username
-        user = user_model.get_user_by_id(tx["userId"])
-        username = user["username"] if user else "Unknown User"
-        
-        # Format status class
-        status_class = "bg-success"
-        if tx["status"] == "pending":
-            status_class = "bg-warning"
-        elif tx["status"] == "failed":
-            status_class = "bg-danger"
-        
-        recent_transactions.append({
-            "id": tx["_id"],
-            "username": username,
-            "plan": plan_name,
-            "amount": tx["amount"],
-            "date": tx["createdAt"]["$date"].split('T')[0] if isinstance(tx["createdAt"], dict) and "$date" in tx["createdAt"] else tx["createdAt"].strftime('%Y-%m-%d'),
-            "status": tx["status"].capitalize(),
-            "status_class": status_class
-        })
-    
-    # Prepare data for the template
-    user_stats = {
-        'total_users': total_users,
-        'active_users': active_users,
-        'new_users_week': new_users_week
-    }
-    
-    revenue_stats = {
-        'monthly_revenue': monthly_revenue,
-        'monthly_change': monthly_change,
-        'monthly_goal': monthly_goal
-    }
-    
-    subscription_stats = {
-        'active_subscriptions': active_subscriptions,
-        'new_subscriptions': new_subscriptions,
-        'plan_distribution': {
-            'basic': basic_count,
-            'standard': standard_count,
-            'premium': premium_count
-        }
-    }
-    
     # Get current user for the template
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = User().get_cached_user(session['user_id'])
     
     # Render admin dashboard template
     return render_template(
         'admin/dashboard.html',
-        user_stats=user_stats,
-        revenue_stats=revenue_stats,
-        subscription_stats=subscription_stats,
+        user_stats=stats['user_stats'],
+        revenue_stats=stats['revenue_stats'],
+        subscription_stats=stats['subscription_stats'],
         system_stats=system_stats,
         recent_activity=recent_activity,
-        recent_users=recent_users,
-        recent_transactions=recent_transactions,
+        recent_users=stats['recent_users'],
+        recent_transactions=stats['recent_transactions'],
         current_user=current_user,
         title='Admin Dashboard'
     )
@@ -246,7 +305,9 @@ def admin_refresh_stats():
     """API endpoint to refresh admin dashboard statistics."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
+    
+    invalidate_dashboard_stats()
     
     logger.info(f"Admin '{current_user['username']}' refreshed dashboard statistics")
     
@@ -9,12 +9,20 @@ from flask import (
 )
 
 from web.utils.decorators import admin_required
+from web.utils.streaming import stream_export
 from database.models.user import User
 from database.models.system_log import SystemLog
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Fields read from the database and written to downloads
+DOWNLOAD_PROJECTION = {
+    'timestamp': 1, 'level': 1, 'user': 1, 'message': 1,
+    'category': 1, 'ip_address': 1, 'details': 1
+}
+DOWNLOAD_FIELDNAMES = ['timestamp', 'level', 'user', 'message', 'category', 'ip_address', 'details']
+
 def register_routes(admin_bp):
     """Register logs routes with the admin blueprint."""
     # Attach routes to the blueprint
@@ -27,7 +35,7 @@ def logs():
     """System logs page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Initialize system log model
     system_log = SystemLog()
@@ -170,7 +178,7 @@ def download_logs():
     """Download logs based on filter criteria."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get form data
     log_level = request.form.get('level', 'all')
@@ -225,21 +233,52 @@ def download_logs():
         if date_to:
             logs_query['timestamp']['$lte'] = date_to
     
-    # In a real implementation, we would query all logs matching criteria,
-    # format them according to the requested format, and return a downloadable file
-    
-    # For demonstration purposes, we'll just log the request
     logger.info(f"Admin '{current_user['username']}' downloaded logs with filter: level={log_level}, range={date_range}, format={download_format}")
     
-    # Flash message and redirect
-    flash(f'Logs downloaded in {download_format.upper()} format', 'success')
-    return redirect(url_for('admin.logs'))
+    # Stream matching logs from a projected cursor
+    cursor = system_log.iter_logs(logs_query, projection=DOWNLOAD_PROJECTION)
+    compress = request.form.get('gzip') in ('1', 'true', 'on')
+    
+    rows = (format_log_for_download(log) for log in cursor)
+    if download_format == 'txt':
+        rows = (
+            f"{row['timestamp']} [{row['level']}] {row['user']}: {row['message']}"
+            for row in rows
+        )
+    
+    return stream_export(
+        rows,
+        download_format,
+        'system_logs',
+        fieldnames=DOWNLOAD_FIELDNAMES,
+        compress=compress
+    )
+
+def format_log_for_download(log):
+    """
+    Format a system log document for download.
+    
+    Args:
+        log (dict): System log document
+        
+    Returns:
+        dict: Exported fields
+    """
+    return {
+        'timestamp': log.get('timestamp').strftime('%Y-%m-%d %H:%M:%S') if log.get('timestamp') else 'N/A',
+        'level': log.get('level', 'info').upper(),
+        'user': log.get('user', 'system'),
+        'message': log.get('message', ''),
+        'category': log.get('category', ''),
+        'ip_address': log.get('ip_address', 'N/A'),
+        'details': log.get('details', '')
+    }
 
 def clear_logs():
     """Clear old logs from the system."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get form data
     retention_days = int(request.form.get('retention_days', 30))
@@ -26,7 +26,7 @@ def maintenance():
     """System maintenance page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Mock maintenance info and system stats
     system_stats = {
@@ -85,7 +85,7 @@ def update_maintenance():
     """
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get request data (supporting both JSON and form data)
     if request.is_json:
@@ -114,7 +114,7 @@ def generate_report():
     """Generate various reports."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get form data
     report_type = request.form.get('report_type')
@@ -26,7 +26,7 @@ def settings():
     """Admin settings page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Initialize settings model
     settings_model = Settings()
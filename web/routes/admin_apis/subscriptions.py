@@ -27,7 +27,7 @@ def subscriptions():
     """Subscription plans management page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get subscription plans
     subscription_model = SubscriptionPlan()
@@ -64,7 +64,7 @@ def create_plan():
     """Create subscription plan page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     if request.method == 'POST':
         # Process form submission
@@ -112,7 +112,7 @@ def edit_plan(plan_id):
     """Edit subscription plan page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get subscription plan
     subscription_model = SubscriptionPlan()
@@ -173,7 +173,7 @@ def delete_plan(plan_id):
     """Delete subscription plan."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get subscription plan
     subscription_model = SubscriptionPlan()
@@ -12,6 +12,7 @@ from web.utils.decorators import admin_required
 from database.models.user import User
 from database.models.subscription import SubscriptionPlan
 from database.models.transaction import Transaction
+from database.models.revenue_stats import RevenueStats
 def format_mongodb_date(date_field, format='%Y-%m-%d'):
     """
     Format a date field that could be either a datetime object or a MongoDB date dictionary.
@@ -58,7 +59,7 @@ def transactions():
     """Transaction history page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Initialize models
     transaction_model = Transaction()
@@ -164,12 +165,14 @@ def transactions():
     # Get all subscription plans for filter dropdown
     all_plans = subscription_model.list_plans()
     
-    # Calculate transaction statistics
+    # Calculate transaction statistics from the materialized all-time counters
+    all_time = RevenueStats().get_all_time()
+    status_counts = all_time.get('status_counts', {})
     stats = {
         'total_transactions': total_count,
-        'total_revenue': f"${sum(tx.get('amount', 0) for tx in transaction_model.collection.find({'status': 'completed'})):.2f}",
-        'completed': transaction_model.collection.count_documents({"status": "completed"}),
-        'pending': transaction_model.collection.count_documents({"status": "pending"})
+        'total_revenue': f"${all_time.get('revenue', 0):.2f}",
+        'completed': status_counts.get('completed', 0),
+        'pending': status_counts.get('pending', 0)
     }
     
     # Calculate pagination variables
@@ -195,7 +198,7 @@ def transaction_details(transaction_id):
     """Transaction details page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Initialize models
     transaction_model = Transaction()
@@ -262,7 +265,7 @@ def update_transaction_status(transaction_id):
     """Update transaction status."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get new status
     status = request.form.get('status')
@@ -309,7 +312,7 @@ def send_transaction_receipt(transaction_id):
     """Send transaction receipt via email."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get form data
     email = request.form.get('email')
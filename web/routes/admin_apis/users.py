@@ -141,7 +141,7 @@ def users():
     }
     
     # Get current user for the template
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Create pagination URLs
     pagination_urls = {}
@@ -179,7 +179,7 @@ def user_create():
     """Create user page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get all subscription plans for the form
     subscription_model = SubscriptionPlan()
@@ -279,7 +279,7 @@ def user_edit(user_id):
     """Edit user page."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get user to edit
     user = user_model.get_user_by_id(user_id)
@@ -335,6 +335,7 @@ def user_edit(user_id):
                         {"_id": ObjectId(user_id)},
                         {"$set": {"password": hashed_password}}
                     )
+                    user_model.invalidate_cached_user(user_id)
                     if not result.modified_count > 0:
                         flash('User updated but failed to update password', 'warning')
                 except Exception as e:
@@ -433,7 +434,7 @@ def user_delete(user_id):
     """Delete user."""
     # Get current user for the template
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get user to delete
     user = user_model.get_user_by_id(user_id)
@@ -455,6 +456,7 @@ def user_delete(user_id):
         try:
             result = user_model.collection.delete_one({"_id": ObjectId(user_id)})
             success = result.deleted_count > 0
+            user_model.invalidate_cached_user(user_id)
         except Exception as e:
             logger.error(f"Error deleting user: {e}")
             success = False
@@ -472,7 +474,7 @@ def admin_get_user(user_id):
     """API endpoint to get user details for admin."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get user to view
     user = user_model.get_user_by_id(user_id)
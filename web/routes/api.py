@@ -11,18 +11,11 @@ from database.models.user import User
 from database.models.subscription import SubscriptionPlan
 from database.models.transaction import Transaction
 from payment.paypal import create_subscription_order, process_successful_payment
-
-def jsonify_custom(obj):
-    """Custom jsonify function that handles ObjectId and datetime objects."""
-    from flask import jsonify
-    from web.utils.json_encoder import to_json
-    import json
-    
-    # Convert the object to JSON-serializable data using our custom converter
-    serializable_obj = json.loads(json.dumps(obj, default=to_json))
-    
-    # Use Flask's jsonify with pre-serialized data
-    return jsonify(serializable_obj)
+from web.utils.http_cache import check_not_modified
+from web.utils.jobs import submit_job, job_events_response
+from web.utils.sse import sse_response
+from web.utils.user_events import iter_user_events
+from database.models.job import Job
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -36,8 +29,17 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 @login_required
 def get_user_profile():
     """API endpoint to get user profile data."""
-    # Get user data
     user_model = User()
+    
+    # Answer polls with 304 while the stored user document is unchanged;
+    # the validator is read from the database, never from a cached copy
+    stamp = user_model.get_user_updated_at(session['user_id'])
+    if stamp:
+        not_modified = check_not_modified(stamp['_id'], stamp.get('updatedAt'), last_modified=stamp.get('updatedAt'))
+        if not_modified:
+            return not_modified
+    
+    # Get user data
     user = user_model.get_user_by_id(session['user_id'])
     
     if not user:
@@ -81,8 +83,17 @@ def get_user_profile():
 @login_required
 def get_user_villages():
     """API endpoint to get user villages."""
-    # Get user data
     user_model = User()
+    
+    # Answer polls with 304 while the stored user document is unchanged;
+    # the validator is read from the database, never from a cached copy
+    stamp = user_model.get_user_updated_at(session['user_id'])
+    if stamp:
+        not_modified = check_not_modified(stamp['_id'], stamp.get('updatedAt'), last_modified=stamp.get('updatedAt'))
+        if not_modified:
+            return not_modified
+    
+    # Get user data
     user = user_model.get_user_by_id(session['user_id'])
     
     if not user:
@@ -97,6 +108,54 @@ def get_user_villages():
     })
 
 
+@api_bp.route('/user/villages/extract', methods=['POST'])
+@api_error_handler
+@login_required
+def extract_user_villages():
+    """API endpoint to queue a village extraction job."""
+    return submit_job(
+        session['user_id'],
+        'extract_villages',
+        message='Village extraction started'
+    )
+
+
+@api_bp.route('/user/jobs/<job_id>', methods=['GET'])
+@api_error_handler
+@login_required
+def get_job_status(job_id):
+    """API endpoint to get the status of a background job."""
+    job = Job().get_job(job_id, session['user_id'])
+    
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': Job.to_public(job)
+    })
+
+
+@api_bp.route('/user/jobs/<job_id>/events', methods=['GET'])
+@login_required
+def stream_job_events(job_id):
+    """API endpoint streaming background job progress as server-sent events."""
+    return job_events_response(job_id, session['user_id'])
+
+
+@api_bp.route('/user/events', methods=['GET'])
+@login_required
+def stream_user_events():
+    """API endpoint streaming the user's job updates and new activity as server-sent events."""
+    return sse_response(iter_user_events(
+        session['user_id'],
+        request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    ), user_id=session['user_id'])
+
+
 @api_bp.route('/user/villages/update', methods=['POST'])
 @api_error_handler
 @login_required
@@ -132,7 +191,7 @@ def update_user_villages():
         }), 400
     
     # Update user villages
-    if user_model.update_villages(session['user_id'], villages):
+    if user_model.update_user(session['user_id'], {'villages': villages}):
         logger.info(f"User '{user['username']}' updated villages")
         return jsonify({
             'success': True,
@@ -345,7 +404,7 @@ def cancel_subscription():
     """API endpoint to cancel a subscription."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         return jsonify({
@@ -388,7 +447,7 @@ def admin_refresh_stats():
     
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     logger.info(f"Admin '{current_user['username']}' refreshed dashboard statistics")
     
@@ -404,7 +463,7 @@ def admin_get_user(user_id):
     """API endpoint to get user details for admin."""
     # Get current user for logging
     user_model = User()
-    current_user = user_model.get_user_by_id(session['user_id'])
+    current_user = user_model.get_cached_user(session['user_id'])
     
     # Get user to view
     user = user_model.get_user_by_id(user_id)
@@ -507,6 +566,7 @@ def delete_user_account():
             try:
                 # Delete user
                 result = user_model.collection.delete_one({"_id": ObjectId(user_id)})
+                user_model.invalidate_cached_user(user_id)
                 
                 if result.deleted_count > 0:
                     # Delete associated data (activities, etc.)
@@ -552,7 +612,7 @@ def delete_user_account():
 def paypal_webhook():
     """Webhook endpoint for PayPal payment notifications."""
     # Import PayPal webhook function
-    from payment.paypal import handle_webhook_event, verify_webhook_signature
+    from payment.paypal import handle_webhook_event, verify_webhook_signature, webhook_partition_key
     
     # Verify webhook signature
     if not verify_webhook_signature(request.data, request.headers):
@@ -563,7 +623,13 @@ def paypal_webhook():
         }), 401
     
     # Get webhook event data
-    event_data = request.get_json()
+    event_data = request.get_json(silent=True)
+    if not isinstance(event_data, dict):
+        logger.warning("Invalid JSON in PayPal webhook")
+        return jsonify({
+            'success': False,
+            'message': 'Invalid event body'
+        }), 400
     
     # Extract event type
     event_type = event_data.get('event_type')
@@ -575,16 +641,45 @@ def paypal_webhook():
             'message': 'Missing event type'
         }), 400
     
-    # Handle webhook event
-    if handle_webhook_event(event_type, event_data):
-        logger.info(f"Successfully processed PayPal webhook event: {event_type}")
-        return jsonify({
-            'success': True,
-            'message': 'Webhook processed successfully'
-        })
-    else:
+    if not current_app.config.get('WEBHOOK_INBOX_ENABLED', True):
+        # Process inline while PayPal waits
+        if handle_webhook_event(event_type, event_data):
+            logger.info(f"Successfully processed PayPal webhook event: {event_type}")
+            return jsonify({
+                'success': True,
+                'message': 'Webhook processed successfully'
+            })
+        
         logger.warning(f"Failed to process PayPal webhook event: {event_type}")
         return jsonify({
             'success': False,
             'message': 'Failed to process webhook event'
         }), 500
+    
+    event_id = event_data.get('id')
+    if not event_id:
+        logger.warning("Missing event ID in PayPal webhook")
+        return jsonify({
+            'success': False,
+            'message': 'Missing event ID'
+        }), 400
+    
+    # Store the event for the webhook workers and acknowledge it right away;
+    # PayPal redelivers the same event ID on retries, which the inbox ignores
+    from database.models.webhook_event import WebhookEvent
+    
+    stored_id, created = WebhookEvent().record(
+        'paypal', event_id, event_type, event_data, webhook_partition_key(event_data)
+    )
+    
+    if stored_id is None:
+        # Let PayPal retry later
+        return jsonify({
+            'success': False,
+            'message': 'Failed to store webhook event'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'message': 'Webhook received' if created else 'Webhook already received'
+    })
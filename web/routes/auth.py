@@ -36,8 +36,11 @@ def login():
         password = request.form.get('password', '')
         remember_me = 'remember' in request.form
         
-        # Authenticate user
-        success, message, token, user_data = login_user(username, password, remember_me)
+        # Authenticate user; throttle on the peer address ProxyFix resolved,
+        # never on a client-supplied X-Forwarded-For
+        success, message, token, user_data = login_user(
+            username, password, remember_me, ip_address=request.remote_addr
+        )
         
         if success:
             # Store user data in session
@@ -5,7 +5,7 @@ import logging
 from flask import Blueprint, request, jsonify, session
 from web.utils.decorators import login_required, api_error_handler
 from database.models.user import User
-from database.models.activity_log import ActivityLog
+from web.utils.jobs import submit_job
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -17,10 +17,10 @@ travian_api_bp = Blueprint('travian_api', __name__, url_prefix='/api/user/travia
 @api_error_handler
 @login_required
 def verify_travian_connection():
-    """API endpoint to verify Travian account connection."""
+    """API endpoint to queue a Travian account connection check."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         return jsonify({
@@ -53,78 +53,16 @@ def verify_travian_connection():
             'message': 'Password is required'
         }), 400
     
-    # Try to verify connection
-    try:
-        # Test the connection
-        connection_result = test_connection(
-            username, 
-            password, 
-            server_url
-        )
-        
-        # Check connection result
-        if connection_result['success']:
-            # Get villages count if available
-            villages_count = connection_result.get('villages_count', 0)
-            
-            # Log successful connection
-            try:
-                activity_model = ActivityLog()
-                activity_model.log_activity(
-                    user_id=session['user_id'],
-                    activity_type='travian-connection',
-                    details='Successfully connected to Travian account',
-                    status='success',
-                    data={
-                        'villages_count': villages_count
-                    }
-                )
-            except Exception as e:
-                logger.error(f"Error logging connection activity: {e}")
-            
-            # Return success response
-            return jsonify({
-                'success': True,
-                'message': 'Travian account successfully connected!',
-                'villages_count': villages_count
-            })
-        else:
-            # Log failed connection
-            try:
-                activity_model = ActivityLog()
-                activity_model.log_activity(
-                    user_id=session['user_id'],
-                    activity_type='travian-connection',
-                    details=f"Failed to connect to Travian account: {connection_result.get('message', 'Unknown error')}",
-                    status='error'
-                )
-            except Exception as e:
-                logger.error(f"Error logging connection activity: {e}")
-            
-            # Return error response
-            return jsonify({
-                'success': False,
-                'message': connection_result.get('message', 'Failed to connect to Travian account')
-            })
-    except Exception as e:
-        logger.error(f"Error verifying Travian connection: {e}")
-        
-        # Log error
-        try:
-            activity_model = ActivityLog()
-            activity_model.log_activity(
-                user_id=session['user_id'],
-                activity_type='travian-connection',
-                details=f"Error verifying Travian connection: {str(e)}",
-                status='error'
-            )
-        except Exception as log_err:
-            logger.error(f"Error logging connection activity: {log_err}")
-        
-        return jsonify({
-            'success': False,
-            'message': f"An error occurred: {str(e)}"
-        }), 500
+    # The Selenium login takes up to a minute, so it runs on the job workers
+    secrets = {'password': data['password']} if data.get('password') is not None else None
+    
+    return submit_job(
+        session['user_id'],
+        'verify_travian_connection',
+        params={'username': username, 'server': server_url},
+        secrets=secrets,
+        message='Connection check started'
+    )
 
 def register_routes(app):
     """Register Travian API routes with the application."""
@@ -2,22 +2,24 @@
 Activity logs routes for Travian Whispers web application.
 """
 import logging
-import csv
-import io
-import json
 from datetime import datetime, timedelta
 from flask import (
     render_template, flash, session, redirect, 
-    url_for, request, jsonify, Response, current_app
+    url_for, request, jsonify, current_app
 )
 
 from web.utils.decorators import login_required, api_error_handler
+from web.utils.streaming import stream_export
 from database.models.user import User
 from database.models.activity_log import ActivityLog
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Fields read from the database and written to exports
+EXPORT_PROJECTION = {'timestamp': 1, 'activityType': 1, 'details': 1, 'status': 1, 'village': 1, 'data': 1}
+CSV_FIELDNAMES = ['timestamp', 'activity_type', 'details', 'status', 'village']
+
 def register_routes(user_bp):
     """Register activity logs routes with the user blueprint."""
     # Attach routes to the blueprint
@@ -29,7 +31,7 @@ def activity_logs():
     """Activity logs route."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         # Flash error message
@@ -171,90 +173,39 @@ def export_activity_logs():
         if end_date:
             filter_query["timestamp"]["$lte"] = end_date
     
-    # Get activity logs from database
+    # Stream matching logs from a projected cursor (no pagination)
     activity_model = ActivityLog()
+    cursor = activity_model.iter_user_logs(
+        session['user_id'],
+        filter_query=filter_query,
+        projection=EXPORT_PROJECTION
+    )
     
-    # Get all logs that match the filter (no pagination)
-    all_logs = list(activity_model.collection.find(filter_query).sort("timestamp", -1))
-    
-    # Format logs for export
-    formatted_logs = []
-    for log in all_logs:
-        formatted_logs.append({
-            'timestamp': log.get('timestamp').strftime('%Y-%m-%d %H:%M:%S') if log.get('timestamp') else 'N/A',
-            'activity_type': log.get('activityType', 'Unknown'),
-            'details': log.get('details', 'No details'),
-            'status': log.get('status', 'Unknown'),
-            'village': log.get('village', 'N/A'),
-            'data': log.get('data', {})
-        })
-    
-    # Export as CSV or JSON
-    if export_format == 'csv':
-        return export_as_csv(formatted_logs)
-    else:
-        return export_as_json(formatted_logs)
-
-def export_as_csv(logs):
-    """
-    Export logs as CSV file.
-    
-    Args:
-        logs (list): List of log dictionaries
-        
-    Returns:
-        Response: Flask response with CSV file
-    """
-    # Create CSV file in memory
-    output = io.StringIO()
-    fieldnames = ['timestamp', 'activity_type', 'details', 'status', 'village']
-    
-    # Create CSV writer
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    
-    # Write header
-    writer.writeheader()
-    
-    # Write logs
-    for log in logs:
-        # Only include the specified fields
-        row = {field: log.get(field, '') for field in fieldnames}
-        writer.writerow(row)
+    compress = request.args.get('gzip', 'false').lower() == 'true'
     
-    # Create response
-    response = Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename=activity_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        }
+    return stream_export(
+        (format_log_for_export(log) for log in cursor),
+        export_format,
+        'activity_logs',
+        fieldnames=CSV_FIELDNAMES,
+        compress=compress
     )
-    
-    return response
 
-def export_as_json(logs):
+def format_log_for_export(log):
     """
-    Export logs as JSON file.
+    Format an activity log document for export.
     
     Args:
-        logs (list): List of log dictionaries
+        log (dict): Activity log document
         
     Returns:
-        Response: Flask response with JSON file
+        dict: Exported fields
     """
-    # Convert ObjectId and datetime objects to strings
-    for log in logs:
-        for key, value in log.items():
-            if isinstance(value, datetime):
-                log[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Create response
-    response = Response(
-        json.dumps(logs, indent=2),
-        mimetype='application/json',
-        headers={
-            'Content-Disposition': f'attachment; filename=activity_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        }
-    )
-    
-    return response
\ No newline at end of file
+    return {
+        'timestamp': log.get('timestamp').strftime('%Y-%m-%d %H:%M:%S') if log.get('timestamp') else 'N/A',
+        'activity_type': log.get('activityType', 'Unknown'),
+        'details': log.get('details', 'No details'),
+        'status': log.get('status', 'Unknown'),
+        'village': log.get('village', 'N/A'),
+        'data': log.get('data', {})
+    }
@@ -23,7 +23,7 @@ def dashboard():
     """User dashboard route."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         # Flash error message
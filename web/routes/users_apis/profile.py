@@ -28,7 +28,11 @@ def profile():
     """User profile route."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    # Forms that write read the stored document, not a cached copy
+    if request.method == 'POST':
+        user = user_model.get_user_by_id(session['user_id'])
+    else:
+        user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         # Flash error message
@@ -14,18 +14,6 @@ from web.utils.decorators import login_required
 from database.models.user import User
 from database.models.activity_log import ActivityLog
 
-# Import needed for connection testing
-try:
-    from travian_api.connector import test_connection
-except ImportError:
-    # Define a fallback function if the module is not available
-    def test_connection(username, password, server_url, timeout=30):
-        logger.warning("travian_api.connector module not available, using fallback")
-        return {
-            'success': False,
-            'message': "Connection test not available - module not installed"
-        }
-        
 # Initialize logger
 logger = logging.getLogger(__name__)
 
@@ -74,7 +62,11 @@ def travian_settings():
     """Travian account settings route."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    # Forms that write read the stored document, not a cached copy
+    if request.method == 'POST':
+        user = user_model.get_user_by_id(session['user_id'])
+    else:
+        user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         # Flash error message
@@ -164,84 +156,27 @@ def travian_settings():
             flash('Travian account settings updated successfully', 'success')
             logger.info(f"User '{user['username']}' updated Travian settings")
             
-            # Attempt to verify connection with Travian servers and extract villages
-            connection_verified = False
-            villages_extracted = False
-            villages_count = 0
-            try:
-                # Test the connection
-                from travian_api.connector import test_connection
-                connection_result = test_connection(
-                    travian_username, 
-                    travian_password, 
-                    travian_server
-                )
-                connection_verified = connection_result['success']
-                
-                if connection_verified:
-                    flash('Travian account successfully connected and verified!', 'success')
-                    logger.info(f"Travian connection verified for user '{user['username']}'")
-                    
-                    # Now automatically extract villages
-                    try:
-                        # Notify user that we're extracting villages
-                        flash('Extracting villages from your Travian account...', 'info')
-                        
-                        # Import the extract_villages function
-                        try:
-                            from web.routes.users_apis.villages import extract_villages_internal
-                            
-                            # Extract villages
-                            extraction_result = extract_villages_internal(session['user_id'])
-                            
-                            if extraction_result.get('success'):
-                                villages_extracted = True
-                                villages_count = len(extraction_result.get('data', []))
-                                flash(f'Successfully extracted {villages_count} villages from your Travian account!', 'success')
-                                logger.info(f"Villages extracted for user '{user['username']}': {villages_count}")
-                            else:
-                                flash(f"Villages could not be extracted: {extraction_result.get('message', 'Unknown error')}", 'warning')
-                                logger.warning(f"Village extraction failed for user '{user['username']}': {extraction_result.get('message', 'Unknown error')}")
-                        except ImportError:
-                            logger.warning("extract_villages_internal function not available")
-                            flash('Villages could not be extracted automatically. Please use the Extract Villages button on the Villages page.', 'warning')
-                    except Exception as e:
-                        logger.error(f"Error during village extraction: {e}")
-                        flash('Connection verified, but village extraction failed. Please try manually extracting villages.', 'warning')
-                else:
-                    flash(f"Settings saved but connection could not be verified: {connection_result.get('message', 'Unknown error')}", 'warning')
-                    logger.warning(f"Travian connection failed for user '{user['username']}': {connection_result.get('message', 'Unknown error')}")
-            except ImportError:
-                logger.warning("Travian API connector module not available, connection verification skipped")
+            # Verify the connection and extract villages on the job workers;
+            # the browser session takes too long to run in this request
+            from database.models.job import Job
+            job = Job().create_job(session['user_id'], 'connect_travian_account')
+            
+            if job:
+                flash('Verifying your Travian account and extracting villages in the background. '
+                      'Your villages will appear on the Villages page shortly.', 'info')
+            else:
                 flash('Settings saved. To verify your connection, please visit the Villages page and click "Extract Villages".', 'info')
-            except Exception as e:
-                logger.error(f"Error verifying Travian connection: {e}")
-                flash('Settings saved but there was an error verifying the connection', 'warning')
             
-            # Log the activity
+            # Log the activity (the job logs the connection result)
             try:
-                from database.models.activity_log import ActivityLog
                 activity_model = ActivityLog()
-                
-                # Log different activity based on verification result
-                if connection_verified:
-                    activity_model.log_activity(
-                        user_id=session['user_id'],
-                        activity_type='travian-connection',
-                        details='Successfully connected to Travian account',
-                        status='success',
-                        data={
-                            'villages_extracted': villages_extracted,
-                            'villages_count': villages_count
-                        }
-                    )
-                else:
-                    activity_model.log_activity(
-                        user_id=session['user_id'],
-                        activity_type='travian-settings-update',
-                        details='Updated Travian account settings',
-                        status='success'
-                    )
+                activity_model.log_activity(
+                    user_id=session['user_id'],
+                    activity_type='travian-settings-update',
+                    details='Updated Travian account settings',
+                    status='success',
+                    data={'job_id': str(job['_id'])} if job else None
+                )
             except Exception as e:
                 logger.error(f"Error logging activity: {e}")
         else:
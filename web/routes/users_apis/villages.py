@@ -12,6 +12,7 @@ from flask import (
 from bson import ObjectId
 
 from web.utils.decorators import login_required, api_error_handler
+from web.utils.jobs import submit_job
 from database.models.user import User
 from database.models.activity_log import ActivityLog
 
@@ -19,13 +20,15 @@ from database.models.activity_log import ActivityLog
 logger = logging.getLogger(__name__)
 
 # Define the extract_villages_internal function first, before it's referenced
-def extract_villages_internal(user_id):
+def extract_villages_internal(user_id, progress=None):
     """
     Extract villages internally (without HTTP request/response).
-    This can be called from travian_settings when a user adds/updates their account.
+    This runs as the 'extract_villages' background job (see tasks/job_handlers.py).
     
     Args:
         user_id (str): User ID
+        progress (callable, optional): Called with (percent, message) as
+            extraction advances
         
     Returns:
         dict: Result dictionary with keys 'success', 'message', and optionally 'data'
@@ -83,6 +86,8 @@ def extract_villages_internal(user_id):
         # Setup browser
         try:
             logger.info("Setting up browser for internal village extraction")
+            if progress:
+                progress(10, 'Starting browser...')
             
             # Check for Selenium remote URL
             selenium_url = os.environ.get('SELENIUM_REMOTE_URL')
@@ -133,6 +138,8 @@ def extract_villages_internal(user_id):
         # Login to Travian
         try:
             logger.info(f"Attempting to log in to Travian as {travian_username}")
+            if progress:
+                progress(30, 'Logging into Travian...')
             
             # Basic login implementation
             if not travian_server.startswith(('http://', 'https://')):
@@ -234,6 +241,8 @@ def extract_villages_internal(user_id):
         # Extract villages
         try:
             logger.info("Running village extraction")
+            if progress:
+                progress(60, 'Extracting village data...')
             from tasks.villages import run_villages
             
             extracted_villages = run_villages(driver)
@@ -291,6 +300,8 @@ def extract_villages_internal(user_id):
         
         # Update user's villages in database
         logger.info("Updating user's villages in database")
+        if progress:
+            progress(90, 'Saving villages...')
         if user_model.update_user(user_id, {'villages': extracted_villages}):
             # Log the activity
             activity_model = ActivityLog()
@@ -343,7 +354,7 @@ def villages():
     """Villages management route."""
     # Get user data
     user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
+    user = user_model.get_cached_user(session['user_id'])
     
     if not user:
         # Flash error message
@@ -469,11 +480,8 @@ def add_village():
                 'message': 'A village with this ID already exists'
             }), 400
     
-    # Add village to user's villages
-    current_villages.append(village)
-    
-    # Update user in database
-    if user_model.update_user(session['user_id'], {'villages': current_villages}):
+    # Append in place so villages extracted meanwhile are kept
+    if user_model.add_village(session['user_id'], village):
         # Log the activity
         activity_model = ActivityLog()
         activity_model.log_activity(
@@ -538,27 +546,30 @@ def update_village():
     # Get the original village data before update (for logging)
     original_village = current_villages[village_idx].copy()
     
-    # Update village data
+    # Collect the changed fields
+    fields = {}
     if 'village_name' in data:
-        current_villages[village_idx]['name'] = data['village_name']
+        fields['name'] = data['village_name']
     
     if 'village_x' in data:
-        current_villages[village_idx]['x'] = int(data['village_x'])
+        fields['x'] = int(data['village_x'])
     
     if 'village_y' in data:
-        current_villages[village_idx]['y'] = int(data['village_y'])
+        fields['y'] = int(data['village_y'])
     
     if 'village_population' in data:
-        current_villages[village_idx]['population'] = int(data['village_population'])
+        fields['population'] = int(data['village_population'])
     
     if 'auto_farm_enabled' in data:
-        current_villages[village_idx]['auto_farm_enabled'] = bool(data['auto_farm_enabled'])
+        fields['auto_farm_enabled'] = bool(data['auto_farm_enabled'])
     
     if 'training_enabled' in data:
-        current_villages[village_idx]['training_enabled'] = bool(data['training_enabled'])
+        fields['training_enabled'] = bool(data['training_enabled'])
+    
+    current_villages[village_idx].update(fields)
     
-    # Update user in database
-    if user_model.update_user(session['user_id'], {'villages': current_villages}):
+    # Update only this village so concurrent changes to the others are kept
+    if user_model.update_village(session['user_id'], original_village.get('newdid'), fields):
         # Log the activity
         activity_model = ActivityLog()
         activity_model.log_activity(
@@ -620,11 +631,8 @@ def remove_village():
             'message': 'Village not found'
         }), 404
     
-    # Remove the village from the list
-    current_villages = [v for v in current_villages if str(v.get('newdid')) != str(data['village_id'])]
-    
-    # Update user in database
-    if user_model.update_user(session['user_id'], {'villages': current_villages}):
+    # Remove only this village so concurrent changes to the others are kept
+    if user_model.remove_village(session['user_id'], village_to_remove.get('newdid')):
         # Log the activity
         activity_model = ActivityLog()
         activity_model.log_activity(
@@ -676,19 +684,18 @@ def update_village_settings():
     training_villages = data.get('training_villages', [])
     
     # Update villages settings
-    current_villages = user.get('villages', [])
+    settings = {}
     
-    for village in current_villages:
+    for village in user.get('villages', []):
         village_id = str(village.get('newdid'))
         
-        # Update auto farm setting
-        village['auto_farm_enabled'] = village_id in auto_farm_villages
-        
-        # Update training setting
-        village['training_enabled'] = village_id in training_villages
+        settings[village.get('newdid')] = {
+            'auto_farm_enabled': village_id in auto_farm_villages,
+            'training_enabled': village_id in training_villages
+        }
     
-    # Update user in database
-    if user_model.update_user(session['user_id'], {'villages': current_villages}):
+    # Update the flags in place so villages extracted meanwhile are kept
+    if user_model.update_villages_fields(session['user_id'], settings):
         # Log the activity
         activity_model = ActivityLog()
         activity_model.log_activity(
@@ -713,19 +720,10 @@ def update_village_settings():
 @api_error_handler
 @login_required
 def extract_villages():
-    """API endpoint to extract villages from Travian."""
-    # Call the internal function, just passing the user ID from the session
-    result = extract_villages_internal(session['user_id'])
-    
-    # Return JSON response based on the result
-    if result.get('success'):
-        return jsonify({
-            'success': True,
-            'message': result.get('message', f'Successfully extracted {len(result.get("data", []))} villages'),
-            'data': result.get('data', [])
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'message': result.get('message', 'Unknown error occurred during extraction')
-        }), 500
+    """API endpoint to queue a village extraction job."""
+    # Extraction drives a browser for up to two minutes, so it runs on the job workers
+    return submit_job(
+        session['user_id'],
+        'extract_villages',
+        message='Village extraction started'
+    )
@@ -0,0 +1,82 @@
+/**
+ * Background Jobs JavaScript
+ * Follows a queued background job until it finishes
+ */
+
+/**
+ * Wait for a background job to finish.
+ *
+ * Listens to the job's server-sent events and falls back to polling
+ * the status endpoint when EventSource is unavailable or fails.
+ *
+ * @param {Object} submission - Response of the submit endpoint (job_id, status_url, events_url)
+ * @param {Function} onUpdate - Called with the job on every progress update
+ * @returns {Promise<Object>} Resolves with the finished job
+ */
+function waitForJob(submission, onUpdate) {
+    const finished = ['succeeded', 'failed'];
+    const update = onUpdate || function() {};
+
+    return new Promise((resolve, reject) => {
+        let settled = false;
+
+        function handle(job) {
+            if (settled) return;
+            update(job);
+            if (finished.includes(job.status)) {
+                settled = true;
+                resolve(job);
+            }
+        }
+
+        function poll() {
+            fetch(submission.status_url, {
+                headers: {
+                    'Accept': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP error! Status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                handle(data.data);
+                if (!settled) setTimeout(poll, 2000);
+            })
+            .catch(error => {
+                settled = true;
+                reject(error);
+            });
+        }
+
+        if (!window.EventSource || !submission.events_url) {
+            poll();
+            return;
+        }
+
+        const source = new EventSource(submission.events_url);
+
+        source.addEventListener('job', event => {
+            handle(JSON.parse(event.data));
+            if (settled) source.close();
+        });
+
+        source.addEventListener('error', event => {
+            // Error sent by the server, e.g. the job does not exist
+            if (event.data) {
+                source.close();
+                settled = true;
+                reject(new Error(JSON.parse(event.data).message));
+                return;
+            }
+            // The server ends streams periodically and the browser reconnects;
+            // only give up on the stream when it is closed for good
+            if (source.readyState === EventSource.CLOSED && !settled) {
+                poll();
+            }
+        });
+    });
+}
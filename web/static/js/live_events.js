@@ -0,0 +1,134 @@
+/**
+ * Live Events JavaScript
+ * Receives job updates and new activity entries from the server
+ * instead of reloading pages to see progress. Included only by the
+ * pages that show live activity.
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    if (!window.EventSource) return;
+
+    let source = null;
+
+    // Each open stream holds a server thread, so hidden tabs let go of theirs.
+    // The browser sends Last-Event-ID when it reconnects on its own; after a
+    // tab comes back the stream starts fresh and the page keeps what it shows.
+    function open() {
+        if (source) return;
+        source = new EventSource('/api/user/events');
+
+        source.addEventListener('activity', event => {
+            const entry = JSON.parse(event.data);
+            document.dispatchEvent(new CustomEvent('live:activity', {detail: entry}));
+            prependActivityRow(entry);
+        });
+
+        source.addEventListener('job', event => {
+            const job = JSON.parse(event.data);
+            document.dispatchEvent(new CustomEvent('live:job', {detail: job}));
+
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                showJobToast(job);
+            }
+        });
+
+        source.addEventListener('error', () => {
+            // Refused (too many streams) or gone for good; stay closed
+            if (source && source.readyState === EventSource.CLOSED) {
+                source = null;
+            }
+        });
+    }
+
+    function close() {
+        if (!source) return;
+        source.close();
+        source = null;
+    }
+
+    document.addEventListener('visibilitychange', () => {
+        if (document.hidden) {
+            close();
+        } else {
+            open();
+        }
+    });
+    window.addEventListener('beforeunload', close);
+
+    if (!document.hidden) open();
+});
+
+/**
+ * Escape text for insertion into HTML
+ */
+function escapeLiveText(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
+/**
+ * Add a new activity entry to the activity log table, if the page has one
+ */
+function prependActivityRow(entry) {
+    const body = document.getElementById('activityLogBody');
+    if (!body) return;
+
+    const badges = {
+        success: '<span class="badge bg-success">Success</span>',
+        warning: '<span class="badge bg-warning">Warning</span>',
+        error: '<span class="badge bg-danger">Failed</span>',
+        info: '<span class="badge bg-info">Info</span>'
+    };
+    const status = (entry.status || '').toLowerCase();
+    const activity = (entry.activity || '').replace(/-/g, ' ').replace(/\b\w/g, c => c.toUpperCase());
+
+    const row = document.createElement('tr');
+    row.className = 'activity-row';
+    row.innerHTML = `
+        <td>${escapeLiveText(entry.timestamp ? new Date(entry.timestamp).toLocaleString() : '')}</td>
+        <td><div class="d-flex align-items-center"><i class="bi bi-info-circle me-2 text-muted"></i>${escapeLiveText(activity)}</div></td>
+        <td>${escapeLiveText(entry.details)}</td>
+        <td>${escapeLiveText(entry.village || 'N/A')}</td>
+        <td>${badges[status] || `<span class="badge bg-secondary">${escapeLiveText(entry.status)}</span>`}</td>
+    `;
+
+    // Drop the "no activity" placeholder row
+    const placeholder = body.querySelector('td[colspan]');
+    if (placeholder) placeholder.parentElement.remove();
+
+    body.prepend(row);
+}
+
+/**
+ * Show a notification when a background job finishes
+ */
+function showJobToast(job) {
+    let container = document.getElementById('liveToastContainer');
+    if (!container) {
+        container = document.createElement('div');
+        container.id = 'liveToastContainer';
+        container.className = 'toast-container position-fixed bottom-0 end-0 p-3';
+        document.body.appendChild(container);
+    }
+
+    const succeeded = job.status === 'succeeded';
+    const toast = document.createElement('div');
+    toast.className = `toast align-items-center text-bg-${succeeded ? 'success' : 'danger'} border-0`;
+    toast.setAttribute('role', 'status');
+    toast.innerHTML = `
+        <div class="d-flex">
+            <div class="toast-body">
+                <i class="bi ${succeeded ? 'bi-check-circle-fill' : 'bi-exclamation-triangle-fill'} me-2"></i>
+                ${escapeLiveText(succeeded ? job.message : (job.error || 'Job failed'))}
+            </div>
+            <button type="button" class="btn-close btn-close-white me-2 m-auto" data-bs-dismiss="toast" aria-label="Close"></button>
+        </div>
+    `;
+    container.appendChild(toast);
+
+    if (window.bootstrap) {
+        new bootstrap.Toast(toast, {delay: 8000}).show();
+        toast.addEventListener('hidden.bs.toast', () => toast.remove());
+    }
+}
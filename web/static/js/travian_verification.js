@@ -51,17 +51,25 @@ function verifyTravianConnection() {
         })
     })
     .then(response => response.json())
-    .then(data => {
-        // Update UI based on response
-        if (data.success) {
+    .then(submission => {
+        if (!submission.success) {
+            throw new Error(submission.message || 'Failed to verify connection');
+        }
+        
+        // The login runs as a background job
+        return waitForJob(submission);
+    })
+    .then(job => {
+        // Update UI based on the job result
+        if (job.status === 'succeeded') {
             // Show success message
-            showVerificationSuccess(data);
+            showVerificationSuccess(job.result || {});
             
             // Initiate village extraction if connection was successful
             initiateVillageExtraction();
         } else {
             // Show error message
-            showVerificationError(data.message || 'Failed to verify connection');
+            showVerificationError(job.error || 'Failed to verify connection');
         }
     })
     .catch(error => {
@@ -167,13 +175,21 @@ function initiateVillageExtraction() {
         body: JSON.stringify({})
     })
     .then(response => response.json())
-    .then(data => {
+    .then(submission => {
+        if (!submission.success) {
+            return {status: 'failed', error: submission.message};
+        }
+        
+        // Extraction runs as a background job
+        return waitForJob(submission);
+    })
+    .then(job => {
         // Remove the extraction notification
         notice.remove();
         
         // Show result
-        if (data.success) {
-            const villagesCount = data.data ? data.data.length : 0;
+        if (job.status === 'succeeded') {
+            const villagesCount = job.result && job.result.data ? job.result.data.length : 0;
             const resultNotice = document.createElement('div');
             resultNotice.className = 'alert alert-success mt-3';
             resultNotice.innerHTML = `
@@ -201,7 +217,7 @@ function initiateVillageExtraction() {
             errorNotice.className = 'alert alert-warning mt-3';
             errorNotice.innerHTML = `
                 <i class="bi bi-exclamation-triangle-fill me-2"></i>
-                <div><strong>Village extraction failed.</strong> ${data.message || 'Unknown error'}</div>
+                <div><strong>Village extraction failed.</strong> ${job.error || 'Unknown error'}</div>
                 <div class="mt-2">
                     <a href="/dashboard/villages" class="btn btn-sm btn-outline-primary">
                         <i class="bi bi-buildings me-1"></i>Try Manual Extraction
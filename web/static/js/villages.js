@@ -191,8 +191,8 @@ function startVillageExtraction() {
     if (doneBtn) doneBtn.classList.add('d-none');
     
     // Update progress bar and status
-    progressBar.style.width = '10%';
-    statusText.textContent = 'Checking Travian credentials...';
+    progressBar.style.width = '5%';
+    statusText.textContent = 'Starting extraction...';
     
     // Get CSRF token
     const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content') || 
@@ -200,81 +200,82 @@ function startVillageExtraction() {
     
     console.log("CSRF Token found:", csrfToken ? "Yes" : "No");
     
-    // Set up extraction process with indicators
-    setTimeout(() => {
-        progressBar.style.width = '30%';
-        statusText.textContent = 'Logging into Travian...';
+    // Queue the extraction job and follow its progress
+    console.log("Sending extract villages request");
+    fetch('/api/user/villages/extract', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRF-Token': csrfToken || '',
+            'Accept': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify({})
+    })
+    .then(response => {
+        console.log("Response received:", response.status);
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(submission => {
+        if (!submission.success) {
+            throw new Error(submission.message || 'Failed to start extraction');
+        }
+        
+        return waitForJob(submission, job => {
+            progressBar.style.width = `${Math.max(job.progress || 0, 10)}%`;
+            if (job.message) statusText.textContent = job.message;
+        });
+    })
+    .then(job => {
+        console.log("Extract villages job finished:", job);
+        progressBar.style.width = '100%';
         
-        setTimeout(() => {
-            progressBar.style.width = '60%';
-            statusText.textContent = 'Extracting village data...';
+        if (job.status === 'succeeded') {
+            const villages = (job.result && job.result.data) || [];
+            
+            // Show success results
+            if (progressElement) progressElement.classList.add('d-none');
+            if (resultsElement) resultsElement.classList.remove('d-none');
+            
+            // Update success message
+            const extractSuccessMessage = document.getElementById('extractSuccessMessage');
+            if (extractSuccessMessage) {
+                extractSuccessMessage.textContent = 
+                    `Successfully extracted ${villages.length} villages.`;
+            }
             
-            // Send AJAX request to extract villages
-            console.log("Sending extract villages request");
-            fetch('/api/user/villages/extract', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRF-Token': csrfToken || '',
-                    'Accept': 'application/json',
-                    'X-Requested-With': 'XMLHttpRequest'
-                },
-                body: JSON.stringify({})
-            })
-            .then(response => {
-                console.log("Response received:", response.status);
-                if (!response.ok) {
-                    throw new Error(`HTTP error! Status: ${response.status}`);
-                }
-                return response.json();
-            })
-            .then(data => {
-                console.log("Extract villages response:", data);
-                progressBar.style.width = '100%';
+            // Populate villages list
+            const villagesList = document.getElementById('extractedVillagesList');
+            if (villagesList) {
+                villagesList.innerHTML = '';
                 
-                if (data.success) {
-                    // Show success results
-                    if (progressElement) progressElement.classList.add('d-none');
-                    if (resultsElement) resultsElement.classList.remove('d-none');
-                    
-                    // Update success message
-                    const extractSuccessMessage = document.getElementById('extractSuccessMessage');
-                    if (extractSuccessMessage) {
-                        extractSuccessMessage.textContent = 
-                            `Successfully extracted ${data.data.length} villages.`;
-                    }
-                    
-                    // Populate villages list
-                    const villagesList = document.getElementById('extractedVillagesList');
-                    if (villagesList) {
-                        villagesList.innerHTML = '';
-                        
-                        data.data.forEach(village => {
-                            const listItem = document.createElement('li');
-                            listItem.className = 'list-group-item';
-                            listItem.textContent = `${village.name} (${village.x}|${village.y})`;
-                            villagesList.appendChild(listItem);
-                        });
-                    }
-                    
-                    // Show Done button
-                    if (doneBtn) doneBtn.classList.remove('d-none');
-                    
-                    // Refresh the page data after delay
-                    setTimeout(() => {
-                        window.location.reload();
-                    }, 3000);
-                } else {
-                    // Show error
-                    showExtractionError(data.message || 'Failed to extract villages');
-                }
-            })
-            .catch(error => {
-                console.error('Extraction error:', error);
-                showExtractionError(`Error: ${error.message || 'Unknown error occurred'}`);
-            });
-        }, 1500);
-    }, 1000);
+                villages.forEach(village => {
+                    const listItem = document.createElement('li');
+                    listItem.className = 'list-group-item';
+                    listItem.textContent = `${village.name} (${village.x}|${village.y})`;
+                    villagesList.appendChild(listItem);
+                });
+            }
+            
+            // Show Done button
+            if (doneBtn) doneBtn.classList.remove('d-none');
+            
+            // Refresh the page data after delay
+            setTimeout(() => {
+                window.location.reload();
+            }, 3000);
+        } else {
+            // Show error
+            showExtractionError(job.error || 'Failed to extract villages');
+        }
+    })
+    .catch(error => {
+        console.error('Extraction error:', error);
+        showExtractionError(`Error: ${error.message || 'Unknown error occurred'}`);
+    });
 }
 
 /**
@@ -5,28 +5,11 @@ This module provides utility functions for API endpoints.
 import logging
 import json
 from flask import Response, make_response
-from bson import ObjectId
-from datetime import datetime
+from web.utils.json_encoder import to_json
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-def custom_json_encoder(obj):
-    """
-    Custom JSON encoder for MongoDB ObjectId and datetime objects.
-    
-    Args:
-        obj: Object to encode
-        
-    Returns:
-        JSON serializable object
-    """
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    if isinstance(obj, datetime):
-        return obj.isoformat() if obj else None
-    raise TypeError(f"Type {type(obj)} not serializable")
-
 def jsonify(data, status=200):
     """
     Create a JSON response with the correct content type.
@@ -40,7 +23,7 @@ def jsonify(data, status=200):
     """
     # First serialize the data to a JSON string
     try:
-        json_str = json.dumps(data, default=custom_json_encoder)
+        json_str = json.dumps(data, default=to_json)
     except TypeError as e:
         logger.error(f"JSON serialization error: {e}")
         json_str = json.dumps({
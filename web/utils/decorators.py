@@ -41,7 +41,22 @@ def admin_required(view_func):
                 flash('Please log in to access this page', 'warning')
                 return redirect(url_for('auth.login', next=request.path))
         
-        if session.get('role') != 'admin':
+        # Check the stored role; the user document is reused by the view
+        from database.models.user import User
+        user = User().get_cached_user(session['user_id'])
+        
+        if not user:
+            session.clear()
+            if request.path.startswith('/api/'):
+                return jsonify({
+                    'success': False,
+                    'message': 'Authentication required'
+                }), 401
+            else:
+                flash('Please log in to access this page', 'warning')
+                return redirect(url_for('auth.login', next=request.path))
+        
+        if user.get('role') != 'admin':
             if request.path.startswith('/api/'):
                 return jsonify({
                     'success': False,
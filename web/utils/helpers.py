@@ -45,7 +45,7 @@ def get_current_user():
         return None
     
     user_model = User()
-    return user_model.get_user_by_id(session['user_id'])
+    return user_model.get_cached_user(session['user_id'])
 
 
 def render_error_page(error_code, message=None):
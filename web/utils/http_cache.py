@@ -0,0 +1,238 @@
+"""
+HTTP caching and compression for Travian Whispers web application.
+This module adds cache validators (ETag/Last-Modified), content-negotiated
+gzip/brotli compression and long-lived caching of fingerprinted static
+files to every response.
+"""
+import gzip
+import hashlib
+import logging
+import os
+from datetime import timezone
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Mimetypes worth compressing
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/xml',
+    'image/svg+xml'
+}
+
+# Mimetypes that get a body-hash ETag when the view did not set one
+ETAG_MIMETYPES = {'text/html', 'application/json'}
+
+# One year, the conventional maximum for immutable assets
+IMMUTABLE_MAX_AGE = 31536000
+
+# Static file fingerprints keyed by (path, mtime)
+_fingerprints = {}
+
+
+def document_etag(*parts):
+    """
+    Build an ETag value from document versions.
+
+    Args:
+        *parts: Values identifying the resource state, typically
+            document IDs and updatedAt timestamps
+
+    Returns:
+        str: ETag value (without quotes or weak prefix)
+    """
+    digest = hashlib.md5()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def check_not_modified(*parts, last_modified=None):
+    """
+    Set cache validators for the current response and check the request.
+
+    Views call this before building an expensive response. The weak ETag
+    is derived from the given document versions, so an unchanged
+    resource can be answered with 304 without rendering it.
+
+    Args:
+        *parts: Values identifying the resource state
+        last_modified (datetime, optional): Last modification time
+
+    Returns:
+        Response: Empty 304 response if the client copy is current,
+            otherwise None
+    """
+    etag = document_etag(*parts)
+    g.http_etag = etag
+    g.http_last_modified = last_modified
+
+    if request.if_none_match:
+        is_current = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        is_current = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        is_current = False
+
+    if is_current:
+        return current_app.response_class(status=304)
+    return None
+
+
+def static_fingerprint(filename):
+    """
+    Get a short content hash for a static file.
+
+    Args:
+        filename (str): Path relative to the static folder
+
+    Returns:
+        str: Fingerprint or None if the file does not exist
+    """
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    key = (path, mtime)
+    fingerprint = _fingerprints.get(key)
+    if fingerprint is None:
+        with open(path, 'rb') as f:
+            fingerprint = hashlib.md5(f.read()).hexdigest()[:12]
+        _fingerprints[key] = fingerprint
+    return fingerprint
+
+
+def add_static_fingerprint(endpoint, values):
+    """
+    URL defaults hook adding a content fingerprint to static URLs.
+
+    Args:
+        endpoint (str): Endpoint being built
+        values (dict): URL values, updated in place
+    """
+    if endpoint != 'static' or 'filename' not in values or 'v' in values:
+        return
+
+    fingerprint = static_fingerprint(values['filename'])
+    if fingerprint:
+        values['v'] = fingerprint
+
+
+def _select_encoding(app):
+    """
+    Pick the response encoding from the Accept-Encoding header.
+
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    accept = request.accept_encodings
+
+    if brotli is not None and app.config.get('HTTP_BROTLI', True) and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def _compress(app, response):
+    """
+    Compress a buffered response body in place if worthwhile.
+
+    Args:
+        app: Flask application instance
+        response: Response object
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return
+
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < app.config.get('HTTP_COMPRESS_MIN_SIZE', 1024):
+        return
+
+    encoding = _select_encoding(app)
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=app.config.get('HTTP_BROTLI_QUALITY', 4))
+    elif encoding == 'gzip':
+        compressed = gzip.compress(data, compresslevel=app.config.get('HTTP_GZIP_LEVEL', 6))
+    else:
+        return
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+
+def apply_http_cache(response):
+    """
+    After-request hook applying validators, caching headers and compression.
+
+    Args:
+        response: Response object
+
+    Returns:
+        Response: Updated response
+    """
+    app = current_app._get_current_object()
+
+    # Fingerprinted static files never change under the same URL
+    if request.endpoint == 'static' and request.args.get('v'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config.get('STATIC_IMMUTABLE_MAX_AGE', IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
+
+    etag = g.pop('http_etag', None)
+    last_modified = g.pop('http_last_modified', None)
+
+    if etag:
+        # Validators set by the view from document versions
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    elif (app.config.get('HTTP_ETAGS', True)
+            and request.method == 'GET'
+            and response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and response.mimetype in ETAG_MIMETYPES
+            and 'ETag' not in response.headers):
+        # Fall back to a hash of the body; saves bandwidth on unchanged polls
+        response.add_etag(weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response = response.make_conditional(request)
+
+    _compress(app, response)
+    return response
+
+
+def register_http_cache(app):
+    """
+    Register HTTP caching and compression with the application.
+
+    Args:
+        app: Flask application instance
+    """
+    app.url_defaults(add_static_fingerprint)
+    app.after_request(apply_http_cache)
+
+    logger.info(f"HTTP caching registered (brotli {'available' if brotli else 'not installed'})")
@@ -0,0 +1,111 @@
+"""
+Background job helpers for Travian Whispers web application.
+This module queues jobs from views and reports their progress as JSON
+or server-sent events.
+"""
+import logging
+import time
+from flask import current_app, jsonify, url_for
+
+from database.models.job import Job
+from web.utils.sse import format_event, heartbeat, sse_response
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def submit_job(user_id, job_type, params=None, secrets=None, message='Job queued'):
+    """
+    Queue a background job and build the 202 response pointing at it.
+
+    Args:
+        user_id (str): User ID
+        job_type (str): Job type
+        params (dict, optional): Job parameters
+        secrets (dict, optional): Parameters dropped once the job is claimed
+        message (str, optional): Message returned to the client
+
+    Returns:
+        tuple: (response, status code)
+    """
+    job = Job().create_job(user_id, job_type, params=params, secrets=secrets)
+
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Failed to queue job'
+        }), 500
+
+    job_id = str(job['_id'])
+    response = jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job_id,
+        'status': job['status'],
+        'status_url': url_for('api.get_job_status', job_id=job_id),
+        'events_url': url_for('api.stream_job_events', job_id=job_id)
+    })
+    response.headers['Location'] = url_for('api.get_job_status', job_id=job_id)
+    return response, 202
+
+
+def iter_job_events(job_id, user_id):
+    """
+    Stream a job's progress as server-sent events until it finishes.
+
+    The job document is polled; a 'job' event is sent whenever its status,
+    progress or message changes. The stream ends when the job finishes or
+    after JOB_EVENTS_MAX_DURATION seconds, and the browser reconnects.
+
+    Args:
+        job_id (str): Job ID
+        user_id (str): ID of the user owning the job
+
+    Yields:
+        str: Formatted events
+    """
+    config = current_app.config
+    poll_interval = config.get('JOB_EVENTS_POLL_INTERVAL', 1)
+    heartbeat_interval = config.get('SSE_HEARTBEAT_INTERVAL', 15)
+    deadline = time.monotonic() + config.get('JOB_EVENTS_MAX_DURATION', 55)
+
+    job_model = Job()
+    last_state = None
+    last_sent = time.monotonic()
+
+    yield format_event(retry=config.get('SSE_RETRY_MS', 2000))
+
+    while True:
+        job = job_model.get_job(job_id, user_id)
+        if job is None:
+            yield format_event({'message': 'Job not found'}, event='error')
+            return
+
+        state = (job.get('status'), job.get('progress'), job.get('message'))
+        if state != last_state:
+            last_state = state
+            last_sent = time.monotonic()
+            yield format_event(Job.to_public(job), event='job')
+
+        if job.get('status') in Job.FINISHED_STATUSES or time.monotonic() >= deadline:
+            return
+
+        if time.monotonic() - last_sent >= heartbeat_interval:
+            last_sent = time.monotonic()
+            yield heartbeat()
+
+        time.sleep(poll_interval)
+
+
+def job_events_response(job_id, user_id):
+    """
+    Build the event-stream response for a job.
+
+    Args:
+        job_id (str): Job ID
+        user_id (str): ID of the user owning the job
+
+    Returns:
+        Response: Streaming response
+    """
+    return sse_response(iter_job_events(job_id, user_id), user_id=user_id)
@@ -1,11 +1,22 @@
 """
 JSON utilities for Travian Whispers web application.
-This module provides utility functions for JSON serialization.
+This module provides the application's JSON provider and utility
+functions for JSON serialization.
 """
+import dataclasses
+import decimal
 import logging
 import json
+import uuid
 from bson import ObjectId
-from datetime import datetime
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec is optional
+    msgspec = None
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -23,10 +34,98 @@ def to_json(obj):
     if isinstance(obj, ObjectId):
         return str(obj)
     if isinstance(obj, datetime):
-        return obj.isoformat() if obj else None
-    # Let the default encoder handle it
+        return obj.isoformat()
+    # The remaining conversions match Flask's default provider
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
     raise TypeError(f"Type {type(obj)} not serializable")
 
+def _msgspec_hook(obj):
+    """
+    Encode hook for msgspec, covering types it does not support natively.
+    
+    Args:
+        obj: Object to convert
+        
+    Returns:
+        JSON-compatible object
+    """
+    return to_json(obj)
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes MongoDB documents in a single pass.
+    
+    ObjectId and datetime values are converted by the encoder's default
+    hook, so documents can be passed to jsonify() as-is. When msgspec is
+    installed and JSON_USE_MSGSPEC is enabled, compact responses are
+    encoded with msgspec, falling back to the standard library on error.
+    Note that msgspec writes UTC datetimes with a "Z" suffix instead of
+    "+00:00", and dates as ISO strings instead of HTTP dates.
+    """
+    
+    default = staticmethod(to_json)
+    sort_keys = False
+    
+    def __init__(self, app):
+        """
+        Initialize MongoJSONProvider.
+        
+        Args:
+            app: Flask application instance
+        """
+        super().__init__(app)
+        self.use_msgspec = msgspec is not None and app.config.get('JSON_USE_MSGSPEC', True)
+        self._encoder = msgspec.json.Encoder(enc_hook=_msgspec_hook) if self.use_msgspec else None
+    
+    def encode(self, obj):
+        """
+        Encode an object to compact JSON bytes.
+        
+        Args:
+            obj: Object to serialize
+            
+        Returns:
+            bytes: JSON document
+        """
+        if self._encoder is not None:
+            try:
+                return self._encoder.encode(obj)
+            except (TypeError, ValueError, OverflowError) as e:
+                logger.debug(f"msgspec encoding failed, using json module: {e}")
+        
+        return json.dumps(
+            obj, default=self.default, ensure_ascii=self.ensure_ascii,
+            sort_keys=self.sort_keys, separators=(",", ":")
+        ).encode("utf-8")
+    
+    def response(self, *args, **kwargs):
+        """
+        Serialize the given arguments as a JSON response.
+        
+        Returns:
+            Flask response object
+        """
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            # Pretty-printed output goes through the standard encoder
+            return super().response(*args, **kwargs)
+        
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
 def dumps(obj, **kwargs):
     """
     Serialize an object to a JSON string.
@@ -57,18 +156,15 @@ def jsonify_custom(obj):
     """
     Create a Flask JSON response with custom serialization.
     
+    Kept for existing callers; jsonify() now handles ObjectId and
+    datetime through MongoJSONProvider.
+    
     Args:
         obj: Object to serialize
         
     Returns:
         JSON response object
     """
-    from flask import Response
-    
-    # First serialize the object to a JSON string
-    json_str = dumps(obj)
-    
-    # Create a Response object with the correct content type
-    response = Response(json_str, mimetype='application/json')
+    from flask import current_app
     
-    return response
+    return current_app.json.response(obj)
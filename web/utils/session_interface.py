@@ -0,0 +1,188 @@
+"""
+Session storage for Travian Whispers web application.
+This module provides a MongoDB session store keyed by session ID, with
+a TTL index for expiry and an optional in-memory read tier.
+"""
+import logging
+from datetime import datetime, timezone
+
+from cachelib import SimpleCache
+from flask_session.mongodb import MongoDBSessionInterface
+from itsdangerous import want_bytes
+from pymongo import ReturnDocument
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class TieredMongoDBSessionInterface(MongoDBSessionInterface):
+    """
+    MongoDB session interface with an optional in-memory read tier.
+
+    Sessions are stored with the session ID as the document _id, so
+    lookups use the primary key index, and MongoDB removes expired
+    documents through the TTL index on "expiration". Every write bumps a
+    "rev" counter. When the tier is enabled, recently used sessions are
+    kept in a per-process cachelib SimpleCache with the revision they
+    were read at; a cached copy is served only after a projection on
+    "rev" shows the stored session has not changed, so a login or logout
+    in another process is seen on the next request and a stale copy is
+    never written back. Unmodified sessions are written back at most
+    once per refresh interval instead of on every request.
+    """
+
+    def __init__(self, app, client, db, collection, local_cache_ttl=0,
+                 local_cache_size=1000, refresh_interval=60, **kwargs):
+        """
+        Initialize TieredMongoDBSessionInterface.
+
+        Args:
+            app: Flask application instance
+            client (MongoClient): MongoDB client
+            db (str): Database name
+            collection (str): Collection name
+            local_cache_ttl (int, optional): Seconds a session stays in the
+                in-memory tier, 0 disables it
+            local_cache_size (int, optional): Maximum sessions kept in memory
+            refresh_interval (int, optional): Minimum seconds between expiry
+                refreshes of an unmodified session
+            **kwargs: Common Flask-Session options (key_prefix, permanent,
+                sid_length, serialization_format, ...)
+        """
+        super().__init__(app, client=client, db=db, collection=collection, **kwargs)
+
+        self.local_cache_ttl = local_cache_ttl
+        self.refresh_interval = refresh_interval
+        self.local = SimpleCache(threshold=local_cache_size, default_timeout=local_cache_ttl)
+        self.touched = SimpleCache(threshold=local_cache_size * 10, default_timeout=refresh_interval)
+
+    def _retrieve_session_data(self, store_id):
+        """
+        Load session data, from memory when the stored copy is unchanged.
+
+        Args:
+            store_id (str): Prefixed session ID
+
+        Returns:
+            dict: Session data or None if missing or expired
+        """
+        cached = self.local.get(store_id) if self.local_cache_ttl > 0 else None
+
+        # Only the revision is read when a copy is cached
+        projection = {"rev": 1, "expiration": 1} if cached is not None else {"val": 1, "rev": 1, "expiration": 1}
+        document = self.store.find_one({"_id": store_id}, projection)
+        if not document:
+            self.local.delete(store_id)
+            return None
+
+        # The TTL monitor runs about once a minute, so check expiry here too
+        expiration = document.get("expiration")
+        if expiration is not None:
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=timezone.utc)
+            if expiration <= datetime.now(timezone.utc):
+                self.local.delete(store_id)
+                return None
+
+        if cached is not None and cached[1] == document.get("rev"):
+            serialized = cached[0]
+        else:
+            if "val" not in document:
+                # Changed by another process since it was cached
+                document = self.store.find_one({"_id": store_id}, {"val": 1, "rev": 1})
+                if not document:
+                    self.local.delete(store_id)
+                    return None
+            serialized = want_bytes(document["val"])
+            if self.local_cache_ttl > 0:
+                self.local.set(store_id, (serialized, document.get("rev")))
+
+        return self.serializer.decode(serialized)
+
+    def _delete_session(self, store_id):
+        """
+        Delete a session from memory and MongoDB.
+
+        Args:
+            store_id (str): Prefixed session ID
+        """
+        self.local.delete(store_id)
+        self.touched.delete(store_id)
+        self.store.delete_one({"_id": store_id})
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        """
+        Create or update a session.
+
+        Args:
+            session_lifetime (timedelta): Session lifetime
+            session: Session to store
+            store_id (str): Prefixed session ID
+        """
+        serialized = self.serializer.encode(session)
+
+        document = self.store.find_one_and_update(
+            {"_id": store_id},
+            {
+                "$set": {
+                    "val": serialized,
+                    "expiration": datetime.now(timezone.utc) + session_lifetime
+                },
+                "$inc": {"rev": 1}
+            },
+            projection={"rev": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+        if self.local_cache_ttl > 0 and document is not None:
+            self.local.set(store_id, (serialized, document.get("rev")))
+        self.touched.set(store_id, True)
+
+    def should_set_storage(self, app, session):
+        """
+        Decide whether the session must be written back.
+
+        Args:
+            app: Flask application instance
+            session: Current session
+
+        Returns:
+            bool: True if the session was modified or its expiry is due
+                for a refresh
+        """
+        if session.modified:
+            return True
+
+        if not app.config["SESSION_REFRESH_EACH_REQUEST"]:
+            return False
+
+        return not self.touched.has(self._get_store_id(session.sid))
+
+
+def create_session_interface(app, client):
+    """
+    Build the MongoDB session interface from the application config.
+
+    Args:
+        app: Flask application instance
+        client (MongoClient): MongoDB client
+
+    Returns:
+        TieredMongoDBSessionInterface: Session interface
+    """
+    config = app.config
+
+    return TieredMongoDBSessionInterface(
+        app,
+        client=client,
+        db=config.get('SESSION_MONGODB_DB') or config.get('MONGODB_DB_NAME'),
+        collection=config.get('SESSION_MONGODB_COLLECT', 'sessions'),
+        local_cache_ttl=config.get('SESSION_LOCAL_CACHE_TTL', 0),
+        local_cache_size=config.get('SESSION_LOCAL_CACHE_SIZE', 1000),
+        refresh_interval=config.get('SESSION_REFRESH_INTERVAL', 60),
+        key_prefix=config.get('SESSION_KEY_PREFIX', 'session:'),
+        permanent=config.get('SESSION_PERMANENT', True),
+        sid_length=config.get('SESSION_ID_LENGTH', 32),
+        serialization_format=config.get('SESSION_SERIALIZATION_FORMAT', 'msgpack')
+    )
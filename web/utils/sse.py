@@ -0,0 +1,182 @@
+"""
+Server-sent events utilities for Travian Whispers web application.
+This module formats events and builds streaming text/event-stream
+responses.
+"""
+import json
+import logging
+import threading
+from flask import Response, current_app, jsonify, stream_with_context
+
+from web.utils.json_encoder import to_json
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def format_event(data=None, event=None, event_id=None, retry=None):
+    """
+    Format a server-sent event.
+
+    Args:
+        data (optional): Payload, serialized as JSON
+        event (str, optional): Event name
+        event_id (str, optional): Event ID, sent back by the browser as
+            Last-Event-ID when it reconnects
+        retry (int, optional): Reconnection delay in milliseconds
+
+    Returns:
+        str: Event text
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    if retry is not None:
+        lines.append(f"retry: {int(retry)}")
+    if data is not None:
+        for line in json.dumps(data, default=to_json).splitlines():
+            lines.append(f"data: {line}")
+
+    return '\n'.join(lines) + '\n\n'
+
+
+def heartbeat():
+    """
+    Build a comment line that keeps idle connections and proxies open.
+
+    Returns:
+        str: SSE comment
+    """
+    return ': keepalive\n\n'
+
+
+class StreamLimiter:
+    """
+    Caps the event streams open in a process.
+
+    Every stream holds a worker thread for as long as it is open, so a
+    process keeps at most max_streams of them, and at most max_per_user
+    for one user, leaving the other threads to ordinary requests.
+    """
+
+    def __init__(self, max_streams=8, max_per_user=2):
+        """
+        Initialize StreamLimiter.
+
+        Args:
+            max_streams (int, optional): Streams open at once in the process
+            max_per_user (int, optional): Streams open at once for one user
+        """
+        self.max_streams = max_streams
+        self.max_per_user = max_per_user
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, user_id):
+        """
+        Reserve a stream slot.
+
+        Args:
+            user_id (str): User opening the stream
+
+        Returns:
+            bool: True if the stream may open
+        """
+        with self._lock:
+            if sum(self._open.values()) >= self.max_streams:
+                return False
+            if self._open.get(user_id, 0) >= self.max_per_user:
+                return False
+            self._open[user_id] = self._open.get(user_id, 0) + 1
+            return True
+
+    def release(self, user_id):
+        """
+        Free a slot taken by acquire().
+
+        Args:
+            user_id (str): User whose stream closed
+        """
+        with self._lock:
+            remaining = self._open.get(user_id, 0) - 1
+            if remaining > 0:
+                self._open[user_id] = remaining
+            else:
+                self._open.pop(user_id, None)
+
+
+def get_stream_limiter(app=None):
+    """
+    Get the application's stream limiter, creating it on first use.
+
+    Args:
+        app: Flask application instance, defaults to the current app
+
+    Returns:
+        StreamLimiter: Stream limiter
+    """
+    app = app or current_app._get_current_object()
+    limiter = app.extensions.get('sse_stream_limiter')
+
+    if limiter is None:
+        limiter = app.extensions.setdefault('sse_stream_limiter', StreamLimiter(
+            max_streams=app.config.get('SSE_MAX_STREAMS', 8),
+            max_per_user=app.config.get('SSE_MAX_STREAMS_PER_USER', 2)
+        ))
+
+    return limiter
+
+
+def sse_response(events, user_id=None):
+    """
+    Build a streaming event-stream response.
+
+    Args:
+        events (iterable): Generator yielding formatted events
+        user_id (str, optional): Owner of the stream; when given, the stream
+            counts against the process and per-user limits
+
+    Returns:
+        Response: Flask streaming response, or a 429 response when the
+            limits are reached
+    """
+    limiter = get_stream_limiter() if user_id is not None else None
+
+    if limiter is not None and not limiter.acquire(user_id):
+        # EventSource does not retry after an error status; job pages poll instead
+        if hasattr(events, 'close'):
+            events.close()
+        response = jsonify({
+            'success': False,
+            'message': 'Too many open event streams'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = '30'
+        return response
+
+    def generate():
+        try:
+            yield from events
+        except GeneratorExit:
+            # Client disconnected
+            raise
+        except Exception as e:
+            logger.error(f"Error in event stream: {e}")
+            yield format_event({'message': 'Stream error'}, event='error')
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+    # Runs when the server closes the response, even if the stream never started
+    if limiter is not None:
+        response.call_on_close(lambda: limiter.release(user_id))
+
+    return response
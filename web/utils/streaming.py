@@ -0,0 +1,196 @@
+"""
+Streaming export utilities for Travian Whispers web application.
+This module builds CSV, JSON and NDJSON download responses from
+row iterators, optionally gzip-compressed, without holding the whole
+export in memory.
+"""
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from flask import Response, stream_with_context
+
+from web.utils.json_encoder import to_json
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Bytes of output buffered before a chunk is sent to the client
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'txt': ('text/plain', 'txt')
+}
+
+
+def _chunked(pieces, chunk_size=CHUNK_SIZE):
+    """
+    Join small string pieces into encoded chunks of about chunk_size bytes.
+
+    Args:
+        pieces (iterable): Strings to send
+        chunk_size (int, optional): Target chunk size in bytes
+
+    Yields:
+        bytes: UTF-8 encoded chunk
+    """
+    buffer = []
+    size = 0
+
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_csv(rows, fieldnames):
+    """
+    Render rows as CSV lines.
+
+    Args:
+        rows (iterable): Row dictionaries
+        fieldnames (list): Columns to write, in order
+
+    Yields:
+        str: CSV text, one line at a time
+    """
+    line = io.StringIO()
+    writer = csv.DictWriter(line, fieldnames=fieldnames, extrasaction='ignore')
+
+    writer.writeheader()
+    yield line.getvalue()
+
+    for row in rows:
+        line.seek(0)
+        line.truncate(0)
+        writer.writerow(row)
+        yield line.getvalue()
+
+
+def iter_ndjson(rows):
+    """
+    Render rows as newline-delimited JSON.
+
+    Args:
+        rows (iterable): Row dictionaries
+
+    Yields:
+        str: One JSON document per line
+    """
+    for row in rows:
+        yield json.dumps(row, default=to_json) + '\n'
+
+
+def iter_lines(rows):
+    """
+    Render pre-formatted text rows, one per line.
+
+    Args:
+        rows (iterable): Strings
+
+    Yields:
+        str: Text line
+    """
+    for row in rows:
+        yield f"{row}\n"
+
+
+def iter_json_array(rows):
+    """
+    Render rows as a single JSON array, one element at a time.
+
+    Args:
+        rows (iterable): Row dictionaries
+
+    Yields:
+        str: JSON text
+    """
+    yield '['
+    separator = '\n'
+    for row in rows:
+        yield separator + json.dumps(row, default=to_json)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Gzip-compress a stream of byte chunks on the fly.
+
+    Args:
+        chunks (iterable): Byte chunks
+        level (int, optional): Compression level
+
+    Yields:
+        bytes: Compressed chunks
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def stream_export(rows, export_format, filename, fieldnames=None, compress=False):
+    """
+    Build a streaming download response.
+
+    Args:
+        rows (iterable): Row dictionaries (strings for 'txt'), usually a
+            generator over a cursor
+        export_format (str): 'csv', 'json', 'ndjson' or 'txt'
+        filename (str): File name without extension
+        fieldnames (list, optional): CSV columns
+        compress (bool, optional): Gzip the file
+
+    Returns:
+        Response: Flask streaming response
+    """
+    mimetype, extension = EXPORT_FORMATS.get(export_format, EXPORT_FORMATS['json'])
+
+    if export_format == 'csv':
+        pieces = iter_csv(rows, fieldnames)
+    elif export_format == 'ndjson':
+        pieces = iter_ndjson(rows)
+    elif export_format == 'txt':
+        pieces = iter_lines(rows)
+    else:
+        pieces = iter_json_array(rows)
+
+    chunks = _chunked(pieces)
+    filename = f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    if compress:
+        chunks = gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are already sent, so the download just ends early
+            logger.error(f"Error streaming export '{filename}': {e}")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
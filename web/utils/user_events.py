@@ -0,0 +1,464 @@
+"""
+Live user events for Travian Whispers web application.
+This module pushes background job transitions and new activity log
+entries to each user's server-sent event stream.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from flask import current_app
+
+from database.models.init import get_collection
+from database.models.job import Job
+from web.utils.sse import format_event, heartbeat
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a stream it fell behind and must reconnect
+OVERFLOW = object()
+
+# Fields of activity log entries sent to the browser
+ACTIVITY_PROJECTION = {
+    'userId': 1, 'activityType': 1, 'details': 1,
+    'status': 1, 'village': 1, 'timestamp': 1
+}
+
+
+def _aware(value):
+    """Treat naive datetimes from the database as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _user_id_values(user_ids):
+    """
+    Expand user IDs to the string and ObjectId forms activity logs use.
+
+    Args:
+        user_ids (list): User IDs as strings
+
+    Returns:
+        list: Values for an $in query
+    """
+    values = list(user_ids)
+    values.extend(ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id))
+    return values
+
+
+def _activity_event(log):
+    """
+    Build the event for an activity log entry.
+
+    Args:
+        log (dict): Activity log document
+
+    Returns:
+        dict: Hub event
+    """
+    return {
+        'type': 'activity',
+        'key': log['_id'],
+        'data': {
+            'id': str(log['_id']),
+            'activity': log.get('activityType'),
+            'details': log.get('details'),
+            'status': log.get('status'),
+            'village': log.get('village'),
+            'timestamp': log.get('timestamp')
+        }
+    }
+
+
+def _job_event(job):
+    """
+    Build the event for a job state.
+
+    Args:
+        job (dict): Job document
+
+    Returns:
+        dict: Hub event
+    """
+    return {
+        'type': 'job',
+        'key': job['updatedAt'],
+        'data': Job.to_public(job)
+    }
+
+
+class Cursor:
+    """
+    Position in a user's event stream, sent as the SSE event ID.
+
+    Activity entries are ordered by ObjectId and job updates by updatedAt,
+    so the cursor holds one watermark for each.
+    """
+
+    def __init__(self, activity_id, job_time):
+        """
+        Initialize Cursor.
+
+        Args:
+            activity_id (ObjectId): Last activity log entry delivered
+            job_time (datetime): Last job update delivered
+        """
+        self.activity_id = activity_id
+        self.job_time = job_time
+
+    @classmethod
+    def now(cls):
+        """Cursor positioned at the current time."""
+        now = datetime.now(timezone.utc)
+        return cls(ObjectId.from_datetime(now), now)
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Parse a Last-Event-ID header value.
+
+        Args:
+            value (str): Event ID
+
+        Returns:
+            Cursor: Parsed cursor or None if the value is not a cursor
+        """
+        try:
+            activity_id, job_ms = value.split('.', 1)
+            return cls(ObjectId(activity_id), datetime.fromtimestamp(int(job_ms) / 1000, timezone.utc))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def advance(self, event):
+        """
+        Move the cursor past an event.
+
+        Args:
+            event (dict): Hub event
+        """
+        if event['type'] == 'activity':
+            self.activity_id = max(self.activity_id, event['key'])
+        else:
+            self.job_time = max(self.job_time, _aware(event['key']))
+
+    def covers(self, event):
+        """
+        Check whether an event is at or before the cursor.
+
+        Args:
+            event (dict): Hub event
+
+        Returns:
+            bool: True if a stream at this position already has the event
+        """
+        if event['type'] == 'activity':
+            return event['key'] <= self.activity_id
+        return _aware(event['key']) <= self.job_time
+
+    def __str__(self):
+        return f"{self.activity_id}.{int(self.job_time.timestamp() * 1000)}"
+
+
+class UserEventHub:
+    """
+    In-process publish/subscribe hub for per-user events.
+
+    Streams subscribe to the hub instead of querying MongoDB themselves.
+    A single thread per process polls the activity_logs and jobs
+    collections for the users that currently have a stream open and
+    publishes what changed, so the database load does not grow with
+    the number of open connections. Polling is used because change
+    streams need a replica set. Each poll looks back a few seconds to
+    catch inserts that commit out of _id order; seen entries are
+    remembered so nothing is delivered twice.
+    """
+
+    def __init__(self, app, poll_interval=1, overlap=5, queue_size=256, batch_size=500):
+        """
+        Initialize UserEventHub.
+
+        Args:
+            app: Flask application instance
+            poll_interval (float, optional): Seconds between polls
+            overlap (float, optional): Seconds each poll looks back
+            queue_size (int, optional): Events buffered per stream
+            batch_size (int, optional): Maximum documents read per poll
+        """
+        self.app = app
+        self.poll_interval = poll_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        """Start watching from now, forgetting what an earlier poll thread saw."""
+        now = datetime.now(timezone.utc)
+        self._activity_since = now
+        self._job_since = now
+        self._seen_activity = {}
+        self._job_states = {}
+
+    def subscribe(self, user_id):
+        """
+        Register a stream for a user.
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            queue.Queue: Queue receiving the user's events
+        """
+        events = queue.Queue(maxsize=self.queue_size)
+
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(events)
+            if self._thread is None or not self._thread.is_alive():
+                # Changes made while no stream was open are not replayed
+                self._reset()
+                self._thread = threading.Thread(target=self._run, name='user-event-hub', daemon=True)
+                self._thread.start()
+
+        return events
+
+    def unsubscribe(self, user_id, events):
+        """
+        Remove a stream.
+
+        Args:
+            user_id (str): User ID
+            events (queue.Queue): Queue returned by subscribe()
+        """
+        with self._lock:
+            streams = self._subscribers.get(user_id)
+            if streams:
+                streams.discard(events)
+                if not streams:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        """
+        Deliver an event to every stream of a user.
+
+        A stream whose queue is full is sent OVERFLOW and dropped; the
+        browser reconnects and resumes from its last event ID.
+
+        Args:
+            user_id (str): User ID
+            event (dict): Event with 'type', 'key' and 'data'
+        """
+        with self._lock:
+            streams = list(self._subscribers.get(user_id, ()))
+
+        for events in streams:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(user_id, events)
+                try:
+                    events.get_nowait()
+                except queue.Empty:
+                    pass
+                events.put_nowait(OVERFLOW)
+
+    def _run(self):
+        """Poll for changes while any stream is open."""
+        while True:
+            time.sleep(self.poll_interval)
+
+            with self._lock:
+                user_ids = list(self._subscribers)
+                if not user_ids:
+                    self._thread = None
+                    return
+
+            try:
+                with self.app.app_context():
+                    self._poll_activity(user_ids)
+                    self._poll_jobs(user_ids)
+            except Exception as e:
+                logger.error(f"Error polling user events: {e}")
+
+    def _poll_activity(self, user_ids):
+        """
+        Publish activity log entries created since the last poll.
+
+        Args:
+            user_ids (list): Users with open streams
+        """
+        collection = get_collection('activity_logs')
+        if collection is None:
+            return
+
+        since = self._activity_since - self.overlap
+        logs = collection.find(
+            {'_id': {'$gte': ObjectId.from_datetime(since)}, 'userId': {'$in': _user_id_values(user_ids)}},
+            ACTIVITY_PROJECTION
+        ).sort('_id', 1).limit(self.batch_size)
+
+        for log in logs:
+            if log['_id'] in self._seen_activity:
+                continue
+            created = log['_id'].generation_time
+            self._seen_activity[log['_id']] = created
+            self._activity_since = max(self._activity_since, created)
+            self.publish(str(log['userId']), _activity_event(log))
+
+        # Forget entries that fell out of the look-back window
+        horizon = self._activity_since - self.overlap * 2
+        self._seen_activity = {k: v for k, v in self._seen_activity.items() if v >= horizon}
+
+    def _poll_jobs(self, user_ids):
+        """
+        Publish job status, progress and message changes since the last poll.
+
+        Args:
+            user_ids (list): Users with open streams
+        """
+        collection = get_collection('jobs')
+        if collection is None:
+            return
+
+        since = self._job_since - self.overlap
+        jobs = collection.find(
+            {'updatedAt': {'$gte': since}, 'userId': {'$in': _user_id_values(user_ids)}},
+            {'secrets': 0}
+        ).sort('updatedAt', 1).limit(self.batch_size)
+
+        for job in jobs:
+            self._job_since = max(self._job_since, _aware(job['updatedAt']))
+
+            # Lease renewals touch updatedAt without changing anything visible
+            state = (job.get('status'), job.get('progress'), job.get('message'))
+            if self._job_states.get(job['_id'], (None,))[0:3] == state:
+                continue
+            self._job_states[job['_id']] = state + (job['updatedAt'],)
+            self.publish(str(job['userId']), _job_event(job))
+
+        horizon = self._job_since - self.overlap * 2
+        self._job_states = {
+            k: v for k, v in self._job_states.items()
+            if v[0] not in Job.FINISHED_STATUSES or _aware(v[3]) >= horizon
+        }
+
+
+def get_event_hub(app=None):
+    """
+    Get the application's event hub, creating it on first use.
+
+    Args:
+        app: Flask application instance, defaults to the current app
+
+    Returns:
+        UserEventHub: Event hub
+    """
+    app = app or current_app._get_current_object()
+    hub = app.extensions.get('user_event_hub')
+
+    if hub is None:
+        hub = app.extensions.setdefault('user_event_hub', UserEventHub(
+            app,
+            poll_interval=app.config.get('USER_EVENTS_POLL_INTERVAL', 1),
+            overlap=app.config.get('USER_EVENTS_OVERLAP', 5),
+            queue_size=app.config.get('USER_EVENTS_QUEUE_SIZE', 256)
+        ))
+
+    return hub
+
+
+def catch_up(user_id, cursor, limit=100):
+    """
+    Load events a reconnecting stream missed.
+
+    Args:
+        user_id (str): User ID
+        cursor (Cursor): Position of the last event the client received
+        limit (int, optional): Maximum events of each kind
+
+    Returns:
+        list: Hub events in delivery order
+    """
+    events = []
+
+    activity_logs = get_collection('activity_logs')
+    if activity_logs is not None:
+        logs = activity_logs.find(
+            {'userId': {'$in': _user_id_values([user_id])}, '_id': {'$gt': cursor.activity_id}},
+            ACTIVITY_PROJECTION
+        ).sort('_id', 1).limit(limit)
+        events.extend(_activity_event(log) for log in logs)
+
+    jobs = get_collection('jobs')
+    if jobs is not None and ObjectId.is_valid(user_id):
+        changed = jobs.find(
+            {'userId': ObjectId(user_id), 'updatedAt': {'$gt': cursor.job_time}},
+            {'secrets': 0}
+        ).sort('updatedAt', 1).limit(limit)
+        events.extend(_job_event(job) for job in changed)
+
+    return events
+
+
+def iter_user_events(user_id, last_event_id=None):
+    """
+    Stream a user's live events as server-sent events.
+
+    Args:
+        user_id (str): User ID
+        last_event_id (str, optional): Last-Event-ID sent by a reconnecting browser
+
+    Yields:
+        str: Formatted events
+    """
+    config = current_app.config
+    heartbeat_interval = config.get('SSE_HEARTBEAT_INTERVAL', 15)
+    deadline = time.monotonic() + config.get('USER_EVENTS_MAX_DURATION', 60)
+
+    hub = get_event_hub()
+    events = hub.subscribe(user_id)
+
+    try:
+        yield format_event(retry=config.get('SSE_RETRY_MS', 2000))
+
+        cursor = Cursor.parse(last_event_id)
+        resuming = cursor is not None
+        sent = set()
+
+        if not resuming:
+            cursor = Cursor.now()
+            yield format_event({'connected': True}, event='ready', event_id=cursor)
+
+        # The hub looks back a few seconds; events before the stream's
+        # starting position were delivered earlier or predate the stream
+        start = Cursor(cursor.activity_id, cursor.job_time)
+
+        if resuming:
+            # Subscribed before catching up, so nothing falls in between
+            for event in catch_up(user_id, cursor):
+                sent.add((event['type'], event['data']['id'], event['key']))
+                cursor.advance(event)
+                yield format_event(event['data'], event=event['type'], event_id=cursor)
+
+        while time.monotonic() < deadline:
+            try:
+                event = events.get(timeout=heartbeat_interval)
+            except queue.Empty:
+                yield heartbeat()
+                continue
+
+            if event is OVERFLOW:
+                return
+
+            if start.covers(event) or (event['type'], event['data']['id'], event['key']) in sent:
+                continue
+
+            cursor.advance(event)
+            yield format_event(event['data'], event=event['type'], event_id=cursor)
+    finally:
+        hub.unsubscribe(user_id, events)